@@ -4,8 +4,13 @@ namespace App\Console\Commands;
 
 use App\Models\StockSymbol;
 use App\Models\FinancialData;
+use App\Services\LLMJobQueue;
+use App\Services\LLMService;
+use App\Services\LLMWireFormat;
 use App\Services\YahooFinanceService;
 use Illuminate\Console\Command;
+use Illuminate\Http\Client\ConnectionException;
+use Illuminate\Support\Facades\Http;
 use Illuminate\Support\Facades\Log;
 use Symfony\Component\Process\Process;
 
@@ -181,50 +186,56 @@ class AgentJuliaFetch extends Command
     protected function handlePythonExecution(string $companyName, string $pythonPath): int
     {
         try {
-            $this->info(" Executando script Python AgentJulia.py para: {$companyName}");
-            
-            $scriptPath = base_path('llm/models/AgentJulia.py');
-            
-            if (!file_exists($scriptPath)) {
-                $this->error(" Script Python não encontrado em: {$scriptPath}");
-                return Command::FAILURE;
-            }
+            // Prioriza o serviço Python em execução contínua (sem iniciar um novo interpretador)
+            $jsonOutput = $this->fetchFromPythonService($companyName);
 
-            // Executa script Python
-            $process = new Process([
-                $pythonPath,
-                $scriptPath,
-                $companyName
-            ]);
-            
-            $process->setTimeout(300); // 5 minutos de timeout
-            $process->run();
-
-            if (!$process->isSuccessful()) {
-                $errorOutput = $process->getErrorOutput() ?: $process->getOutput();
-                $this->error(" Erro ao executar script Python: " . $errorOutput);
-                Log::error('Agent Julia: Erro ao executar script Python', [
-                    'error' => $errorOutput,
-                    'company_name' => $companyName,
-                    'exit_code' => $process->getExitCode(),
-                ]);
-                return Command::FAILURE;
-            }
+            if ($jsonOutput === null) {
+                $this->info(" Executando script Python AgentJulia.py para: {$companyName}");
+                
+                $scriptPath = base_path('llm/models/AgentJulia.py');
+                
+                if (!file_exists($scriptPath)) {
+                    $this->error(" Script Python não encontrado em: {$scriptPath}");
+                    return Command::FAILURE;
+                }
 
-            $jsonOutput = $process->getOutput();
+                // Executa script Python
+                $process = new Process(array_merge([
+                    $pythonPath,
+                    $scriptPath,
+                    $companyName
+                ], LLMWireFormat::arguments()));
+                
+                $process->setTimeout(300); // 5 minutos de timeout
+                $process->run();
+
+                if (!$process->isSuccessful()) {
+                    $errorOutput = $process->getErrorOutput() ?: $process->getOutput();
+                    $this->error(" Erro ao executar script Python: " . $errorOutput);
+                    Log::error('Agent Julia: Erro ao executar script Python', [
+                        'error' => $errorOutput,
+                        'company_name' => $companyName,
+                        'exit_code' => $process->getExitCode(),
+                    ]);
+                    return Command::FAILURE;
+                }
+
+                $jsonOutput = $process->getOutput();
+            }
             
             if (empty($jsonOutput)) {
                 $this->warn(" Script Python não retornou dados.");
                 return Command::FAILURE;
             }
 
-            // Decodifica JSON
-            $data = json_decode($jsonOutput, true);
+            // Decodifica a saída (JSON, MessagePack ou arquivo temporário, conforme negociado)
+            $data = LLMWireFormat::decode($jsonOutput);
             
-            if (json_last_error() !== JSON_ERROR_NONE) {
-                $this->error(" Erro ao decodificar JSON: " . json_last_error_msg());
-                Log::error('Agent Julia: Erro ao decodificar JSON do Python', [
-                    'error' => json_last_error_msg(),
+            if ($data === null) {
+                $decodeError = json_last_error() !== JSON_ERROR_NONE ? json_last_error_msg() : 'saída inválida';
+                $this->error(" Erro ao decodificar saída do Python: " . $decodeError);
+                Log::error('Agent Julia: Erro ao decodificar saída do Python', [
+                    'error' => $decodeError,
                     'output' => substr($jsonOutput, 0, 500),
                 ]);
                 return Command::FAILURE;
@@ -299,6 +310,54 @@ class AgentJuliaFetch extends Command
         }
     }
 
+    /**
+     * Busca os dados no serviço Python em execução contínua (services.llm.service_url)
+     * 
+     * @param string $companyName
+     * @return string|null JSON retornado, ou null se o serviço não estiver configurado/disponível
+     * @throws \Exception Se o serviço responder com erro ou não responder a tempo
+     */
+    protected function fetchFromPythonService(string $companyName): ?string
+    {
+        $serviceUrl = config('services.llm.service_url');
+        if (empty($serviceUrl)) {
+            return null;
+        }
+
+        // Com a fila de jobs habilitada no serviço: prioridade de lote agendado,
+        // deduplicação com coletas idênticas e novas tentativas/dead-letter duráveis
+        $queue = new LLMJobQueue();
+        $job = $queue->enqueue('julia', ['company_name' => $companyName], LLMJobQueue::PRIORITY_SCHEDULED);
+        if ($job !== null) {
+            $this->info(" Coleta enfileirada no serviço Python (job #{$job['job_id']}) para: {$companyName}");
+            $done = $queue->await((int) $job['job_id'], 300);
+            return json_encode($done['result'] ?? []);
+        }
+
+        try {
+            $this->info(" Consultando serviço Python (Agente Júlia) para: {$companyName}");
+            $response = Http::timeout(300)
+                ->withHeaders(LLMWireFormat::headers())
+                ->post(rtrim($serviceUrl, '/') . '/julia', ['company_name' => $companyName]);
+        } catch (ConnectionException $e) {
+            // Timeout: o serviço está vivo e pode ainda estar coletando; não duplica a coleta
+            if (!LLMService::isConnectFailure($e)) {
+                throw new \Exception('Serviço Python não respondeu (julia): ' . $e->getMessage(), 0, $e);
+            }
+            Log::warning('Agent Julia: Serviço Python indisponível, executando script local', [
+                'error' => $e->getMessage(),
+            ]);
+            return null;
+        }
+
+        if (!$response->successful()) {
+            $body = LLMWireFormat::decode($response->body());
+            throw new \Exception($body['error'] ?? $response->body());
+        }
+
+        return $response->body();
+    }
+
     /**
      * Obtém símbolos para coleta baseado nas opções
      * 
@@ -6,6 +6,7 @@ use App\Models\StockSymbol;
 use App\Models\FinancialData;
 use App\Models\SentimentAnalysis;
 use App\Models\Article;
+use App\Services\LLMJobQueue;
 use App\Services\LLMService;
 use Illuminate\Console\Command;
 use Illuminate\Support\Facades\Log;
@@ -50,7 +51,7 @@ class AgentKeyCompose extends Command
         try {
             $symbol = $this->option('symbol');
             $force = $this->option('force');
-            $service = new LLMService();
+            $service = (new LLMService())->setQueuePriority(LLMJobQueue::PRIORITY_SCHEDULED);
             $generatedCount = 0;
             $errorCount = 0;
 
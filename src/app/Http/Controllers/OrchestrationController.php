@@ -12,6 +12,7 @@ use App\Models\SentimentAnalysis;
 use App\Models\Article;
 use App\Services\YahooFinanceService;
 use App\Services\NewsAnalysisService;
+use App\Services\LLMJobQueue;
 use App\Services\LLMService;
 
 /**
@@ -611,7 +612,8 @@ class OrchestrationController extends Controller
         $this->addLog('Key', "Iniciado... Redatora veterana transformando dados em matéria jornalística para {$symbol}...");
 
         try {
-            $service = new LLMService();
+            // Requisição do usuário: na fila do serviço Python passa na frente dos lotes agendados
+            $service = (new LLMService())->setQueuePriority(LLMJobQueue::PRIORITY_INTERACTIVE);
 
             // Busca ou cria StockSymbol (otimizado: usa método helper)
             $stockSymbol = $this->getOrCreateStockSymbol($symbol, $companyName, 'Key');
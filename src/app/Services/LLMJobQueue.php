@@ -0,0 +1,149 @@
+<?php
+
+namespace App\Services;
+
+use Illuminate\Support\Facades\Http;
+use Illuminate\Support\Facades\Log;
+
+/**
+ * Cliente da fila de jobs durável do serviço LLM (Python)
+ *
+ * Enfileira jobs dos agentes (julia, pedro, key) no serviço em execução
+ * contínua, que os persiste em SQLite e os processa por prioridade:
+ * requisições interativas (OrchestrationController::orchestrate) passam
+ * na frente dos lotes agendados (agent:*). Jobs idênticos pendentes são
+ * deduplicados; falhas são refeitas e, esgotadas as tentativas, vão para
+ * o dead-letter.
+ *
+ * Produtores:
+ * - OrchestrationController::orchestrate (Agente Key): PRIORITY_INTERACTIVE,
+ *   via LLMService::setQueuePriority()
+ * - agent:key:compose: PRIORITY_SCHEDULED, via LLMService::setQueuePriority()
+ * - agent:julia:fetch (coleta pelo serviço Python): PRIORITY_SCHEDULED
+ * Todos aguardam o resultado com await(). Sem o serviço configurado (ou com
+ * a fila indisponível) cada produtor segue pelo caminho direto de antes.
+ */
+class LLMJobQueue
+{
+    public const PRIORITY_INTERACTIVE = 'interactive';
+    public const PRIORITY_SCHEDULED = 'scheduled';
+
+    public const STATUS_DONE = 'done';
+    public const STATUS_DEAD = 'dead';
+
+    protected $serviceUrl;
+    protected $timeout;
+
+    public function __construct()
+    {
+        $config = config('services.llm');
+        $this->serviceUrl = rtrim($config['service_url'] ?? '', '/');
+        $this->timeout = 10;
+    }
+
+    /**
+     * Verifica se o serviço LLM está configurado
+     *
+     * @return bool
+     */
+    public function isConfigured(): bool
+    {
+        return !empty($this->serviceUrl);
+    }
+
+    /**
+     * Enfileira um job para um agente
+     *
+     * @param string $agent Agente ('julia', 'pedro', 'key')
+     * @param array $payload Entrada do agente
+     * @param string $priority self::PRIORITY_INTERACTIVE ou self::PRIORITY_SCHEDULED
+     * @return array|null ['job_id', 'status', 'deduplicated'] ou null se indisponível
+     */
+    public function enqueue(string $agent, array $payload, string $priority = self::PRIORITY_SCHEDULED): ?array
+    {
+        if (!$this->isConfigured()) {
+            return null;
+        }
+
+        try {
+            $response = Http::timeout($this->timeout)->post("{$this->serviceUrl}/jobs", [
+                'agent' => $agent,
+                'payload' => $payload,
+                'priority' => $priority,
+            ]);
+
+            if (!$response->successful()) {
+                Log::warning('LLMJobQueue: Falha ao enfileirar job', [
+                    'agent' => $agent,
+                    'status' => $response->status(),
+                    'error' => $response->json('error'),
+                ]);
+                return null;
+            }
+
+            return $response->json();
+        } catch (\Exception $e) {
+            Log::warning('LLMJobQueue: Serviço LLM indisponível', [
+                'agent' => $agent,
+                'error' => $e->getMessage(),
+            ]);
+            return null;
+        }
+    }
+
+    /**
+     * Consulta o estado (e o resultado) de um job
+     *
+     * @param int $jobId
+     * @return array|null Job com 'status', 'result' e 'error', ou null se não encontrado
+     */
+    public function status(int $jobId): ?array
+    {
+        if (!$this->isConfigured()) {
+            return null;
+        }
+
+        try {
+            $response = Http::timeout($this->timeout)->get("{$this->serviceUrl}/jobs/{$jobId}");
+            return $response->successful() ? $response->json() : null;
+        } catch (\Exception $e) {
+            Log::warning('LLMJobQueue: Serviço LLM indisponível', [
+                'job_id' => $jobId,
+                'error' => $e->getMessage(),
+            ]);
+            return null;
+        }
+    }
+
+    /**
+     * Aguarda o job terminar (concluído ou no dead-letter), consultando o estado periodicamente
+     *
+     * @param int $jobId
+     * @param int $timeoutSeconds Espera máxima
+     * @param int $pollMilliseconds Intervalo entre as consultas
+     * @return array Job com 'status' = 'done' (e 'result')
+     * @throws \Exception Se o job for para o dead-letter ou não terminar a tempo
+     */
+    public function await(int $jobId, int $timeoutSeconds = 300, int $pollMilliseconds = 1000): array
+    {
+        $deadline = microtime(true) + $timeoutSeconds;
+
+        while (true) {
+            $job = $this->status($jobId);
+            $status = $job['status'] ?? null;
+
+            if ($status === self::STATUS_DONE) {
+                return $job;
+            }
+            if ($status === self::STATUS_DEAD) {
+                throw new \Exception("Job #{$jobId} falhou: " . ($job['error'] ?? 'erro desconhecido'));
+            }
+            if (microtime(true) >= $deadline) {
+                // O job continua na fila; não executa de novo por conta própria
+                throw new \Exception("Job #{$jobId} não terminou em {$timeoutSeconds}s (status: " . ($status ?? 'desconhecido') . ')');
+            }
+
+            usleep($pollMilliseconds * 1000);
+        }
+    }
+}
@@ -4,6 +4,7 @@ namespace App\Services;
 
 use Illuminate\Support\Facades\Http;
 use Illuminate\Support\Facades\Log;
+use Illuminate\Support\Str;
 use Symfony\Component\Process\Process;
 use App\Services\GeminiResponseService;
 
@@ -27,11 +28,19 @@ use App\Services\GeminiResponseService;
  */
 class LLMService
 {
+    /**
+     * Erros do cURL em que a requisição não chegou ao serviço
+     * (5: proxy não resolvido, 6: host não resolvido, 7: conexão recusada/inalcançável)
+     */
+    public const CONNECT_FAILURE_CURL_ERRORS = [5, 6, 7];
+
     protected $pythonPath;
     protected $llmScriptPath;
     protected $provider;
     protected $timeout;
     protected $config;
+    protected $traceId;
+    protected $queuePriority;
 
     public function __construct()
     {
@@ -48,6 +57,51 @@ class LLMService
             : base_path($scriptPath);
     }
 
+    /**
+     * Define o identificador de rastreamento enviado ao serviço Python
+     * 
+     * O serviço grava a cascata de spans da requisição com este id
+     * (GET /traces/{id}), casando os logs do Laravel com os do Python.
+     * 
+     * @param string|null $traceId
+     * @return $this
+     */
+    public function setTraceId(?string $traceId): self
+    {
+        $this->traceId = $traceId;
+        return $this;
+    }
+
+    /**
+     * Envia a geração pela fila de jobs do serviço Python com esta prioridade
+     * 
+     * Com o serviço configurado, generateArticle() enfileira um job 'key'
+     * (LLMJobQueue::PRIORITY_INTERACTIVE para a orquestração,
+     * PRIORITY_SCHEDULED para os lotes) em vez de chamar o Gemini direto:
+     * as requisições interativas passam na frente dos lotes agendados.
+     * 
+     * @param string|null $priority Prioridade da fila (null desativa)
+     * @return $this
+     */
+    public function setQueuePriority(?string $priority): self
+    {
+        $this->queuePriority = $priority;
+        return $this;
+    }
+
+    /**
+     * Identificador de rastreamento atual (X-Trace-Id da requisição ou um novo)
+     * 
+     * @return string
+     */
+    public function getTraceId(): string
+    {
+        if (empty($this->traceId)) {
+            $this->traceId = request()->header('X-Trace-Id') ?: (string) Str::uuid();
+        }
+        return $this->traceId;
+    }
+
     /**
      * Gera matéria jornalística usando LLM baseado em dados consolidados
      * 
@@ -55,6 +109,9 @@ class LLMService
      * profissional, clara, objetiva e aprofundada.
      * 
      * Fluxo:
+     * 0. Com setQueuePriority() e o serviço Python configurado, gera pela fila de
+     *    jobs (o serviço tem o próprio Gemini e fallback); se o job falhar ou não
+     *    terminar a tempo, usa a geração simples sem repetir a chamada ao Gemini
      * 1. Prioriza GeminiResponseService (via API direta) se configurado
      * 2. Valida resultado do Gemini (deve ter title e content)
      * 3. Fallback para geração simples se Gemini falhar ou não estiver configurado
@@ -67,6 +124,22 @@ class LLMService
     public function generateArticle(array $financialData, array $sentimentData, string $symbol): array
     {
         try {
+            if ($this->queuePriority !== null) {
+                try {
+                    $queued = $this->generateViaQueue($financialData, $sentimentData, $symbol);
+                    if ($queued !== null) {
+                        return $queued;
+                    }
+                } catch (\Exception $e) {
+                    Log::warning("LLMService: Job da fila falhou, usando fallback", [
+                        'error' => $e->getMessage(),
+                        'symbol' => $symbol,
+                        'trace_id' => $this->getTraceId(),
+                    ]);
+                    return $this->generateSimpleArticle($financialData, $sentimentData, $symbol);
+                }
+            }
+
             // Verifica se pode usar Gemini diretamente (prioritário)
             if ($this->provider === 'gemini' && $this->canUseGeminiDirectly()) {
                 try {
@@ -265,21 +338,25 @@ class LLMService
     protected function callPythonScript(string $inputData): array
     {
         try {
-            $process = new Process([
-                $this->pythonPath,
-                $this->llmScriptPath,
-                $inputData
-            ]);
-            
-            $process->setTimeout($this->timeout);
-            $process->run();
+            $output = $this->callPythonService('key', json_decode($inputData, true) ?? []);
+
+            if ($output === null) {
+                $process = new Process(array_merge([
+                    $this->pythonPath,
+                    $this->llmScriptPath,
+                    $inputData
+                ], LLMWireFormat::arguments()), null, ['LLM_TRACE_ID' => $this->getTraceId()]);
+                
+                $process->setTimeout($this->timeout);
+                $process->run();
+
+                if (!$process->isSuccessful()) {
+                    $errorOutput = $process->getErrorOutput() ?: $process->getOutput();
+                    throw new \Exception($errorOutput);
+                }
 
-            if (!$process->isSuccessful()) {
-                $errorOutput = $process->getErrorOutput() ?: $process->getOutput();
-                throw new \Exception($errorOutput);
+                $output = LLMWireFormat::decode($process->getOutput());
             }
-
-            $output = json_decode($process->getOutput(), true);
             
             return [
                 'title' => $output['title'] ?? 'Análise Financeira',
@@ -288,13 +365,119 @@ class LLMService
 
         } catch (\Exception $e) {
             Log::warning("Python script error, using fallback", [
-                'error' => $e->getMessage()
+                'error' => $e->getMessage(),
+                'trace_id' => $this->getTraceId(),
             ]);
             
             throw $e;
         }
     }
 
+    /**
+     * Gera a matéria por um job 'key' na fila do serviço Python e aguarda o resultado
+     * 
+     * @param array $financialData
+     * @param array $sentimentData
+     * @param string $symbol
+     * @return array|null ['title', 'content'], ou null se a fila estiver indisponível
+     * @throws \Exception Se o job falhar, vier sem título/conteúdo ou não terminar em LLM_TIMEOUT
+     */
+    protected function generateViaQueue(array $financialData, array $sentimentData, string $symbol): ?array
+    {
+        $queue = new LLMJobQueue();
+        $payload = json_decode($this->prepareInputData($financialData, $sentimentData, $symbol), true);
+        $payload['trace_id'] = $this->getTraceId();
+
+        $job = $queue->enqueue('key', $payload, $this->queuePriority);
+        if ($job === null) {
+            return null;
+        }
+
+        $done = $queue->await((int) $job['job_id'], (int) $this->timeout, 250);
+        $result = $done['result'] ?? [];
+        if (!empty($result['error']) || empty($result['title']) || empty($result['content'])) {
+            throw new \Exception($result['error'] ?? "Job #{$job['job_id']} sem título ou conteúdo");
+        }
+
+        Log::info("LLMService: Artigo gerado pela fila do serviço Python", [
+            'symbol' => $symbol,
+            'job_id' => $job['job_id'],
+            'priority' => $this->queuePriority,
+            'is_fallback' => $result['is_fallback'] ?? false,
+        ]);
+
+        return [
+            'title' => $result['title'],
+            'content' => $result['content'],
+        ];
+    }
+
+    /**
+     * Verifica se a falha de conexão aconteceu antes de o serviço receber a
+     * requisição (conexão recusada, DNS, rede inalcançável)
+     *
+     * Só nesses casos é seguro executar o script local; um timeout (cURL 28)
+     * significa que o serviço está vivo, mas lento.
+     *
+     * @param \Illuminate\Http\Client\ConnectionException $e
+     * @return bool
+     */
+    public static function isConnectFailure(\Illuminate\Http\Client\ConnectionException $e): bool
+    {
+        $errno = null;
+        $previous = $e->getPrevious();
+        if ($previous instanceof \GuzzleHttp\Exception\ConnectException) {
+            $errno = $previous->getHandlerContext()['errno'] ?? null;
+        }
+        if ($errno === null && preg_match('/cURL error (\d+)/', $e->getMessage(), $matches)) {
+            $errno = (int) $matches[1];
+        }
+        return in_array((int) $errno, self::CONNECT_FAILURE_CURL_ERRORS, true);
+    }
+
+    /**
+     * Chama o serviço Python em execução contínua (services.llm.service_url)
+     * 
+     * Evita iniciar um novo interpretador Python a cada chamada.
+     * 
+     * @param string $endpoint Endpoint do agente ('julia', 'pedro', 'key')
+     * @param array $payload Dados de entrada do agente
+     * @return array|null Resposta do serviço, ou null se não configurado/indisponível
+     * @throws \Exception Se o serviço responder com erro ou não responder a tempo
+     */
+    protected function callPythonService(string $endpoint, array $payload): ?array
+    {
+        $serviceUrl = $this->config['service_url'] ?? null;
+        if (empty($serviceUrl)) {
+            return null;
+        }
+
+        try {
+            $response = Http::timeout($this->timeout)
+                ->withHeaders(['X-Trace-Id' => $this->getTraceId()] + LLMWireFormat::headers())
+                ->post(rtrim($serviceUrl, '/') . '/' . $endpoint, $payload);
+        } catch (\Illuminate\Http\Client\ConnectionException $e) {
+            // Timeout com a conexão feita: o serviço pode ainda estar processando;
+            // rodar o script local duplicaria a chamada (como em utils/service_client.py)
+            if (!self::isConnectFailure($e)) {
+                throw new \Exception("Serviço Python não respondeu ({$endpoint}): " . $e->getMessage(), 0, $e);
+            }
+            Log::warning('Serviço Python indisponível, executando script local', [
+                'endpoint' => $endpoint,
+                'error' => $e->getMessage(),
+                'trace_id' => $this->getTraceId(),
+            ]);
+            return null;
+        }
+
+        $body = LLMWireFormat::decode($response->body());
+        if (!$response->successful()) {
+            throw new \Exception($body['error'] ?? $response->body());
+        }
+
+        return $body;
+    }
+
     /**
      * Gera artigo simples baseado em template (Fallback)
      * 
@@ -0,0 +1,122 @@
+<?php
+
+namespace App\Services;
+
+/**
+ * Formato de saída negociado com os agentes Python (llm/utils/wire.py)
+ *
+ * Os scripts aceitam --format json|compact|msgpack e --spill-over BYTES;
+ * o serviço Python responde em MessagePack com "Accept: application/msgpack".
+ * MessagePack só é pedido quando a extensão msgpack do PHP está carregada
+ * (senão, JSON compacto). Resultados maiores que o limite chegam como um
+ * ponteiro {"_spill": {"path", "format", "bytes"}} para um arquivo
+ * temporário, que é lido e apagado aqui.
+ */
+class LLMWireFormat
+{
+    public const FORMATS = ['json', 'compact', 'msgpack'];
+    public const SPILL_KEY = '_spill';
+    public const SPILL_PREFIX = 'llm-out-';
+
+    /**
+     * Formato pedido aos agentes (services.llm.output_format)
+     *
+     * @return string
+     */
+    public static function format(): string
+    {
+        $format = config('services.llm.output_format', 'compact');
+        if (!in_array($format, self::FORMATS, true)) {
+            return 'compact';
+        }
+        if ($format === 'msgpack' && !self::msgpackAvailable()) {
+            return 'compact';
+        }
+        return $format;
+    }
+
+    /**
+     * Verifica se a extensão msgpack do PHP está carregada
+     *
+     * @return bool
+     */
+    public static function msgpackAvailable(): bool
+    {
+        return function_exists('msgpack_unpack');
+    }
+
+    /**
+     * Argumentos de linha de comando para os scripts Python
+     *
+     * @return array
+     */
+    public static function arguments(): array
+    {
+        $arguments = ['--format', self::format()];
+        $spillBytes = (int) config('services.llm.output_spill_bytes', 0);
+        if ($spillBytes > 0) {
+            $arguments[] = '--spill-over';
+            $arguments[] = (string) $spillBytes;
+        }
+        return $arguments;
+    }
+
+    /**
+     * Cabeçalhos HTTP para o serviço Python
+     *
+     * @return array
+     */
+    public static function headers(): array
+    {
+        return self::format() === 'msgpack' ? ['Accept' => 'application/msgpack'] : [];
+    }
+
+    /**
+     * Decodifica a saída de um agente (JSON, MessagePack ou ponteiro de arquivo)
+     *
+     * @param string $output stdout do script ou corpo da resposta do serviço
+     * @return array|null Resultado decodificado, ou null se vazio/inválido
+     * @throws \RuntimeException Se o arquivo do ponteiro não puder ser lido
+     */
+    public static function decode(string $output): ?array
+    {
+        $data = self::decodePayload($output);
+
+        $spill = (is_array($data) && count($data) === 1) ? ($data[self::SPILL_KEY] ?? null) : null;
+        if (is_array($spill) && isset($spill['path'])) {
+            $path = $spill['path'];
+            if (strpos(basename($path), self::SPILL_PREFIX) !== 0) {
+                throw new \RuntimeException("Arquivo de saída do agente inválido: {$path}");
+            }
+            $contents = @file_get_contents($path);
+            @unlink($path);
+            if ($contents === false) {
+                throw new \RuntimeException("Arquivo de saída do agente não encontrado: {$path}");
+            }
+            $data = self::decodePayload($contents);
+        }
+
+        return is_array($data) ? $data : null;
+    }
+
+    /**
+     * Decodifica JSON ou MessagePack pelo primeiro byte
+     *
+     * @param string $payload
+     * @return mixed
+     */
+    protected static function decodePayload(string $payload)
+    {
+        $trimmed = ltrim($payload);
+        if ($trimmed === '') {
+            return null;
+        }
+        if ($trimmed[0] === '{' || $trimmed[0] === '[') {
+            return json_decode($trimmed, true);
+        }
+        if (!self::msgpackAvailable()) {
+            throw new \RuntimeException('Saída do agente em MessagePack, mas a extensão msgpack não está carregada');
+        }
+        return msgpack_unpack($payload);
+    }
+}
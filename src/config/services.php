@@ -86,6 +86,9 @@ return [
         'python_path' => env('PYTHON_PATH', 'python3'),
         'python_script_path' => env('LLM_SCRIPT_PATH', 'llm/scripts/run_llm.py'),
         'timeout' => env('LLM_TIMEOUT', 60), // segundos
+        'service_url' => env('LLM_SERVICE_URL'), // Serviço Python em execução contínua (ex: http://llm:8001)
+        'output_format' => env('LLM_OUTPUT_FORMAT', 'compact'), // Saída dos scripts: 'json', 'compact' ou 'msgpack' (requer ext-msgpack)
+        'output_spill_bytes' => env('LLM_OUTPUT_SPILL_BYTES', 1048576), // Saídas maiores vão para arquivo temporário (0 desliga)
         
         // Google Gemini (provider principal)
         'gemini' => [
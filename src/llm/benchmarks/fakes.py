@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Dublês locais das APIs externas (Gemini, News API e Yahoo Finance)
+Um único servidor HTTP responde nos caminhos das três APIs, com latência,
+taxa de erros e limite de requisições configuráveis por serviço, usando os
+dados sintéticos de benchmarks/generators.py. Nenhuma cota real é gasta.
+
+Caminhos atendidos:
+    POST /v1beta/models/<modelo>:generateContent     (Gemini, transporte REST)
+    GET  /v2/everything?q=...&pageSize=...            (News API)
+    GET  /v10/finance/quoteSummary/<símbolo>          (Yahoo Finance)
+    GET  /v8/finance/chart/<símbolo>                  (Yahoo Finance)
+    GET  /__stats                                     (contadores por serviço)
+
+Os agentes apontam para o dublê com GEMINI_BASE_URL, NEWS_API_BASE_URL e
+YAHOO_API_BASE_URL (ver FakeUpstreams.env()).
+
+Latência (--<serviço>-latency):
+    fixed:MS | uniform:MIN,MAX | normal:MÉDIA,DESVIO | lognormal:MEDIANA,SIGMA | exp:MÉDIA  (em ms)
+
+Uso:
+    python benchmarks/fakes.py --port 8765 --gemini-latency lognormal:1500,0.4 --news-errors 0.05 --yahoo-rps 20
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+try:
+    from .generators import (COMPANIES, DEFAULT_SEED, synthetic_article_response, synthetic_articles,
+                             synthetic_financial, synthetic_sentiment_response)
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent))
+    from generators import (COMPANIES, DEFAULT_SEED, synthetic_article_response,  # type: ignore
+                            synthetic_articles, synthetic_financial, synthetic_sentiment_response)
+
+SERVICES = ('gemini', 'news', 'yahoo')
+
+# Perfis padrão, próximos do observado em produção
+DEFAULT_LATENCY = {
+    'gemini': 'lognormal:1500,0.4',
+    'news': 'lognormal:250,0.3',
+    'yahoo': 'lognormal:120,0.3',
+}
+
+_GEMINI_PATH = re.compile(r'^/v1(?:beta)?/models/([^/:]+):generateContent$')
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Converte a especificação de latência num sorteador (em segundos).
+
+    Args:
+        spec: 'fixed:MS', 'uniform:MIN,MAX', 'normal:MÉDIA,DESVIO', 'lognormal:MEDIANA,SIGMA' ou 'exp:MÉDIA'
+
+    Returns:
+        Função que recebe um random.Random e devolve a latência em segundos
+
+    Raises:
+        ValueError: Se a especificação for inválida
+    """
+    kind, _, raw = spec.partition(':')
+    try:
+        values = [float(value) for value in raw.split(',')] if raw else []
+    except ValueError:
+        raise ValueError(f"Latência inválida: {spec}")
+    samplers: Dict[str, Tuple[int, Callable[[random.Random], float]]] = {
+        'fixed': (1, lambda rng: values[0]),
+        'uniform': (2, lambda rng: rng.uniform(values[0], values[1])),
+        'normal': (2, lambda rng: rng.gauss(values[0], values[1])),
+        'lognormal': (2, lambda rng: rng.lognormvariate(math.log(max(values[0], 1e-3)), values[1])),
+        'exp': (1, lambda rng: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0),
+    }
+    if kind not in samplers or len(values) != samplers[kind][0]:
+        raise ValueError(f"Latência inválida: {spec} (use fixed:MS, uniform:MIN,MAX, normal:MÉDIA,DESVIO, "
+                         f"lognormal:MEDIANA,SIGMA ou exp:MÉDIA)")
+    sampler = samplers[kind][1]
+    return lambda rng: max(sampler(rng), 0.0) / 1000
+
+
+class TokenBucket:
+    """Limite de requisições por segundo (rajada de até 'rate' requisições)."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = max(rate, 1.0)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class ServiceBehavior:
+    """Comportamento de um serviço falso: latência, erros e limite de requisições."""
+
+    def __init__(self, latency: str, error_rate: float = 0.0, rps: float = 0.0):
+        self.latency_spec = latency
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.bucket = TokenBucket(rps) if rps > 0 else None
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def count(self, status: int) -> None:
+        key = str(status)
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.counts)
+        return {'requests': sum(counts.values()), 'status': counts}
+
+
+def _resolve_company(symbol: str) -> Optional[Tuple[str, str]]:
+    """Resolve um símbolo ou nome de empresa (como o Yahoo) para (empresa, ticker)."""
+    normalize = lambda text: ''.join(c for c in text.upper() if c.isalnum())
+    wanted = normalize(symbol[:-3] if symbol.upper().endswith('.SA') else symbol)
+    for company, ticker in COMPANIES:
+        if wanted in (ticker, normalize(company)):
+            return company, ticker
+    return None
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    server: 'FakeUpstreamServer'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if url.path == '/__stats':
+            self._send(200, self.server.stats())
+        elif url.path == '/v2/everything':
+            self._serve('news', lambda rng: self._news(rng, query))
+        elif url.path.startswith('/v10/finance/quoteSummary/'):
+            symbol = unquote(url.path[len('/v10/finance/quoteSummary/'):])
+            self._serve('yahoo', lambda rng: self._quote_summary(rng, symbol))
+        elif url.path.startswith('/v8/finance/chart/'):
+            symbol = unquote(url.path[len('/v8/finance/chart/'):])
+            self._serve('yahoo', lambda rng: self._chart(rng, symbol))
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length).decode('utf-8') or '{}')
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            body = {}
+        match = _GEMINI_PATH.match(url.path)
+        if match:
+            self._serve('gemini', lambda rng: self._generate(rng, match.group(1), body))
+        else:
+            self._send(404, {'error': 'not found'})
+
+    # Respostas ----------------------------------------------------------------
+
+    def _serve(self, service: str, respond: Callable[[random.Random], Tuple[int, Dict[str, Any]]]) -> None:
+        behavior = self.server.behaviors[service]
+        rng = self.server.rng()
+        if behavior.bucket is not None and not behavior.bucket.acquire():
+            status, body = 429, self._error_body(service, 429, 'Rate limit exceeded')
+        else:
+            time.sleep(behavior.latency(rng))
+            if behavior.error_rate > 0 and rng.random() < behavior.error_rate:
+                status = rng.choice((500, 503))
+                body = self._error_body(service, status, 'Injected failure')
+            else:
+                status, body = respond(rng)
+        behavior.count(status)
+        self._send(status, body)
+
+    def _error_body(self, service: str, status: int, message: str) -> Dict[str, Any]:
+        if service == 'gemini':
+            state = 'RESOURCE_EXHAUSTED' if status == 429 else 'UNAVAILABLE'
+            return {'error': {'code': status, 'message': message, 'status': state}}
+        if service == 'news':
+            code = 'rateLimited' if status == 429 else 'unexpectedError'
+            return {'status': 'error', 'code': code, 'message': message}
+        return {'finance': {'result': None, 'error': {'code': str(status), 'description': message}}}
+
+    def _news(self, rng: random.Random, query: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        count = max(0, min(int(query.get('pageSize') or 20), 100))
+        articles = synthetic_articles(rng, count, query.get('q') or 'Petrobras')
+        return 200, {'status': 'ok', 'totalResults': count, 'articles': articles}
+
+    def _quote_summary(self, rng: random.Random, symbol: str) -> Tuple[int, Dict[str, Any]]:
+        resolved = _resolve_company(symbol)
+        if resolved is None:
+            return 404, {'quoteSummary': {'result': None,
+                                          'error': {'code': 'Not Found', 'description': 'Quote not found'}}}
+        company, ticker = resolved
+        data = synthetic_financial(rng, company, ticker)
+        raw = lambda value: {'raw': value, 'fmt': str(value)}
+        return 200, {'quoteSummary': {'error': None, 'result': [{
+            'price': {
+                'symbol': data['symbol'], 'longName': company, 'shortName': company.upper(),
+                'regularMarketPrice': raw(data['price']), 'regularMarketVolume': raw(data['volume']),
+                'marketCap': raw(data['market_cap']), 'currency': 'BRL', 'exchange': 'SAO',
+            },
+            'summaryDetail': {
+                'previousClose': raw(data['previous_close']), 'volume': raw(data['volume']),
+                'fiftyTwoWeekHigh': raw(data['high_52w']), 'fiftyTwoWeekLow': raw(data['low_52w']),
+                'trailingPE': raw(data['pe_ratio']), 'dividendYield': raw(round(data['dividend_yield'] / 100, 4)),
+            },
+            'financialData': {'currentPrice': raw(data['price'])},
+            'quoteType': {'symbol': data['symbol'], 'quoteType': 'EQUITY'},
+        }]}}
+
+    def _chart(self, rng: random.Random, symbol: str) -> Tuple[int, Dict[str, Any]]:
+        resolved = _resolve_company(symbol)
+        if resolved is None:
+            return 404, {'chart': {'result': None, 'error': {'code': 'Not Found', 'description': 'No data found'}}}
+        data = synthetic_financial(rng, *resolved)
+        closes = [data['previous_close'], data['price']]
+        return 200, {'chart': {'error': None, 'result': [{
+            'meta': {'symbol': data['symbol'], 'currency': 'BRL'},
+            'timestamp': [int(time.time()) - 86400, int(time.time())],
+            'indicators': {'quote': [{'open': closes, 'high': closes, 'low': closes, 'close': closes,
+                                      'volume': [data['volume']] * 2}]},
+        }]}}
+
+    def _generate(self, rng: random.Random, model: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        prompt = ' '.join(part.get('text', '') for content in body.get('contents') or []
+                          for part in content.get('parts') or [] if isinstance(part, dict))
+        index = rng.randrange(1000)
+        if '"sentiment_analysis"' in prompt:
+            # Modo fundido: análise e matéria no mesmo objeto
+            text = json.dumps({
+                'sentiment_analysis': json.loads(synthetic_sentiment_response(rng, 0)),
+                'article': json.loads(synthetic_article_response(rng, 0)),
+            }, ensure_ascii=False)
+        elif 'DIRETRIZES DE REDAÇÃO' in prompt:
+            text = synthetic_article_response(rng, index)
+        else:
+            text = synthetic_sentiment_response(rng, index)
+        return 200, {
+            'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]},
+                            'finishReason': 'STOP', 'index': 0}],
+            'usageMetadata': {'promptTokenCount': len(prompt) // 4, 'candidatesTokenCount': len(text) // 4,
+                              'totalTokenCount': (len(prompt) + len(text)) // 4},
+            'modelVersion': model,
+        }
+
+    def _send(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        if status == 429:
+            self.send_header('Retry-After', '1')
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeUpstreamServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], behaviors: Dict[str, ServiceBehavior], seed: int = DEFAULT_SEED):
+        super().__init__(address, FakeUpstreamHandler)
+        self.behaviors = behaviors
+        self._seed_rng = random.Random(seed)
+        self._seed_lock = threading.Lock()
+
+    def rng(self) -> random.Random:
+        # Um gerador por requisição (random.Random não é seguro entre threads)
+        with self._seed_lock:
+            return random.Random(self._seed_rng.getrandbits(64))
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: {'latency': behavior.latency_spec, 'error_rate': behavior.error_rate,
+                       'rps': behavior.bucket.rate if behavior.bucket else 0, **behavior.stats()}
+                for name, behavior in self.behaviors.items()}
+
+
+class FakeUpstreams:
+    """
+    Sobe os dublês numa thread de fundo.
+
+    Uso:
+        with FakeUpstreams({'gemini': ServiceBehavior('fixed:200', error_rate=0.05)}) as fakes:
+            os.environ.update(fakes.env())
+    """
+
+    def __init__(self, behaviors: Optional[Dict[str, ServiceBehavior]] = None, host: str = '127.0.0.1',
+                 port: int = 0, seed: int = DEFAULT_SEED):
+        behaviors = dict(behaviors or {})
+        for service in SERVICES:
+            behaviors.setdefault(service, ServiceBehavior(DEFAULT_LATENCY[service]))
+        self.server = FakeUpstreamServer((host, port), behaviors, seed)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        """Variáveis de ambiente que apontam os agentes para os dublês."""
+        return {
+            'GEMINI_BASE_URL': f"{self.url}/v1beta",
+            'GEMINI_API_KEY': 'fake-gemini-key',
+            'NEWS_API_BASE_URL': f"{self.url}/v2",
+            'NEWS_API_KEY': 'fake-news-key',
+            'YAHOO_API_BASE_URL': self.url,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return self.server.stats()
+
+    def start(self) -> 'FakeUpstreams':
+        self._thread = threading.Thread(target=self.server.serve_forever, name='fake-upstreams', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> 'FakeUpstreams':
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def add_behavior_arguments(parser: argparse.ArgumentParser) -> None:
+    """Opções --<serviço>-latency/-errors/-rps (compartilhadas com o loadtest)."""
+    for service in SERVICES:
+        parser.add_argument(f'--{service}-latency', default=DEFAULT_LATENCY[service],
+                            help=f"Latência do {service} (padrão: {DEFAULT_LATENCY[service]})")
+        parser.add_argument(f'--{service}-errors', type=float, default=0.0,
+                            help=f"Fração de respostas 5xx do {service} (padrão: 0)")
+        parser.add_argument(f'--{service}-rps', type=float, default=0.0,
+                            help=f"Limite de requisições/s do {service}; excedentes recebem 429 (padrão: sem limite)")
+
+
+def behaviors_from_args(args: argparse.Namespace) -> Dict[str, ServiceBehavior]:
+    return {
+        service: ServiceBehavior(getattr(args, f'{service}_latency'), getattr(args, f'{service}_errors'),
+                                 getattr(args, f'{service}_rps'))
+        for service in SERVICES
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Dublês locais de Gemini, News API e Yahoo Finance')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    add_behavior_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        fakes = FakeUpstreams(behaviors_from_args(args), args.host, args.port, args.seed)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    print(f"Dublês em {fakes.url} — exporte para o serviço/agentes:", file=sys.stderr)
+    for key, value in fakes.env().items():
+        print(f"export {key}={value}")
+    sys.stdout.flush()
+    try:
+        fakes.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fakes.server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
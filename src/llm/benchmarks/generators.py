@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Geradores de dados sintéticos para os benchmarks do serviço LLM
+Entradas determinísticas (semente fixa) no formato real dos agentes: dados
+financeiros da Júlia, notícias e análise do Pedro, entradas do run_llm e
+respostas do Gemini (JSON puro, em bloco ```json, com texto em volta e com
+vírgula final).
+
+Uso:
+    python benchmarks/generators.py inputs 1000 > entradas.ndjson
+    python benchmarks/generators.py articles 20 --seed 7
+
+Tipos: inputs, financial, sentiment, articles, article_responses, sentiment_responses
+"""
+
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List
+
+# Escalas padrão dos benchmarks
+SCALES = {'small': 10, 'medium': 1000, 'large': 100000}
+
+DEFAULT_SEED = 42
+
+COMPANIES = [
+    ('Petrobras', 'PETR4'), ('Vale', 'VALE3'), ('Itaú Unibanco', 'ITUB4'), ('Bradesco', 'BBDC4'),
+    ('Ambev', 'ABEV3'), ('Magazine Luiza', 'MGLU3'), ('WEG', 'WEGE3'), ('Banco do Brasil', 'BBAS3'),
+    ('Suzano', 'SUZB3'), ('Localiza', 'RENT3'), ('B3', 'B3SA3'), ('Eletrobras', 'ELET3'),
+]
+
+SOURCES = ['Valor Econômico', 'InfoMoney', 'Exame', 'Folha de S.Paulo', 'Estadão', 'Reuters', 'Bloomberg Línea']
+
+HEADLINE_TEMPLATES = [
+    "{company} registra lucro acima do esperado e ações sobem",
+    "{company} anuncia expansão e crescimento de receita no trimestre",
+    "Analistas recomendam compra de {company} após resultado positivo",
+    "{company} enfrenta queda nas vendas e ações caem",
+    "Investigação e prejuízo pressionam {company} na bolsa",
+    "{company} mantém guidance e mercado reage com estabilidade",
+    "{company} divulga plano de investimentos para os próximos anos",
+    "Crise no setor afeta {company}, que registra perda no período",
+]
+
+DESCRIPTION_TEMPLATES = [
+    "Especialistas indicam crescimento e valorização para {company} no médio prazo.",
+    "O resultado veio abaixo das estimativas, com risco de rebaixamento para {company}.",
+    "A companhia {company} reportou números em linha com o consenso do mercado.",
+    "Segundo analistas, {company} deve seguir com dividendos robustos e recorde de produção.",
+]
+
+
+def synthetic_financial(rng: random.Random, company: str = '', symbol: str = '') -> Dict[str, Any]:
+    """Dados financeiros no formato de saída do Agente Júlia."""
+    if not company:
+        company, symbol = rng.choice(COMPANIES)
+    price = round(rng.uniform(5, 120), 2)
+    previous_close = round(price * rng.uniform(0.95, 1.05), 2)
+    change = round(price - previous_close, 2)
+    return {
+        'symbol': f"{symbol}.SA",
+        'action_symbol': symbol,
+        'company_name': company,
+        'price': price,
+        'previous_close': previous_close,
+        'change': change,
+        'change_percent': round(change / previous_close * 100, 4),
+        'volume': rng.randint(100000, 90000000),
+        'market_cap': rng.randint(10 ** 9, 5 * 10 ** 11),
+        'pe_ratio': round(rng.uniform(3, 40), 2),
+        'dividend_yield': round(rng.uniform(0, 12), 2),
+        'high_52w': round(price * rng.uniform(1.0, 1.4), 2),
+        'low_52w': round(price * rng.uniform(0.6, 1.0), 2),
+        'currency': 'BRL',
+        'exchange': 'SAO',
+    }
+
+
+def synthetic_articles(rng: random.Random, count: int, company: str = '') -> List[Dict[str, Any]]:
+    """Notícias no formato da News API."""
+    company = company or rng.choice(COMPANIES)[0]
+    now = datetime(2025, 1, 15, 12, 0, 0)
+    return [
+        {
+            'title': rng.choice(HEADLINE_TEMPLATES).format(company=company),
+            'description': rng.choice(DESCRIPTION_TEMPLATES).format(company=company),
+            'source': {'name': rng.choice(SOURCES)},
+            'url': f"https://noticias.example.com/{company.lower().replace(' ', '-')}/{index}",
+            'publishedAt': (now - timedelta(minutes=17 * index)).isoformat(),
+        }
+        for index in range(count)
+    ]
+
+
+def synthetic_sentiment(rng: random.Random, company: str = '', news_count: int = 20) -> Dict[str, Any]:
+    """Análise de sentimento no formato de saída do Agente Pedro."""
+    positive = rng.randint(0, news_count)
+    negative = rng.randint(0, news_count - positive)
+    score = round((positive - negative) / max(news_count, 1), 4)
+    return {
+        'company_name': company or rng.choice(COMPANIES)[0],
+        'sentiment': 'positive' if score > 0.2 else ('negative' if score < -0.2 else 'neutral'),
+        'sentiment_score': score,
+        'news_count': news_count,
+        'positive_count': positive,
+        'negative_count': negative,
+        'neutral_count': news_count - positive - negative,
+        'trending_topics': ', '.join(rng.sample(['lucro', 'dividendos', 'expansão', 'petróleo', 'juros',
+                                                 'investimentos', 'guidance', 'exportação'], 4)),
+        'news_sources': rng.sample(SOURCES, 3),
+    }
+
+
+def synthetic_input(rng: random.Random, index: int = 0) -> Dict[str, Any]:
+    """Entrada do run_llm (Júlia + Pedro), com request_id para o modo lote."""
+    company, symbol = rng.choice(COMPANIES)
+    return {
+        'request_id': f"req-{index}",
+        'company_name': company,
+        'financial': synthetic_financial(rng, company, symbol),
+        'sentiment': synthetic_sentiment(rng, company),
+    }
+
+
+def synthetic_article_response(rng: random.Random, index: int = 0) -> str:
+    """Resposta do Gemini para o artigo, variando o formato do JSON."""
+    company, symbol = rng.choice(COMPANIES)
+    paragraphs = ' '.join(rng.choice(DESCRIPTION_TEMPLATES).format(company=company) for _ in range(12))
+    body = json.dumps({
+        'title': f"{company} ({symbol}): {rng.choice(['alta', 'queda', 'estabilidade'])} no pregão",
+        'content': f"## Análise de {company}\n\n{paragraphs}\n\n### Perspectivas\n\n{paragraphs}",
+    }, ensure_ascii=False)
+    return _wrap_response(body, index)
+
+
+def synthetic_sentiment_response(rng: random.Random, index: int = 0) -> str:
+    """Resposta do Gemini para a análise de sentimento, variando o formato do JSON."""
+    positive = rng.randint(10, 70)
+    negative = rng.randint(0, 100 - positive)
+    body = json.dumps({
+        'sentiment': 'positive' if positive > negative else 'negative',
+        'sentiment_score': round((positive - negative) / 100, 4),
+        'total_mentions': rng.randint(5, 50),
+        'sentiment_breakdown': {
+            'positive_percentage': positive,
+            'negative_percentage': negative,
+            'neutral_percentage': 100 - positive - negative,
+            'dominant_emotions': rng.sample(['confiança', 'otimismo', 'cautela', 'preocupação'], 2),
+        },
+        'brand_perception': {'overall': 'Percepção estável', 'strengths': ['marca forte'], 'weaknesses': ['dívida']},
+        'strategic_insights': [f"Insight {n}" for n in range(5)],
+    }, ensure_ascii=False)
+    return _wrap_response(body, index)
+
+
+def _wrap_response(body: str, index: int) -> str:
+    style = index % 4
+    if style == 1:
+        return f"```json\n{body}\n```"
+    if style == 2:
+        return f"Segue a análise solicitada:\n\n{body}\n\nEspero que ajude."
+    if style == 3:
+        # Vírgula final antes do fechamento (erro comum de LLM tolerado pelo extrator)
+        return body[:-1] + ',}'
+    return body
+
+
+GENERATORS: Dict[str, Callable[[random.Random, int], Any]] = {
+    'inputs': synthetic_input,
+    'financial': lambda rng, index: synthetic_financial(rng),
+    'sentiment': lambda rng, index: synthetic_sentiment(rng),
+    'articles': lambda rng, index: synthetic_articles(rng, 1)[0],
+    'article_responses': synthetic_article_response,
+    'sentiment_responses': synthetic_sentiment_response,
+}
+
+
+def generate(kind: str, count: int, seed: int = DEFAULT_SEED) -> Iterator[Any]:
+    """
+    Gera 'count' itens sintéticos do tipo informado (determinístico pela semente).
+
+    Args:
+        kind: Tipo de item (chave de GENERATORS)
+        count: Quantidade
+        seed: Semente do gerador
+
+    Returns:
+        Iterador de itens
+    """
+    rng = random.Random(seed)
+    factory = GENERATORS[kind]
+    for index in range(count):
+        yield factory(rng, index)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Gera dados sintéticos (NDJSON) para benchmarks e testes de carga')
+    parser.add_argument('kind', choices=sorted(GENERATORS), help='Tipo de item')
+    parser.add_argument('count', help=f"Quantidade ou escala ({', '.join(SCALES)})")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='Semente do gerador')
+    args = parser.parse_args()
+
+    count = SCALES.get(args.count) or int(args.count)
+    for item in generate(args.kind, count, args.seed):
+        sys.stdout.write(json.dumps(item, ensure_ascii=False) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Microbenchmarks dos caminhos quentes do serviço LLM
+Mede as funções puras (sem rede) que rodam em toda geração de matéria, com
+dados sintéticos (benchmarks/generators.py) em escalas de 10, 1k e 100k itens,
+e compara com a linha de base gravada em benchmarks/baselines/hotpaths.json.
+
+Uso:
+    python benchmarks/hotpaths.py run [--scales small,medium] [--cases ...] [--output resultado.json]
+    python benchmarks/hotpaths.py run --save-baseline        # regrava a linha de base
+    python benchmarks/hotpaths.py compare [resultado.json]    # roda (ou lê) e compara com a linha de base
+    python benchmarks/hotpaths.py compare antigo.json novo.json
+
+    --tolerance / LLM_BENCH_TOLERANCE: lentidão aceita em relação à linha de base (padrão: 0.25 = 25%)
+    --gate-scales: escalas que reprovam o compare (padrão: medium)
+
+O compare usa a mediana das repetições (15 por padrão) e retorna código 1
+quando algum caso de uma escala do gate fica mais lento que a tolerância. A
+escala small (10 itens, microssegundos por chamada) oscila demais entre
+execuções para reprovar: aparece na tabela apenas como informação. A escala
+large (100k itens) só roda quando pedida em --scales e fica fora da linha de
+base e do gate: os casos lentos param no orçamento de tempo (TIME_BUDGET) com
+poucas amostras, ruidosas demais para reprovar.
+
+As repetições são intercaladas em rodadas que passam por todos os casos e
+medem uma carga de referência fixa; cada amostra é corrigida pela referência
+da sua rodada e o relatório grava a mediana delas (calibration_ms). O compare
+divide as razões pela razão entre as calibrações, descontando a variação de
+velocidade da máquina inteira (CPU compartilhada, frequência) entre as duas
+execuções.
+Compare sempre na mesma máquina em que a linha de base foi gravada; em máquinas
+compartilhadas (VMs de CI) o ruído pode passar de 25% e pede uma tolerância maior.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+LLM_ROOT = Path(__file__).parent.parent
+if str(LLM_ROOT) not in sys.path:
+    sys.path.insert(0, str(LLM_ROOT))
+
+try:
+    from .generators import (DEFAULT_SEED, SCALES, synthetic_article_response, synthetic_articles,
+                             synthetic_financial, synthetic_input, synthetic_sentiment,
+                             synthetic_sentiment_response)
+except ImportError:
+    from generators import (DEFAULT_SEED, SCALES, synthetic_article_response, synthetic_articles,  # type: ignore
+                            synthetic_financial, synthetic_input, synthetic_sentiment,
+                            synthetic_sentiment_response)
+
+BASELINE_FILE = Path(__file__).parent / 'baselines' / 'hotpaths.json'
+
+# Tempo máximo (s) de repetição de um caso numa escala; sempre roda ao menos uma vez
+TIME_BUDGET = 2.0
+
+# Duração mínima de uma amostra (s); chamadas mais curtas são repetidas em laço
+MIN_SAMPLE_SECONDS = 0.02
+
+# Repetições por caso e escala (a mediana delas é comparada), distribuídas em rodadas
+DEFAULT_RUNS = 15
+ROUNDS = 5
+
+# Escalas que reprovam o compare; as demais só são exibidas (large não está na linha de base)
+GATED_SCALES = ('medium',)
+
+
+def _prepare_format_input_data(rng: random.Random, n: int) -> Callable[[], Any]:
+    from utils.llm_utils import format_input_data
+    inputs = [synthetic_input(rng, index) for index in range(n)]
+    return lambda: [format_input_data(item) for item in inputs]
+
+
+def _prepare_generate_article_content(rng: random.Random, n: int) -> Callable[[], Any]:
+    from utils.llm_utils import format_input_data, generate_article_content
+    formatted = [format_input_data(synthetic_input(rng, index)) for index in range(n)]
+    return lambda: [generate_article_content(item) for item in formatted]
+
+
+def _prepare_render_articles(rng: random.Random, n: int) -> Callable[[], Any]:
+    from utils.llm_utils import format_input_data, render_articles
+    formatted = [format_input_data(synthetic_input(rng, index)) for index in range(n)]
+    return lambda: render_articles(formatted)
+
+
+def _prepare_screen(rng: random.Random, n: int) -> Callable[[], Any]:
+    from utils.screening import screen
+    records = [synthetic_input(rng, index) for index in range(n)]
+    # Um símbolo por registro: o universo tem n símbolos
+    for index, record in enumerate(records):
+        record['financial']['action_symbol'] = f"{record['financial']['action_symbol']}-{index}"
+    return lambda: screen(records)
+
+
+def _prepare_data_models_roundtrip(rng: random.Random, n: int) -> Callable[[], Any]:
+    from utils.data_models import FinancialSnapshot, dumps
+    snapshots = [synthetic_financial(rng) for _ in range(n)]
+    return lambda: [dumps(FinancialSnapshot.from_dict(item)) for item in snapshots]
+
+
+def _prepare_analyze_sentiment(rng: random.Random, n: int) -> Callable[[], Any]:
+    from models.AgentPedro import analyze_sentiment
+    texts = [f"{article['title']} {article['description']}".lower() for article in synthetic_articles(rng, n)]
+    return lambda: [analyze_sentiment(text) for text in texts]
+
+
+def _prepare_analyze_news_sentiment(rng: random.Random, n: int) -> Callable[[], Any]:
+    from models.AgentPedro import analyze_news_sentiment
+    articles = synthetic_articles(rng, n)
+    return lambda: analyze_news_sentiment(articles)
+
+
+def _prepare_build_article_prompt(rng: random.Random, n: int) -> Callable[[], Any]:
+    from models.GeminiService import build_article_prompt
+    cases = [(synthetic_financial(rng), synthetic_sentiment(rng), f"SYM{index}") for index in range(n)]
+    return lambda: [build_article_prompt(financial, sentiment, symbol) for financial, sentiment, symbol in cases]
+
+
+def _prepare_build_sentiment_analysis_prompt(rng: random.Random, n: int) -> Callable[[], Any]:
+    from models.GeminiService import build_sentiment_analysis_prompt
+    articles = synthetic_articles(rng, n, 'Petrobras')
+    financial = synthetic_financial(rng, 'Petrobras', 'PETR4')
+    return lambda: build_sentiment_analysis_prompt(articles, 'PETR4', 'Petrobras', financial)
+
+
+def _prepare_parse_gemini_response(rng: random.Random, n: int) -> Callable[[], Any]:
+    from models.GeminiService import parse_gemini_response
+    responses = [synthetic_article_response(rng, index) for index in range(n)]
+    financial, sentiment = synthetic_financial(rng), synthetic_sentiment(rng)
+    return lambda: [parse_gemini_response(content, financial, sentiment, 'PETR4') for content in responses]
+
+
+def _prepare_parse_sentiment_response(rng: random.Random, n: int) -> Callable[[], Any]:
+    from models.GeminiService import parse_sentiment_response
+    responses = [synthetic_sentiment_response(rng, index) for index in range(n)]
+    articles = synthetic_articles(rng, 20)
+    return lambda: [parse_sentiment_response(content, articles, 'PETR4', 'Petrobras') for content in responses]
+
+
+# Caso -> (preparação, o que 'n' significa no caso)
+CASES: Dict[str, Any] = {
+    'llm_utils.format_input_data': (_prepare_format_input_data, 'entradas'),
+    'llm_utils.generate_article_content': (_prepare_generate_article_content, 'entradas'),
+    'llm_utils.render_articles': (_prepare_render_articles, 'entradas'),
+    'screening.screen': (_prepare_screen, 'símbolos'),
+    'data_models.roundtrip': (_prepare_data_models_roundtrip, 'snapshots'),
+    'AgentPedro.analyze_sentiment': (_prepare_analyze_sentiment, 'textos'),
+    'AgentPedro.analyze_news_sentiment': (_prepare_analyze_news_sentiment, 'notícias em uma chamada'),
+    'GeminiService.build_article_prompt': (_prepare_build_article_prompt, 'prompts'),
+    'GeminiService.build_sentiment_analysis_prompt': (_prepare_build_sentiment_analysis_prompt, 'notícias em uma chamada'),
+    'GeminiService.parse_gemini_response': (_prepare_parse_gemini_response, 'respostas'),
+    'GeminiService.parse_sentiment_response': (_prepare_parse_sentiment_response, 'respostas'),
+}
+
+
+def _autorange(func: Callable[[], Any]) -> int:
+    """Aquece a função e escolhe quantas chamadas formam uma amostra de ao menos MIN_SAMPLE_SECONDS."""
+    func()  # aquecimento (imports sob demanda, caches de regex)
+    loops = 1
+    while True:
+        elapsed = _sample(func, loops)
+        if elapsed * loops >= MIN_SAMPLE_SECONDS or loops >= 10000:
+            return loops
+        loops *= 10
+
+
+def _sample(func: Callable[[], Any], loops: int) -> float:
+    begin = time.perf_counter()
+    for _ in range(loops):
+        func()
+    return (time.perf_counter() - begin) / loops
+
+
+def _summary(timings: List[float], n: int, loops: int) -> Dict[str, Any]:
+    median = statistics.median(timings)
+    return {
+        'per_item_us': float(f'{median / n * 1e6:.4g}'),
+        'total_ms': float(f'{median * 1000:.4g}'),
+        'min_total_ms': float(f'{min(timings) * 1000:.4g}'),
+        'runs': len(timings),
+        'loops': loops,
+    }
+
+
+def measure(func: Callable[[], Any], n: int, runs: int, time_budget: float = TIME_BUDGET) -> Dict[str, Any]:
+    """
+    Mede uma função preparada: repete até 'runs' amostras (ou até estourar o orçamento de tempo).
+
+    Chamadas muito curtas são agrupadas (como no timeit.autorange) para que cada
+    amostra dure ao menos MIN_SAMPLE_SECONDS e o ruído do relógio não domine.
+
+    Returns:
+        Dicionário com 'per_item_us' (mediana), 'total_ms' (mediana), 'min_total_ms',
+        'runs' e 'loops' (chamadas por amostra); os tempos são por chamada
+    """
+    # Saídas dos fallbacks (stdout/stderr) não entram na medição
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+        loops = _autorange(func)
+        timings = [_sample(func, loops)]
+        started = time.perf_counter()
+        while len(timings) < runs and time.perf_counter() - started < time_budget:
+            timings.append(_sample(func, loops))
+    return _summary(timings, n, loops)
+
+
+def _calibration_workload() -> Any:
+    # Mesma mistura dos caminhos quentes: dicionários, formatação de strings, regex e ordenação
+    import re
+    pattern = re.compile(r'(\d+)[.,](\d+)')
+    rows = [{'symbol': f'SYM{index}', 'price': index * 1.37, 'volume': index * 1000} for index in range(2000)]
+    text = ' '.join(f"{row['symbol']} R$ {row['price']:,.2f} vol {row['volume']:,}" for row in rows)
+    return sorted(pattern.findall(text))
+
+
+def run(scales: List[str], cases: Optional[List[str]] = None, runs: int = DEFAULT_RUNS,
+        seed: int = DEFAULT_SEED, rounds: int = ROUNDS) -> Dict[str, Any]:
+    """
+    Executa os casos nas escalas pedidas.
+
+    As amostras são intercaladas em rodadas (cada rodada passa por todos os
+    casos e mede a carga de referência): uma rajada de contenção na máquina se
+    espalha por todos os casos em vez de cair inteira num só. Cada amostra é
+    corrigida pela calibração da sua rodada.
+
+    Returns:
+        Relatório com 'environment' e 'results' ({caso: {escala: medição}})
+    """
+    entries = []
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+        for name in cases or list(CASES):
+            prepare, unit = CASES[name]
+            for scale in scales:
+                func = prepare(random.Random(seed), SCALES[scale])
+                entries.append((name, scale, unit, func, _autorange(func)))
+        calibration_loops = _autorange(_calibration_workload)
+
+        per_round = max(1, math.ceil(runs / max(rounds, 1)))
+        timings: Dict[Any, List[float]] = {(name, scale): [] for name, scale, *_ in entries}
+        spent: Dict[Any, float] = dict.fromkeys(timings, 0.0)
+        calibrations: List[float] = []
+        for _ in range(max(rounds, 1)):
+            calibration = _sample(_calibration_workload, calibration_loops)
+            calibrations.append(calibration)
+            for name, scale, _unit, func, loops in entries:
+                key = (name, scale)
+                for _ in range(per_round):
+                    # Casos lentos (escala large) param no orçamento de tempo, com ao menos uma amostra
+                    if timings[key] and spent[key] >= TIME_BUDGET:
+                        break
+                    begin = time.perf_counter()
+                    timings[key].append(_sample(func, loops) / calibration)
+                    spent[key] += time.perf_counter() - begin
+
+    reference = statistics.median(calibrations)
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, scale, unit, _func, loops in entries:
+        n = SCALES[scale]
+        measured = _summary([value * reference for value in timings[(name, scale)]], n, loops)
+        results.setdefault(name, {})[scale] = {'n': n, 'unit': unit, **measured}
+        print(f"  {name:<48} {scale:<7} {measured['per_item_us']:>12.4g} µs/item", file=sys.stderr)
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'recorded_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'calibration_ms': float(f'{reference * 1000:.4g}'),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float,
+            gated_scales: Iterable[str] = GATED_SCALES) -> Dict[str, Any]:
+    """
+    Compara o tempo de cada caso/escala com a linha de base.
+
+    Usa a mediana do tempo total de cada lado, corrigida pela razão entre as
+    calibrações dos dois relatórios (quando ambos a têm); só as escalas de
+    gated_scales contam como regressão (as demais recebem 'gated': False).
+
+    Returns:
+        {'rows': [...], 'regressions': [...], 'ok': bool, 'machine_speed': float}
+    """
+    gated_scales = set(gated_scales)
+    base_calibration = baseline.get('environment', {}).get('calibration_ms')
+    current_calibration = current.get('environment', {}).get('calibration_ms')
+    # > 1: a máquina estava mais lenta nesta execução do que na linha de base
+    machine_speed = current_calibration / base_calibration if base_calibration and current_calibration else 1.0
+    rows = []
+    for name, scales in current.get('results', {}).items():
+        for scale, measured in scales.items():
+            reference = baseline.get('results', {}).get(name, {}).get(scale)
+            if reference is None:
+                rows.append({'case': name, 'scale': scale, 'status': 'new', 'gated': scale in gated_scales,
+                             'current_ms': measured['total_ms']})
+                continue
+            ratio = measured['total_ms'] / max(reference['total_ms'], 1e-9) / machine_speed
+            status = 'slower' if ratio > 1 + tolerance else ('faster' if ratio < 1 - tolerance else 'ok')
+            rows.append({
+                'case': name, 'scale': scale, 'status': status, 'gated': scale in gated_scales,
+                'ratio': round(ratio, 3), 'baseline_ms': reference['total_ms'], 'current_ms': measured['total_ms'],
+            })
+    regressions = [row for row in rows if row['status'] == 'slower' and row['gated']]
+    return {'rows': rows, 'regressions': regressions, 'ok': not regressions,
+            'machine_speed': round(machine_speed, 3)}
+
+
+def _load(path: Path) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def _write(path: Path, data: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=2, ensure_ascii=False)
+        file.write('\n')
+
+
+def _print_comparison(report: Dict[str, Any], tolerance: float) -> None:
+    icons = {'ok': '✅', 'faster': '🚀', 'slower': '❌', 'new': '🆕'}
+    print(f"Velocidade relativa da máquina (calibração): {report['machine_speed']:.2f}x o tempo da linha de base")
+    print(f"{'Caso':<48} {'escala':<7} {'base (ms)':>11} {'atual (ms)':>11} {'razão':>7}")
+    for row in report['rows']:
+        note = '' if row['gated'] else '  (fora do gate)'
+        print(f"{row['case']:<48} {row['scale']:<7} {row.get('baseline_ms', float('nan')):>11.3f} "
+              f"{row['current_ms']:>11.3f} {row.get('ratio', float('nan')):>7.2f}  {icons[row['status']]}{note}")
+    if report['regressions']:
+        print(f"\n{len(report['regressions'])} caso(s) mais lento(s) que a linha de base (tolerância {tolerance:.0%})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Microbenchmarks dos caminhos quentes do serviço LLM')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_run_options(command: argparse.ArgumentParser) -> None:
+        command.add_argument('--scales', default='small,medium',
+                             help=f"Escalas separadas por vírgula ({', '.join(f'{k}={v}' for k, v in SCALES.items())})")
+        command.add_argument('--cases', default='', help='Casos separados por vírgula (padrão: todos)')
+        command.add_argument('--runs', type=int, default=DEFAULT_RUNS, help='Repetições por caso e escala')
+
+    run_parser = sub.add_parser('run', help='Executa os benchmarks')
+    add_run_options(run_parser)
+    run_parser.add_argument('--output', help='Grava o relatório JSON neste arquivo')
+    run_parser.add_argument('--save-baseline', action='store_true', help=f'Grava o relatório em {BASELINE_FILE.name}')
+
+    compare_parser = sub.add_parser('compare', help='Compara com a linha de base (ou dois relatórios)')
+    add_run_options(compare_parser)
+    compare_parser.add_argument('reports', nargs='*', help='[atual.json] ou [base.json atual.json]')
+    compare_parser.add_argument('--tolerance', type=float,
+                                default=float(os.getenv('LLM_BENCH_TOLERANCE', '0.25')),
+                                help='Lentidão aceita (fração, padrão: 0.25)')
+    compare_parser.add_argument('--gate-scales', default=','.join(GATED_SCALES),
+                                help=f"Escalas que reprovam o compare (padrão: {','.join(GATED_SCALES)})")
+    compare_parser.add_argument('--json', action='store_true', help='Saída em JSON')
+
+    args = parser.parse_args()
+    scales = [scale.strip() for scale in args.scales.split(',') if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    cases = [case.strip() for case in args.cases.split(',') if case.strip()] or None
+    unknown += [case for case in cases or [] if case not in CASES]
+    if unknown:
+        print(f"Escala/caso desconhecido: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    if args.command == 'run':
+        report = run(scales, cases, args.runs)
+        if args.output:
+            _write(Path(args.output), report)
+        if args.save_baseline:
+            _write(BASELINE_FILE, report)
+            print(f"Linha de base gravada em {BASELINE_FILE}", file=sys.stderr)
+        if not args.output and not args.save_baseline:
+            print(json.dumps(report, indent=2, ensure_ascii=False))
+        return 0
+
+    if len(args.reports) == 2:
+        baseline, current = _load(Path(args.reports[0])), _load(Path(args.reports[1]))
+    else:
+        if not BASELINE_FILE.exists():
+            print(f"Linha de base não encontrada: {BASELINE_FILE} (use run --save-baseline)", file=sys.stderr)
+            return 2
+        baseline = _load(BASELINE_FILE)
+        current = _load(Path(args.reports[0])) if args.reports else run(scales, cases, args.runs)
+
+    gated_scales = [scale.strip() for scale in args.gate_scales.split(',') if scale.strip()]
+    report = compare(baseline, current, args.tolerance, gated_scales)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        _print_comparison(report, args.tolerance)
+    return 0 if report['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
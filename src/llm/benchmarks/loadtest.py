@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste de carga ponta a ponta do fluxo Júlia → Pedro → Key
+Replica fluxos realistas (dados financeiros, sentimento e matéria de uma
+empresa) contra os handlers em processo ou contra o serviço em execução,
+com Gemini, News API e Yahoo Finance substituídos pelos dublês locais de
+benchmarks/fakes.py. Serve para dimensionar a implantação e calibrar
+timeouts e concorrência sem gastar cota real.
+
+Relatório: vazão (fluxos/s e requisições/s), latência p50/p95/p99 por etapa e
+do fluxo inteiro, erros, taxa de fallback por componente e o que cada dublê
+recebeu (requisições, 429, 5xx).
+
+Uso:
+    # Handlers em processo (sobe os dublês e configura o ambiente sozinho)
+    python benchmarks/loadtest.py --flows 200 --concurrency 8 --gemini-errors 0.05
+
+    # Serviço em execução (suba antes com as variáveis impressas por benchmarks/fakes.py)
+    python benchmarks/fakes.py --port 8765 > /tmp/fakes.env &
+    (. /tmp/fakes.env && python main.py) &
+    python benchmarks/loadtest.py --target http://127.0.0.1:8001 --fakes-url http://127.0.0.1:8765 --duration 60
+
+    --rate N: chegadas em ritmo fixo (fluxos/s); a latência conta a partir do horário
+        agendado, incluindo a espera por um worker livre
+    --env CHAVE=VALOR: ajustes do ambiente no modo em processo (ex: LLM_LATENCY_BUDGET=20)
+    --cassette ARQUIVO: no lugar dos dublês, reproduz respostas reais gravadas (utils/cassette.py)
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.request import urlopen
+
+LLM_ROOT = Path(__file__).parent.parent
+if str(LLM_ROOT) not in sys.path:
+    sys.path.insert(0, str(LLM_ROOT))
+
+try:
+    from .fakes import FakeUpstreams, add_behavior_arguments, behaviors_from_args
+    from .generators import COMPANIES, DEFAULT_SEED
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent))
+    from fakes import FakeUpstreams, add_behavior_arguments, behaviors_from_args  # type: ignore
+    from generators import COMPANIES, DEFAULT_SEED  # type: ignore
+
+STEPS = ('julia', 'pedro', 'key')
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil pelo método do posto mais próximo (lista já ordenada)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), int(round(pct / 100 * len(sorted_values) + 0.5))))
+    return sorted_values[rank - 1]
+
+
+class Target:
+    """Executa um passo do fluxo: handler em processo ou POST ao serviço."""
+
+    def __init__(self, url: Optional[str] = None, timeout: float = 120.0):
+        self.url = url.rstrip('/') if url else None
+        self.timeout = timeout
+        self._handlers: Optional[Dict[str, Any]] = None
+
+    @property
+    def name(self) -> str:
+        return self.url or 'em processo'
+
+    def prepare(self) -> None:
+        if self.url is None:
+            from service.handlers import AGENT_HANDLERS, warm_up
+            # Como o serviço: carrega os módulos antes da primeira requisição
+            warm_up()
+            self._handlers = AGENT_HANDLERS
+
+    def call(self, endpoint: str, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        if self._handlers is not None:
+            status, body = self._handlers[endpoint](payload)
+            # Como pelo serviço: o fluxo recebe o dicionário do contrato, não o modelo
+            return status, body.to_dict() if hasattr(body, 'to_dict') else body
+        from utils.service_client import ServiceUnavailable, call_service
+        try:
+            return call_service(endpoint, payload, timeout=self.timeout, url=self.url)
+        except ServiceUnavailable as e:
+            return 503, {'error': str(e)}
+
+    def fallback_counters(self) -> Dict[str, float]:
+        """llm_fallback_total por componente (processo local ou GET /metrics do serviço)."""
+        totals: Dict[str, float] = {}
+        if self.url is None:
+            from utils import metrics
+            for name, labels, value in metrics.snapshot()['counters']:
+                if name == 'llm_fallback_total':
+                    component = labels.get('component', '')
+                    totals[component] = totals.get(component, 0.0) + value
+            return totals
+        try:
+            with urlopen(f"{self.url}/metrics", timeout=10) as response:
+                text = response.read().decode('utf-8')
+        except OSError:
+            return totals
+        for line in text.splitlines():
+            if line.startswith('llm_fallback_total{'):
+                labels, _, value = line[len('llm_fallback_total{'):].partition('} ')
+                pairs = dict(pair.split('=', 1) for pair in labels.split(',') if '=' in pair)
+                component = pairs.get('component', '""').strip('"')
+                totals[component] = totals.get(component, 0.0) + float(value)
+        return totals
+
+
+def run_flow(target: Target, company: str, symbol: str) -> Dict[str, Any]:
+    """
+    Executa um fluxo Júlia → Pedro → Key para uma empresa.
+
+    Returns:
+        {'steps': {passo: (status, segundos)}, 'article_fallback': motivo ou None, 'error': passo ou None}
+    """
+    steps: Dict[str, Tuple[int, float]] = {}
+    result: Dict[str, Any] = {'steps': steps, 'article_fallback': None, 'error': None}
+
+    def step(endpoint: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        started_at = time.perf_counter()
+        try:
+            status, body = target.call(endpoint, payload)
+        except Exception as e:
+            status, body = 599, {'error': f"{type(e).__name__}: {e}"}
+        steps[endpoint] = (status, time.perf_counter() - started_at)
+        if status != 200:
+            result['error'] = result['error'] or endpoint
+            return None
+        return body
+
+    financial = step('julia', {'company_name': company})
+    # Sem dados financeiros o PHP segue com a análise de sentimento mesmo assim
+    financial = financial or {}
+    sentiment = step('pedro', {'company_name': company, 'symbol': symbol, 'limit': 20,
+                               'financial_data': financial}) or {}
+    article = step('key', {
+        'company_name': company,
+        'financial': {**financial, 'action_symbol': symbol},
+        'sentiment': sentiment,
+    })
+    if article and article.get('is_fallback'):
+        result['article_fallback'] = article.get('fallback_reason', 'unknown')
+    return result
+
+
+def run_load(target: Target, concurrency: int, flows: Optional[int] = None, duration: Optional[float] = None,
+             rate: Optional[float] = None, seed: int = DEFAULT_SEED) -> Dict[str, Any]:
+    """
+    Dispara os fluxos com 'concurrency' workers até 'flows' fluxos ou 'duration' segundos.
+
+    Args:
+        target: Alvo (em processo ou serviço)
+        concurrency: Fluxos simultâneos
+        flows: Total de fluxos (padrão: ilimitado se houver duration)
+        duration: Duração máxima em segundos
+        rate: Chegadas por segundo (None: cada worker emenda um fluxo no outro)
+        seed: Semente da escolha das empresas
+
+    Returns:
+        Resultados brutos: {'flows': [...], 'elapsed': segundos}
+    """
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    results: List[Dict[str, Any]] = []
+    issued = [0]
+    started_at = time.perf_counter()
+    deadline = started_at + duration if duration else None
+
+    def next_flow() -> Optional[Tuple[int, str, str, float]]:
+        with lock:
+            index = issued[0]
+            if flows is not None and index >= flows:
+                return None
+            scheduled = started_at + index / rate if rate else time.perf_counter()
+            if deadline is not None and scheduled >= deadline:
+                return None
+            issued[0] += 1
+            company, symbol = rng.choice(COMPANIES)
+            return index, company, symbol, scheduled
+
+    def worker() -> None:
+        while True:
+            item = next_flow()
+            if item is None:
+                return
+            index, company, symbol, scheduled = item
+            wait = scheduled - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            outcome = run_flow(target, company, symbol)
+            # Em ritmo fixo, o atraso até um worker ficar livre também é latência do fluxo
+            outcome['latency'] = time.perf_counter() - scheduled
+            outcome['company'] = company
+            with lock:
+                results.append(outcome)
+
+    threads = [threading.Thread(target=worker, name=f'load-{n}', daemon=True) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {'flows': results, 'elapsed': time.perf_counter() - started_at}
+
+
+def summarize(raw: Dict[str, Any], fallbacks: Dict[str, float], upstream: Optional[Dict[str, Any]],
+              settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Monta o relatório (vazão, percentis, erros e fallbacks) a partir dos resultados brutos."""
+    flows = raw['flows']
+    elapsed = max(raw['elapsed'], 1e-9)
+    total = len(flows)
+
+    def latency_stats(values: List[float]) -> Dict[str, float]:
+        values = sorted(values)
+        stats = {f'p{pct}': round(percentile(values, pct) * 1000, 1) for pct in PERCENTILES}
+        stats['max'] = round(values[-1] * 1000, 1) if values else 0.0
+        stats['mean'] = round(sum(values) / len(values) * 1000, 1) if values else 0.0
+        return stats
+
+    steps: Dict[str, Any] = {}
+    requests = 0
+    for name in STEPS:
+        calls = [flow['steps'][name] for flow in flows if name in flow['steps']]
+        requests += len(calls)
+        statuses: Dict[str, int] = {}
+        for status, _ in calls:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        steps[name] = {'requests': len(calls), 'status': statuses,
+                       'latency_ms': latency_stats([seconds for _, seconds in calls])}
+
+    article_reasons: Dict[str, int] = {}
+    for flow in flows:
+        if flow['article_fallback']:
+            article_reasons[flow['article_fallback']] = article_reasons.get(flow['article_fallback'], 0) + 1
+
+    return {
+        'settings': settings,
+        'flows': total,
+        'elapsed_seconds': round(elapsed, 2),
+        'throughput': {'flows_per_second': round(total / elapsed, 3),
+                       'requests_per_second': round(requests / elapsed, 3)},
+        'latency_ms': latency_stats([flow['latency'] for flow in flows]),
+        'steps': steps,
+        'errors': {
+            'flows': sum(1 for flow in flows if flow['error']),
+            'rate': round(sum(1 for flow in flows if flow['error']) / total, 4) if total else 0.0,
+        },
+        'fallbacks': {
+            'per_component': {component: {'count': int(count), 'rate': round(count / total, 4) if total else 0.0}
+                              for component, count in sorted(fallbacks.items())},
+            'article_reasons': article_reasons,
+        },
+        'upstream': upstream,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    settings = report['settings']
+    print(f"Alvo: {settings['target']} | concorrência {settings['concurrency']}"
+          f"{' | ritmo ' + str(settings['rate']) + '/s' if settings.get('rate') else ''}")
+    print(f"Fluxos: {report['flows']} em {report['elapsed_seconds']}s — "
+          f"{report['throughput']['flows_per_second']} fluxos/s, "
+          f"{report['throughput']['requests_per_second']} req/s")
+    print(f"Erros: {report['errors']['flows']} fluxo(s) ({report['errors']['rate']:.1%})")
+    print()
+    print(f"{'Etapa':<8} {'req':>6} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10} {'máx (ms)':>10}  status")
+    rows = [(name, report['steps'][name]) for name in STEPS] + [('fluxo', {
+        'requests': report['flows'], 'latency_ms': report['latency_ms'], 'status': {}})]
+    for name, data in rows:
+        latency = data['latency_ms']
+        statuses = ' '.join(f"{code}×{count}" for code, count in sorted(data['status'].items()))
+        print(f"{name:<8} {data['requests']:>6} {latency['p50']:>10.1f} {latency['p95']:>10.1f} "
+              f"{latency['p99']:>10.1f} {latency['max']:>10.1f}  {statuses}")
+    print()
+    print("Fallbacks (por fluxo):")
+    for component, data in report['fallbacks']['per_component'].items():
+        print(f"  {component:<10} {data['count']:>6} ({data['rate']:.1%})")
+    if report['fallbacks']['article_reasons']:
+        reasons = ', '.join(f"{reason}={count}" for reason, count in sorted(report['fallbacks']['article_reasons'].items()))
+        print(f"  matéria: {reasons}")
+    if report['upstream']:
+        print()
+        print("Dublês:")
+        for service, data in report['upstream'].items():
+            statuses = ' '.join(f"{code}×{count}" for code, count in sorted(data['status'].items()))
+            print(f"  {service:<7} {data['requests']:>6} req  {statuses}")
+
+
+def _upstream_stats(fakes: Optional[FakeUpstreams], fakes_url: Optional[str]) -> Optional[Dict[str, Any]]:
+    if fakes is not None:
+        return fakes.stats()
+    if fakes_url:
+        try:
+            with urlopen(f"{fakes_url.rstrip('/')}/__stats", timeout=10) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except (OSError, ValueError):
+            return None
+    return None
+
+
+def _subtract(after: Dict[str, float], before: Dict[str, float]) -> Dict[str, float]:
+    return {key: value - before.get(key, 0.0) for key, value in after.items() if value - before.get(key, 0.0) > 0}
+
+
+def _diff_upstream(after: Optional[Dict[str, Any]], before: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if after is None:
+        return None
+    diff = {}
+    for service, data in after.items():
+        previous = (before or {}).get(service, {})
+        statuses = {code: count - previous.get('status', {}).get(code, 0) for code, count in data['status'].items()}
+        diff[service] = {**data, 'requests': data['requests'] - previous.get('requests', 0),
+                         'status': {code: count for code, count in statuses.items() if count}}
+    return diff
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Teste de carga do fluxo Júlia → Pedro → Key com dublês locais')
+    parser.add_argument('--target', default='', help='URL do serviço (padrão: handlers em processo)')
+    parser.add_argument('--fakes-url', default='', help='Dublês já em execução (padrão: sobe dublês locais)')
+    parser.add_argument('--flows', type=int, default=None, help='Total de fluxos (padrão: 50 sem --duration)')
+    parser.add_argument('--duration', type=float, default=None, help='Duração máxima em segundos')
+    parser.add_argument('--concurrency', type=int, default=4, help='Fluxos simultâneos (padrão: 4)')
+    parser.add_argument('--rate', type=float, default=None, help='Chegadas por segundo (padrão: malha fechada)')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Timeout das chamadas ao serviço (s)')
+    parser.add_argument('--env', action='append', default=[], metavar='CHAVE=VALOR',
+                        help='Variável de ambiente para o modo em processo (repetível)')
+    parser.add_argument('--cassette', default='', help='Reproduz este cassete em vez de subir dublês (em processo)')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--json', action='store_true', help='Relatório em JSON')
+    parser.add_argument('--output', help='Grava o relatório JSON neste arquivo')
+    add_behavior_arguments(parser)
+    args = parser.parse_args()
+
+    if args.flows is None and args.duration is None:
+        args.flows = 50
+
+    if args.cassette and args.target:
+        print("❌ --cassette só vale para o modo em processo (sem --target)", file=sys.stderr)
+        return 2
+
+    fakes: Optional[FakeUpstreams] = None
+    if not args.fakes_url and not args.cassette:
+        try:
+            fakes = FakeUpstreams(behaviors_from_args(args), seed=args.seed).start()
+        except ValueError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 2
+        if args.target:
+            print(f"⚠️  Dublês locais em {fakes.url}: o serviço em {args.target} só os usa se tiver sido "
+                  f"iniciado com as variáveis de benchmarks/fakes.py", file=sys.stderr)
+
+    if not args.target:
+        # Modo em processo: aponta os agentes para os dublês antes de carregá-los
+        if fakes is not None:
+            os.environ.update(fakes.env())
+        if args.cassette:
+            os.environ.update({'LLM_CASSETTE_MODE': 'replay', 'LLM_CASSETTE': str(Path(args.cassette).resolve())})
+        for item in args.env:
+            key, _, value = item.partition('=')
+            os.environ[key] = value
+
+    target = Target(args.target or None, args.timeout)
+    try:
+        target.prepare()
+        fallbacks_before = target.fallback_counters()
+        upstream_before = _upstream_stats(fakes, args.fakes_url)
+        raw = run_load(target, args.concurrency, args.flows, args.duration, args.rate, args.seed)
+        fallbacks = _subtract(target.fallback_counters(), fallbacks_before)
+        upstream = _diff_upstream(_upstream_stats(fakes, args.fakes_url), upstream_before)
+    finally:
+        if fakes is not None:
+            fakes.stop()
+
+    settings = {'target': target.name, 'concurrency': args.concurrency, 'rate': args.rate,
+                'flows': args.flows, 'duration': args.duration, 'env': args.env}
+    report = summarize(raw, fallbacks, upstream, settings)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark de inicialização dos scripts do serviço LLM
+Mede, com `python -X importtime`, o tempo de importação de cada ponto de
+entrada e compara com o orçamento de benchmarks/import_budget.json.
+Também falha se algum módulo pesado proibido (SDK do Gemini, yfinance,
+pandas, requests...) for importado no carregamento do módulo.
+
+Uso:
+    python benchmarks/startup.py [--runs 5] [--json] [--update]
+
+    --update: regrava os orçamentos com o tempo medido + 50% de folga
+    LLM_IMPORT_BUDGET_SCALE: multiplica os orçamentos (ex: 2 em máquinas lentas de CI)
+
+Retorna código 1 quando algum orçamento é excedido.
+"""
+
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+LLM_ROOT = Path(__file__).parent.parent
+BUDGET_FILE = Path(__file__).parent / 'import_budget.json'
+
+# Importa o módulo do ponto de entrada (sem executar main) e lista os módulos carregados
+_PROBE = (
+    "import json, sys; sys.path.insert(0, {root!r}); import {module}; "
+    "print(json.dumps(sorted(sys.modules)))"
+)
+
+
+def parse_importtime(stderr: str, module: str) -> float:
+    """
+    Extrai o tempo cumulativo (ms) de importação do módulo a partir da saída do -X importtime.
+
+    Args:
+        stderr: Saída de erro do processo com -X importtime
+        module: Nome do módulo importado
+
+    Returns:
+        Tempo cumulativo em milissegundos
+    """
+    total_us = 0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or parts[2].strip() != module:
+            continue
+        try:
+            total_us = max(total_us, int(parts[1]))
+        except ValueError:
+            continue
+    return total_us / 1000
+
+
+def measure(module: str, runs: int = 5) -> Dict[str, Any]:
+    """
+    Mede o tempo de importação e o tempo total do processo de um ponto de entrada.
+
+    Args:
+        module: Módulo do ponto de entrada (ex: 'scripts.run_llm')
+        runs: Número de execuções (usa o menor tempo de importação e a mediana do processo)
+
+    Returns:
+        Dicionário com 'import_ms', 'process_ms' e 'modules' (módulos carregados)
+    """
+    code = _PROBE.format(root=str(LLM_ROOT), module=module)
+    env = dict(os.environ)
+    # Cliente fino desativado: mede o caminho completo do script
+    env.pop('LLM_SERVICE_URL', None)
+
+    import_times: List[float] = []
+    process_times: List[float] = []
+    modules: List[str] = []
+    for _ in range(max(1, runs)):
+        started_at = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=str(LLM_ROOT), env=env, capture_output=True, text=True
+        )
+        process_times.append((time.perf_counter() - started_at) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(f"Falha ao importar {module}: {result.stderr.strip().splitlines()[-1:]}")
+        import_times.append(parse_importtime(result.stderr, module))
+        modules = json.loads(result.stdout.strip().splitlines()[-1])
+
+    process_times.sort()
+    return {
+        'import_ms': round(min(import_times), 1),
+        'process_ms': round(process_times[len(process_times) // 2], 1),
+        'modules': modules,
+    }
+
+
+def load_budget(path: Path = BUDGET_FILE) -> Dict[str, Any]:
+    """Carrega o arquivo de orçamento de importação."""
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def run_benchmark(runs: int = 5, update: bool = False) -> Dict[str, Any]:
+    """
+    Executa o benchmark de todos os pontos de entrada.
+
+    Args:
+        runs: Execuções por ponto de entrada
+        update: Regrava os orçamentos a partir das medições
+
+    Returns:
+        Dicionário com 'results' (por ponto de entrada) e 'ok'
+    """
+    budget = load_budget()
+    scale = float(os.getenv('LLM_IMPORT_BUDGET_SCALE', '1'))
+    forbidden = budget.get('forbidden_modules', [])
+
+    results = {}
+    ok = True
+    for entry, config in budget['entry_points'].items():
+        measured = measure(config['module'], runs)
+        limit = config['budget_ms'] * scale
+        heavy = sorted(name for name in forbidden if name in measured['modules'])
+        within = measured['import_ms'] <= limit and not heavy
+        ok = ok and within
+        results[entry] = {
+            'import_ms': measured['import_ms'],
+            'process_ms': measured['process_ms'],
+            'budget_ms': round(limit, 1),
+            'forbidden_imports': heavy,
+            'ok': within,
+        }
+        if update:
+            config['budget_ms'] = int(math.ceil(measured['import_ms'] * 1.5 / 10) * 10)
+
+    if update:
+        with open(BUDGET_FILE, 'w', encoding='utf-8') as file:
+            json.dump(budget, file, indent=2)
+            file.write('\n')
+
+    return {'results': results, 'ok': ok}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark de inicialização dos scripts LLM')
+    parser.add_argument('--runs', type=int, default=5, help='Execuções por ponto de entrada')
+    parser.add_argument('--json', action='store_true', help='Saída em JSON')
+    parser.add_argument('--update', action='store_true', help='Regrava os orçamentos a partir das medições')
+    args = parser.parse_args()
+
+    report = run_benchmark(args.runs, args.update)
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print(f"{'Ponto de entrada':<24} {'import (ms)':>12} {'processo (ms)':>14} {'orçamento':>10}  status")
+        for entry, result in report['results'].items():
+            status = '✅' if result['ok'] else '❌'
+            if result['forbidden_imports']:
+                status += f" importa {', '.join(result['forbidden_imports'])}"
+            print(f"{entry:<24} {result['import_ms']:>12.1f} {result['process_ms']:>14.1f} "
+                  f"{result['budget_ms']:>10.1f}  {status}")
+
+    return 0 if report['ok'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -24,11 +24,21 @@ Scripts Python Disponíveis:
 
 NOTA: Este serviço fica em execução contínua e pode ser usado como fallback
 quando a integração direta via PHP (Gemini API) não está disponível ou falha.
+
+Servidor RPC:
+O serviço expõe os agentes via HTTP (POST /julia, /pedro, /key; GET /health)
+em LLM_SERVICE_HOST:LLM_SERVICE_PORT (padrão 127.0.0.1:8001) ou no socket Unix
+LLM_SERVICE_SOCKET, e consome a fila de jobs durável (POST /jobs, ver
+utils/job_queue.py; LLM_QUEUE_ENABLED=false desativa). Os módulos pesados e o cliente Gemini são carregados uma
+única vez na inicialização; os scripts acima viram clientes finos quando
+LLM_SERVICE_URL está definido.
 """
 
 import os
 import sys
 import json
+import signal
+import threading
 import time
 from pathlib import Path
 from typing import Optional
@@ -177,38 +187,102 @@ def main():
     print("  • run_llm.py: Geração de artigos")
     print("    Uso: python llm/scripts/run_llm.py '{\"symbol\":\"PETR4\",...}'")
     print()
+    # Pré-carrega módulos e clientes para as requisições
+    print("🔥 Pré-carregando módulos dos agentes...")
+    from service.handlers import warm_up
+    from service.server import create_server, describe_address
+    warm_status = warm_up()
+    print(f"   {sum(warm_status.values())}/{len(warm_status)} módulos carregados")
+    print()
+    
+    server = create_server()
+    guard = None
+    
+    # Métricas de execuções anteriores (snapshots dos workers) não valem para esta
+    from utils import metrics
+    metrics.reset()
+    
+    # Fila de jobs durável (prioridades, deduplicação, novas tentativas e dead-letter)
+    consumer = None
+    pool = None
+    if os.getenv('LLM_QUEUE_ENABLED', 'true').lower() not in ('0', 'false', 'no'):
+        from service.worker_pool import WorkerPool, pool_enabled
+        from utils.job_queue import JobQueue
+        if pool_enabled():
+            # Pool pré-forkado: o fork acontece agora, com os módulos aquecidos e sem threads
+            pool = WorkerPool()
+            pool.start(close_on_fork=[server])
+            server.worker_pool = pool  # type: ignore
+        job_queue = JobQueue()
+        server.job_queue = job_queue  # type: ignore
+        if pool is not None:
+            print(f"📥 Fila de jobs: {job_queue.path} (pool de {pool.min_workers}-{pool.max_workers} "
+                  f"worker(s), gerente PID {pool.manager_pid})")
+        else:
+            from service.queue_worker import QueueConsumer
+            from service.server import recycle
+            from utils.memory_guard import MemoryGuard
+            # Sem o pool, os agentes rodam neste processo: ele mesmo é contabilizado e reciclado
+            guard = server.memory_guard = MemoryGuard()  # type: ignore
+            consumer = QueueConsumer(job_queue, guard=guard, on_recycle=lambda reason: recycle(server, reason))
+            consumer.start()
+            server.queue_consumer = consumer  # type: ignore
+            print(f"📥 Fila de jobs: {job_queue.path} ({consumer.workers} consumidor(es))")
+    
+    # docker stop envia SIGTERM: encerra como no Ctrl+C (parando o pool)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    
     print("=" * 70)
     print("🔄 Serviço em execução contínua...")
     print("=" * 70)
+    print(f"🌐 Endpoints em {describe_address(server)}: POST /julia, /pedro, /key | GET /health, /ready, /metrics")
     print("Este serviço NÃO deve encerrar após consultas")
     print("Para encerrar, use Ctrl+C ou pare o container Docker")
     print("=" * 70)
     print()
+    sys.stdout.flush()
+    
+    threading.Thread(target=heartbeat, daemon=True).start()
     
     try:
-        heartbeat_count = 0
-        while True:
-            heartbeat_count += 1
-            # Heartbeat a cada 10 minutos
-            if heartbeat_count % 10 == 0:
-                timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
-                print(f"[{timestamp}] 💓 Serviço LLM ativo (heartbeat #{heartbeat_count})")
-            time.sleep(60)  # Aguarda 1 minuto antes de verificar novamente
+        server.serve_forever()
     except KeyboardInterrupt:
         print()
         print("=" * 70)
         print("🛑 Serviço LLM encerrado pelo usuário")
         print("=" * 70)
         sys.exit(0)
-    except Exception as e:
-        print()
-        print("=" * 70)
-        print(f"❌ Erro inesperado no serviço LLM: {e}")
-        print("=" * 70)
-        print("Reiniciando em 5 segundos...")
-        time.sleep(5)
-        # Não encerra, apenas loga o erro e continua
-        pass
+    finally:
+        recycle_reason = getattr(server, 'recycle_reason', None)
+        drain_timeout = float(os.getenv('LLM_POOL_SHUTDOWN_TIMEOUT', '120'))
+        if recycle_reason:
+            from service.server import wait_idle
+            if not wait_idle(server, drain_timeout):
+                print("⚠️  Reciclagem: requisições em andamento não terminaram a tempo", file=sys.stderr)
+        if consumer is not None:
+            consumer.stop(timeout=drain_timeout if recycle_reason else 5.0)
+        if pool is not None:
+            pool.stop()
+        server.server_close()
+
+    if recycle_reason:
+        stats = guard.stats() if guard is not None else {}
+        print(f"♻️  Reiniciando o serviço ({recycle_reason}): {stats.get('jobs')} job(s), "
+              f"RSS {stats.get('rss_mb')} MB (início {stats.get('start_rss_mb')} MB)", flush=True)
+        sys.stderr.flush()
+        # Mesmo PID (o container não reinicia) e processo limpo, como um worker reciclado
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+
+def heartbeat():
+    """Registra no log que o serviço continua ativo (a cada 10 minutos)."""
+    heartbeat_count = 0
+    while True:
+        time.sleep(60)
+        heartbeat_count += 1
+        if heartbeat_count % 10 == 0:
+            timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+            print(f"[{timestamp}] 💓 Serviço LLM ativo (heartbeat #{heartbeat_count})", flush=True)
 
 if __name__ == "__main__":
     main()
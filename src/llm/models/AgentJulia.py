@@ -7,19 +7,48 @@ Recebe company_name (nome da empresa, serviço ou produto) como argumento e reto
 Busca automaticamente o ticker correspondente ao nome fornecido.
 """
 
+import os
 import sys
 import json
 import time
-try:
-    import yfinance as yf  # type: ignore
-except ImportError:
-    raise ImportError("yfinance não está instalado. Execute: pip install yfinance>=0.2.0")
-from typing import Dict, Optional, Any
+from pathlib import Path
+from typing import Dict, Optional, Any, Tuple
+
+_LLM_ROOT = str(Path(__file__).parent.parent)
+if _LLM_ROOT not in sys.path:
+    sys.path.insert(0, _LLM_ROOT)
+
+from utils import cassette, metrics, single_flight, tracing, wire
+from utils.service_client import ServiceUnavailable, call_service
+
+# Cache de nome -> ticker resolvido (cada resolução faz até 6 consultas ao Yahoo Finance)
+TICKER_CACHE_TTL = float(os.getenv('LLM_TICKER_CACHE_TTL', '3600'))
+TICKER_CACHE_MAX_ENTRIES = 1024
+_ticker_cache: Dict[str, Tuple[float, str]] = {}
+
+def _yfinance():
+    """
+    Importa o yfinance (e o pandas) apenas quando há coleta a fazer,
+    para não pesar na inicialização do script como cliente fino.
+    Com YAHOO_API_BASE_URL definido, usa o cliente HTTP de utils/yahoo_http.py;
+    com LLM_CASSETTE_MODE, grava ou reproduz as respostas (utils/cassette.py).
+    """
+    return cassette.wrap('yahoo', _import_yfinance)
+
+def _import_yfinance():
+    if os.getenv('YAHOO_API_BASE_URL'):
+        from utils import yahoo_http
+        return yahoo_http
+    try:
+        import yfinance as yf  # type: ignore
+    except ImportError:
+        raise ImportError("yfinance não está instalado. Execute: pip install yfinance>=0.2.0")
+    return yf
 
 def search_ticker_by_name(company_name: str) -> Optional[str]:
     """
     Busca o ticker de uma ação a partir do nome da empresa.
-    Tenta diferentes estratégias para encontrar o ticker correto.
+    Tickers encontrados ficam em cache por LLM_TICKER_CACHE_TTL segundos.
     
     Args:
         company_name: Nome da empresa, serviço ou produto
@@ -27,6 +56,28 @@ def search_ticker_by_name(company_name: str) -> Optional[str]:
     Returns:
         Ticker encontrado ou None
     """
+    key = company_name.strip().upper()
+    cached = _ticker_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < TICKER_CACHE_TTL:
+        metrics.cache_result('ticker', True)
+        return cached[1]
+    metrics.cache_result('ticker', False)
+    
+    with metrics.stage('ticker_resolution'):
+        ticker = _resolve_ticker(company_name)
+    # Só cacheia sucessos: uma falha pode ser indisponibilidade momentânea do Yahoo
+    if ticker and TICKER_CACHE_TTL > 0:
+        if len(_ticker_cache) >= TICKER_CACHE_MAX_ENTRIES:
+            _ticker_cache.clear()
+        _ticker_cache[key] = (time.monotonic(), ticker)
+    return ticker
+
+def _resolve_ticker(company_name: str) -> Optional[str]:
+    """
+    Resolve o ticker no Yahoo Finance, tentando diferentes estratégias para
+    encontrar o ticker correto.
+    """
+    yf = _yfinance()
     try:
         # Estratégia 1: Se já parece um ticker (curto, alfanumérico), tenta usar diretamente
         if len(company_name) <= 10 and company_name.replace('.', '').replace('-', '').isalnum():
@@ -103,6 +154,7 @@ def get_stock_data_by_company_name(company_name: str) -> Optional[Dict[str, Any]
     # Agora busca os dados usando o ticker encontrado
     return get_stock_data(ticker, company_name)
 
+@tracing.traced()
 def get_stock_data(ticker: str, company_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """
     Obtém os dados financeiros de uma ação usando Yahoo Finance.
@@ -113,6 +165,7 @@ def get_stock_data(ticker: str, company_name: Optional[str] = None) -> Optional[
     Returns:
         Dicionário com dados financeiros ou None em caso de erro
     """
+    yf = _yfinance()
     try:
         # Adiciona .SA se for ação brasileira sem sufixo
         if not ticker.endswith('.SA') and len(ticker) <= 6:
@@ -120,11 +173,12 @@ def get_stock_data(ticker: str, company_name: Optional[str] = None) -> Optional[
         else:
             ticker_formatted = ticker
         
-        stock = yf.Ticker(ticker_formatted)
-        info = stock.info
-        
-        # Obtém dados históricos para calcular variação
-        hist = stock.history(period="2d")
+        with metrics.stage('quote_fetch'):
+            stock = yf.Ticker(ticker_formatted)
+            info = stock.info
+            
+            # Obtém dados históricos para calcular variação
+            hist = stock.history(period="2d")
         
         if info is None or info == {}:
             return None
@@ -253,6 +307,8 @@ def get_stock_data(ticker: str, company_name: Optional[str] = None) -> Optional[
         print(f"Erro ao obter dados financeiros para {ticker}: {e}", file=sys.stderr)
         return None
 
+@tracing.traced()
+@single_flight.shared('julia')
 def get_stock_data_with_retry(company_name: str, max_retries: int = 3, delay: int = 5) -> Optional[Dict[str, Any]]:
     """
     Obtém os dados financeiros usando o nome da empresa com retry.
@@ -276,24 +332,46 @@ def get_stock_data_with_retry(company_name: str, max_retries: int = 3, delay: in
 def main():
     """
     Função principal - pode ser chamada via linha de comando.
-    Uso: python AgentJulia.py <company_name>
+    Uso: python AgentJulia.py <company_name> [--format json|compact|msgpack] [--spill-over BYTES]
     
     Args:
         company_name: Nome da empresa, serviço contratado ou produto
                      Exemplos: "Petrobras", "Petróleo Brasileiro", "Petrobras", "Apple Inc"
     """
-    if len(sys.argv) < 2:
+    try:
+        args, output = wire.parse_args(sys.argv[1:])
+    except ValueError as e:
+        print(json.dumps({'error': str(e)}, indent=2, ensure_ascii=False), file=sys.stderr)
+        return 1
+    
+    if not args:
         # Se não houver argumentos, usa exemplo padrão
         company_name = "Petrobras"
         print(f"Nenhum nome de empresa fornecido, usando exemplo: {company_name}", file=sys.stderr)
     else:
-        company_name = sys.argv[1]
+        company_name = args[0]
     
-    data = get_stock_data_with_retry(company_name)
+    # Cliente fino: usa o serviço em execução contínua quando configurado
+    try:
+        status, body = call_service('julia', {'company_name': company_name})
+        if status == 200:
+            wire.emit(body, output)
+            return 0
+        print(json.dumps(body, indent=2, ensure_ascii=False), file=sys.stderr)
+        return 1
+    except ServiceUnavailable:
+        pass
+    
+    try:
+        data = get_stock_data_with_retry(company_name)
+    except single_flight.SingleFlightTimeout as e:
+        print(json.dumps({'error': str(e), 'company_name': company_name}, indent=2, ensure_ascii=False),
+              file=sys.stderr)
+        return 1
     
     if data:
-        # Retorna JSON para stdout
-        print(json.dumps(data, indent=2, ensure_ascii=False))
+        # Retorna o resultado para stdout (JSON indentado, salvo outro --format)
+        wire.emit(data, output)
         return 0
     else:
         error = {
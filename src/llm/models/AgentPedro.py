@@ -6,43 +6,66 @@ Agente Pedro - Análise de Sentimento de Mercado
 Recebe nome da empresa, busca notícias recentes e analisa sentimento com LLM.
 """
 
+import importlib
 import sys
 import json
 import os
 import re
+import time
+from importlib.util import find_spec
+from pathlib import Path
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 
+# Adiciona o diretório raiz do serviço ao path (para utils/)
+_LLM_ROOT = str(Path(__file__).parent.parent)
+if _LLM_ROOT not in sys.path:
+    sys.path.insert(0, _LLM_ROOT)
+
+from utils import cassette, metrics, single_flight, tracing, wire
+from utils.circuit_breaker import get_breaker
+from utils.service_client import ServiceUnavailable, call_service
+from utils.cpu_lane import run_cpu_bound
+
 try:
-    import requests  # type: ignore
-    REQUESTS_AVAILABLE = True
+    from dotenv import load_dotenv  # type: ignore
+    # Carrega variáveis de ambiente
+    load_dotenv()
 except ImportError:
-    REQUESTS_AVAILABLE = False
-    requests = None  # type: ignore
+    # dotenv não está instalado, mas não é crítico
+    def load_dotenv() -> None:
+        pass
+    load_dotenv()
+
+# requests só é importado na busca de notícias (custo relevante na inicialização)
+REQUESTS_AVAILABLE = find_spec('requests') is not None
+if not REQUESTS_AVAILABLE:
     print("Aviso: requests não instalado. Execute: pip install requests", file=sys.stderr)
 
 try:
-    from .GeminiService import analyze_sentiment_with_gemini, initialize_gemini
+    from .GeminiService import (
+        analyze_sentiment_with_gemini,
+        generate_sentiment_and_article_with_gemini,
+        initialize_gemini,
+    )
     GEMINI_AVAILABLE = True
 except ImportError:
     try:
-        from GeminiService import analyze_sentiment_with_gemini, initialize_gemini
+        from GeminiService import (
+            analyze_sentiment_with_gemini,
+            generate_sentiment_and_article_with_gemini,
+            initialize_gemini,
+        )
         GEMINI_AVAILABLE = True
     except ImportError:
         GEMINI_AVAILABLE = False
         analyze_sentiment_with_gemini = None  # type: ignore
+        generate_sentiment_and_article_with_gemini = None  # type: ignore
         initialize_gemini = None  # type: ignore
         print("Aviso: GeminiService não disponível. Análise básica será usada.", file=sys.stderr)
 
-try:
-    from dotenv import load_dotenv  # type: ignore
-    # Carrega variáveis de ambiente
-    load_dotenv()
-except ImportError:
-    # dotenv não está instalado, mas não é crítico
-    def load_dotenv() -> None:
-        pass
-    load_dotenv()
+# URL base da News API (NEWS_API_BASE_URL, a mesma do PHP; ex: dublê local do benchmarks/loadtest.py)
+NEWS_API_BASE_URL = 'https://newsapi.org/v2'
 
 # Palavras-chave para análise de sentimento
 POSITIVE_WORDS = [
@@ -57,6 +80,7 @@ NEGATIVE_WORDS = [
     'fraco', 'fraqueza', 'ruim', 'péssimo', 'falhou', 'perdeu', 'declínio'
 ]
 
+@single_flight.shared('news')
 def search_news(company_name: str, limit: int = 20) -> List[Dict[str, Any]]:
     """
     Busca notícias recentes sobre uma empresa.
@@ -68,13 +92,14 @@ def search_news(company_name: str, limit: int = 20) -> List[Dict[str, Any]]:
     Returns:
         Lista de notícias encontradas
     """
-    if not REQUESTS_AVAILABLE:
+    if not REQUESTS_AVAILABLE and not cassette.replaying():
         return get_mock_news(company_name, limit)
     
     # Tenta usar News API se disponível
-    news_api_key = os.getenv('NEWS_API_KEY')
+    news_api_key = cassette.api_key('NEWS_API_KEY')
     if news_api_key:
-        return search_news_api(company_name, news_api_key, limit)
+        with metrics.stage('news_fetch'):
+            return search_news_api(company_name, news_api_key, limit)
     
     # Fallback: retorna notícias mockadas
     return get_mock_news(company_name, limit)
@@ -91,8 +116,15 @@ def search_news_api(company_name: str, api_key: str, limit: int = 20) -> List[Di
     Returns:
         Lista de notícias
     """
+    # Circuito aberto: News API indisponível recentemente, usa fallback imediatamente
+    breaker = get_breaker('news_api')
+    if not breaker.allow_request():
+        print("Aviso: circuito da News API aberto, usando notícias de fallback", file=sys.stderr)
+        return get_mock_news(company_name, limit)
+    
+    started_at = time.monotonic()
     try:
-        url = 'https://newsapi.org/v2/everything'
+        url = f"{os.getenv('NEWS_API_BASE_URL', NEWS_API_BASE_URL).rstrip('/')}/everything"
         params = {
             'q': company_name,
             'language': 'pt',
@@ -101,19 +133,26 @@ def search_news_api(company_name: str, api_key: str, limit: int = 20) -> List[Di
             'apiKey': api_key
         }
         
-        if not REQUESTS_AVAILABLE or requests is None:
-            return get_mock_news(company_name, limit)
+        # requests real ou gravação/reprodução do cassete (LLM_CASSETTE_MODE)
+        requests = cassette.wrap('news', lambda: importlib.import_module('requests'))
         
-        response = requests.get(url, params=params, timeout=10)  # type: ignore
+        response = requests.get(url, params=params, timeout=float(os.getenv('NEWS_API_TIMEOUT', '10')))
         
         if response.status_code == 200:
             data = response.json()
+            breaker.record_success(time.monotonic() - started_at)
             return data.get('articles', [])
         else:
             print(f"Erro na News API: {response.status_code}", file=sys.stderr)
+            # Erros do cliente (ex: chave inválida) não indicam indisponibilidade
+            if response.status_code == 429 or response.status_code >= 500:
+                breaker.record_failure(time.monotonic() - started_at)
+            else:
+                breaker.record_success(time.monotonic() - started_at)
             return get_mock_news(company_name, limit)
             
     except Exception as e:
+        breaker.record_failure(time.monotonic() - started_at)
         print(f"Erro ao buscar notícias: {e}", file=sys.stderr)
         return get_mock_news(company_name, limit)
 
@@ -121,6 +160,7 @@ def get_mock_news(company_name: str, limit: int = 20) -> List[Dict[str, Any]]:
     """
     Retorna notícias mockadas para desenvolvimento.
     """
+    metrics.inc('llm_fallback_total', component='news')
     return [
         {
             'title': f"Análise: {company_name} mostra sinais positivos no mercado",
@@ -239,24 +279,112 @@ def get_default_sentiment() -> Dict[str, Any]:
         'analyzed_at': datetime.now().isoformat()
     }
 
-def analyze_company_sentiment(company_name: str, limit: int = 20, symbol: str = '', financial_data: dict = {}) -> Dict[str, Any]:
+def finalize_llm_analysis(analysis: Dict[str, Any], articles: List[Dict[str, Any]], company_name: str,
+                          symbol: str = '') -> Dict[str, Any]:
     """
-    Função principal: analisa sentimento de mercado, da marca e opiniões da mídia sobre uma empresa com LLM.
+    Ajusta a análise gerada pelo LLM ao contrato de saída do Agente Pedro.
     
     Args:
+        analysis: Análise retornada pelo Gemini
+        articles: Notícias analisadas
         company_name: Nome da empresa
-        limit: Número máximo de notícias para analisar
         symbol: Símbolo da ação (opcional)
-        financial_data: Dados financeiros 
+        
+    Returns:
+        Dicionário com a análise no formato esperado pelo PHP
+    """
+    # Adiciona campos básicos se não estiverem presentes
+    if 'company_name' not in analysis:
+        analysis['company_name'] = company_name
+    if 'symbol' not in analysis:
+        analysis['symbol'] = symbol or company_name
     
+    # Garante que raw_data contém os artigos
+    if 'raw_data' not in analysis or not analysis['raw_data']:
+        analysis['raw_data'] = articles
+    
+    # Adiciona estrutura _analysis se necessário
+    raw_data_value = analysis.get('raw_data')
+    if isinstance(raw_data_value, list) and len(raw_data_value) > 0:
+        # raw_data é array de artigos, adiciona _analysis
+        raw_data_dict: Dict[str, Any] = {
+            '_analysis': {
+                'digital_data': analysis.get('digital_data', {}),
+                'behavioral_data': analysis.get('behavioral_data', {}),
+                'strategic_insights': analysis.get('strategic_insights', []),
+                'cost_optimization': analysis.get('cost_optimization', {})
+            },
+            'articles': raw_data_value  # Preserva artigos
+        }
+        analysis['raw_data'] = raw_data_dict
+    elif isinstance(raw_data_value, dict):
+        # raw_data já é um dicionário, apenas adiciona _analysis se não existir
+        if '_analysis' not in raw_data_value:
+            raw_data_value['_analysis'] = {
+                'digital_data': analysis.get('digital_data', {}),
+                'behavioral_data': analysis.get('behavioral_data', {}),
+                'strategic_insights': analysis.get('strategic_insights', []),
+                'cost_optimization': analysis.get('cost_optimization', {})
+            }
+    
+    return analysis
+
+def basic_analysis(articles: List[Dict[str, Any]], company_name: str, symbol: str = '') -> Dict[str, Any]:
+    """
+    Análise básica sem LLM (fallback), no contrato de saída do Agente Pedro.
+    
+    Args:
+        articles: Notícias a analisar
+        company_name: Nome da empresa
+        symbol: Símbolo da ação (opcional)
+        
     Returns:
-        Dicionário com análise completa de sentimento, percepção de marca e opniões da mídia 
+        Dicionário com a análise básica
     """
-    # Busca notícias
-    articles = search_news(company_name, limit)
+    analysis = analyze_news_sentiment(articles)
+    analysis['company_name'] = company_name
+    analysis['symbol'] = symbol or company_name
+    
+    # Adiciona estrutura básica para compatibilidade
+    analysis['raw_data'] = {
+        'articles': articles,
+        '_analysis': {
+            'digital_data': {},
+            'behavioral_data': {},
+            'strategic_insights': [],
+            'cost_optimization': {}
+        }
+    }
     
-    # Tenta usar LLM para análise avançada
-    if GEMINI_AVAILABLE and initialize_gemini is not None and analyze_sentiment_with_gemini is not None:
+    return analysis
+
+def _gemini_usable() -> bool:
+    """Verifica se o Gemini pode ser usado (disponível e com circuito não aberto)."""
+    if not (GEMINI_AVAILABLE and initialize_gemini is not None and analyze_sentiment_with_gemini is not None):
+        return False
+    if get_breaker('gemini').is_open():
+        print("Aviso: circuito do Gemini aberto. Usando análise básica.", file=sys.stderr)
+        return False
+    return True
+
+@tracing.traced()
+@single_flight.shared('pedro')
+def analyze_articles(articles: List[Dict[str, Any]], company_name: str, symbol: str = '',
+                     financial_data: Optional[dict] = None) -> Dict[str, Any]:
+    """
+    Analisa as notícias já coletadas com LLM (ou análise básica como fallback).
+    
+    Args:
+        articles: Notícias a analisar
+        company_name: Nome da empresa
+        symbol: Símbolo da ação (opcional)
+        financial_data: Dados financeiros (opcional)
+        
+    Returns:
+        Dicionário com análise completa de sentimento
+    """
+    # Tenta usar LLM para análise avançada (pula direto para o fallback com o circuito aberto)
+    if _gemini_usable():
         try:
             # Verifica se Gemini foi inicializado com sucesso
             if not initialize_gemini():
@@ -267,89 +395,122 @@ def analyze_company_sentiment(company_name: str, limit: int = 20, symbol: str =
                 articles,
                 symbol or company_name,
                 company_name,
-                financial_data
+                financial_data or {}
             )
             
-            # Adiciona campos básicos se não estiverem presentes
-            if 'company_name' not in analysis:
-                analysis['company_name'] = company_name
-            if 'symbol' not in analysis:
-                analysis['symbol'] = symbol or company_name
-            
-            # Garante que raw_data contém os artigos
-            if 'raw_data' not in analysis or not analysis['raw_data']:
-                analysis['raw_data'] = articles
-            
-            # Adiciona estrutura _analysis se necessário
-            raw_data_value = analysis.get('raw_data')
-            if isinstance(raw_data_value, list) and len(raw_data_value) > 0:
-                # raw_data é array de artigos, adiciona _analysis
-                raw_data_dict: Dict[str, Any] = {
-                    '_analysis': {
-                        'digital_data': analysis.get('digital_data', {}),
-                        'behavioral_data': analysis.get('behavioral_data', {}),
-                        'strategic_insights': analysis.get('strategic_insights', []),
-                        'cost_optimization': analysis.get('cost_optimization', {})
-                    },
-                    'articles': raw_data_value  # Preserva artigos
-                }
-                analysis['raw_data'] = raw_data_dict
-            elif isinstance(raw_data_value, dict):
-                # raw_data já é um dicionário, apenas adiciona _analysis se não existir
-                if '_analysis' not in raw_data_value:
-                    raw_data_value['_analysis'] = {
-                        'digital_data': analysis.get('digital_data', {}),
-                        'behavioral_data': analysis.get('behavioral_data', {}),
-                        'strategic_insights': analysis.get('strategic_insights', []),
-                        'cost_optimization': analysis.get('cost_optimization', {})
-                    }
-            
-            return analysis
+            return finalize_llm_analysis(analysis, articles, company_name, symbol)
         except Exception as e:
             print(f"Erro na análise com LLM: {e}. Usando análise básica.", file=sys.stderr)
     
-    # Fallback: análise básica sem LLM
-    analysis = analyze_news_sentiment(articles)
-    analysis['company_name'] = company_name
-    analysis['symbol'] = symbol or company_name
+    # Fallback: análise básica sem LLM (CPU-bound, roda na faixa de CPU dos workers)
+    metrics.inc('llm_fallback_total', component='sentiment')
+    return run_cpu_bound(basic_analysis, articles, company_name, symbol)
+
+@tracing.traced()
+def analyze_company_sentiment(company_name: str, limit: int = 20, symbol: str = '', financial_data: dict = {}) -> Dict[str, Any]:
+    """
+    Função principal: analisa sentimento de mercado, da marca e opiniões da mídia sobre uma empresa com LLM.
     
-    # Adiciona estrutura básica para compatibilidade
-    analysis['raw_data'] = {
-        'articles': articles,
-        '_analysis': {
-            'digital_data': {},
-            'behavioral_data': {},
-            'strategic_insights': [],
-            'cost_optimization': {}
-        }
-    }
+    Args:
+        company_name: Nome da empresa
+        limit: Número máximo de notícias para analisar
+        symbol: Símbolo da ação (opcional)
+        financial_data: Dados financeiros 
     
-    return analysis
+    Returns:
+        Dicionário com análise completa de sentimento, percepção de marca e opniões da mídia 
+    """
+    # Busca notícias
+    articles = search_news(company_name, limit)
+    
+    return analyze_articles(articles, company_name, symbol, financial_data)
+
+def analyze_company_sentiment_and_article(company_name: str, limit: int = 20, symbol: str = '',
+                                          financial_data: Optional[dict] = None) -> Dict[str, Any]:
+    """
+    Modo fundido: análise de sentimento e matéria em uma única chamada ao Gemini.
+    
+    Se a chamada fundida falhar, volta ao fluxo normal do Agente Pedro e devolve
+    'article' como None, para o chamador gerar a matéria separadamente.
+    
+    Args:
+        company_name: Nome da empresa
+        limit: Número máximo de notícias para analisar
+        symbol: Símbolo da ação (opcional)
+        financial_data: Dados financeiros (opcional)
+        
+    Returns:
+        Dicionário com 'sentiment' (contrato do Agente Pedro) e 'article' ('title'/'content' ou None)
+    """
+    articles = search_news(company_name, limit)
+    
+    if _gemini_usable() and generate_sentiment_and_article_with_gemini is not None:
+        try:
+            result = generate_sentiment_and_article_with_gemini(
+                articles,
+                financial_data or {},
+                symbol or company_name,
+                company_name
+            )
+            return {
+                'sentiment': finalize_llm_analysis(result['sentiment'], articles, company_name, symbol),
+                'article': result['article'],
+            }
+        except Exception as e:
+            print(f"Erro no modo fundido: {e}. Usando fluxo em duas etapas.", file=sys.stderr)
+    
+    return {
+        'sentiment': analyze_articles(articles, company_name, symbol, financial_data),
+        'article': None,
+    }
 
 def main():
     """
     Função principal - pode ser chamada via linha de comando.
     Uso: python AgentPedro.py <company_name> [limit] [symbol] [financial_data_json]
+                              [--format json|compact|msgpack] [--spill-over BYTES]
     """
-    if len(sys.argv) < 2:
+    try:
+        args, output = wire.parse_args(sys.argv[1:])
+    except ValueError as e:
+        print(json.dumps({'error': str(e)}, indent=2, ensure_ascii=False), file=sys.stderr)
+        return 1
+    
+    if not args:
         company_name = "Petrobras"
         print(f"Nenhuma empresa fornecida, usando exemplo: {company_name}", file=sys.stderr)
     else:
-        company_name = sys.argv[1]
+        company_name = args[0]
     
-    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 20
-    symbol = sys.argv[3] if len(sys.argv) > 3 else company_name
+    limit = int(args[1]) if len(args) > 1 else 20
+    symbol = args[2] if len(args) > 2 else company_name
     
     financial_data = {}
-    if len(sys.argv) > 4:
+    if len(args) > 3:
         try:
-            financial_data = json.loads(sys.argv[4])
+            financial_data = json.loads(args[3])
         except:
             pass
     
+    # Cliente fino: usa o serviço em execução contínua quando configurado
+    try:
+        status, body = call_service('pedro', {
+            'company_name': company_name,
+            'limit': limit,
+            'symbol': symbol,
+            'financial_data': financial_data,
+        })
+        if status == 200:
+            wire.emit(body, output)
+            return 0
+        print(json.dumps(body, indent=2, ensure_ascii=False), file=sys.stderr)
+        return 1
+    except ServiceUnavailable:
+        pass
+    
     try:
         analysis = analyze_company_sentiment(company_name, limit, symbol, financial_data)
-        print(json.dumps(analysis, indent=2, ensure_ascii=False))
+        wire.emit(analysis, output)
         return 0
     except Exception as e:
         error = {
@@ -1,7 +1,3 @@
-try:
-    import requests  # type: ignore
-except ImportError:
-    requests = None  # type: ignore
 import json
 import sys
 
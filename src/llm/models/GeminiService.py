@@ -6,22 +6,79 @@ Serviço para integração com Google Gemini API
 Usado pelo Agente Key para gerar matérias financeiras.
 """
 
+import importlib
 import os
 import json
 import sys
+import time
+from importlib.util import find_spec
+from pathlib import Path
 from typing import Dict, List, Optional, Any
 
+# O SDK (google.generativeai e dependências gRPC/protobuf) só é importado na
+# primeira chamada ao Gemini; aqui apenas verificamos se está instalado.
 try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
+    GEMINI_AVAILABLE = find_spec('google.generativeai') is not None
+except (ImportError, ValueError):
     GEMINI_AVAILABLE = False
-    print("Aviso: google-generativeai não instalado. Execute: pip install google-generativeai")
+if not GEMINI_AVAILABLE:
+    print("Aviso: google-generativeai não instalado. Execute: pip install google-generativeai", file=sys.stderr)
 
-from dotenv import load_dotenv
+_genai: Any = None
+_configured_api_key: Optional[tuple] = None
 
-# Carrega variáveis de ambiente
-load_dotenv()
+# Host padrão da API (GEMINI_BASE_URL apontando para outro host troca o endpoint do SDK)
+DEFAULT_API_HOST = 'generativelanguage.googleapis.com'
+
+# Adiciona o diretório raiz do serviço ao path (para utils/)
+_LLM_ROOT = str(Path(__file__).parent.parent)
+if _LLM_ROOT not in sys.path:
+    sys.path.insert(0, _LLM_ROOT)
+
+from utils import cassette, metrics, tracing
+from utils.json_utils import extract_json, JSONExtractionError
+from utils.circuit_breaker import get_breaker
+from utils.model_router import TASK_ARTICLE, TASK_SENTIMENT, TASK_STRATEGIC_ANALYSIS, get_router
+
+# Schema de saída do artigo (saída estruturada do Gemini)
+ARTICLE_RESPONSE_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'title': {'type': 'STRING'},
+        'content': {'type': 'STRING'},
+    },
+    'required': ['title', 'content'],
+}
+
+# Prefixos de modelos sem suporte a saída JSON estruturada
+_MODELS_WITHOUT_JSON_MODE = ('gemini-pro', 'gemini-1.0')
+
+# Número máximo de continuações quando a resposta é cortada pelo limite de tokens
+MAX_CONTINUATIONS = int(os.getenv('GEMINI_MAX_CONTINUATIONS', '2'))
+
+CONTINUATION_PROMPT = (
+    "Sua resposta anterior foi interrompida pelo limite de tamanho. "
+    "Continue EXATAMENTE do ponto onde parou, sem repetir nenhum trecho já enviado, "
+    "sem reiniciar o JSON e sem adicionar markdown ou comentários."
+)
+
+def _load_genai() -> Any:
+    """
+    Importa o SDK do Gemini na primeira utilização (e carrega o .env).
+    
+    Returns:
+        Módulo google.generativeai
+    """
+    global _genai
+    if _genai is None:
+        try:
+            from dotenv import load_dotenv  # type: ignore
+            load_dotenv()
+        except ImportError:
+            pass
+        # SDK real ou gravação/reprodução do cassete (LLM_CASSETTE_MODE)
+        _genai = cassette.wrap('gemini', lambda: importlib.import_module('google.generativeai'))
+    return _genai
 
 def initialize_gemini():
     """
@@ -30,17 +87,250 @@ def initialize_gemini():
     Returns:
         bool: True se inicializado com sucesso, False caso contrário
     """
-    if not GEMINI_AVAILABLE:
+    if not GEMINI_AVAILABLE and not cassette.replaying():
         return False
     
-    api_key = os.getenv('GEMINI_API_KEY')
+    global _configured_api_key
+    genai = _load_genai()
+    api_key = cassette.api_key('GEMINI_API_KEY')
     if not api_key:
         return False
     
-    genai.configure(api_key=api_key)
+    # Configura o cliente uma única vez por processo (batch e serviço reutilizam)
+    endpoint = api_endpoint()
+    if (api_key, endpoint) != _configured_api_key:
+        if endpoint:
+            # Endpoint alternativo (proxy ou dublê local): transporte REST aceita http://
+            genai.configure(api_key=api_key, transport='rest', client_options={'api_endpoint': endpoint})
+        else:
+            genai.configure(api_key=api_key)
+        _configured_api_key = (api_key, endpoint)
     return True
 
-def generate_article_with_gemini(financial_data: dict, sentiment_data: dict, symbol: str) -> dict:
+def api_endpoint() -> Optional[str]:
+    """
+    Endpoint da API do Gemini a partir de GEMINI_BASE_URL (a mesma variável do PHP).
+    
+    Returns:
+        'esquema://host[:porta]' quando aponta para outro host que não o padrão do Google, senão None
+    """
+    base_url = os.getenv('GEMINI_BASE_URL')
+    if not base_url:
+        return None
+    from urllib.parse import urlparse
+    parsed = urlparse(base_url)
+    if not parsed.netloc or parsed.netloc == DEFAULT_API_HOST:
+        return None
+    return f"{parsed.scheme or 'https'}://{parsed.netloc}"
+
+def supports_json_mode(model_name: str) -> bool:
+    """
+    Verifica se o modelo aceita saída JSON estruturada (response_mime_type/response_schema).
+    
+    Pode ser desativado com GEMINI_JSON_MODE=false.
+    
+    Args:
+        model_name: Nome do modelo Gemini
+        
+    Returns:
+        bool: True se o modelo suporta saída JSON estruturada
+    """
+    if os.getenv('GEMINI_JSON_MODE', 'true').lower() in ('0', 'false', 'no'):
+        return False
+    name = model_name.split('/')[-1]
+    return not any(name == prefix or name.startswith(prefix + '-') for prefix in _MODELS_WITHOUT_JSON_MODE)
+
+def _finish_reason(response: Any) -> str:
+    """
+    Retorna o nome do motivo de término do primeiro candidato (ex: 'STOP', 'MAX_TOKENS').
+    """
+    try:
+        reason = response.candidates[0].finish_reason
+    except (AttributeError, IndexError, TypeError):
+        return ''
+    name = getattr(reason, 'name', None)
+    if name:
+        return name
+    # Versões antigas do SDK retornam o valor numérico do enum
+    return {1: 'STOP', 2: 'MAX_TOKENS'}.get(reason, str(reason))
+
+def _response_text(response: Any) -> str:
+    """
+    Extrai o texto da resposta, mesmo quando response.text não está disponível.
+    """
+    try:
+        return response.text
+    except (ValueError, AttributeError):
+        try:
+            parts = response.candidates[0].content.parts
+        except (AttributeError, IndexError, TypeError):
+            return ''
+        return ''.join(getattr(part, 'text', '') for part in parts)
+
+def _stitch_continuation(previous: str, continuation: str) -> str:
+    """
+    Junta a continuação ao texto anterior, removendo cercas de markdown
+    e trechos repetidos no início da continuação.
+    
+    Args:
+        previous: Texto já gerado
+        continuation: Texto da continuação
+        
+    Returns:
+        Texto combinado
+    """
+    if continuation.lstrip().startswith('```'):
+        continuation = continuation.lstrip()
+        first_newline = continuation.find('\n')
+        continuation = continuation[first_newline + 1:] if first_newline >= 0 else ''
+    
+    # Remove sobreposição (o modelo às vezes repete o final do texto anterior).
+    # Sobreposições muito curtas são ignoradas para não cortar texto legítimo.
+    max_overlap = min(len(previous), len(continuation), 200)
+    for size in range(max_overlap, 15, -1):
+        if previous.endswith(continuation[:size]):
+            continuation = continuation[size:]
+            break
+    
+    return previous + continuation
+
+def generate_with_continuation(model: Any, prompt: str, generation_config: dict,
+                               max_continuations: Optional[int] = None, usage: Optional[dict] = None) -> str:
+    """
+    Gera conteúdo e, se a resposta for cortada por MAX_TOKENS, pede apenas a
+    continuação do que falta em vez de regenerar tudo do zero.
+    
+    Args:
+        model: Instância de genai.GenerativeModel
+        prompt: Prompt original
+        generation_config: Configuração de geração
+        max_continuations: Limite de continuações (padrão: GEMINI_MAX_CONTINUATIONS)
+        usage: Dicionário opcional preenchido com o uso de tokens somado das chamadas
+        
+    Returns:
+        Texto completo da resposta (partes já unidas)
+        
+    Raises:
+        CircuitOpenError: Se o circuito do Gemini estiver aberto
+    """
+    if max_continuations is None:
+        max_continuations = MAX_CONTINUATIONS
+    
+    # Circuito aberto: falha imediatamente para o chamador usar o fallback
+    return get_breaker('gemini').call(_generate_and_continue, model, prompt, generation_config, max_continuations, usage)
+
+def _accumulate_usage(usage: Optional[dict], response: Any) -> None:
+    """Soma o uso de tokens da resposta (usage_metadata) no dicionário informado."""
+    metadata = getattr(response, 'usage_metadata', None)
+    if usage is None or metadata is None:
+        return
+    usage['prompt_tokens'] = usage.get('prompt_tokens', 0) + (getattr(metadata, 'prompt_token_count', 0) or 0)
+    usage['output_tokens'] = usage.get('output_tokens', 0) + (getattr(metadata, 'candidates_token_count', 0) or 0)
+
+def _generate_and_continue(model: Any, prompt: str, generation_config: dict, max_continuations: int,
+                           usage: Optional[dict] = None) -> str:
+    response = model.generate_content(prompt, generation_config=generation_config)
+    _accumulate_usage(usage, response)
+    text = _response_text(response)
+    
+    # A continuação é texto livre: em modo JSON o modelo reiniciaria o objeto
+    continuation_config = {
+        key: value for key, value in generation_config.items()
+        if key not in ('response_mime_type', 'response_schema')
+    }
+    
+    continuations = 0
+    while _finish_reason(response) == 'MAX_TOKENS' and continuations < max_continuations:
+        continuations += 1
+        print(f"Aviso: resposta do Gemini truncada (MAX_TOKENS), pedindo continuação {continuations}/{max_continuations}", file=sys.stderr)
+        contents = [
+            {'role': 'user', 'parts': [prompt]},
+            {'role': 'model', 'parts': [text]},
+            {'role': 'user', 'parts': [CONTINUATION_PROMPT]},
+        ]
+        response = model.generate_content(contents, generation_config=continuation_config)
+        _accumulate_usage(usage, response)
+        text = _stitch_continuation(text, _response_text(response))
+    
+    return text
+
+def build_generation_config(model_name: str, temperature: float, max_output_tokens: int,
+                            response_schema: Optional[dict] = None) -> dict:
+    """
+    Monta a configuração de geração, pedindo saída JSON quando o modelo suporta.
+    
+    Args:
+        model_name: Nome do modelo Gemini
+        temperature: Temperatura de geração
+        max_output_tokens: Limite de tokens de saída
+        response_schema: Schema da resposta (opcional)
+        
+    Returns:
+        Dicionário com a configuração de geração
+    """
+    config: Dict[str, Any] = {
+        'temperature': temperature,
+        'max_output_tokens': max_output_tokens,
+    }
+    if supports_json_mode(model_name):
+        config['response_mime_type'] = 'application/json'
+        if response_schema:
+            config['response_schema'] = response_schema
+    return config
+
+def generate_for_task(task: str, prompt: str, model_name: Optional[str] = None,
+                      response_schema: Optional[dict] = None) -> str:
+    """
+    Gera conteúdo para uma tarefa usando o modelo e a configuração da rota da tarefa.
+    
+    A latência observada (inclusive das chamadas que falham) é registrada no
+    roteador, que rebaixa a tarefa para um modelo mais rápido quando a meta de
+    latência da rota é estourada.
+    
+    Args:
+        task: Tarefa ('sentiment', 'strategic_analysis', 'article')
+        prompt: Prompt a enviar
+        model_name: Força um modelo específico (ex: hedge); padrão: modelo da rota
+        response_schema: Schema da resposta (opcional)
+        
+    Returns:
+        Texto completo da resposta
+    """
+    router = get_router()
+    route = router.select(task)
+    model_name = model_name or route['model']
+    model = _load_genai().GenerativeModel(model_name)
+    
+    usage: Dict[str, int] = {}
+    started_at = time.monotonic()
+    try:
+        with tracing.span('gemini_call', task=task, model=model_name) as span:
+            content = generate_with_continuation(
+                model,
+                prompt,
+                build_generation_config(
+                    model_name,
+                    temperature=route['temperature'],
+                    max_output_tokens=route['max_output_tokens'],
+                    response_schema=response_schema,
+                ),
+                usage=usage,
+            )
+            if span is not None:
+                span.set(**usage)
+    finally:
+        elapsed = time.monotonic() - started_at
+        metrics.observe('llm_stage_duration_seconds', elapsed, stage='gemini_call')
+        for kind in ('prompt', 'output'):
+            if usage.get(f'{kind}_tokens'):
+                metrics.inc('llm_gemini_tokens_total', usage[f'{kind}_tokens'], task=task, type=kind)
+        # Chamadas que falham (ex: timeout) também contam para a meta de latência da rota
+        router.record(task, model_name, elapsed, usage.get('output_tokens'))
+    return content
+
+@tracing.traced()
+def generate_article_with_gemini(financial_data: dict, sentiment_data: dict, symbol: str,
+                                 model_name: Optional[str] = None) -> dict:
     """
     Gera artigo financeiro usando Google Gemini.
     
@@ -48,6 +338,7 @@ def generate_article_with_gemini(financial_data: dict, sentiment_data: dict, sym
         financial_data: Dicionário com dados financeiros
         sentiment_data: Dicionário com análise de sentimento
         symbol: Símbolo da ação
+        model_name: Modelo a usar (padrão: modelo da rota 'article')
         
     Returns:
         Dicionário com 'title' e 'content'
@@ -58,29 +349,105 @@ def generate_article_with_gemini(financial_data: dict, sentiment_data: dict, sym
     # Prepara prompt
     prompt = build_article_prompt(financial_data, sentiment_data, symbol)
     
-    # Configura modelo
-    model_name = os.getenv('GEMINI_MODEL', 'gemini-pro')
-    model = genai.GenerativeModel(model_name)
-    
-    # Gera conteúdo
+    # Gera conteúdo (modelo e configuração vêm da rota 'article')
     try:
-        response = model.generate_content(
-            prompt,
-            generation_config={
-                'temperature': 0.6,  # Reduzido para mais objetividade jornalística, mantendo criatividade
-                'max_output_tokens': 3072,  # Aumentado para permitir análises mais aprofundadas
-            }
-        )
-        
-        content = response.text
+        content = generate_for_task(TASK_ARTICLE, prompt, model_name, ARTICLE_RESPONSE_SCHEMA)
         
         # Tenta extrair JSON da resposta
-        article = parse_gemini_response(content, financial_data, sentiment_data, symbol)
+        with metrics.stage('parse'):
+            article = parse_gemini_response(content, financial_data, sentiment_data, symbol)
         return article
         
     except Exception as e:
         raise Exception(f"Erro ao gerar artigo com Gemini: {str(e)}")
 
+# Diretrizes de redação do Agente Key (compartilhadas pelo modo fundido)
+ARTICLE_WRITING_GUIDELINES = """ DIRETRIZES DE REDAÇÃO JORNALÍSTICA:
+            1. TÍTULO:
+            - Crie um título impactante, informativo e preciso que capture a essência da matéria 
+            - Evite sensacionalismo, mas seja atraente - Inclua o símbolo da ação quando relevante 
+            - Exemplo: "PETR4 registra alta de 3,2% em dia de recuperação do setor petrolífero"
+            
+            2. INTRODUÇÃO (Lead):
+            - Comece com um parágrafo forte que responda: O que está acontecendo? Por que é relevante? 
+            - Contextualize a situação atual da ação no mercado 
+            - Use dados concretos (preço, variação) para ancorar a narrativa 
+            - Seja direto e objetivo, mas não superficial
+            
+            3. ANÁLISE FINANCEIRA APROFUNDADA:
+            - Não apenas liste números, mas explique o que eles significam
+            - Compare com médias históricas (52 semanas) quando relevante
+            - Contextualize indicadores como P/L e Dividend Yield no cenário atual
+            - Explique o significado do volume negociado e da capitalização de mercado
+            - Use linguagem técnica quando necessário, mas sempre explique termos complexos
+            - Transforme dados em insights: "O P/L de X indica...", "A variação de Y% sugere..."
+            
+            4. CONTEXTO DE MERCADO E SENTIMENTO:
+            - Analise profundamente como o sentimento do mercado está influenciando a ação
+            - Relacione as notícias recentes com os movimentos de preço
+            - Explique padrões: "O sentimento positivo reflete...", "As notícias negativas indicam..."
+            - Contextualize os tópicos em destaque e seu impacto
+            - Se houver análise de mercado ou macroeconômica, integre-a à narrativa de forma natural
+            
+            5. PERCEPÇÃO DE MARCA E COMPORTAMENTO (se disponível):
+            - Integre insights sobre percepção da marca de forma jornalística
+            - Explique como o engajamento e a confiança do investidor se refletem nos dados
+            - Use dados comportamentais para enriquecer a análise, não apenas listá-los
+            - Exemplo: "A queda na confiança do investidor, medida em X pontos, coincide com..."
+            
+            6. INSIGHTS ESTRATÉGICOS E PERSPECTIVAS:
+            - Transforme insights estratégicos em análise jornalística
+            - Discuta perspectivas de forma equilibrada, baseando-se nos dados apresentados
+            - Se houver alertas de risco, apresente-os de forma objetiva e contextualizada
+            - Evite especulação, mas não deixe de analisar tendências identificadas nos dados
+            - Seja cauteloso com projeções, sempre fundamentando em dados reais
+            
+            7. CONCLUSÃO:
+            - Encerre com uma síntese equilibrada que reúna os principais pontos
+            - Não faça recomendações explícitas de compra/venda
+            - Ofereça uma visão consolidada do cenário atual
+            - Deixe claro que investimentos requerem análise individual
+            
+            8. ESTILO E TOM JORNALÍSTICO:
+            - Use linguagem profissional, clara e objetiva
+            - Evite jargões desnecessários, mas use termos técnicos quando apropriado (sempre explicando)
+            - Mantenha tom neutro e informativo, sem sensacionalismo
+            - Seja preciso com números e dados
+            - Use parágrafos curtos e objetivos para facilitar a leitura
+            - Crie uma narrativa fluida que conecte os diferentes aspectos da análise
+            
+            9. PROFUNDIDADE E APROFUNDAMENTO:
+            - Não se limite a apresentar dados, aprofunde-se em seu significado
+            - Faça conexões entre diferentes indicadores e análises
+            - Explique o "porquê" por trás dos números, não apenas o "o quê"
+            - Use comparações e contextos históricos quando relevante
+            - Transforme análises técnicas em insights compreensíveis
+            
+            10. FORMATO:
+            - Use HTML para formatação profissional
+            - Utilize <h2> para subtítulos de seções
+            - Use <p> para parágrafos
+            - Use <strong> para destacar dados importantes
+            - Use <ul> e <li> para listas quando apropriado
+            - Mantenha formatação limpa e profissional
+            
+            *IMPORTANTE: NÃO INCLUA O DISCLAIMER NO JSON, SERÁ ADICIONADO AUTOMATICAMENTE*
+            
+            IMPORTANTE - DISCLAIMER OBRIGATÓRIO:
+            
+            - Ao final do conteúdo, SEMPRE inclua o seguinte aviso (não inclua no JSON, será adicionado automaticamente):
+            "*Este conteúdo foi gerado automaticamente com auxílio de inteligência artificial e requer revisão humana antes da publicação. As informações apresentadas não constituem recomendação de investimento. Consulte sempre um analista financeiro certificado antes de tomar decisões de investimento.*"
+            
+"""
+
+ARTICLE_OUTPUT_FORMAT = """            FORMATO DE SAÍDA:
+            - Retorne APENAS um JSON válido com a seguinte estrutura:
+            {
+            "title": "Título da matéria",
+            "content": "Conteúdo completo em HTML formatado (sem o disclaimer, que será adicionado automaticamente)"
+            }
+            - Não inclua texto adicional antes ou depois do JSON."""
+
 def build_article_prompt(financial_data: dict, sentiment_data: dict, symbol: str) -> str:
     """
     Constrói prompt para geração de artigo com novos dados de análise.
@@ -223,89 +590,7 @@ def build_article_prompt(financial_data: dict, sentiment_data: dict, symbol: str
             opportunities = json.dumps(opportunities, indent=2, ensure_ascii=False)
         prompt += f"\n\nOPORTUNIDADES DE MELHORIA (Agente Pedro):\n{opportunities}"
     
-    prompt += f""" DIRETRIZES DE REDAÇÃO JORNALÍSTICA:
-            1. TÍTULO:
-            - Crie um título impactante, informativo e preciso que capture a essência da matéria 
-            - Evite sensacionalismo, mas seja atraente - Inclua o símbolo da ação quando relevante 
-            - Exemplo: "PETR4 registra alta de 3,2% em dia de recuperação do setor petrolífero"
-            
-            2. INTRODUÇÃO (Lead):
-            - Comece com um parágrafo forte que responda: O que está acontecendo? Por que é relevante? 
-            - Contextualize a situação atual da ação no mercado 
-            - Use dados concretos (preço, variação) para ancorar a narrativa 
-            - Seja direto e objetivo, mas não superficial
-            
-            3. ANÁLISE FINANCEIRA APROFUNDADA:
-            - Não apenas liste números, mas explique o que eles significam
-            - Compare com médias históricas (52 semanas) quando relevante
-            - Contextualize indicadores como P/L e Dividend Yield no cenário atual
-            - Explique o significado do volume negociado e da capitalização de mercado
-            - Use linguagem técnica quando necessário, mas sempre explique termos complexos
-            - Transforme dados em insights: "O P/L de X indica...", "A variação de Y% sugere..."
-            
-            4. CONTEXTO DE MERCADO E SENTIMENTO:
-            - Analise profundamente como o sentimento do mercado está influenciando a ação
-            - Relacione as notícias recentes com os movimentos de preço
-            - Explique padrões: "O sentimento positivo reflete...", "As notícias negativas indicam..."
-            - Contextualize os tópicos em destaque e seu impacto
-            - Se houver análise de mercado ou macroeconômica, integre-a à narrativa de forma natural
-            
-            5. PERCEPÇÃO DE MARCA E COMPORTAMENTO (se disponível):
-            - Integre insights sobre percepção da marca de forma jornalística
-            - Explique como o engajamento e a confiança do investidor se refletem nos dados
-            - Use dados comportamentais para enriquecer a análise, não apenas listá-los
-            - Exemplo: "A queda na confiança do investidor, medida em X pontos, coincide com..."
-            
-            6. INSIGHTS ESTRATÉGICOS E PERSPECTIVAS:
-            - Transforme insights estratégicos em análise jornalística
-            - Discuta perspectivas de forma equilibrada, baseando-se nos dados apresentados
-            - Se houver alertas de risco, apresente-os de forma objetiva e contextualizada
-            - Evite especulação, mas não deixe de analisar tendências identificadas nos dados
-            - Seja cauteloso com projeções, sempre fundamentando em dados reais
-            
-            7. CONCLUSÃO:
-            - Encerre com uma síntese equilibrada que reúna os principais pontos
-            - Não faça recomendações explícitas de compra/venda
-            - Ofereça uma visão consolidada do cenário atual
-            - Deixe claro que investimentos requerem análise individual
-            
-            8. ESTILO E TOM JORNALÍSTICO:
-            - Use linguagem profissional, clara e objetiva
-            - Evite jargões desnecessários, mas use termos técnicos quando apropriado (sempre explicando)
-            - Mantenha tom neutro e informativo, sem sensacionalismo
-            - Seja preciso com números e dados
-            - Use parágrafos curtos e objetivos para facilitar a leitura
-            - Crie uma narrativa fluida que conecte os diferentes aspectos da análise
-            
-            9. PROFUNDIDADE E APROFUNDAMENTO:
-            - Não se limite a apresentar dados, aprofunde-se em seu significado
-            - Faça conexões entre diferentes indicadores e análises
-            - Explique o "porquê" por trás dos números, não apenas o "o quê"
-            - Use comparações e contextos históricos quando relevante
-            - Transforme análises técnicas em insights compreensíveis
-            
-            10. FORMATO:
-            - Use HTML para formatação profissional
-            - Utilize <h2> para subtítulos de seções
-            - Use <p> para parágrafos
-            - Use <strong> para destacar dados importantes
-            - Use <ul> e <li> para listas quando apropriado
-            - Mantenha formatação limpa e profissional
-            
-            *IMPORTANTE: NÃO INCLUA O DISCLAIMER NO JSON, SERÁ ADICIONADO AUTOMATICAMENTE*
-            
-            IMPORTANTE - DISCLAIMER OBRIGATÓRIO:
-            
-            - Ao final do conteúdo, SEMPRE inclua o seguinte aviso (não inclua no JSON, será adicionado automaticamente):
-            "*Este conteúdo foi gerado automaticamente com auxílio de inteligência artificial e requer revisão humana antes da publicação. As informações apresentadas não constituem recomendação de investimento. Consulte sempre um analista financeiro certificado antes de tomar decisões de investimento.*"
-            
-            FORMATO DE SAÍDA:
-            - Retorne APENAS um JSON válido com a seguinte estrutura:
-            {{
-            "title": "Título da matéria",
-            "content": "Conteúdo completo em HTML formatado (sem o disclaimer, que será adicionado automaticamente)"
-            }}
-            - Não inclua texto adicional antes ou depois do JSON."""
+    prompt += ARTICLE_WRITING_GUIDELINES + ARTICLE_OUTPUT_FORMAT
     
     return prompt
 
@@ -342,30 +627,25 @@ def analyze_sentiment_with_gemini(articles: list, symbol: str, company_name: str
     # Prepara prompt
     prompt = build_sentiment_analysis_prompt(articles, symbol, company_name, financial_data or {})
     
-    # Configura modelo
-    model_name = os.getenv('GEMINI_MODEL', 'gemini-pro')
-    model = genai.GenerativeModel(model_name)
-    
-    # Gera análise
+    # Gera análise (modelo e configuração vêm da rota 'sentiment')
     try:
-        response = model.generate_content(
-            prompt,
-            generation_config={
-                'temperature': 0.4,  # Balanceado para análise estratégica
-                'max_output_tokens': 3072,  # Mais tokens para análise detalhada
-            }
-        )
-        
-        content = response.text
+        # Estrutura aninhada e livre demais para um schema: pede apenas saída JSON
+        content = generate_for_task(TASK_SENTIMENT, prompt)
         
         # Tenta extrair JSON da resposta
-        analysis = parse_sentiment_response(content, articles, symbol, company_name)
+        with metrics.stage('parse'):
+            analysis = parse_sentiment_response(content, articles, symbol, company_name)
         return analysis
         
     except Exception as e:
         raise Exception(f"Erro ao analisar sentimento com Gemini: {str(e)}")
 
-def build_sentiment_analysis_prompt(articles: list, symbol: str, company_name: str, financial_data: dict) -> str:
+SENTIMENT_OUTPUT_INSTRUCTION = """
+
+        Retorne APENAS o JSON, sem markdown ou texto adicional."""
+
+def build_sentiment_analysis_prompt(articles: list, symbol: str, company_name: str, financial_data: dict,
+                                    include_output_instruction: bool = True) -> str:
     """
     Constrói prompt para análise de sentimento e percepção de marca.
     
@@ -374,6 +654,7 @@ def build_sentiment_analysis_prompt(articles: list, symbol: str, company_name: s
         symbol: Símbolo da ação
         company_name: Nome da empresa
         financial_data: Dados financeiros
+        include_output_instruction: Inclui a instrução final de saída (desligado no modo fundido)
         
     Returns:
         String com o prompt
@@ -593,10 +874,131 @@ def build_sentiment_analysis_prompt(articles: list, symbol: str, company_name: s
         - Os insights em "strategic_insights" devem ser específicos e acionáveis, como: "O público está mais sensível ao preço", "O concorrente X está ganhando share", "Há tendência de crescimento em tema Y", "A satisfação do cliente está caindo"
         - A seção "cost_optimization" deve fornecer recomendações claras sobre onde cortar custos ou investir
         - Use dados reais das notícias e contexto financeiro para fundamentar todas as análises
-        - Seja objetivo, estratégico e focado em ações práticas
+        - Seja objetivo, estratégico e focado em ações práticas"""
+    
+    if include_output_instruction:
+        prompt += SENTIMENT_OUTPUT_INSTRUCTION
+        
+    return prompt
 
-        Retorne APENAS o JSON, sem markdown ou texto adicional."""
+def complete_sentiment_analysis(analysis: dict, articles: list) -> dict:
+    """
+    Completa a análise de sentimento retornada pelo Gemini com os campos básicos.
+    
+    Args:
+        analysis: Objeto JSON da análise
+        articles: Lista de artigos analisados
         
+    Returns:
+        Dicionário com análise de sentimento
+    """
+    # Adiciona campos básicos se não estiverem presentes
+    if 'sentiment' not in analysis:
+        # Calcula sentimento baseado em sentiment_breakdown
+        sentiment_breakdown = analysis.get('sentiment_breakdown', {})
+        positive = sentiment_breakdown.get('positive_percentage', 0)
+        negative = sentiment_breakdown.get('negative_percentage', 0)
+        
+        if positive > negative + 10:
+            analysis['sentiment'] = 'positive'
+        elif negative > positive + 10:
+            analysis['sentiment'] = 'negative'
+        else:
+            analysis['sentiment'] = 'neutral'
+    
+    if 'sentiment_score' not in analysis:
+        sentiment_breakdown = analysis.get('sentiment_breakdown', {})
+        positive = sentiment_breakdown.get('positive_percentage', 0)
+        negative = sentiment_breakdown.get('negative_percentage', 0)
+        analysis['sentiment_score'] = round((positive - negative) / 100, 4)
+    
+    if 'news_count' not in analysis:
+        analysis['news_count'] = len(articles)
+    
+    # Adiciona raw_data com artigos
+    analysis['raw_data'] = articles
+    
+    return analysis
+
+def generate_sentiment_and_article_with_gemini(articles: list, financial_data: dict, symbol: str,
+                                               company_name: str) -> dict:
+    """
+    Modo fundido: gera a análise de sentimento (Agente Pedro) e a matéria
+    (Agente Key) em uma única chamada estruturada ao Gemini.
+    
+    Cada parte passa pelos mesmos contratos de saída do fluxo em duas chamadas
+    (complete_sentiment_analysis e chaves 'title'/'content' do artigo).
+    
+    Args:
+        articles: Lista de notícias
+        financial_data: Dados financeiros
+        symbol: Símbolo da ação
+        company_name: Nome da empresa
+        
+    Returns:
+        Dicionário com 'sentiment' (análise) e 'article' ('title' e 'content')
+        
+    Raises:
+        ValueError: Se o Gemini não estiver configurado
+        Exception: Se a resposta não puder ser usada (o chamador deve voltar ao fluxo em duas chamadas)
+    """
+    if not initialize_gemini():
+        raise ValueError("GEMINI_API_KEY não configurada")
+    
+    prompt = build_fused_prompt(articles, financial_data or {}, symbol, company_name)
+    
+    try:
+        content = generate_for_task(TASK_STRATEGIC_ANALYSIS, prompt)
+        with metrics.stage('parse'):
+            result = extract_json(content, required_keys=('sentiment_analysis', 'article'))
+        
+        article = result['article']
+        if not isinstance(article, dict) or not article.get('title') or not article.get('content'):
+            raise JSONExtractionError('missing_keys', 'article.title, article.content')
+        if not isinstance(result['sentiment_analysis'], dict):
+            raise JSONExtractionError('missing_keys', 'sentiment_analysis')
+        
+        return {
+            'sentiment': complete_sentiment_analysis(result['sentiment_analysis'], articles),
+            'article': {'title': article['title'], 'content': article['content']},
+        }
+    except Exception as e:
+        raise Exception(f"Erro na geração fundida com Gemini: {str(e)}")
+
+def build_fused_prompt(articles: list, financial_data: dict, symbol: str, company_name: str) -> str:
+    """
+    Constrói o prompt do modo fundido (análise de sentimento + matéria).
+    
+    Args:
+        articles: Lista de notícias
+        financial_data: Dados financeiros
+        symbol: Símbolo da ação
+        company_name: Nome da empresa
+        
+    Returns:
+        String com o prompt
+    """
+    prompt = build_sentiment_analysis_prompt(articles, symbol, company_name, financial_data,
+                                             include_output_instruction=False)
+    
+    prompt += f"""
+
+        ETAPA 2 - MATÉRIA JORNALÍSTICA:
+        Depois da análise, atue como um jornalista financeiro veterano e escreva uma matéria sobre a ação
+        {symbol} ({company_name}) usando os dados financeiros acima e a SUA PRÓPRIA análise de sentimento.
+"""
+    prompt += ARTICLE_WRITING_GUIDELINES
+    prompt += """            FORMATO DE SAÍDA:
+            - Retorne APENAS um JSON válido com a seguinte estrutura:
+            {
+            "sentiment_analysis": { objeto completo da análise, na estrutura descrita acima },
+            "article": {
+                "title": "Título da matéria",
+                "content": "Conteúdo completo em HTML formatado (sem o disclaimer, que será adicionado automaticamente)"
+            }
+            }
+            - Não inclua texto adicional antes ou depois do JSON."""
+    
     return prompt
 
 def parse_sentiment_response(content: str, articles: list, symbol: str, company_name: str) -> dict:
@@ -613,51 +1015,9 @@ def parse_sentiment_response(content: str, articles: list, symbol: str, company_
         Dicionário com análise de sentimento
     """
     try:
-        # Remove markdown code blocks se presente
-        content_clean = content.strip()
-        if content_clean.startswith('```'):
-            lines = content_clean.split('\n')
-            if lines[0].startswith('```'):
-                lines = lines[1:]
-            if lines[-1].strip() == '```':
-                lines = lines[:-1]
-            content_clean = '\n'.join(lines)
-        
-        # Tenta encontrar JSON
-        json_start = content_clean.find('{')
-        json_end = content_clean.rfind('}') + 1
-        
-        if json_start >= 0 and json_end > json_start:
-            json_str = content_clean[json_start:json_end]
-            analysis = json.loads(json_str)
-            
-            # Adiciona campos básicos se não estiverem presentes
-            if 'sentiment' not in analysis:
-                # Calcula sentimento baseado em sentiment_breakdown
-                sentiment_breakdown = analysis.get('sentiment_breakdown', {})
-                positive = sentiment_breakdown.get('positive_percentage', 0)
-                negative = sentiment_breakdown.get('negative_percentage', 0)
-                
-                if positive > negative + 10:
-                    analysis['sentiment'] = 'positive'
-                elif negative > positive + 10:
-                    analysis['sentiment'] = 'negative'
-                else:
-                    analysis['sentiment'] = 'neutral'
-            
-            if 'sentiment_score' not in analysis:
-                sentiment_breakdown = analysis.get('sentiment_breakdown', {})
-                positive = sentiment_breakdown.get('positive_percentage', 0)
-                negative = sentiment_breakdown.get('negative_percentage', 0)
-                analysis['sentiment_score'] = round((positive - negative) / 100, 4)
-            
-            if 'news_count' not in analysis:
-                analysis['news_count'] = len(articles)
-            
-            # Adiciona raw_data com artigos
-            analysis['raw_data'] = articles
-            
-            return analysis
+        return complete_sentiment_analysis(extract_json(content), articles)
+    except JSONExtractionError as e:
+        print(f"Erro ao parsear resposta JSON de sentimento: {e}", file=sys.stderr)
     except Exception as e:
         print(f"Erro ao parsear resposta JSON: {e}", file=sys.stderr)
     
@@ -707,47 +1067,27 @@ def parse_gemini_response(content: str, financial_data: dict, sentiment_data: di
     """
     # Tenta extrair JSON da resposta
     try:
-        # Remove markdown code blocks se presente
-        content_clean = content.strip()
-        if content_clean.startswith('```'):
-            # Remove primeiro ``` e último ```
-            lines = content_clean.split('\n')
-            if lines[0].startswith('```'):
-                lines = lines[1:]
-            if lines[-1].strip() == '```':
-                lines = lines[:-1]
-            content_clean = '\n'.join(lines)
-        
-        # Tenta encontrar JSON
-        json_start = content_clean.find('{')
-        json_end = content_clean.rfind('}') + 1
-        
-        if json_start >= 0 and json_end > json_start:
-            json_str = content_clean[json_start:json_end]
-            article = json.loads(json_str)
-            
-            if 'title' in article and 'content' in article:
-                return article
-    except:
-        pass
-    
-        # Fallback: usa o conteúdo completo como artigo
-        price = financial_data.get('price', 'N/A')
-        change = financial_data.get('change', 0)
-        trend = 'alta' if change > 0 else ('queda' if change < 0 else 'estabilidade')
-        
-        title = f"Análise {symbol}: Mercado em {trend}"
-        if price != 'N/A':
-            title += f" - R$ {price:.2f}" if isinstance(price, (int, float)) else f" - {price}"
-        
-        # Adiciona disclaimer ao conteúdo
-        disclaimer = "\n\n---\n\n*Este conteúdo foi gerado automaticamente com auxílio de inteligência artificial e requer revisão humana antes da publicação. As informações apresentadas não constituem recomendação de investimento. Consulte sempre um analista financeiro certificado antes de tomar decisões de investimento.*"
-        content_with_disclaimer = content + disclaimer
-        
-        return {
-            'title': title,
-            'content': content_with_disclaimer
-        }
+        return extract_json(content, required_keys=('title', 'content'))
+    except JSONExtractionError as e:
+        print(f"Erro ao parsear resposta JSON do artigo: {e}", file=sys.stderr)
+    
+    # Fallback: usa o conteúdo completo como artigo
+    price = financial_data.get('price', 'N/A')
+    change = financial_data.get('change', 0) or 0
+    trend = 'alta' if change > 0 else ('queda' if change < 0 else 'estabilidade')
+    
+    title = f"Análise {symbol}: Mercado em {trend}"
+    if price != 'N/A':
+        title += f" - R$ {price:.2f}" if isinstance(price, (int, float)) else f" - {price}"
+    
+    # Adiciona disclaimer ao conteúdo
+    disclaimer = "\n\n---\n\n*Este conteúdo foi gerado automaticamente com auxílio de inteligência artificial e requer revisão humana antes da publicação. As informações apresentadas não constituem recomendação de investimento. Consulte sempre um analista financeiro certificado antes de tomar decisões de investimento.*"
+    content_with_disclaimer = content + disclaimer
+    
+    return {
+        'title': title,
+        'content': content_with_disclaimer
+    }
 
 if __name__ == "__main__":
     # Teste
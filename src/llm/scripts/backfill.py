@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Backfill em paralelo: preparação e geração de artigos em shards
+Divide uma exportação grande (lista JSON, NDJSON ou objeto, como no
+prepare_inputs.py) em shards por símbolo e período, processa os shards num
+pool de processos e junta as saídas na ordem da entrada.
+
+Uso:
+    python scripts/backfill.py historico.ndjson -o artigos.ndjson
+    python scripts/backfill.py historico.json -o preparados.ndjson --prepare-only
+    python scripts/backfill.py historico.ndjson -o artigos.ndjson --workers 8 --period day
+
+Etapas (todas com checkpoint no diretório de trabalho, <saída>.work):
+    1. Partição: cada registro vai para o shard '<símbolo>__<período>' com o
+       seu número de sequência na entrada; o manifest.json marca a partição
+       concluída (e a entrada de origem).
+    2. Processamento: cada shard passa por run_llm (ou só pelo
+       prepare_inputs com --prepare-only); os resultados são gravados linha a
+       linha em out/<shard>.ndjson.partial, renomeado ao concluir o shard.
+    3. Junção: as saídas dos shards são intercaladas pela sequência da
+       entrada, então o resultado não depende da ordem de conclusão.
+
+Um backfill interrompido retoma ao rodar o mesmo comando: shards concluídos
+são pulados e shards parciais continuam dos registros ainda não gravados. Se
+algum shard falhar, a junção não acontece e o comando retorna 1.
+
+Artigos de template ('is_fallback': Gemini indisponível ou circuito aberto) e
+registros com erro não entram no checkpoint: o shard fica incompleto, a junção
+não acontece, o comando retorna 1 e a próxima execução processa esses
+registros de novo. Com --accept-fallback / --accept-errors eles são gravados
+como os demais (ex: erros permanentes nos dados de origem).
+
+Configuração:
+    LLM_BACKFILL_WORKERS: processos do pool (padrão: 4)
+    LLM_SERVICE_URL: como no run_llm, a geração usa o serviço quando configurado
+"""
+
+import argparse
+import heapq
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+_LLM_ROOT = str(Path(__file__).resolve().parent.parent)
+if _LLM_ROOT not in sys.path:
+    sys.path.insert(0, _LLM_ROOT)
+
+from scripts.prepare_inputs import InputFormatError, InvalidLine, iter_records
+
+MANIFEST_VERSION = 1
+BACKFILL_WORKERS = int(os.getenv('LLM_BACKFILL_WORKERS', '4'))
+# Arquivos de shard abertos ao mesmo tempo durante a partição
+MAX_OPEN_SHARDS = 128
+
+PERIOD_LENGTHS = {'day': 10, 'month': 7, 'year': 4}
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+def shard_key(record: Dict[str, Any], period: str) -> str:
+    """
+    Shard de um registro: símbolo e período da coleta.
+
+    Args:
+        record: Registro no formato do run_llm
+        period: 'day', 'month' ou 'year'
+
+    Returns:
+        Chave segura para nome de arquivo (ex: 'PETR4__2025-03')
+    """
+    financial = record.get('financial') or {}
+    sentiment = record.get('sentiment') or {}
+    symbol = (financial.get('action_symbol') or financial.get('symbol') or record.get('symbol')
+              or record.get('company_name') or 'sem-simbolo')
+    date = (record.get('date') or financial.get('collected_at') or sentiment.get('analyzed_at')
+            or record.get('updated_at'))
+    period_text = str(date)[:PERIOD_LENGTHS[period]] if date else 'sem-data'
+    return f"{_UNSAFE_CHARS.sub('_', str(symbol))}__{_UNSAFE_CHARS.sub('_', period_text)}"
+
+
+def _fingerprint(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+
+def _read_manifest(work_dir: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(work_dir / 'manifest.json', 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def partition(input_file: str, work_dir: Path, period: str, prepare_only: bool) -> Dict[str, Any]:
+    """
+    Divide a entrada em shards (ou reaproveita uma partição já concluída).
+
+    Returns:
+        Manifesto com a entrada de origem e a contagem de registros por shard
+
+    Raises:
+        ValueError: Se o diretório de trabalho for de outro backfill
+        InputFormatError: Se a entrada estiver malformada
+    """
+    settings = {'period': period, 'prepare_only': prepare_only}
+    manifest = _read_manifest(work_dir)
+    if manifest is not None:
+        if manifest.get('input') != _fingerprint(input_file) or manifest.get('settings') != settings:
+            raise ValueError(f"{work_dir} pertence a outro backfill (entrada ou opções diferentes); use --restart")
+        return manifest
+
+    shards_dir = work_dir / 'shards'
+    if shards_dir.exists():
+        # Partição interrompida: recomeça do zero
+        shutil.rmtree(shards_dir)
+    shards_dir.mkdir(parents=True)
+
+    counts: Dict[str, int] = {}
+    handles: 'OrderedDict[str, Any]' = OrderedDict()
+    invalid = 0
+    try:
+        with open(input_file, 'r', encoding='utf-8') as source:
+            for sequence, record in enumerate(iter_records(source)):
+                if isinstance(record, InvalidLine) or not isinstance(record, dict):
+                    invalid += 1
+                    continue
+                key = shard_key(record, period)
+                handle = handles.get(key)
+                if handle is None:
+                    if len(handles) >= MAX_OPEN_SHARDS:
+                        handles.popitem(last=False)[1].close()
+                    handle = handles[key] = open(shards_dir / f"{key}.ndjson", 'a', encoding='utf-8')
+                else:
+                    handles.move_to_end(key)
+                handle.write(f"{sequence}\t{json.dumps(record, ensure_ascii=False)}\n")
+                counts[key] = counts.get(key, 0) + 1
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'input': _fingerprint(input_file),
+        'settings': settings,
+        'invalid_records': invalid,
+        'shards': dict(sorted(counts.items())),
+    }
+    temp_path = work_dir / 'manifest.json.partial'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2, ensure_ascii=False)
+    os.replace(temp_path, work_dir / 'manifest.json')
+    return manifest
+
+
+def _resume_point(partial_path: Path) -> Set[int]:
+    """
+    Sequências dos registros já gravados na saída parcial de um shard.
+
+    Uma última linha incompleta (interrupção durante a escrita) é descartada.
+    """
+    done: Set[int] = set()
+    if not partial_path.exists():
+        return done
+    offset = 0
+    with open(partial_path, 'rb+') as file:
+        for line in file:
+            if not line.endswith(b'\n'):
+                break
+            done.add(int(line.split(b'\t', 1)[0]))
+            offset += len(line)
+        file.truncate(offset)
+    return done
+
+
+def process_shard(work_dir: str, key: str, prepare_only: bool, accept_fallback: bool = False,
+                  accept_errors: bool = False) -> Tuple[str, int, int, int]:
+    """
+    Processa um shard (no processo do pool), retomando de onde parou.
+
+    Args:
+        work_dir: Diretório de trabalho do backfill
+        key: Shard a processar
+        prepare_only: Só formata os registros (prepare_inputs), sem gerar artigos
+        accept_fallback: Grava artigos de template como concluídos
+        accept_errors: Grava registros com erro como concluídos
+
+    Returns:
+        Tupla (shard, registros processados nesta execução, registros com erro,
+        artigos de template não gravados); com algum registro não gravado o
+        shard continua parcial
+    """
+    from scripts.prepare_inputs import prepare_data
+    if not prepare_only:
+        from scripts.run_llm import generate
+
+    shard_path = Path(work_dir) / 'shards' / f"{key}.ndjson"
+    output_path = Path(work_dir) / 'out' / f"{key}.ndjson"
+    partial_path = output_path.with_name(output_path.name + '.partial')
+    done = _resume_point(partial_path)
+
+    processed = errors = fallbacks = skipped = 0
+    with open(shard_path, 'r', encoding='utf-8') as source, open(partial_path, 'a', encoding='utf-8') as output:
+        for line in source:
+            sequence, raw = line.split('\t', 1)
+            if int(sequence) in done:
+                continue
+            record = json.loads(raw)
+            request_id = record.get('request_id', f'line-{int(sequence) + 1}')
+            try:
+                result = prepare_data(record) if prepare_only else {'request_id': request_id, **generate(record)}
+            except Exception as e:
+                result = {
+                    'request_id': request_id,
+                    'error': str(e),
+                    'title': 'Erro ao gerar artigo',
+                    'content': f'Erro inesperado: {str(e)}'
+                }
+            processed += 1
+            if 'error' in result:
+                errors += 1
+                if not accept_errors:
+                    # Fora do checkpoint: a próxima execução tenta o registro de novo
+                    skipped += 1
+                    continue
+            elif result.get('is_fallback') and not accept_fallback:
+                # Fora do checkpoint: a próxima execução tenta o Gemini de novo
+                fallbacks += 1
+                skipped += 1
+                continue
+            output.write(f"{sequence}\t{json.dumps(result, ensure_ascii=False)}\n")
+            output.flush()
+    if not skipped:
+        os.replace(partial_path, output_path)
+    return key, processed, errors, fallbacks
+
+
+def _sequenced_lines(path: Path) -> Iterator[Tuple[int, str]]:
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            sequence, body = line.split('\t', 1)
+            yield int(sequence), body
+
+
+def _merge_rounds(paths: List[Path], merge_dir: Path) -> List[Path]:
+    # Intercala em rodadas para nunca abrir mais que MAX_OPEN_SHARDS arquivos de uma vez
+    round_number = 0
+    while len(paths) > MAX_OPEN_SHARDS:
+        merge_dir.mkdir(exist_ok=True)
+        merged_paths = []
+        for start in range(0, len(paths), MAX_OPEN_SHARDS):
+            merged_path = merge_dir / f"round{round_number}-{start // MAX_OPEN_SHARDS}.ndjson"
+            streams = [_sequenced_lines(path) for path in paths[start:start + MAX_OPEN_SHARDS]]
+            with open(merged_path, 'w', encoding='utf-8') as output:
+                for sequence, body in heapq.merge(*streams, key=lambda item: item[0]):
+                    output.write(f"{sequence}\t{body}")
+            merged_paths.append(merged_path)
+        paths = merged_paths
+        round_number += 1
+    return paths
+
+
+def merge(work_dir: Path, keys: List[str], output_file: str) -> int:
+    """
+    Junta as saídas dos shards na ordem da entrada (determinística).
+
+    Returns:
+        Número de registros escritos
+    """
+    paths = _merge_rounds([work_dir / 'out' / f"{key}.ndjson" for key in keys], work_dir / 'merge')
+    merged = heapq.merge(*[_sequenced_lines(path) for path in paths], key=lambda item: item[0])
+    written = 0
+    if output_file == '-':
+        for _, body in merged:
+            sys.stdout.write(body)
+            written += 1
+        return written
+
+    temp_path = f"{output_file}.partial"
+    with open(temp_path, 'w', encoding='utf-8') as output:
+        for _, body in merged:
+            output.write(body)
+            written += 1
+    os.replace(temp_path, output_file)
+    shutil.rmtree(work_dir / 'merge', ignore_errors=True)
+    return written
+
+
+def run_backfill(input_file: str, output_file: str, work_dir: Path, workers: int, period: str,
+                 prepare_only: bool, accept_fallback: bool = False, accept_errors: bool = False) -> Dict[str, Any]:
+    """
+    Executa (ou retoma) o backfill completo.
+
+    Returns:
+        Dicionário com 'shards', 'records', 'errors', 'fallbacks', 'failed_shards',
+        'incomplete_shards' (com registros de template ou com erro a refazer) e 'written'
+        ('written' é None se algum shard falhou ou ficou incompleto e a junção não aconteceu)
+    """
+    work_dir.mkdir(parents=True, exist_ok=True)
+    manifest = partition(input_file, work_dir, period, prepare_only)
+    (work_dir / 'out').mkdir(exist_ok=True)
+    keys = list(manifest['shards'])
+    pending = [key for key in keys if not (work_dir / 'out' / f"{key}.ndjson").exists()]
+    if manifest.get('invalid_records'):
+        print(f"Aviso: {manifest['invalid_records']} registro(s) inválido(s) ignorado(s) na partição", file=sys.stderr)
+    print(f"{len(keys)} shard(s), {sum(manifest['shards'].values())} registro(s); "
+          f"{len(keys) - len(pending)} já concluído(s)", file=sys.stderr)
+
+    stats: Dict[str, Any] = {'shards': len(keys), 'records': 0, 'errors': 0, 'fallbacks': 0,
+                             'failed_shards': [], 'incomplete_shards': [], 'written': None}
+    if pending:
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {pool.submit(process_shard, str(work_dir), key, prepare_only, accept_fallback,
+                                   accept_errors): key
+                       for key in pending}
+            for finished, future in enumerate(as_completed(futures), 1):
+                key = futures[future]
+                try:
+                    _, processed, errors, fallbacks = future.result()
+                except Exception as e:
+                    stats['failed_shards'].append(key)
+                    print(f"[{finished}/{len(pending)}] {key}: falhou ({e})", file=sys.stderr)
+                    continue
+                stats['records'] += processed
+                stats['errors'] += errors
+                stats['fallbacks'] += fallbacks
+                if not (work_dir / 'out' / f"{key}.ndjson").exists():
+                    stats['incomplete_shards'].append(key)
+                print(f"[{finished}/{len(pending)}] {key}: {processed} registro(s), {errors} com erro"
+                      + (' (a refazer)' if errors and not accept_errors else '')
+                      + (f", {fallbacks} de template (a refazer)" if fallbacks else ''), file=sys.stderr)
+
+    if not stats['failed_shards'] and not stats['incomplete_shards']:
+        stats['written'] = merge(work_dir, keys, output_file)
+    return stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Backfill em paralelo (shards por símbolo e período)')
+    parser.add_argument('input', help="Exportação (lista JSON, NDJSON ou objeto)")
+    parser.add_argument('-o', '--output', default='backfill_output.ndjson', help="Saída NDJSON ('-' para stdout)")
+    parser.add_argument('--workers', type=int, default=BACKFILL_WORKERS, help='Processos do pool')
+    parser.add_argument('--period', choices=sorted(PERIOD_LENGTHS), default='month', help='Período de cada shard')
+    parser.add_argument('--prepare-only', action='store_true', help='Só prepara as entradas, sem gerar artigos')
+    parser.add_argument('--work-dir', help='Diretório de checkpoints (padrão: <saída>.work)')
+    parser.add_argument('--restart', action='store_true', help='Descarta checkpoints anteriores')
+    parser.add_argument('--keep-work', action='store_true', help='Mantém o diretório de trabalho ao concluir')
+    parser.add_argument('--accept-fallback', action='store_true',
+                        help='Aceita artigos de template (Gemini indisponível) em vez de refazê-los na próxima execução')
+    parser.add_argument('--accept-errors', action='store_true',
+                        help='Aceita registros com erro em vez de refazê-los na próxima execução')
+    args = parser.parse_args()
+
+    if args.input == '-':
+        print("❌ O backfill precisa de um arquivo de entrada (a retomada relê a origem)", file=sys.stderr)
+        return 1
+    work_dir = Path(args.work_dir or f"{'backfill_output.ndjson' if args.output == '-' else args.output}.work")
+    if args.restart and work_dir.exists():
+        shutil.rmtree(work_dir)
+
+    started_at = time.monotonic()
+    try:
+        stats = run_backfill(args.input, args.output, work_dir, args.workers, args.period, args.prepare_only,
+                             args.accept_fallback, args.accept_errors)
+    except (OSError, ValueError, InputFormatError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    elapsed = time.monotonic() - started_at
+    if stats['failed_shards']:
+        print(f"❌ {len(stats['failed_shards'])} shard(s) falharam; rode o mesmo comando para retomar "
+              f"(checkpoints em {work_dir})", file=sys.stderr)
+        return 1
+    if stats['incomplete_shards']:
+        pending = []
+        if stats['fallbacks']:
+            pending.append(f"{stats['fallbacks']} artigo(s) de template (Gemini indisponível)")
+        if stats['errors'] and not args.accept_errors:
+            pending.append(f"{stats['errors']} registro(s) com erro")
+        print(f"❌ {' e '.join(pending)} em {len(stats['incomplete_shards'])} shard(s); rode o mesmo comando "
+              f"para processá-los de novo ou use --accept-fallback/--accept-errors (checkpoints em {work_dir})",
+              file=sys.stderr)
+        return 1
+    if not args.keep_work:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print(f"✅ {stats['written']} registro(s) em {args.output} ({stats['records']} processado(s) agora, "
+          f"{stats['errors']} com erro, {elapsed:.1f}s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
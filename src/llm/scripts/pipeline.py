@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pipeline Júlia → Pedro → Key para várias empresas
+Executa o fluxo do OrchestrationController como um grafo (DAG) de etapas por
+empresa, em vez de uma empresa por vez e uma etapa por vez:
+
+    julia (cotação, Yahoo) ─────┬────────────────────────────────┐
+                                ├──> pedro (sentimento, Gemini) ─┴──> key (matéria, Gemini)
+    news  (notícias, News API) ─┘
+
+A busca de notícias do Pedro começa junto com a cotação da Júlia; a análise de
+sentimento começa quando as duas terminam e a matéria logo em seguida. Cada
+serviço externo tem seu próprio limite de concorrência, e uma etapa só ocupa
+uma thread quando o seu serviço tem vaga (entre as prontas, a empresa mais
+antiga vai primeiro). Assim o tempo total tende ao da etapa mais lenta
+(empresas × duração / limite do serviço), não à soma das etapas × empresas.
+
+Entre as etapas os resultados trafegam como os modelos de utils/data_models.py
+(FinancialSnapshot, SentimentResult, ArticleDraft), com __slots__: as empresas
+em andamento na janela ocupam menos memória que os dicionários equivalentes.
+
+Os resultados saem em NDJSON, uma linha por empresa, assim que a empresa
+termina (ordem de conclusão), com 'financial', 'sentiment', 'article' e
+'timings'; falhas saem com 'error' e 'stage', como as validações do
+orquestrador (sem dados da Júlia não há Pedro nem Key).
+
+Uso: python pipeline.py [empresa ...] [--input arquivo|-] [-o saida.ndjson]
+                        [--limit servico=N ...] [--news-limit N]
+
+--input lê uma empresa por linha (ou uma lista JSON de nomes).
+
+Configuração:
+    LLM_PIPELINE_<SERVIÇO>_CONCURRENCY: limite por serviço (padrão: yahoo 4,
+        news 4, gemini 2)
+    LLM_PIPELINE_WINDOW: empresas em andamento ao mesmo tempo (padrão: 4x a
+        soma dos limites); limita a memória com listas grandes
+"""
+
+import argparse
+import functools
+import heapq
+import itertools
+import json
+import os
+import queue
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+_LLM_ROOT = str(Path(__file__).resolve().parent.parent)
+if _LLM_ROOT not in sys.path:
+    sys.path.insert(0, _LLM_ROOT)
+
+from utils import metrics
+from utils.data_models import ArticleDraft, FinancialSnapshot, SentimentResult
+
+DEFAULT_LIMITS = {'yahoo': 4, 'news': 4, 'gemini': 2}
+
+StageFunc = Callable[[Any, Dict[str, Any]], Any]
+
+
+def service_limits(overrides: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Limites de concorrência por serviço (padrão, ambiente e overrides)."""
+    limits = {}
+    for service, default in DEFAULT_LIMITS.items():
+        value = os.getenv(f"LLM_PIPELINE_{service.upper()}_CONCURRENCY")
+        limits[service] = int(value) if value else default
+    limits.update(overrides or {})
+    return {service: max(1, limit) for service, limit in limits.items()}
+
+
+class StageError(Exception):
+    """Resultado inválido de uma etapa (interrompe o fluxo daquela empresa)."""
+
+
+class Stage:
+    """Etapa do grafo: func(item, resultados das dependências) no serviço indicado."""
+
+    __slots__ = ('name', 'service', 'func', 'deps')
+
+    def __init__(self, name: str, service: str, func: StageFunc, deps: Sequence[str] = ()):
+        self.name = name
+        self.service = service
+        self.func = func
+        self.deps = tuple(deps)
+
+
+class _Flow:
+    """Estado de um item no grafo."""
+
+    __slots__ = ('index', 'item', 'results', 'timings', 'waiting', 'running', 'error', 'done')
+
+    def __init__(self, index: int, item: Any, stages: Sequence[Stage]):
+        self.index = index
+        self.item = item
+        self.results: Dict[str, Any] = {}
+        self.timings: Dict[str, float] = {}
+        # Etapa -> dependências ainda não concluídas
+        self.waiting = {stage.name: set(stage.deps) for stage in stages}
+        self.running = 0
+        self.error: Optional[Tuple[str, str]] = None
+        self.done = False
+
+
+def run_dag(items: Iterable[Any], stages: Sequence[Stage], limits: Dict[str, int],
+            window: Optional[int] = None) -> Iterator[_Flow]:
+    """
+    Executa o grafo de etapas para cada item, respeitando o limite de cada serviço.
+
+    Args:
+        items: Itens de entrada (lidos aos poucos, até 'window' em andamento)
+        stages: Etapas em ordem topológica (dependências antes)
+        limits: Chamadas simultâneas por serviço
+        window: Itens em andamento ao mesmo tempo (padrão: LLM_PIPELINE_WINDOW
+            ou 4x a soma dos limites)
+
+    Yields:
+        O estado de cada item (results, timings, error) assim que ele termina,
+        na ordem de conclusão
+
+    Raises:
+        ValueError: Se uma etapa depender de outra desconhecida ou posterior, ou
+            usar um serviço sem limite
+    """
+    by_name: Dict[str, Stage] = {}
+    dependents: Dict[str, List[Stage]] = {stage.name: [] for stage in stages}
+    for stage in stages:
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"Etapa '{stage.name}' depende de '{dep}', que não vem antes dela")
+            dependents[dep].append(stage)
+        if stage.service not in limits:
+            raise ValueError(f"Serviço sem limite de concorrência: {stage.service}")
+        by_name[stage.name] = stage
+    roots = [stage for stage in stages if not stage.deps]
+    order = {stage.name: position for position, stage in enumerate(stages)}
+
+    if window is None:
+        window = int(os.getenv('LLM_PIPELINE_WINDOW', '0') or 0) or 4 * sum(limits.values())
+    window = max(1, window)
+
+    # Fila de prontas por serviço: a empresa mais antiga primeiro, para que os
+    # resultados saiam cedo em vez de todas as empresas avançarem juntas
+    ready: Dict[str, List[Tuple[int, int, _Flow]]] = {service: [] for service in limits}
+    running = {service: 0 for service in limits}
+    completed: 'queue.Queue[Tuple[_Flow, Stage, float, Future]]' = queue.Queue()
+    source = iter(items)
+    exhausted = False
+    active = 0
+    next_index = 0
+
+    def push(flow: _Flow, stage: Stage) -> None:
+        heapq.heappush(ready[stage.service], (flow.index, order[stage.name], flow))
+
+    def timed(stage: Stage, flow: _Flow) -> Any:
+        inputs = {dep: flow.results[dep] for dep in stage.deps}
+        with metrics.stage(f"pipeline_{stage.name}"):
+            return stage.func(flow.item, inputs)
+
+    with ThreadPoolExecutor(max_workers=sum(limits.values()), thread_name_prefix='pipeline') as pool:
+        while True:
+            while not exhausted and active < window:
+                try:
+                    item = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                flow = _Flow(next_index, item, stages)
+                next_index += 1
+                active += 1
+                for stage in roots:
+                    push(flow, stage)
+
+            for service, heap in ready.items():
+                while heap and running[service] < limits[service]:
+                    _, position, flow = heapq.heappop(heap)
+                    if flow.error is not None:
+                        # O item já falhou em outra etapa: descarta as que estavam na fila
+                        continue
+                    stage = stages[position]
+                    running[service] += 1
+                    flow.running += 1
+                    started_at = time.monotonic()
+                    future = pool.submit(timed, stage, flow)
+                    future.add_done_callback(
+                        lambda done, flow=flow, stage=stage, started_at=started_at:
+                            completed.put((flow, stage, started_at, done)))
+
+            if active == 0 and exhausted:
+                return
+
+            flow, stage, started_at, future = completed.get()
+            running[stage.service] -= 1
+            flow.running -= 1
+            flow.timings[stage.name] = round(time.monotonic() - started_at, 3)
+            flow.waiting.pop(stage.name, None)
+            try:
+                flow.results[stage.name] = future.result()
+            except Exception as e:
+                if flow.error is None:
+                    flow.error = (stage.name, str(e) or type(e).__name__)
+                # As etapas ainda não iniciadas deste item não rodam mais
+                flow.waiting.clear()
+            else:
+                if flow.error is None:
+                    for dependent in dependents[stage.name]:
+                        deps = flow.waiting[dependent.name]
+                        deps.discard(stage.name)
+                        if not deps:
+                            push(flow, dependent)
+
+            if not flow.waiting and flow.running == 0 and not flow.done:
+                flow.done = True
+                active -= 1
+                yield flow
+
+
+# --- Etapas do fluxo dos agentes ---------------------------------------------
+
+def _julia(company_name: str, _: Dict[str, Any]) -> FinancialSnapshot:
+    from models.AgentJulia import get_stock_data_with_retry
+
+    data = get_stock_data_with_retry(company_name)
+    if not data:
+        raise StageError(f'Não foi possível obter dados para "{company_name}"')
+    if not data.get('symbol'):
+        raise StageError('Dados financeiros inválidos: symbol não encontrado')
+    return FinancialSnapshot.from_dict(data)
+
+
+def _news(company_name: str, _: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+    from models.AgentPedro import search_news
+
+    return search_news(company_name, limit)
+
+
+def _pedro(company_name: str, results: Dict[str, Any]) -> SentimentResult:
+    from models.AgentPedro import analyze_articles
+
+    financial: FinancialSnapshot = results['julia']
+    sentiment = analyze_articles(results['news'], company_name, financial.symbol, financial.to_dict())
+    if not sentiment or not sentiment.get('sentiment') or 'sentiment_score' not in sentiment:
+        raise StageError('Dados de sentimento incompletos. Sentimento ou score não encontrados')
+    return SentimentResult.from_dict(sentiment)
+
+
+def _key(company_name: str, results: Dict[str, Any]) -> ArticleDraft:
+    from scripts.run_llm import generate
+
+    financial: FinancialSnapshot = results['julia']
+    article = generate({
+        'company_name': company_name,
+        'financial': {**financial.to_dict(), 'action_symbol': financial.symbol},
+        'sentiment': results['pedro'].to_dict(),
+        'mode': 'default',
+    })
+    if article.get('error') or not article.get('title') or not article.get('content'):
+        raise StageError(article.get('error') or 'Artigo gerado sem título ou conteúdo')
+    return ArticleDraft.from_dict(article)
+
+
+def agent_stages(news_limit: int = 20) -> List[Stage]:
+    """Grafo do fluxo Júlia → Pedro → Key (notícias em paralelo com a cotação)."""
+    return [
+        Stage('julia', 'yahoo', _julia),
+        Stage('news', 'news', functools.partial(_news, limit=news_limit)),
+        Stage('pedro', 'gemini', _pedro, deps=('julia', 'news')),
+        Stage('key', 'gemini', _key, deps=('julia', 'pedro')),
+    ]
+
+
+def run_pipeline(companies: Iterable[str], output: TextIO, limits: Optional[Dict[str, int]] = None,
+                 news_limit: int = 20) -> Dict[str, int]:
+    """
+    Executa o fluxo para cada empresa, escrevendo um resultado NDJSON por empresa.
+
+    Args:
+        companies: Nomes das empresas
+        output: Saída NDJSON (uma linha por empresa, na ordem de conclusão)
+        limits: Limites por serviço (padrão: service_limits())
+        news_limit: Número máximo de notícias por empresa
+
+    Returns:
+        Dicionário com 'total' e 'errors'
+    """
+    stats = {'total': 0, 'errors': 0}
+    for flow in run_dag(companies, agent_stages(news_limit), limits or service_limits()):
+        results = flow.results
+        record: Dict[str, Any] = {'company_name': flow.item}
+        if flow.error:
+            stats['errors'] += 1
+            record['stage'], record['error'] = flow.error
+        else:
+            record.update({
+                'symbol': results['julia'].symbol,
+                'financial': results['julia'].to_dict(),
+                'sentiment': results['pedro'].to_dict(),
+                'article': results['key'].to_dict(),
+            })
+        record['timings'] = flow.timings
+        stats['total'] += 1
+        output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        output.flush()
+    return stats
+
+
+def _read_companies(source: str) -> Iterator[str]:
+    stream = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8')
+    with stream:
+        first = stream.readline()
+        if first.lstrip().startswith('['):
+            names = [str(name) for name in json.loads(first + stream.read())]
+        else:
+            names = itertools.chain([first], stream)
+        for name in names:
+            if name.strip():
+                yield name.strip()
+
+
+def _parse_limit(value: str) -> Tuple[str, int]:
+    service, _, limit = value.partition('=')
+    if service not in DEFAULT_LIMITS or not limit.isdigit() or int(limit) < 1:
+        raise argparse.ArgumentTypeError(
+            f"use SERVIÇO=N com SERVIÇO em {', '.join(DEFAULT_LIMITS)} e N >= 1: {value}")
+    return service, int(limit)
+
+
+def main() -> int:
+    """Função principal do script."""
+    parser = argparse.ArgumentParser(description='Fluxo Júlia → Pedro → Key para várias empresas (NDJSON)')
+    parser.add_argument('companies', nargs='*', help='Nomes das empresas')
+    parser.add_argument('--input', help="Arquivo com uma empresa por linha ou lista JSON ('-' para stdin)")
+    parser.add_argument('-o', '--output', help='Arquivo NDJSON de saída (padrão: stdout)')
+    parser.add_argument('--limit', type=_parse_limit, action='append', default=[],
+                        help='Chamadas simultâneas a um serviço (ex: gemini=4); pode repetir')
+    parser.add_argument('--news-limit', type=int, default=20, help='Notícias por empresa (padrão: 20)')
+    args = parser.parse_args()
+
+    if not args.companies and not args.input:
+        parser.error('informe as empresas ou --input')
+
+    def companies() -> Iterator[str]:
+        yield from args.companies
+        if args.input:
+            yield from _read_companies(args.input)
+
+    limits = service_limits(dict(args.limit))
+    started_at = time.monotonic()
+    try:
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as output:
+                stats = run_pipeline(companies(), output, limits, args.news_limit)
+        else:
+            stats = run_pipeline(companies(), sys.stdout, limits, args.news_limit)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Pipeline concluído: {stats['total']} empresa(s), {stats['errors']} com erro "
+          f"em {time.monotonic() - started_at:.1f}s "
+          f"(limites: {', '.join(f'{s}={n}' for s, n in limits.items())})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
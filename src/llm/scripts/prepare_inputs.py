@@ -6,93 +6,283 @@ Script para preparar dados de entrada para o LLM
 Formata dados financeiros e de sentimento para processamento pelo modelo.
 
 Uso: python prepare_inputs.py [input_file] [output_file]
+
+A entrada pode ser uma lista JSON, NDJSON (um registro por linha) ou um único
+objeto JSON; '-' lê da entrada padrão. A leitura é incremental, com memória
+limitada pelo tamanho de um registro (não do arquivo), para preparar
+exportações históricas de vários GB para backfills.
+
+A saída é NDJSON: um registro formatado (format_input_data) por linha, com o
+'request_id' da entrada quando houver; '-' escreve na saída padrão. O arquivo
+de saída só aparece completo (gravado ao lado e renomeado no final).
+
+Registros inválidos no NDJSON são reportados no stderr e pulados; JSON
+malformado numa lista ou objeto interrompe o processamento.
+
+Configuração:
+    INPUT_FILE / OUTPUT_FILE: arquivos padrão (input.json / prepared_output.ndjson)
+    LLM_PREPARE_CHUNK_BYTES: tamanho de cada leitura (padrão: 1 MiB)
+    LLM_PREPARE_MAX_RECORD_BYTES: tamanho máximo de um registro (padrão: 64 MiB)
 """
 
+import contextlib
 import json
 import os
+import re
 import sys
+import time
 from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, TextIO, Union
+
+_LLM_ROOT = str(Path(__file__).resolve().parent.parent)
+if _LLM_ROOT not in sys.path:
+    sys.path.insert(0, _LLM_ROOT)
+
+from utils.llm_utils import format_input_data
+
+CHUNK_BYTES = int(os.getenv('LLM_PREPARE_CHUNK_BYTES', str(1024 * 1024)))
+MAX_RECORD_BYTES = int(os.getenv('LLM_PREPARE_MAX_RECORD_BYTES', str(64 * 1024 * 1024)))
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+
+
+class InputFormatError(ValueError):
+    """Entrada malformada que impede continuar a leitura."""
+
+
+class InvalidLine:
+    """Linha NDJSON que não pôde ser decodificada (a leitura continua)."""
+
+    __slots__ = ('line', 'error')
 
-# Adiciona o diretório utils ao path
-sys.path.insert(0, str(Path(__file__).parent.parent / 'utils'))
+    def __init__(self, line: int, error: str):
+        self.line = line
+        self.error = error
 
-from llm.utils.llm_utils import format_input_data
 
-def load_input_data(file_path):
+def _read_values(stream: TextIO, buffer: str, in_array: bool) -> Iterator[Any]:
     """
-    Carrega dados de entrada de um arquivo JSON.
-    
-    Args:
-        file_path: Caminho para o arquivo JSON
-        
-    Returns:
-        Dicionário com dados carregados
+    Decodifica valores JSON em sequência (elementos de uma lista ou objetos
+    concatenados), lendo a entrada aos poucos.
+
+    Na lista, exige exatamente uma vírgula entre os elementos, nenhuma vírgula
+    antes de ']' e nada além de espaços depois dele.
+
+    Um registro incompleto no fim do buffer provoca uma nova leitura; leituras
+    crescem junto com o registro para não decodificá-lo do início a cada bloco.
+    """
+    pos = 0
+    eof = False
+    # Estado da lista: 'first' (após '['), 'value' (após ','), 'separator' (após um elemento), 'end' (após ']')
+    state = 'first'
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos < len(buffer) and in_array:
+            char = buffer[pos]
+            if state == 'end':
+                raise InputFormatError(f"Conteúdo após o fim da lista JSON: {buffer[pos:pos + 20]!r}")
+            if state == 'separator':
+                if char not in ',]':
+                    raise InputFormatError(f"Esperado ',' ou ']' entre os elementos da lista JSON, encontrado {char!r}")
+                state = 'value' if char == ',' else 'end'
+                pos += 1
+                continue
+            if char == ']':
+                if state == 'value':
+                    raise InputFormatError("Vírgula sobrando antes de ']' na lista JSON")
+                state = 'end'
+                pos += 1
+                continue
+            if char == ',':
+                raise InputFormatError("Elemento vazio na lista JSON (vírgula sem valor)")
+        if pos < len(buffer):
+            try:
+                value, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise InputFormatError(f"JSON inválido: {e}")
+                if len(buffer) - pos > MAX_RECORD_BYTES:
+                    raise InputFormatError(f"Registro maior que {MAX_RECORD_BYTES} bytes ou JSON inválido: {e}")
+            else:
+                # Números no fim do buffer podem continuar no próximo bloco
+                if end < len(buffer) or eof or isinstance(value, (dict, list)):
+                    yield value
+                    state = 'separator'
+                    pos = end
+                    if pos >= CHUNK_BYTES:
+                        buffer, pos = buffer[pos:], 0
+                    continue
+        elif eof:
+            if in_array and state != 'end':
+                raise InputFormatError("Lista JSON não terminada (falta ']')")
+            return
+        chunk = stream.read(max(CHUNK_BYTES, len(buffer) - pos))
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+
+def _read_lines(stream: TextIO, buffer: str) -> Iterator[str]:
+    """Linhas do buffer já lido seguidas das linhas restantes da entrada."""
+    pos = 0
+    while True:
+        newline = buffer.find('\n', pos)
+        if newline < 0:
+            break
+        yield buffer[pos:newline + 1]
+        pos = newline + 1
+    rest = buffer[pos:] + stream.readline() if pos < len(buffer) else ''
+    if rest:
+        yield rest
+    yield from stream
+
+
+def iter_records(stream: TextIO) -> Iterator[Union[Any, InvalidLine]]:
+    """
+    Registros da entrada, detectando o formato (lista JSON, NDJSON ou objeto).
+
+    Yields:
+        Os valores decodificados (dicionários com os dados brutos) ou
+        InvalidLine para linhas NDJSON inválidas
+
+    Raises:
+        InputFormatError: Se a lista ou o objeto JSON estiver malformado
     """
+    buffer = ''
+    while True:
+        chunk = stream.read(CHUNK_BYTES)
+        buffer += chunk
+        start = _WHITESPACE.match(buffer).end()
+        if start < len(buffer) or not chunk:
+            break
+    if start >= len(buffer):
+        return
+
+    if buffer[start] == '[':
+        yield from _read_values(stream, buffer[start + 1:], in_array=True)
+        return
+
+    # NDJSON se a primeira linha já for um JSON completo; senão objeto indentado/concatenado
+    while '\n' not in buffer[start:] and chunk and len(buffer) - start <= MAX_RECORD_BYTES:
+        chunk = stream.read(CHUNK_BYTES)
+        buffer += chunk
+    newline = buffer.find('\n', start)
+    first_line = buffer[start:newline if newline >= 0 else len(buffer)]
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-        return data
-    except FileNotFoundError:
-        print(f"Erro: Arquivo {file_path} não encontrado.", file=sys.stderr)
-        sys.exit(1)
-    except json.JSONDecodeError as e:
-        print(f"Erro: JSON inválido em {file_path}: {str(e)}", file=sys.stderr)
-        sys.exit(1)
+        json.loads(first_line)
+    except json.JSONDecodeError:
+        yield from _read_values(stream, buffer[start:], in_array=False)
+        return
+
+    for line_number, line in enumerate(_read_lines(stream, buffer[start:]), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield InvalidLine(line_number, f"JSON inválido: {e}")
+
 
 def prepare_data(data):
     """
     Prepara dados para processamento pelo LLM.
-    
+
     Args:
         data: Dicionário com dados brutos (financeiros e sentimento)
-        
+
     Returns:
-        Dicionário com dados formatados
+        Dicionário com dados formatados (e o 'request_id' da entrada, se houver)
     """
     # Usa função de utilitário para formatar dados
     prepared_data = format_input_data(data)
+    if 'request_id' in data:
+        prepared_data = {'request_id': data['request_id'], **prepared_data}
     return prepared_data
 
-def save_prepared_data(prepared_data, output_path):
+def prepare_stream(source: TextIO, output: TextIO) -> Dict[str, int]:
     """
-    Salva dados preparados em arquivo JSON.
-    
+    Prepara todos os registros da entrada, escrevendo NDJSON na saída.
+
     Args:
-        prepared_data: Dicionário com dados formatados
-        output_path: Caminho para o arquivo de saída
+        source: Entrada (lista JSON, NDJSON ou objeto)
+        output: Saída NDJSON
+
+    Returns:
+        Dicionário com 'total', 'written' e 'errors'
+
+    Raises:
+        InputFormatError: Se a entrada estiver malformada (os registros já
+            lidos continuam escritos)
     """
-    try:
-        with open(output_path, 'w', encoding='utf-8') as file:
-            json.dump(prepared_data, file, indent=4, ensure_ascii=False)
-        print(f" Dados preparados salvos em: {output_path}")
-    except Exception as e:
-        print(f"Erro ao salvar dados: {str(e)}", file=sys.stderr)
-        sys.exit(1)
+    stats = {'total': 0, 'written': 0, 'errors': 0}
+    write = output.write
+    for index, record in enumerate(iter_records(source), 1):
+        stats['total'] += 1
+        if isinstance(record, InvalidLine):
+            error = f"linha {record.line}: {record.error}"
+        elif not isinstance(record, dict):
+            error = 'O registro deve ser um objeto JSON'
+        else:
+            try:
+                write(json.dumps(prepare_data(record), ensure_ascii=False))
+                write('\n')
+                stats['written'] += 1
+                continue
+            except Exception as e:
+                error = str(e)
+        stats['errors'] += 1
+        print(f"Aviso: registro {index} ignorado ({error})", file=sys.stderr)
+    return stats
 
 def main(input_file=None, output_file=None):
     """
     Função principal do script.
-    
+
     Args:
-        input_file: Caminho para arquivo de entrada (opcional)
-        output_file: Caminho para arquivo de saída (opcional)
+        input_file: Caminho para arquivo de entrada (opcional; '-' para stdin)
+        output_file: Caminho para arquivo de saída (opcional; '-' para stdout)
     """
     # Define arquivos padrão se não fornecidos
     if not input_file:
         input_file = os.getenv('INPUT_FILE', 'input.json')
     if not output_file:
-        output_file = os.getenv('OUTPUT_FILE', 'prepared_output.json')
-    
-    print(f" Carregando dados de: {input_file}")
-    data = load_input_data(input_file)
-    
-    print(" Preparando dados...")
-    prepared_data = prepare_data(data)
-    
-    print(f" Salvando dados preparados em: {output_file}")
-    save_prepared_data(prepared_data, output_file)
+        output_file = os.getenv('OUTPUT_FILE', 'prepared_output.ndjson')
+
+    print(f" Preparando dados de: {input_file}", file=sys.stderr)
+    started_at = time.monotonic()
+    temp_file: Optional[str] = None
+    try:
+        # A entrada padrão não é nossa: não é fechada ao terminar
+        source = contextlib.nullcontext(sys.stdin) if input_file == '-' else open(input_file, 'r', encoding='utf-8')
+    except OSError as e:
+        print(f"Erro: não foi possível abrir {input_file}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        with source as stream:
+            if output_file == '-':
+                stats = prepare_stream(stream, sys.stdout)
+            else:
+                temp_file = f"{output_file}.partial"
+                with open(temp_file, 'w', encoding='utf-8') as output:
+                    stats = prepare_stream(stream, output)
+                os.replace(temp_file, output_file)
+                temp_file = None
+    except InputFormatError as e:
+        print(f"Erro: {e} em {input_file}", file=sys.stderr)
+        sys.exit(1)
+    except OSError as e:
+        print(f"Erro ao salvar dados: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if temp_file and os.path.exists(temp_file):
+            os.unlink(temp_file)
+
+    print(f" {stats['written']} de {stats['total']} registro(s) preparado(s) em {output_file} "
+          f"({stats['errors']} com erro, {time.monotonic() - started_at:.1f}s)", file=sys.stderr)
 
 if __name__ == "__main__":
     input_file = sys.argv[1] if len(sys.argv) > 1 else None
     output_file = sys.argv[2] if len(sys.argv) > 2 else None
-    main(input_file, output_file)
\ No newline at end of file
+    main(input_file, output_file)
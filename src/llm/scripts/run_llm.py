@@ -5,13 +5,51 @@
 Script para executar LLM e gerar artigos financeiros usando Google Gemini
 Usado pelo Agente Key para gerar matérias baseadas em dados financeiros e análise de sentimento.
 
-Uso: python run_llm.py <input_data_json>
+Uso: python run_llm.py <input_data_json> [--format json|compact|msgpack] [--spill-over BYTES]
+     python run_llm.py --batch [arquivo.ndjson|-]
+
+Formato de saída:
+    --format e --spill-over negociam o formato do resultado com o chamador
+    (JSON indentado por padrão; veja utils/wire.py).
+
+Modo batch:
+    Lê uma requisição JSON por linha (arquivo ou stdin) e processa com um pool
+    de LLM_BATCH_WORKERS threads (padrão 4) no mesmo processo, compartilhando o
+    cliente Gemini. Escreve um resultado NDJSON por requisição, com o
+    'request_id' da entrada (ou 'line-N'), na ordem de conclusão.
+
+Modo com prazo (deadline):
+    Quando LLM_LATENCY_BUDGET (segundos) é maior que zero, o artigo de template é
+    renderizado enquanto o Gemini trabalha. Se o Gemini estourar o orçamento, o
+    template é retornado imediatamente com 'is_fallback': True.
+    Opcionalmente, LLM_HEDGE_MODEL define um modelo secundário disparado após
+    LLM_HEDGE_DELAY segundos; vence a primeira resposta válida (sem hedge com o
+    circuito do Gemini degradado). Chamadas abandonadas contam como falha no
+    circuit breaker e continuam ocupando uma das LLM_MAX_BACKGROUND_CALLS vagas
+    (padrão 16) até voltarem; sem vaga, o template sai na hora ('overloaded').
+
+Modo fundido:
+    Com 'mode': 'fused' na entrada (ou LLM_FUSED_MODE=true e sem 'sentiment'),
+    as notícias são buscadas e a análise de sentimento e a matéria saem de uma
+    única chamada ao Gemini. A saída mantém 'title'/'content' e inclui a análise
+    do Agente Pedro em 'sentiment'.
+
+Serviço:
+    Com LLM_SERVICE_URL definido, o script apenas encaminha a entrada para o
+    serviço em execução contínua (main.py), que mantém módulos e clientes
+    carregados; se o serviço não responder, a geração roda localmente.
 """
 
 import json
 import sys
 import os
+import threading
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
 
 # Import dotenv com tratamento de erro
 try:
@@ -29,22 +67,310 @@ sys.path.insert(0, str(Path(__file__).parent.parent / 'utils'))
 # Carrega variáveis de ambiente
 load_dotenv()
 
-try:
-    from models.GeminiService import generate_article_with_gemini
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
-    generate_article_with_gemini = None  # type: ignore
-    print("Aviso: GeminiService não disponível, usando fallback", file=sys.stderr)
+# GeminiService (e o SDK do Gemini) só é importado quando o Gemini vai de fato
+# ser chamado; o fallback de template e o modo cliente não pagam esse custo.
+GEMINI_AVAILABLE = None  # desconhecido até a primeira tentativa de importação
+generate_article_with_gemini = None
+
+def _load_gemini() -> bool:
+    """Importa o GeminiService sob demanda. Retorna True se disponível."""
+    global GEMINI_AVAILABLE, generate_article_with_gemini
+    if GEMINI_AVAILABLE is None:
+        try:
+            from models.GeminiService import generate_article_with_gemini as generate
+            generate_article_with_gemini = generate
+            GEMINI_AVAILABLE = True
+        except ImportError:
+            GEMINI_AVAILABLE = False
+            print("Aviso: GeminiService não disponível, usando fallback", file=sys.stderr)
+    return GEMINI_AVAILABLE
+
+from utils import cassette, single_flight, tracing, wire
+from utils.circuit_breaker import CallTracker, get_breaker
+from utils.service_client import ServiceUnavailable, call_service, service_url
+from utils.cpu_lane import run_cpu_bound
 
 try:
-    from utils.llm_utils import format_input_data, generate_article_content
+    from utils.llm_utils import format_input_data, generate_article_content, render_articles
 except ImportError:
     from typing import Dict, Any
     def format_input_data(raw_data: Dict[str, Any]) -> Dict[str, Any]:
         return raw_data
     def generate_article_content(formatted_data: Dict[str, Any]) -> Dict[str, str]:
         return {'title': 'Erro', 'content': 'Utilitários não disponíveis'}
+    def render_articles(records):
+        return [generate_article_content(record) for record in records]
+
+# Orçamento de latência da chamada ao Gemini (segundos). 0 desativa o modo com prazo.
+# Padrão abaixo do LLM_TIMEOUT do PHP (60s) para sempre responder antes de ser encerrado.
+LLM_LATENCY_BUDGET = float(os.getenv('LLM_LATENCY_BUDGET', '50'))
+
+# Modelo secundário para requisição "hedge" (opcional) e atraso antes de dispará-lo
+LLM_HEDGE_MODEL = os.getenv('LLM_HEDGE_MODEL', '')
+LLM_HEDGE_DELAY = float(os.getenv('LLM_HEDGE_DELAY', '15'))
+
+# Chamadas ao Gemini em segundo plano ao mesmo tempo no processo. Uma chamada
+# abandonada no prazo continua rodando até voltar; sem limite, um Gemini
+# travado acumularia threads (e cota) no serviço e no modo batch.
+LLM_MAX_BACKGROUND_CALLS = int(os.getenv('LLM_MAX_BACKGROUND_CALLS', '16'))
+_background_slots = threading.BoundedSemaphore(max(1, LLM_MAX_BACKGROUND_CALLS))
+
+def _start_background_call(tracker, func, *args, **kwargs) -> 'Optional[Future]':
+    """
+    Executa a função em uma thread daemon e retorna um Future com o resultado.
+    
+    Threads daemon não impedem o processo de encerrar quando o prazo estoura
+    (um ThreadPoolExecutor aguardaria a chamada pendente no shutdown).
+    O CallTracker permite ao chamador registrar o abandono no circuit breaker.
+    
+    Returns:
+        O Future, ou None se já houver LLM_MAX_BACKGROUND_CALLS chamadas em andamento
+    """
+    if not _background_slots.acquire(blocking=False):
+        return None
+    
+    import contextvars
+    from concurrent.futures import Future
+    
+    future: Future = Future()
+    # A thread herda o contexto (trace ativo) para que seus spans entrem na mesma cascata
+    context = contextvars.copy_context()
+    
+    def runner():
+        if not future.set_running_or_notify_cancel():
+            return
+        tracker.bind()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            _background_slots.release()
+    
+    threading.Thread(target=context.run, args=(runner,), daemon=True).start()
+    return future
+
+def _gemini_degraded() -> bool:
+    """Circuito do Gemini fora do estado fechado ou com falhas na janela recente."""
+    snapshot = get_breaker('gemini').snapshot()
+    return snapshot['state'] != 'closed' or snapshot['failures_in_window'] > 0
+
+def _fallback_article(input_data, reason: str) -> dict:
+    """
+    Gera o artigo de template (fallback) marcado como tal.
+    
+    Args:
+        input_data: Dados de entrada do run_llm
+        reason: Motivo do fallback ('unavailable', 'error', 'deadline', 'circuit_open', 'overloaded')
+        
+    Returns:
+        Dicionário com 'title', 'content' e a marcação de fallback
+    """
+    formatted_data = format_input_data(input_data)
+    result = generate_article_content(formatted_data)
+    result['is_fallback'] = True
+    result['fallback_reason'] = reason
+    return result
+
+def _fallback_articles(inputs, reason: str) -> list:
+    """
+    Versão em lote de _fallback_article: renderiza todos os templates numa passada.
+    
+    Args:
+        inputs: Lista de dados de entrada do run_llm
+        reason: Motivo do fallback
+        
+    Returns:
+        Lista de artigos marcados como fallback, na ordem da entrada
+    """
+    articles = render_articles([format_input_data(input_data) for input_data in inputs])
+    for article in articles:
+        article['is_fallback'] = True
+        article['fallback_reason'] = reason
+    return articles
+
+def _generate_with_deadline(input_data, financial_data, sentiment_data, company_name, budget: float) -> dict:
+    """
+    Dispara o Gemini em segundo plano, renderiza o template em paralelo e
+    retorna o que estiver pronto dentro do orçamento de latência.
+    
+    Args:
+        input_data: Dados de entrada do run_llm
+        financial_data: Dados financeiros
+        sentiment_data: Dados de sentimento
+        company_name: Nome da empresa
+        budget: Orçamento de latência em segundos
+        
+    Returns:
+        Artigo do Gemini ou fallback marcado com 'is_fallback'
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+    
+    started_at = time.monotonic()
+    deadline = started_at + budget
+    trackers = {}
+    
+    def start(*args):
+        tracker = CallTracker()
+        future = _start_background_call(tracker, generate_article_with_gemini, *args)
+        if future is not None:
+            trackers[future] = tracker
+        return future
+    
+    primary = start(financial_data, sentiment_data, company_name)
+    if primary is None:
+        print("Aviso: limite de chamadas ao Gemini em andamento atingido, usando fallback", file=sys.stderr)
+        return run_cpu_bound(_fallback_article, input_data, 'overloaded')
+    pending = [primary]
+    
+    # Renderiza o fallback enquanto o Gemini trabalha
+    fallback = run_cpu_bound(_fallback_article, input_data, 'deadline')
+    
+    hedge_at = started_at + LLM_HEDGE_DELAY
+    hedge_started = not LLM_HEDGE_MODEL
+    
+    while True:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+        
+        if not hedge_started and (now >= hedge_at or not pending):
+            # Primário lento (ou já falhou): dispara o modelo secundário, salvo com o
+            # Gemini degradado (falhas recentes), quando o hedge só dobraria o gasto
+            hedge_started = True
+            if not _gemini_degraded():
+                hedge = start(financial_data, sentiment_data, company_name, LLM_HEDGE_MODEL)
+                if hedge is not None:
+                    pending.append(hedge)
+        
+        if not pending:
+            fallback['fallback_reason'] = 'error'
+            return fallback
+        
+        timeout = deadline - now
+        if not hedge_started:
+            timeout = min(timeout, max(hedge_at - now, 0))
+        
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.remove(future)
+            error = future.exception()
+            if error is None:
+                return future.result()
+            print(f"Aviso: Erro ao usar Gemini, usando fallback: {error}", file=sys.stderr)
+    
+    # Prazo estourado: as chamadas pendentes contam como falha agora (nos scripts
+    # o processo termina antes delas; no serviço a conclusão tardia é ignorada)
+    for future in pending:
+        trackers[future].abandon()
+    print(f"Aviso: Gemini excedeu o orçamento de latência ({budget:.1f}s), retornando fallback", file=sys.stderr)
+    return fallback
+
+# Modo fundido (análise de sentimento + matéria em uma única chamada) quando a
+# entrada não traz a análise do Agente Pedro
+LLM_FUSED_MODE = os.getenv('LLM_FUSED_MODE', 'false').lower() in ('1', 'true', 'yes')
+
+def _wants_fused(input_data) -> bool:
+    mode = input_data.get('mode')
+    if mode is not None:
+        return mode == 'fused'
+    return LLM_FUSED_MODE and not input_data.get('sentiment')
+
+def run_fused(input_data):
+    """
+    Modo fundido: busca notícias, analisa sentimento e gera a matéria com uma
+    única chamada ao Gemini.
+    
+    Respeita o mesmo orçamento de latência do fluxo normal: a chamada fundida
+    roda em segundo plano enquanto o template é renderizado; se o orçamento
+    estourar, o template sai marcado com 'is_fallback' (sem 'sentiment', que
+    não ficou pronto). A segunda chamada (matéria, quando a fundida falha) usa
+    só o que sobrou do orçamento.
+    
+    Args:
+        input_data: Dicionário com 'company_name', 'financial' e opcionalmente
+            'symbol', 'news_limit' e 'latency_budget'
+        
+    Returns:
+        Dicionário com 'title' e 'content' (contrato do Agente Key) e 'sentiment'
+        (contrato do Agente Pedro)
+    """
+    try:
+        from models.AgentPedro import analyze_company_sentiment_and_article
+    except ImportError as e:
+        print(f"Aviso: modo fundido indisponível ({e}), usando fluxo normal", file=sys.stderr)
+        return run_llm({**input_data, 'mode': 'default'})
+    
+    try:
+        company_name = input_data.get('company_name', input_data.get('companny_name', 'N/A'))
+        financial_data = input_data.get('financial', {})
+        symbol = input_data.get('symbol') or financial_data.get('symbol') or ''
+        limit = int(input_data.get('news_limit', 20))
+        budget = float(input_data.get('latency_budget', LLM_LATENCY_BUDGET) or 0)
+    except (TypeError, ValueError, AttributeError) as e:
+        return {
+            'error': str(e),
+            'title': 'Erro ao gerar artigo',
+            'content': f'Erro ao processar dados: {str(e)}'
+        }
+    
+    started_at = time.monotonic()
+    if budget > 0:
+        result = _fused_with_deadline(input_data, company_name, limit, symbol, financial_data, budget)
+        if 'title' in result:
+            return result
+    else:
+        result = analyze_company_sentiment_and_article(company_name, limit, symbol, financial_data)
+    sentiment = result['sentiment']
+    article = result['article']
+    
+    if article is None:
+        # Chamada fundida falhou: gera a matéria com a análise obtida (segunda chamada)
+        second = {**input_data, 'sentiment': sentiment, 'mode': 'default'}
+        if budget > 0:
+            remaining = budget - (time.monotonic() - started_at)
+            if remaining <= 0:
+                article = run_cpu_bound(_fallback_article, second, 'deadline')
+            else:
+                second['latency_budget'] = remaining
+        if article is None:
+            article = run_llm(second)
+    
+    article = dict(article)
+    article['sentiment'] = sentiment
+    return article
+
+def _fused_with_deadline(input_data, company_name, limit, symbol, financial_data, budget: float) -> dict:
+    """
+    Executa a chamada fundida em segundo plano dentro do orçamento de latência.
+    
+    Returns:
+        O resultado da chamada fundida ('sentiment'/'article') ou, sem resposta
+        a tempo, o artigo de template ('title'/'content' com 'is_fallback')
+    """
+    from concurrent.futures import TimeoutError as FutureTimeoutError
+    from models.AgentPedro import analyze_company_sentiment_and_article
+    
+    started_at = time.monotonic()
+    tracker = CallTracker()
+    future = _start_background_call(tracker, analyze_company_sentiment_and_article,
+                                    company_name, limit, symbol, financial_data)
+    if future is None:
+        print("Aviso: limite de chamadas ao Gemini em andamento atingido, usando fallback", file=sys.stderr)
+        return run_cpu_bound(_fallback_article, input_data, 'overloaded')
+    
+    # Renderiza o fallback enquanto a chamada fundida trabalha
+    fallback = run_cpu_bound(_fallback_article, input_data, 'deadline')
+    try:
+        return future.result(timeout=max(0.0, budget - (time.monotonic() - started_at)))
+    except FutureTimeoutError:
+        tracker.abandon()
+        print(f"Aviso: modo fundido excedeu o orçamento de latência ({budget:.1f}s), retornando fallback",
+              file=sys.stderr)
+    except Exception as e:
+        print(f"Aviso: Erro no modo fundido, usando fallback: {e}", file=sys.stderr)
+        fallback['fallback_reason'] = 'error'
+    return fallback
 
 def run_llm(input_data):
     """
@@ -55,29 +381,47 @@ def run_llm(input_data):
         {
             'company_name': 'Petrobras',
             'financial': {...},
-            'sentiment': {...}
+            'sentiment': {...},
+            'latency_budget': 30,  # opcional, sobrescreve LLM_LATENCY_BUDGET
+            'mode': 'fused',  # opcional, ver run_fused
+            'trace_id': '...', 'trace': true, 'profile': true  # opcionais, ver utils/tracing.py
         }
         
     Returns:
-        Dicionário com 'title' e 'content'
+        Dicionário com 'title' e 'content' (e 'is_fallback'/'fallback_reason' no fallback)
     """
+    with tracing.trace('run_llm', **tracing.request_options(input_data)):
+        return _run_llm(input_data)
+
+@single_flight.shared('key')
+def _run_llm(input_data):
+    if _wants_fused(input_data):
+        return run_fused(input_data)
+    
     try:
         company_name = input_data.get('company_name', input_data.get('companny_name', 'N/A'))  # Suporta ambos para compatibilidade
         financial_data = input_data.get('financial', {})
         sentiment_data = input_data.get('sentiment', {})
         
         # Tenta usar Gemini se disponível
-        if GEMINI_AVAILABLE and generate_article_with_gemini is not None and os.getenv('GEMINI_API_KEY'):
+        if cassette.api_key('GEMINI_API_KEY') and _load_gemini():
+            # Circuito aberto: Gemini indisponível recentemente, vai direto para o fallback
+            if get_breaker('gemini').is_open():
+                print("Aviso: circuito do Gemini aberto, usando fallback", file=sys.stderr)
+                return run_cpu_bound(_fallback_article, input_data, 'circuit_open')
+            
+            budget = float(input_data.get('latency_budget', LLM_LATENCY_BUDGET) or 0)
+            if budget > 0:
+                return _generate_with_deadline(input_data, financial_data, sentiment_data, company_name, budget)
             try:
                 result = generate_article_with_gemini(financial_data, sentiment_data, company_name)
                 return result
             except Exception as e:
                 print(f"Aviso: Erro ao usar Gemini, usando fallback: {e}", file=sys.stderr)
+                return run_cpu_bound(_fallback_article, input_data, 'error')
         
         # Fallback: usa template simples
-        formatted_data = format_input_data(input_data)
-        result = generate_article_content(formatted_data)
-        return result
+        return run_cpu_bound(_fallback_article, input_data, 'unavailable')
         
     except Exception as e:
         return {
@@ -86,22 +430,198 @@ def run_llm(input_data):
             'content': f'Erro ao processar dados: {str(e)}'
         }
 
+def generate(input_data):
+    """
+    Gera o artigo pelo serviço em execução contínua (quando configurado) ou localmente.
+    
+    Raises:
+        Exception: Se o serviço responder com erro
+    """
+    try:
+        status, result = call_service('key', input_data)
+        if status != 200:
+            raise Exception(result.get('error', f'Serviço LLM respondeu com status {status}'))
+        return result
+    except ServiceUnavailable:
+        return run_llm(input_data)
+
+# Workers do modo batch (as chamadas ao Gemini são I/O; as threads compartilham o cliente)
+LLM_BATCH_WORKERS = int(os.getenv('LLM_BATCH_WORKERS', '4'))
+
+# Requisições renderizadas por lote quando o Gemini está indisponível no batch
+LLM_BATCH_RENDER_CHUNK = int(os.getenv('LLM_BATCH_RENDER_CHUNK', '256'))
+
+def _batch_outage_reason():
+    """
+    Motivo do fallback que o run_llm local daria a qualquer requisição agora
+    ('unavailable' ou 'circuit_open'), ou None se o Gemini pode ser chamado
+    (ou se o batch é atendido pelo serviço).
+    """
+    if service_url():
+        return None
+    if not (cassette.api_key('GEMINI_API_KEY') and _load_gemini()):
+        return 'unavailable'
+    if get_breaker('gemini').is_open():
+        return 'circuit_open'
+    return None
+
+def _iter_batch_requests(stream):
+    """
+    Lê requisições NDJSON (uma por linha) sem carregar a entrada inteira.
+    
+    Yields:
+        Tupla (request_id, input_data, erro); input_data é None quando a linha é inválida
+    """
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        request_id = f'line-{line_number}'
+        try:
+            input_data = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield request_id, None, f'Erro ao decodificar JSON: {str(e)}'
+            continue
+        if not isinstance(input_data, dict):
+            yield request_id, None, 'A requisição deve ser um objeto JSON'
+            continue
+        yield input_data.get('request_id', request_id), input_data, None
+
+def run_batch(stream, output, workers=None):
+    """
+    Modo batch: processa requisições NDJSON com um pool limitado de workers.
+    
+    Cada linha de saída é o resultado do run_llm com o 'request_id' da entrada
+    (ou 'line-N'), escrita na ordem em que as requisições terminam.
+    
+    Com o Gemini indisponível (sem chave/SDK ou circuito aberto), todas as
+    requisições cairiam no template: elas são agrupadas em lotes de
+    LLM_BATCH_RENDER_CHUNK e renderizadas de uma vez (render_articles), com a
+    mesma saída do caminho individual.
+    
+    Args:
+        stream: Entrada com uma requisição JSON por linha
+        output: Saída para os resultados NDJSON
+        workers: Tamanho do pool (padrão: LLM_BATCH_WORKERS)
+        
+    Returns:
+        Dicionário com 'total' e 'errors'
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    workers = max(1, workers or LLM_BATCH_WORKERS)
+    # Limita as requisições lidas e ainda não concluídas (a entrada pode ser grande)
+    slots = threading.BoundedSemaphore(workers * 2)
+    write_lock = threading.Lock()
+    stats = {'total': 0, 'errors': 0}
+    
+    def write(request_id, result):
+        line = json.dumps({'request_id': request_id, **result}, ensure_ascii=False)
+        with write_lock:
+            stats['total'] += 1
+            if 'error' in result:
+                stats['errors'] += 1
+            output.write(line + '\n')
+            output.flush()
+    
+    def process(request_id, input_data):
+        try:
+            result = generate(input_data)
+        except Exception as e:
+            result = {
+                'error': str(e),
+                'title': 'Erro ao gerar artigo',
+                'content': f'Erro inesperado: {str(e)}'
+            }
+        try:
+            write(request_id, result)
+        finally:
+            slots.release()
+    
+    pending = []
+    
+    def render_pending(reason):
+        # Um registro inválido derruba o lote: refaz um a um pelo caminho normal (mesma mensagem de erro)
+        try:
+            articles = run_cpu_bound(_fallback_articles, [input_data for _, input_data in pending], reason)
+        except Exception:
+            for request_id, input_data in pending:
+                slots.acquire()
+                pool.submit(process, request_id, input_data)
+        else:
+            for (request_id, _), article in zip(pending, articles):
+                write(request_id, article)
+        pending.clear()
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outage_reason = _batch_outage_reason()
+        for request_id, input_data, error in _iter_batch_requests(stream):
+            if error:
+                write(request_id, {
+                    'error': error,
+                    'title': 'Erro ao gerar artigo',
+                    'content': 'Dados de entrada inválidos'
+                })
+                continue
+            if outage_reason and not _wants_fused(input_data):
+                pending.append((request_id, input_data))
+                if len(pending) >= LLM_BATCH_RENDER_CHUNK:
+                    render_pending(outage_reason)
+                    # O circuito pode fechar (ou abrir) durante um batch longo
+                    outage_reason = _batch_outage_reason()
+                continue
+            slots.acquire()
+            pool.submit(process, request_id, input_data)
+        if pending:
+            render_pending(outage_reason)
+    
+    return stats
+
+def main_batch(source):
+    """
+    Executa o modo batch lendo de um arquivo NDJSON ou da entrada padrão ('-').
+    """
+    started_at = time.monotonic()
+    if source == '-':
+        stats = run_batch(sys.stdin, sys.stdout)
+    else:
+        with open(source, 'r', encoding='utf-8') as stream:
+            stats = run_batch(stream, sys.stdout)
+    print(f"Batch concluído: {stats['total']} requisição(ões), {stats['errors']} com erro "
+          f"em {time.monotonic() - started_at:.1f}s", file=sys.stderr)
+
 def main():
     """Função principal do script."""
-    if len(sys.argv) != 2:
+    if len(sys.argv) >= 2 and sys.argv[1] == '--batch':
+        try:
+            main_batch(sys.argv[2] if len(sys.argv) > 2 else '-')
+        except OSError as e:
+            print(json.dumps({'error': f'Erro ao ler entrada do batch: {str(e)}'}))
+            sys.exit(1)
+        return
+    
+    try:
+        args, output = wire.parse_args(sys.argv[1:])
+    except ValueError as e:
+        print(json.dumps({'error': str(e)}))
+        sys.exit(1)
+    
+    if len(args) != 1:
         print(json.dumps({
             'error': 'Argumentos inválidos',
-            'usage': 'python run_llm.py <input_data_json>'
+            'usage': 'python run_llm.py <input_data_json> [--format json|compact|msgpack] [--spill-over BYTES]'
+                     ' | python run_llm.py --batch [arquivo.ndjson|-]'
         }))
         sys.exit(1)
     
     try:
-        input_json = sys.argv[1]
+        input_json = args[0]
         input_data = json.loads(input_json)
         
-        result = run_llm(input_data)
+        # Cliente fino: usa o serviço em execução contínua quando configurado
+        result = generate(input_data)
         
-        print(json.dumps(result, ensure_ascii=False, indent=2))
+        wire.emit(result, output)
         
     except json.JSONDecodeError as e:
         print(json.dumps({
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Handlers dos agentes para o serviço LLM
+Cada handler recebe o payload JSON da requisição e devolve (status HTTP, corpo),
+usando os mesmos contratos de saída dos scripts de linha de comando. Nos
+sucessos o corpo é o modelo do agente (utils/data_models.py: FinancialSnapshot,
+SentimentResult, ArticleDraft), serializado com data_models.dumps no mesmo JSON
+do dicionário; os erros continuam dicionários.
+"""
+
+import importlib
+import sys
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from utils import metrics
+from utils.data_models import ArticleDraft, FinancialSnapshot, SentimentResult
+
+# (status, modelo do agente ou dicionário de erro)
+HandlerResult = Tuple[int, Any]
+
+# Dependências sem as quais o serviço não atende (os agentes não têm alternativa)
+REQUIRED_DEPENDENCIES = ('yfinance', 'pandas')
+# Dependências com fallback (artigo de template, notícias de exemplo, variáveis do ambiente)
+OPTIONAL_DEPENDENCIES = ('google.generativeai', 'requests', 'dotenv')
+
+
+def handle_julia(payload: Dict[str, Any]) -> HandlerResult:
+    """
+    Agente Júlia: coleta de dados financeiros.
+
+    Payload: {"company_name": "Petrobras"}
+    """
+    from models.AgentJulia import get_stock_data_with_retry
+
+    company_name = payload.get('company_name') or 'Petrobras'
+    data = get_stock_data_with_retry(company_name)
+    if data:
+        return 200, FinancialSnapshot.from_dict(data)
+    return 422, {
+        'error': f'Não foi possível obter dados para "{company_name}"',
+        'company_name': company_name,
+        'suggestion': 'Verifique se o nome da empresa está correto ou tente usar o ticker diretamente'
+    }
+
+
+def handle_pedro(payload: Dict[str, Any]) -> HandlerResult:
+    """
+    Agente Pedro: análise de sentimento.
+
+    Payload: {"company_name": "Petrobras", "limit": 20, "symbol": "PETR4", "financial_data": {...}}
+    """
+    from models.AgentPedro import analyze_company_sentiment
+
+    company_name = payload.get('company_name') or 'Petrobras'
+    limit = int(payload.get('limit', 20))
+    symbol = payload.get('symbol') or company_name
+    financial_data = payload.get('financial_data') or {}
+    return 200, SentimentResult.from_dict(analyze_company_sentiment(company_name, limit, symbol, financial_data))
+
+
+def handle_key(payload: Dict[str, Any]) -> HandlerResult:
+    """
+    Agente Key: geração de matéria (mesma entrada do run_llm.py).
+    """
+    from scripts.run_llm import run_llm
+
+    # Como no script, erros de geração vêm no corpo ('error') e não no status
+    result = run_llm(payload)
+    if result.get('is_fallback'):
+        metrics.inc('llm_fallback_total', component='article', reason=result.get('fallback_reason', 'unknown'))
+    return 200, ArticleDraft.from_dict(result)
+
+
+AGENT_HANDLERS: Dict[str, Callable[[Dict[str, Any]], HandlerResult]] = {
+    'julia': handle_julia,
+    'pedro': handle_pedro,
+    'key': handle_key,
+}
+
+
+def check_dependencies() -> Dict[str, Optional[str]]:
+    """
+    Importa de fato as dependências dos agentes (não basta estarem instaladas:
+    uma extensão nativa quebrada só falha no import).
+
+    Returns:
+        Dicionário dependência -> None se importável, ou a mensagem de erro
+    """
+    result: Dict[str, Optional[str]] = {}
+    for name in REQUIRED_DEPENDENCIES + OPTIONAL_DEPENDENCIES:
+        try:
+            importlib.import_module(name)
+            result[name] = None
+        except Exception as e:
+            result[name] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def warm_up() -> Dict[str, bool]:
+    """
+    Importa os módulos pesados (SDK do Gemini, yfinance, pandas) e inicializa
+    o cliente Gemini uma única vez, para que as requisições já os encontrem prontos.
+
+    Returns:
+        Dicionário módulo -> carregado com sucesso
+    """
+    # Os agentes importam as dependências sob demanda: carrega-as agora, antes do fork do pool
+    check_dependencies()
+    status = {}
+    for name in ('models.GeminiService', 'models.AgentPedro', 'models.AgentJulia', 'scripts.run_llm'):
+        try:
+            __import__(name)
+            status[name] = True
+        except Exception as e:
+            print(f"⚠️  Não foi possível pré-carregar {name}: {e}", file=sys.stderr)
+            status[name] = False
+
+    try:
+        from models.GeminiService import initialize_gemini
+        initialize_gemini()
+    except Exception:
+        pass
+    return status
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Consumidor da fila de jobs do serviço LLM
+Threads que reservam jobs da fila SQLite (utils/job_queue.py), executam o
+handler do agente e gravam o resultado, a nova tentativa ou o dead-letter.
+
+Configuração:
+    LLM_QUEUE_WORKERS: threads consumidoras (padrão: 2; 0 desativa o consumidor)
+    LLM_QUEUE_POLL_INTERVAL: intervalo de verificação com a fila vazia em segundos (padrão: 1)
+    LLM_QUEUE_RETENTION: retenção dos jobs terminados (ver utils/job_queue.py); os
+        consumidores apagam os antigos a cada PURGE_INTERVAL segundos
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils import metrics, tracing
+from utils.job_queue import STATUS_DEAD, JobQueue
+from utils.memory_guard import MemoryGuard
+
+try:
+    from .handlers import AGENT_HANDLERS
+except ImportError:
+    from handlers import AGENT_HANDLERS  # type: ignore
+
+Handler = Callable[[Dict[str, Any]], Tuple[int, Dict[str, Any]]]
+
+# Jobs despachados pelos endpoints HTTP (server.py com o pool): o resultado guarda o
+# status do handler, que o servidor devolve ao cliente como numa execução local
+REPLY_KEY = '_http_reply'
+
+# Intervalo (segundos) entre as limpezas dos jobs terminados além da retenção
+PURGE_INTERVAL = 300.0
+
+
+def run_job(job: Dict[str, Any], handlers: Dict[str, Handler]) -> Tuple[bool, Dict[str, Any]]:
+    """
+    Executa um job com o handler do agente.
+
+    Returns:
+        Tupla (sucesso, resultado ou erro). Jobs com REPLY_KEY no payload têm
+        sucesso com qualquer status do handler e o resultado {'status', 'body'}.
+    """
+    handler = handlers.get(job['agent'])
+    if handler is None:
+        return False, {'error': f"Agente desconhecido: {job['agent']}"}
+    payload = job['payload']
+    reply = bool(payload.get(REPLY_KEY))
+    if reply:
+        payload = {key: value for key, value in payload.items() if key != REPLY_KEY}
+    options = tracing.request_options(payload)
+    options['trace_id'] = options.get('trace_id') or f"job-{job['id']}-{job['attempts']}"
+    try:
+        with tracing.trace(f"job {job['agent']}", **options):
+            status, body = handler(payload)
+    except Exception as e:
+        return False, {'error': str(e)}
+    if reply:
+        return True, {'status': status, 'body': body}
+    if status != 200:
+        return False, body
+    return True, body
+
+
+class QueueConsumer:
+    """Pool de threads que consome a fila de jobs."""
+
+    def __init__(self, queue: Optional[JobQueue] = None, workers: Optional[int] = None,
+                 handlers: Optional[Dict[str, Handler]] = None, poll_interval: Optional[float] = None,
+                 guard: Optional[MemoryGuard] = None, on_recycle: Optional[Callable[[str], None]] = None):
+        self.queue = queue or JobQueue()
+        self.workers = workers if workers is not None else int(os.getenv('LLM_QUEUE_WORKERS', '2'))
+        self.handlers = handlers or AGENT_HANDLERS
+        self.poll_interval = poll_interval or float(os.getenv('LLM_QUEUE_POLL_INTERVAL', '1'))
+        # Com guard, o consumidor para de reservar jobs ao passar dos limites de memória/jobs
+        self.guard = guard
+        # Chamado uma vez com o motivo quando o guard pede a reciclagem
+        self.on_recycle = on_recycle
+        self.recycle_reason: Optional[str] = None
+        self._guard_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._purge_lock = threading.Lock()
+        self._next_purge = 0.0
+
+    def start(self) -> None:
+        """Inicia as threads consumidoras."""
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f'queue-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Sinaliza a parada e aguarda as threads terminarem o job atual."""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def notify(self) -> None:
+        """Acorda os consumidores (novo job enfileirado)."""
+        self._wakeup.set()
+
+    def process_one(self) -> bool:
+        """
+        Reserva e executa um job.
+
+        Returns:
+            bool: True se havia um job para processar
+        """
+        job = self.queue.claim(list(self.handlers))
+        if job is None:
+            return False
+
+        started_at = time.monotonic()
+        finished = threading.Event()
+        lost = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job['id'], job['attempts'], finished, lost),
+                                     name=f"queue-heartbeat-{job['id']}", daemon=True)
+        heartbeat.start()
+        try:
+            ok, body = run_job(job, self.handlers)
+        finally:
+            finished.set()
+        elapsed = time.monotonic() - started_at
+        metrics.observe('llm_job_duration_seconds', elapsed, agent=job['agent'])
+        if lost.is_set():
+            self._discard(job, elapsed)
+        elif ok:
+            if self.queue.complete(job['id'], job['attempts'], body):
+                metrics.inc('llm_jobs_total', agent=job['agent'], result='done')
+                print(f"✅ Job #{job['id']} ({job['agent']}) concluído em {elapsed:.1f}s", file=sys.stderr)
+            else:
+                self._discard(job, elapsed)
+        else:
+            error = str(body.get('error', body))
+            status = self.queue.fail(job['id'], job['attempts'], error)
+            if status is None:
+                self._discard(job, elapsed)
+            else:
+                label = 'movido para o dead-letter' if status == STATUS_DEAD else 'reagendado'
+                metrics.inc('llm_jobs_total', agent=job['agent'],
+                            result='dead' if status == STATUS_DEAD else 'retry')
+                print(f"⚠️  Job #{job['id']} ({job['agent']}) falhou na tentativa {job['attempts']}, "
+                      f"{label}: {error}", file=sys.stderr)
+
+        if self.guard is not None:
+            with self._guard_lock:
+                reason = self.guard.job_done()
+                if reason and self.recycle_reason is None:
+                    # Não reserva novos jobs; as outras threads terminam os que já pegaram
+                    self.recycle_reason = reason
+                    self._stop.set()
+                    self._wakeup.set()
+                    if self.on_recycle is not None:
+                        self.on_recycle(reason)
+        return True
+
+    def purge_if_due(self) -> int:
+        """
+        Apaga os jobs terminados além da retenção, no máximo uma vez a cada PURGE_INTERVAL.
+
+        Returns:
+            Quantidade de jobs apagados (0 se ainda não era hora)
+        """
+        with self._purge_lock:
+            if time.monotonic() < self._next_purge:
+                return 0
+            self._next_purge = time.monotonic() + PURGE_INTERVAL
+        removed = self.queue.purge()
+        if removed:
+            print(f"🧹 Fila de jobs: {removed} job(s) terminado(s) apagado(s) (retenção de "
+                  f"{self.queue.retention:.0f}s)", file=sys.stderr)
+        return removed
+
+    @staticmethod
+    def _discard(job: Dict[str, Any], elapsed: float) -> None:
+        # A reserva expirou e o job voltou para a fila (ou já foi reservado de novo):
+        # o resultado desta execução não vale mais
+        metrics.inc('llm_jobs_total', agent=job['agent'], result='lease_lost')
+        print(f"⚠️  Job #{job['id']} ({job['agent']}): reserva perdida na tentativa {job['attempts']}, "
+              f"resultado descartado após {elapsed:.1f}s", file=sys.stderr)
+
+    def _heartbeat(self, job_id: int, attempt: int, finished: threading.Event, lost: threading.Event) -> None:
+        # Renova a reserva enquanto o job roda: jobs longos não são devolvidos à fila
+        # (nem executados duas vezes); só o job de um consumidor morto expira
+        interval = max(self.queue.visibility_timeout / 3, 0.1)
+        while not finished.wait(interval):
+            try:
+                if not self.queue.heartbeat(job_id, attempt):
+                    lost.set()
+                    return
+            except Exception as e:
+                print(f"⚠️  Heartbeat do job #{job_id} falhou: {e}", file=sys.stderr)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.purge_if_due()
+                if self.process_one():
+                    continue
+            except Exception as e:
+                print(f"❌ Erro no consumidor da fila: {e}", file=sys.stderr)
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Servidor RPC local do serviço LLM
+Mantém módulos e clientes carregados entre requisições, evitando iniciar um
+novo interpretador Python (e importar google.generativeai, yfinance e pandas)
+a cada chamada.
+
+Endpoints:
+    POST /julia  -> Agente Júlia (dados financeiros)
+    POST /pedro  -> Agente Pedro (análise de sentimento)
+    POST /key    -> Agente Key (geração de matéria)
+    GET  /health -> estado do serviço
+    GET  /ready  -> prontidão (dependências importáveis e fila acessível); 503 se não pronto
+    GET  /metrics -> métricas no formato texto do Prometheus (utils/metrics.py)
+    GET  /traces/<trace_id> -> cascata de spans de uma requisição gravada (utils/tracing.py)
+
+Com o pool de workers (service/worker_pool.py) os endpoints dos agentes não
+executam no processo do servidor: cada requisição vira um job interativo
+(prioridade máxima, uma tentativa) que os workers executam sob o controle de
+memória e reciclagem, e o servidor devolve o resultado ao cliente. Requisições
+idênticas simultâneas compartilham o mesmo job. Ao enfileirar, o servidor
+acorda os workers ociosos pelo pipe do pool (WorkerPool.notify), sem esperar
+pelo LLM_QUEUE_POLL_INTERVAL deles.
+
+Reciclagem sem o pool: o próprio servidor contabiliza memória e requisições
+(utils/memory_guard.py, os mesmos limites LLM_WORKER_MAX_JOBS e
+LLM_WORKER_MAX_RSS_MB dos workers), somando as dos endpoints e as do consumidor
+da fila. Ao passar dos limites para de aceitar conexões, termina as requisições
+em andamento e o main.py reinicia o processo (ver recycle e wait_idle).
+
+Formato: as respostas são JSON; com "Accept: application/msgpack" (e o pacote
+msgpack instalado) o corpo vai em MessagePack (ver utils/wire.py).
+
+Rastreamento: o cabeçalho X-Trace-Id (ou "trace_id" no corpo) identifica a
+requisição; a resposta devolve o X-Trace-Id usado. Com "trace": true o trace é
+sempre gravado e com "profile": true a requisição passa pelo profiler.
+
+Fila de jobs (quando o servidor tem uma fila associada, ver utils/job_queue.py):
+    POST /jobs                 -> enfileira {"agent", "payload", "priority", "max_attempts"}
+    GET  /jobs/<id>            -> estado e resultado do job
+    GET  /jobs?status=dead     -> lista jobs (ex: dead-letter)
+    POST /jobs/<id>/requeue    -> devolve um job do dead-letter para a fila
+
+Configuração:
+    LLM_SERVICE_HOST: host HTTP (padrão: 127.0.0.1). O serviço não tem autenticação:
+        só escute em outras interfaces numa rede privada (o docker-compose.yaml usa
+        0.0.0.0 na rede interna, sem publicar a porta no host)
+    LLM_SERVICE_PORT: porta HTTP (padrão: 8001)
+    LLM_SERVICE_SOCKET: caminho de socket Unix (se definido, substitui host/porta)
+    LLM_POOL_DISPATCH_TIMEOUT: segundos que uma requisição espera pelo job no pool
+        antes de responder 504 com o job_id (padrão: 300)
+"""
+
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from utils import data_models, metrics, tracing, wire
+
+try:
+    from .handlers import AGENT_HANDLERS, REQUIRED_DEPENDENCIES, check_dependencies
+    from .queue_worker import REPLY_KEY
+except ImportError:
+    from handlers import AGENT_HANDLERS, REQUIRED_DEPENDENCIES, check_dependencies  # type: ignore
+    from queue_worker import REPLY_KEY  # type: ignore
+
+# Serviços com circuit breaker expostos em /metrics
+CIRCUIT_SERVICES = ('gemini', 'news_api')
+
+# Primeiro segmento do caminho usado como rótulo 'endpoint' (os demais viram 'other')
+METRIC_ENDPOINTS = set(AGENT_HANDLERS) | {'jobs', 'health', 'ready', 'metrics'}
+
+# Tamanho máximo do corpo da requisição (bytes)
+MAX_BODY_BYTES = int(os.getenv('LLM_SERVICE_MAX_BODY', str(32 * 1024 * 1024)))
+
+# Espera pelos jobs despachados ao pool de workers (segundos)
+DISPATCH_TIMEOUT = float(os.getenv('LLM_POOL_DISPATCH_TIMEOUT', '300'))
+DISPATCH_POLL_SECONDS = 0.05
+
+
+class AgentRequestHandler(BaseHTTPRequestHandler):
+    """Handler HTTP que despacha as requisições para os agentes."""
+
+    server_version = 'LLMService/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def address_string(self) -> str:
+        # Em socket Unix client_address é uma string vazia
+        if isinstance(self.client_address, tuple) and self.client_address:
+            return str(self.client_address[0])
+        return 'unix'
+
+    def log_message(self, format: str, *args: Any) -> None:
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[{timestamp}] {self.address_string()} {format % args}", file=sys.stderr)
+
+    def do_GET(self) -> None:
+        self._trace_id: Optional[str] = None
+        url = urlparse(self.path)
+        if url.path == '/health':
+            health = {
+                'status': 'ok',
+                'uptime_seconds': round(time.time() - self.server.started_at, 1),  # type: ignore
+                'endpoints': sorted(AGENT_HANDLERS),
+            }
+            queue = getattr(self.server, 'job_queue', None)
+            if queue is not None:
+                health['queue'] = queue.depth()
+            pool = getattr(self.server, 'worker_pool', None)
+            if pool is not None:
+                health['worker_pool'] = pool.status()
+            self._send_json(200, health)
+            return
+        if url.path.startswith('/traces/'):
+            data = tracing.load_trace(url.path[len('/traces/'):])
+            if data is None:
+                self._send_json(404, {'error': 'Trace não encontrado (traces rápidos só são gravados com "trace": true)'})
+            else:
+                self._send_json(200, data)
+            return
+        if url.path == '/ready':
+            self._handle_ready()
+            return
+        if url.path == '/metrics':
+            self._send_text(200, metrics.render(metrics.collect(), self._gauges()),
+                            'text/plain; version=0.0.4; charset=utf-8')
+            return
+        if url.path.rstrip('/') == '/jobs' or url.path.startswith('/jobs/'):
+            self._handle_jobs_get(url.path, parse_qs(url.query))
+            return
+        self._send_json(404, {'error': f'Endpoint não encontrado: {self.path}'})
+
+    def do_POST(self) -> None:
+        self._trace_id = None
+        # O corpo é lido antes de qualquer resposta para não sobrar no stream (keep-alive)
+        payload, error = self._read_payload()
+        endpoint = self.path.split('?')[0].strip('/')
+        if endpoint == 'jobs' or endpoint.startswith('jobs/'):
+            if error:
+                self._send_json(400, {'error': error})
+            else:
+                self._handle_jobs_post(endpoint, payload)
+            return
+        handler = AGENT_HANDLERS.get(endpoint)
+        if handler is None:
+            self._send_json(404, {'error': f'Endpoint não encontrado: {self.path}'})
+            return
+        if error:
+            self._send_json(400, {'error': error})
+            return
+
+        options = tracing.request_options(payload)
+        options['trace_id'] = self.headers.get('X-Trace-Id') or options.get('trace_id')
+        started_at = time.monotonic()
+        with tracing.trace(f'POST /{endpoint}', **options):
+            self._trace_id = tracing.current_trace_id()
+            try:
+                if getattr(self.server, 'worker_pool', None) is not None:
+                    status, body = self._dispatch_to_pool(endpoint, payload)
+                else:
+                    status, body = self._run_locally(handler, payload)
+            except Exception as e:
+                print(f"❌ Erro no endpoint /{endpoint}: {e}", file=sys.stderr)
+                status, body = 500, {'error': str(e)}
+        metrics.observe('llm_request_duration_seconds', time.monotonic() - started_at, endpoint=endpoint)
+        self._send_json(status, body)
+
+    def _run_locally(self, handler: Any, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """Executa o handler no processo do servidor, contabilizando a requisição no guard."""
+        with self.server.active_lock:  # type: ignore
+            self.server.active_requests += 1  # type: ignore
+        try:
+            return handler(payload)
+        finally:
+            with self.server.active_lock:  # type: ignore
+                self.server.active_requests -= 1  # type: ignore
+            guard = getattr(self.server, 'memory_guard', None)
+            if guard is not None:
+                reason = guard.job_done()
+                if reason:
+                    recycle(self.server, reason)
+
+    def _dispatch_to_pool(self, agent: str, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """
+        Executa a requisição do agente num worker do pool (job interativo) e aguarda o resultado.
+
+        Returns:
+            Tupla (status HTTP, corpo) do handler executado no worker
+        """
+        queue = self.server.job_queue  # type: ignore
+        job_payload = dict(payload)
+        job_payload[REPLY_KEY] = True
+        if self._trace_id and 'trace_id' not in job_payload:
+            job_payload['trace_id'] = self._trace_id
+        # Uma tentativa: quem chamou decide se repete (como na execução local)
+        waiters = self.server.dispatch_waiters  # type: ignore
+        # Enfileirar e contar sob o mesmo lock: uma requisição idêntica que caiu no job
+        # em andamento (deduplicação) já está contada quando a primeira o apagar
+        with self.server.dispatch_lock:  # type: ignore
+            job_id = queue.enqueue(agent, job_payload, 'interactive', max_attempts=1)['job_id']
+            waiters[job_id] = waiters.get(job_id, 0) + 1
+        self.server.worker_pool.notify()  # type: ignore
+
+        finished = False
+        try:
+            deadline = time.monotonic() + DISPATCH_TIMEOUT
+            while time.monotonic() < deadline:
+                job = queue.get(job_id)
+                if job is None:
+                    return 500, {'error': f'Job #{job_id} não encontrado'}
+                if job['status'] == 'done':
+                    finished = True
+                    return job['result']['status'], job['result']['body']
+                if job['status'] == 'dead':
+                    finished = True
+                    return 500, {'error': job['error'] or 'Erro desconhecido', 'job_id': job_id}
+                time.sleep(DISPATCH_POLL_SECONDS)
+            return 504, {'error': f'Job #{job_id} não terminou em {DISPATCH_TIMEOUT:.0f}s (consulte GET /jobs/{job_id})',
+                         'job_id': job_id}
+        finally:
+            with self.server.dispatch_lock:  # type: ignore
+                waiters[job_id] -= 1
+                last = waiters[job_id] == 0
+                if last:
+                    del waiters[job_id]
+            # O resultado já foi entregue a todas as requisições que compartilharam o job:
+            # não fica na fila (jobs que estouraram o prazo ficam para GET /jobs/<id> e purge())
+            if last and finished:
+                try:
+                    queue.delete(job_id)
+                except Exception as e:
+                    print(f"⚠️  Falha ao apagar o job #{job_id}: {e}", file=sys.stderr)
+
+    def _handle_ready(self) -> None:
+        dependencies = check_dependencies()
+        ready = all(dependencies[name] is None for name in REQUIRED_DEPENDENCIES)
+        body: Dict[str, Any] = {
+            'dependencies': {name: error or 'ok' for name, error in dependencies.items()},
+        }
+        queue = getattr(self.server, 'job_queue', None)
+        if queue is not None:
+            try:
+                queue.depth()
+                body['queue'] = 'ok'
+            except Exception as e:
+                body['queue'] = str(e)
+                ready = False
+        body['status'] = 'ready' if ready else 'not_ready'
+        self._send_json(200 if ready else 503, body)
+
+    def _gauges(self) -> List[Tuple[str, Dict[str, Any], float]]:
+        """Medidas instantâneas: fila, circuit breakers e pool de workers."""
+        from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, get_breaker
+
+        gauges: List[Tuple[str, Dict[str, Any], float]] = [('llm_up', {}, 1)]
+        for service in CIRCUIT_SERVICES:
+            snapshot = get_breaker(service).snapshot()
+            for state in (CLOSED, OPEN, HALF_OPEN):
+                gauges.append(('llm_circuit_breaker_state', {'service': service, 'state': state},
+                               1 if snapshot['state'] == state else 0))
+            gauges.append(('llm_circuit_breaker_opens_total', {'service': service}, snapshot['opens']))
+
+        queue = getattr(self.server, 'job_queue', None)
+        if queue is not None:
+            try:
+                for status, count in queue.depth().items():
+                    gauges.append(('llm_queue_jobs', {'status': status}, count))
+            except Exception:
+                pass
+        pool = getattr(self.server, 'worker_pool', None)
+        if pool is not None:
+            gauges.append(('llm_pool_workers', {}, len(pool.status().get('workers', []))))
+        return gauges
+
+    def _handle_jobs_post(self, endpoint: str, payload: Dict[str, Any]) -> None:
+        queue = getattr(self.server, 'job_queue', None)
+        if queue is None:
+            self._send_json(503, {'error': 'Fila de jobs não habilitada neste serviço'})
+            return
+
+        if endpoint == 'jobs':
+            agent = payload.get('agent')
+            if agent not in AGENT_HANDLERS:
+                self._send_json(400, {'error': f'Agente inválido: {agent}', 'agents': sorted(AGENT_HANDLERS)})
+                return
+            job_payload = payload.get('payload') or {}
+            if not isinstance(job_payload, dict):
+                self._send_json(400, {'error': "'payload' deve ser um objeto JSON"})
+                return
+            if self.headers.get('X-Trace-Id') and 'trace_id' not in job_payload:
+                job_payload['trace_id'] = self.headers['X-Trace-Id']
+            result = queue.enqueue(agent, job_payload, payload.get('priority', 'scheduled'),
+                                   payload.get('max_attempts'))
+            consumer = getattr(self.server, 'queue_consumer', None)
+            if consumer is not None:
+                consumer.notify()
+            pool = getattr(self.server, 'worker_pool', None)
+            if pool is not None:
+                pool.notify()
+            self._send_json(200 if result['deduplicated'] else 201, result)
+            return
+
+        parts = endpoint.split('/')
+        if len(parts) == 3 and parts[2] == 'requeue' and parts[1].isdigit():
+            if queue.requeue(int(parts[1])):
+                self._send_json(200, {'job_id': int(parts[1]), 'status': 'pending'})
+            else:
+                self._send_json(409, {'error': 'Job não está no dead-letter (ou já existe um idêntico pendente)'})
+            return
+        self._send_json(404, {'error': f'Endpoint não encontrado: {self.path}'})
+
+    def _handle_jobs_get(self, path: str, query: Dict[str, Any]) -> None:
+        queue = getattr(self.server, 'job_queue', None)
+        if queue is None:
+            self._send_json(503, {'error': 'Fila de jobs não habilitada neste serviço'})
+            return
+
+        job_id = path[len('/jobs'):].strip('/')
+        if not job_id:
+            status = (query.get('status') or [None])[0]
+            try:
+                limit = int((query.get('limit') or ['100'])[0])
+            except ValueError:
+                limit = 100
+            self._send_json(200, {'jobs': queue.list(status, limit), 'depth': queue.depth()})
+            return
+        if not job_id.isdigit():
+            self._send_json(404, {'error': f'Endpoint não encontrado: {self.path}'})
+            return
+        job = queue.get(int(job_id))
+        if job is None:
+            self._send_json(404, {'error': f'Job não encontrado: {job_id}'})
+            return
+        self._send_json(200, job)
+
+    def _read_payload(self) -> Tuple[Dict[str, Any], Optional[str]]:
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            self.close_connection = True
+            return {}, 'Content-Length inválido'
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            return {}, f'Corpo da requisição excede {MAX_BODY_BYTES} bytes'
+
+        raw = self.rfile.read(length) if length else b'{}'
+        try:
+            payload = json.loads(raw.decode('utf-8') or '{}')
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            return {}, f'Erro ao decodificar JSON: {e}'
+        if not isinstance(payload, dict):
+            return {}, 'O corpo da requisição deve ser um objeto JSON'
+        return payload, None
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        accept = self.headers.get('Accept', '') if self.headers else ''
+        if wire.MSGPACK_AVAILABLE and any(kind in accept for kind in wire.MSGPACK_CONTENT_TYPES):
+            self._send_bytes(status, wire.encode(body, 'msgpack'), 'application/msgpack')
+            return
+        self._send_bytes(status, data_models.dumps(body).encode('utf-8'), 'application/json; charset=utf-8')
+
+    def _send_text(self, status: int, text: str, content_type: str) -> None:
+        self._send_bytes(status, text.encode('utf-8'), content_type)
+
+    def _send_bytes(self, status: int, data: bytes, content_type: str) -> None:
+        endpoint = self.path.split('?')[0].strip('/').split('/')[0]
+        metrics.inc('llm_requests_total', endpoint=endpoint if endpoint in METRIC_ENDPOINTS else 'other',
+                    status=status)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        if getattr(self.server, 'recycle_reason', None):
+            # Servidor em reciclagem: não aceita novas requisições nesta conexão
+            self.send_header('Connection', 'close')
+        if getattr(self, '_trace_id', None):
+            self.send_header('X-Trace-Id', self._trace_id)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Servidor HTTP multi-thread em socket Unix."""
+
+    daemon_threads = True
+
+
+def create_server(host: Optional[str] = None, port: Optional[int] = None,
+                  socket_path: Optional[str] = None) -> socketserver.BaseServer:
+    """
+    Cria o servidor HTTP (TCP ou socket Unix) do serviço.
+
+    Args:
+        host: Host TCP (padrão: LLM_SERVICE_HOST ou 127.0.0.1)
+        port: Porta TCP (padrão: LLM_SERVICE_PORT ou 8001)
+        socket_path: Caminho do socket Unix (padrão: LLM_SERVICE_SOCKET)
+
+    Returns:
+        Servidor pronto para serve_forever()
+    """
+    socket_path = socket_path or os.getenv('LLM_SERVICE_SOCKET')
+    server: socketserver.BaseServer
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, AgentRequestHandler)
+        os.chmod(socket_path, 0o666)
+    else:
+        host = host or os.getenv('LLM_SERVICE_HOST', '127.0.0.1')
+        port = port or int(os.getenv('LLM_SERVICE_PORT', '8001'))
+        server = ThreadingHTTPServer((host, port), AgentRequestHandler)
+        server.daemon_threads = True  # type: ignore
+    server.started_at = time.time()  # type: ignore
+    server.recycle_reason = None  # type: ignore
+    server.active_requests = 0  # type: ignore
+    server.active_lock = threading.Lock()  # type: ignore
+    # job_id -> requisições aguardando o job despachado ao pool (ver _dispatch_to_pool)
+    server.dispatch_waiters = {}  # type: ignore
+    server.dispatch_lock = threading.Lock()  # type: ignore
+    return server
+
+
+def recycle(server: socketserver.BaseServer, reason: str) -> None:
+    """
+    Pede a reciclagem do servidor: serve_forever() retorna e quem o chamou
+    aguarda as requisições em andamento (wait_idle) e reinicia o processo.
+
+    Args:
+        server: Servidor criado por create_server
+        reason: Motivo ('max_jobs', 'max_rss')
+    """
+    with server.active_lock:  # type: ignore
+        if server.recycle_reason:  # type: ignore
+            return
+        server.recycle_reason = reason  # type: ignore
+    print(f"♻️  Servidor {os.getpid()} será reciclado ({reason})", file=sys.stderr)
+    # shutdown() bloqueia até serve_forever() sair; não pode rodar na thread da requisição
+    threading.Thread(target=server.shutdown, name='server-recycle', daemon=True).start()
+
+
+def wait_idle(server: socketserver.BaseServer, timeout: float) -> bool:
+    """
+    Aguarda as requisições dos agentes em andamento terminarem.
+
+    Returns:
+        bool: True se não restou nenhuma dentro do prazo
+    """
+    deadline = time.monotonic() + timeout
+    while server.active_requests > 0:  # type: ignore
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.1)
+    return True
+
+
+def describe_address(server: socketserver.BaseServer) -> str:
+    """Endereço legível do servidor (para logs e LLM_SERVICE_URL)."""
+    address = server.server_address
+    if isinstance(address, (str, bytes)):
+        return f"unix://{address.decode() if isinstance(address, bytes) else address}"
+    return f"http://{address[0]}:{address[1]}"
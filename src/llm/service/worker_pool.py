@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pool de workers pré-forkados do serviço LLM
+Depois do pré-carregamento dos módulos pesados, o serviço cria um processo
+gerente (single-thread, para que os forks sejam seguros) que mantém entre
+LLM_POOL_MIN_WORKERS e LLM_POOL_MAX_WORKERS processos consumidores da fila de
+jobs. Os filhos compartilham as páginas dos módulos já importados
+(copy-on-write) e não pagam a importação de novo. Os workers atendem tanto os
+jobs enfileirados (POST /jobs) quanto as requisições dos endpoints dos agentes
+(POST /julia, /pedro, /key), que o servidor despacha como jobs interativos
+(ver service/server.py); o processo do servidor só recebe e responde.
+
+Despertar: o servidor e os workers compartilham um pipe. Ao enfileirar um job
+o servidor escreve nele (WorkerPool.notify) e os workers ociosos reservam o job
+na hora; LLM_QUEUE_POLL_INTERVAL fica só como garantia para jobs enfileirados
+por outros processos (ex: LLMJobQueue no PHP).
+
+Cada worker tem:
+    - faixa de I/O: LLM_POOL_THREADS threads consumindo a fila (chamadas ao Gemini/APIs)
+    - faixa de CPU: LLM_CPU_WORKERS processos para renderização de template e
+      pontuação de sentimento (utils/cpu_lane.py)
+
+Dimensionamento (a cada LLM_POOL_SCALE_INTERVAL segundos): estima o tempo para
+esvaziar a fila com a latência média observada dos jobs; acima de
+LLM_POOL_TARGET_DRAIN segundos adiciona workers, e remove um worker depois de
+LLM_POOL_IDLE_TIMEOUT segundos com a capacidade sobrando.
+
+Reciclagem: cada worker contabiliza a memória residente e os jobs processados
+(utils/memory_guard.py). Ao passar de LLM_WORKER_MAX_JOBS ou
+LLM_WORKER_MAX_RSS_MB o worker para de reservar jobs, termina os que estão em
+andamento e sai; o gerente repõe um worker novo na hora. Assim a memória
+acumulada por yfinance/pandas, pelos dicionários raw_data e pelos clientes dos
+SDKs não cresce sem limite num serviço que roda por semanas.
+
+Configuração:
+    LLM_POOL_ENABLED: ativa o pool. No código o padrão é false (ex: python main.py
+        local; sem o pool a fila é consumida por threads no próprio serviço), mas a
+        implantação (docker-compose.yaml) liga o pool: é o modo padrão em produção
+    LLM_POOL_MIN_WORKERS (padrão: 1), LLM_POOL_MAX_WORKERS (padrão: número de CPUs)
+    LLM_POOL_THREADS (padrão: 4), LLM_CPU_WORKERS (padrão: 1)
+    LLM_POOL_TARGET_DRAIN (padrão: 30), LLM_POOL_SCALE_INTERVAL (padrão: 5), LLM_POOL_IDLE_TIMEOUT (padrão: 60)
+    LLM_POOL_SHUTDOWN_TIMEOUT: segundos para um worker terminar os jobs em andamento (padrão: 120)
+    LLM_WORKER_MAX_JOBS, LLM_WORKER_MAX_RSS_MB, LLM_RSS_SPIKE_MB, LLM_TRACEMALLOC: ver utils/memory_guard.py
+"""
+
+import gc
+import math
+import os
+import select
+import signal
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Set
+
+from utils import cpu_lane, metrics
+from utils.job_queue import JobQueue, default_queue_path
+from utils.memory_guard import MemoryGuard
+from utils.shared_state import SharedState
+
+try:
+    from .queue_worker import QueueConsumer
+except ImportError:
+    from queue_worker import QueueConsumer  # type: ignore
+
+# Latência assumida por job antes de haver amostras (segundos)
+DEFAULT_JOB_LATENCY = 10.0
+
+# Código de saída de um worker reciclado (distingue reciclagem de falha)
+RECYCLE_EXIT_CODE = 75
+
+# Intervalo (segundos) de publicação da contabilidade de memória de cada worker
+STATS_INTERVAL = 5.0
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def pool_enabled() -> bool:
+    """Indica se o pool de workers pré-forkados deve ser usado (ver LLM_POOL_ENABLED no topo do módulo)."""
+    return hasattr(os, 'fork') and os.getenv('LLM_POOL_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+
+def desired_workers(load: Dict[str, Any], current: int, min_workers: int, max_workers: int,
+                    threads: int, target_drain: float) -> int:
+    """
+    Calcula o número de workers necessário para esvaziar a fila dentro da meta.
+
+    Args:
+        load: Carga da fila (JobQueue.load: 'ready', 'running', 'avg_latency')
+        current: Workers atuais
+        min_workers: Mínimo de workers
+        max_workers: Máximo de workers
+        threads: Threads de I/O por worker
+        target_drain: Tempo desejado (segundos) para esvaziar a fila
+
+    Returns:
+        Número de workers desejado (entre min_workers e max_workers)
+    """
+    latency = load.get('avg_latency')
+    if latency is None:
+        latency = DEFAULT_JOB_LATENCY
+    backlog = load.get('ready', 0) + load.get('running', 0)
+    # Tempo total de trabalho pendente dividido pelo que cada worker entrega dentro da meta
+    needed = math.ceil(backlog * latency / (max(threads, 1) * max(target_drain, 1.0)))
+    return max(min_workers, min(max_workers, needed))
+
+
+def _publish_worker_stats(state: SharedState, guard: MemoryGuard, reason: Optional[str] = None) -> None:
+    stats = guard.stats()
+    stats['recycle_reason'] = reason
+    stats['updated_at'] = time.time()
+    try:
+        with state.update() as data:
+            data[str(stats['pid'])] = stats
+    except OSError:
+        pass
+
+
+def _watch_wakeups(fd: int, consumer: QueueConsumer, stop: threading.Event) -> None:
+    """Acorda o consumidor a cada escrita do servidor no pipe de despertar."""
+    while not stop.is_set():
+        try:
+            readable, _, _ = select.select([fd], [], [], 1.0)
+        except (OSError, ValueError):
+            return
+        if not readable:
+            continue
+        try:
+            data = os.read(fd, 4096)
+        except BlockingIOError:
+            # Outro worker leu primeiro; o job pode estar livre ainda assim
+            data = b'\0'
+        except OSError:
+            return
+        if not data:
+            # Servidor fechou o pipe (encerrando): resta o intervalo de verificação
+            return
+        consumer.notify()
+
+
+def _run_worker(queue_path: str, threads: int, cpu_workers: int, shutdown_timeout: float,
+                wakeup_fd: Optional[int] = None) -> int:
+    """
+    Loop de um processo worker (filho do gerente).
+
+    Returns:
+        0 ao encerrar por sinal ou RECYCLE_EXIT_CODE ao atingir os limites de reciclagem
+    """
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Faixa de CPU primeiro: o fork dos seus processos acontece ainda sem threads
+    cpu_lane.start(cpu_workers)
+    guard = MemoryGuard()
+    stats_state = SharedState('worker_memory')
+    consumer = QueueConsumer(JobQueue(queue_path), workers=threads, guard=guard)
+    consumer.start()
+    if wakeup_fd is not None:
+        threading.Thread(target=_watch_wakeups, args=(wakeup_fd, consumer, stop),
+                         name='queue-wakeup', daemon=True).start()
+    published_jobs = -1
+    last_publish = 0.0
+    while not stop.wait(1) and consumer.recycle_reason is None:
+        if guard.jobs != published_jobs or time.monotonic() - last_publish >= STATS_INTERVAL:
+            _publish_worker_stats(stats_state, guard)
+            metrics.flush()
+            published_jobs, last_publish = guard.jobs, time.monotonic()
+    consumer.stop(timeout=shutdown_timeout)
+    cpu_lane.shutdown()
+
+    reason = consumer.recycle_reason
+    _publish_worker_stats(stats_state, guard, reason)
+    metrics.flush()
+    if reason is None:
+        return 0
+    stats = guard.stats()
+    print(f"♻️  Worker {os.getpid()} reciclado ({reason}): {stats['jobs']} job(s), "
+          f"RSS {stats['rss_mb']} MB (início {stats['start_rss_mb']} MB)", file=sys.stderr)
+    return RECYCLE_EXIT_CODE
+
+
+class WorkerPool:
+    """Gerente do pool de workers pré-forkados, com dimensionamento pela fila."""
+
+    def __init__(self, queue_path: Optional[str] = None, min_workers: Optional[int] = None,
+                 max_workers: Optional[int] = None, threads: Optional[int] = None,
+                 cpu_workers: Optional[int] = None):
+        self.queue_path = queue_path or default_queue_path()
+        self.min_workers = max(1, min_workers or _env_int('LLM_POOL_MIN_WORKERS', 1))
+        self.max_workers = max(self.min_workers, max_workers or _env_int('LLM_POOL_MAX_WORKERS', os.cpu_count() or 1))
+        self.threads = max(1, threads or _env_int('LLM_POOL_THREADS', 4))
+        self.cpu_workers = cpu_workers if cpu_workers is not None else _env_int('LLM_CPU_WORKERS', 1)
+        self.target_drain = _env_float('LLM_POOL_TARGET_DRAIN', 30)
+        self.scale_interval = _env_float('LLM_POOL_SCALE_INTERVAL', 5)
+        self.idle_timeout = _env_float('LLM_POOL_IDLE_TIMEOUT', 60)
+        self.shutdown_timeout = _env_float('LLM_POOL_SHUTDOWN_TIMEOUT', 120)
+        self.manager_pid: Optional[int] = None
+        self._workers: Dict[int, float] = {}
+        # Workers dispensados pela redução do pool, até o _reap recolhê-los
+        self._retiring: Set[int] = set()
+        self._stopping = False
+        self._state = SharedState('worker_pool')
+        self._memory_state = SharedState('worker_memory')
+        # Pipe de despertar: o servidor escreve, os workers leem (ver notify)
+        self._wakeup_read: Optional[int] = None
+        self._wakeup_write: Optional[int] = None
+
+    # Processo do serviço ----------------------------------------------------
+
+    def start(self, close_on_fork: Iterable[Any] = ()) -> int:
+        """
+        Cria o processo gerente. Deve ser chamada antes de iniciar threads no serviço.
+
+        Args:
+            close_on_fork: Objetos com close()/server_close() a fechar no gerente (ex: o socket HTTP)
+
+        Returns:
+            PID do gerente
+        """
+        # Objetos já carregados saem do GC: as coletas nos filhos não tocam (e copiam) essas páginas
+        gc.freeze()
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                os.close(self._wakeup_write)
+                self._wakeup_write = None
+                for resource in close_on_fork:
+                    getattr(resource, 'server_close', getattr(resource, 'close', lambda: None))()
+                code = self._run_manager()
+            except BaseException as e:
+                print(f"❌ Erro no gerente do pool de workers: {e}", file=sys.stderr)
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        os.close(self._wakeup_read)
+        self._wakeup_read = None
+        self.manager_pid = pid
+        return pid
+
+    def notify(self) -> None:
+        """Acorda os workers ociosos (novo job enfileirado pelo servidor)."""
+        if self._wakeup_write is None:
+            return
+        try:
+            os.write(self._wakeup_write, b'\0')
+        except OSError:
+            # Pipe cheio (os workers já têm o que ler) ou gerente encerrado
+            pass
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Encerra o gerente (que encerra os workers graciosamente)."""
+        if self._wakeup_write is not None:
+            os.close(self._wakeup_write)
+            self._wakeup_write = None
+        if not self.manager_pid:
+            return
+        try:
+            os.kill(self.manager_pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        deadline = time.monotonic() + (timeout or self.shutdown_timeout + 10)
+        while time.monotonic() < deadline:
+            pid, _ = os.waitpid(self.manager_pid, os.WNOHANG)
+            if pid:
+                return
+            time.sleep(0.2)
+        os.kill(self.manager_pid, signal.SIGKILL)
+        os.waitpid(self.manager_pid, 0)
+
+    def status(self) -> Dict[str, Any]:
+        """Estado publicado pelo gerente (workers, desejado, carga) e a memória de cada worker."""
+        status = self._state.read()
+        status['manager_pid'] = self.manager_pid
+        memory = self._memory_state.read()
+        status['worker_memory'] = [memory[str(pid)] for pid in status.get('workers', []) if str(pid) in memory]
+        status['recycled'] = memory.get('recycled', 0)
+        return status
+
+    # Processo gerente ---------------------------------------------------------
+
+    def _run_manager(self) -> int:
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        queue = JobQueue(self.queue_path)
+        try:
+            with self._memory_state.update() as data:
+                data.clear()
+        except OSError:
+            pass
+        print(f"👷 Pool de workers: {self.min_workers}-{self.max_workers} processo(s), "
+              f"{self.threads} thread(s) de I/O e {self.cpu_workers} processo(s) de CPU cada", file=sys.stderr)
+
+        idle_since: Optional[float] = None
+        while not self._stopping:
+            self._reap()
+            while len(self._workers) < self.min_workers and not self._stopping:
+                self._spawn()
+
+            try:
+                load = queue.load()
+            except Exception as e:
+                print(f"⚠️  Pool de workers: falha ao ler a fila ({e})", file=sys.stderr)
+                load = {'ready': 0, 'running': 0, 'avg_latency': None}
+            current = len(self._workers)
+            desired = desired_workers(load, current, self.min_workers, self.max_workers,
+                                      self.threads, self.target_drain)
+
+            if desired > current:
+                idle_since = None
+                for _ in range(desired - current):
+                    self._spawn()
+                print(f"👷 Pool de workers: {current} → {desired} (fila: {load['ready']} pronto(s), "
+                      f"latência média: {load['avg_latency'] or 0:.1f}s)", file=sys.stderr)
+            elif desired < current:
+                idle_since = idle_since or time.monotonic()
+                if time.monotonic() - idle_since >= self.idle_timeout:
+                    # Remove um worker por vez (o mais novo), sem interromper jobs em andamento
+                    youngest = max(self._workers, key=self._workers.get)
+                    os.kill(youngest, signal.SIGTERM)
+                    self._workers.pop(youngest)
+                    self._retiring.add(youngest)
+                    idle_since = time.monotonic()
+                    print(f"👷 Pool de workers: {current} → {current - 1} (capacidade ociosa)", file=sys.stderr)
+            else:
+                idle_since = None
+
+            self._publish(load, desired)
+            self._sleep(self.scale_interval)
+
+        self._shutdown_workers()
+        return 0
+
+    def _request_stop(self, *_: Any) -> None:
+        self._stopping = True
+
+    def _sleep(self, seconds: float) -> None:
+        deadline = time.monotonic() + seconds
+        while not self._stopping and time.monotonic() < deadline:
+            time.sleep(min(0.5, deadline - time.monotonic()))
+
+    def _spawn(self) -> int:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = _run_worker(self.queue_path, self.threads, self.cpu_workers, self.shutdown_timeout,
+                                   self._wakeup_read)
+            except BaseException as e:
+                print(f"❌ Erro no worker {os.getpid()}: {e}", file=sys.stderr)
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        self._workers[pid] = time.monotonic()
+        return pid
+
+    def _reap(self) -> None:
+        """
+        Recolhe workers encerrados. Os reciclados são repostos na hora; os que
+        morreram, no próximo ciclo.
+        """
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self._retiring:
+                self._retiring.discard(pid)
+                self._forget_worker(pid, False)
+                continue
+            if self._workers.pop(pid, None) is None:
+                continue
+            recycled = os.WIFEXITED(status) and os.WEXITSTATUS(status) == RECYCLE_EXIT_CODE
+            self._forget_worker(pid, recycled)
+            if recycled:
+                if not self._stopping:
+                    self._spawn()
+            elif status != 0:
+                print(f"⚠️  Worker {pid} encerrou inesperadamente (status {status})", file=sys.stderr)
+
+    def _forget_worker(self, pid: int, recycled: bool) -> None:
+        try:
+            metrics.archive(pid)
+        except OSError:
+            pass
+        try:
+            with self._memory_state.update() as data:
+                data.pop(str(pid), None)
+                if recycled:
+                    data['recycled'] = data.get('recycled', 0) + 1
+        except OSError:
+            pass
+
+    def _shutdown_workers(self) -> None:
+        for pid in list(self._workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self._workers.pop(pid, None)
+        deadline = time.monotonic() + self.shutdown_timeout
+        while (self._workers or self._retiring) and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.2)
+        for pid in list(self._workers) + list(self._retiring):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self._reap()
+
+    def _publish(self, load: Dict[str, Any], desired: int) -> None:
+        try:
+            with self._state.update() as data:
+                data.clear()
+                data.update({
+                    'workers': sorted(self._workers),
+                    'desired': desired,
+                    'min_workers': self.min_workers,
+                    'max_workers': self.max_workers,
+                    'load': load,
+                    'updated_at': time.time(),
+                })
+        except OSError:
+            pass
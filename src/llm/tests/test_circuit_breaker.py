@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes do circuit breaker (utils/circuit_breaker.py) e do estado
+compartilhado entre processos (utils/shared_state.py).
+
+Uso: python -m pytest src/llm/tests
+"""
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+_LLM_ROOT = str(Path(__file__).resolve().parent.parent)
+if _LLM_ROOT not in sys.path:
+    sys.path.insert(0, _LLM_ROOT)
+
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from utils.shared_state import SharedState
+
+INCREMENTS = 200
+
+
+def _increment(name: str, times: int) -> None:
+    state = SharedState(name)
+    for _ in range(times):
+        with state.update() as data:
+            data['count'] = data.get('count', 0) + 1
+
+
+class _StateDirTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        patcher = mock.patch.dict(os.environ, {'LLM_STATE_DIR': self.directory})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class CircuitBreakerTest(_StateDirTest):
+
+    def _breaker(self, **kwargs):
+        options = {'failure_threshold': 3, 'failure_rate': 0.5, 'window': 60, 'recovery_timeout': 30,
+                   'half_open_max_calls': 1, 'slow_call_threshold': 0}
+        options.update(kwargs)
+        return CircuitBreaker('teste', **options)
+
+    def test_full_cycle_closed_open_half_open_closed(self):
+        breaker = self._breaker()
+        breaker.record_success(0.1)
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CLOSED)
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow_request())
+        with self.assertRaises(CircuitOpenError):
+            breaker.call(lambda: 'nunca')
+
+        later = time.time() + 31
+        with mock.patch('utils.circuit_breaker.time.time', return_value=later):
+            self.assertEqual(breaker.state, HALF_OPEN)
+            # Uma única chamada de teste passa no meio-aberto
+            self.assertTrue(breaker.allow_request())
+            self.assertFalse(breaker.allow_request())
+            breaker.record_success(0.1)
+            self.assertEqual(breaker.state, CLOSED)
+            self.assertTrue(breaker.allow_request())
+
+        snapshot = breaker.snapshot()
+        self.assertEqual(snapshot['opens'], 1)
+        self.assertEqual(snapshot['failures_in_window'], 0)
+
+    def test_failure_in_half_open_reopens_the_circuit(self):
+        breaker = self._breaker(failure_threshold=1)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+
+        later = time.time() + 31
+        with mock.patch('utils.circuit_breaker.time.time', return_value=later):
+            self.assertTrue(breaker.allow_request())
+            breaker.record_failure()
+            self.assertEqual(breaker.state, OPEN)
+            self.assertGreater(breaker.retry_in(), 29)
+        self.assertEqual(breaker.snapshot()['opens'], 2)
+
+    def test_failure_rate_below_the_limit_keeps_the_circuit_closed(self):
+        breaker = self._breaker()
+        for _ in range(4):
+            breaker.record_success(0.1)
+        for _ in range(3):
+            breaker.record_failure()
+        # 3 falhas em 7 chamadas: abaixo de 50%
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_slow_calls_count_as_failures(self):
+        breaker = self._breaker(slow_call_threshold=2.0)
+        breaker.record_success(1.9)
+        self.assertEqual(breaker.snapshot()['failures_in_window'], 0)
+
+        for _ in range(3):
+            breaker.record_success(2.5)
+        self.assertEqual(breaker.snapshot()['failures_in_window'], 3)
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_call_records_exceptions_and_reraises(self):
+        breaker = self._breaker(failure_threshold=2, failure_rate=0.5)
+        self.assertEqual(breaker.call(lambda: 'ok'), 'ok')
+
+        def broken():
+            raise RuntimeError('falhou')
+
+        with self.assertRaises(RuntimeError):
+            breaker.call(broken)
+        self.assertEqual(breaker.state, CLOSED)
+        with self.assertRaises(RuntimeError):
+            breaker.call(broken)
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_state_is_shared_between_instances(self):
+        first = self._breaker(failure_threshold=1)
+        second = self._breaker(failure_threshold=1)
+        first.record_failure()
+        self.assertTrue(second.is_open())
+
+
+class SharedStateTest(_StateDirTest):
+
+    def test_missing_or_corrupted_file_reads_as_empty(self):
+        state = SharedState('corrompido')
+        self.assertEqual(state.read(), {})
+        state.path.write_text('{nao e json', encoding='utf-8')
+        self.assertEqual(state.read(), {})
+
+    def test_concurrent_updates_from_two_processes_are_not_lost(self):
+        context = multiprocessing.get_context('fork' if hasattr(os, 'fork') else 'spawn')
+        processes = [context.Process(target=_increment, args=('contador', INCREMENTS)) for _ in range(2)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+            self.assertEqual(process.exitcode, 0)
+
+        self.assertEqual(SharedState('contador').read(), {'count': 2 * INCREMENTS})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes dos modelos tipados (utils/data_models.py): JSON idêntico ao do
+dicionário original e ida e volta sem perdas.
+
+Uso: python -m pytest src/llm/tests
+"""
+
+import json
+import random
+import sys
+import unittest
+from pathlib import Path
+
+_LLM_ROOT = str(Path(__file__).resolve().parent.parent)
+if _LLM_ROOT not in sys.path:
+    sys.path.insert(0, _LLM_ROOT)
+
+from utils.data_models import ArticleDraft, FinancialSnapshot, SentimentResult, dumps, loads
+
+
+def _julia_output(rng: random.Random, index: int) -> dict:
+    # Mesmas chaves, na mesma ordem, da saída do Agente Júlia
+    data = {name: None for name in FinancialSnapshot.FIELDS}
+    data.update({
+        'symbol': f"PETR{index}.SA",
+        'company_name': 'Petróleo Brasileiro S.A.',
+        'searched_name': 'Petrobras',
+        'price': round(rng.uniform(5, 120), 2),
+        'volume': rng.randint(10 ** 5, 10 ** 8),
+        'company_info': {'name': 'Petrobras', 'sector': 'Energia', 'description': 'Exploração "offshore" ∑'},
+        'financial_metrics': {'roe': rng.random(), 'debt_to_equity': None},
+        'raw_data': {f"campo{key}": rng.choice([1, 2.5, 'ação', None, True, [1, {'x': 'y'}]]) for key in range(20)},
+        'collected_at': '2025-01-15 10:30:00',
+    })
+    return data
+
+
+def _sentiment_output(rng: random.Random) -> dict:
+    return {
+        'sentiment': rng.choice(['positive', 'negative', 'neutral']),
+        'sentiment_score': round(rng.uniform(-1, 1), 3),
+        'news_count': rng.randint(0, 20),
+        'positive_count': 2,
+        'negative_count': 1,
+        'neutral_count': 0,
+        'trending_topics': 'petróleo, dividendos',
+        'news_sources': ['Valor', 'InfoMoney'],
+        'raw_data': [{'title': 'Notícia', 'url': 'https://example.com/1'}],
+        'analyzed_at': '2025-01-15 10:31:00',
+        # Campos da análise do Gemini, fora do contrato básico
+        'confidence': 0.8,
+        'key_themes': ['produção'],
+    }
+
+
+class DataModelsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(7)
+
+    def assertSameJSON(self, record, data):
+        self.assertEqual(dumps(record), json.dumps(data, ensure_ascii=False))
+        self.assertEqual(dumps(record, indent=2), json.dumps(data, ensure_ascii=False, indent=2))
+        self.assertEqual(list(record.to_dict()), list(data))
+
+    def test_julia_output_is_byte_compatible(self):
+        for index in range(20):
+            data = _julia_output(self.rng, index)
+            self.assertSameJSON(FinancialSnapshot.from_dict(data), data)
+
+    def test_unknown_keys_and_any_key_order_are_preserved(self):
+        for _ in range(20):
+            data = _sentiment_output(self.rng)
+            items = list(data.items())
+            self.rng.shuffle(items)
+            shuffled = dict(items[:self.rng.randint(1, len(items))])
+            record = SentimentResult.from_dict(shuffled)
+            self.assertSameJSON(record, shuffled)
+
+    def test_round_trip(self):
+        data = _julia_output(self.rng, 1)
+        data['dividend_yield'] = 6.5
+        record = FinancialSnapshot.from_dict(data)
+        again = loads(FinancialSnapshot, dumps(record))
+
+        self.assertEqual(again, record)
+        self.assertEqual(again.to_dict(), data)
+        self.assertEqual(again.price, data['price'])
+        self.assertEqual(again.extra, {'dividend_yield': 6.5})
+
+    def test_fused_article_nests_the_sentiment(self):
+        sentiment = _sentiment_output(self.rng)
+        data = {'title': 'Petrobras sobe', 'content': 'Texto', 'sentiment': sentiment}
+        article = ArticleDraft.from_dict(data)
+
+        self.assertIsInstance(article.sentiment, SentimentResult)
+        self.assertEqual(article.sentiment.news_count, sentiment['news_count'])
+        self.assertSameJSON(article, data)
+        self.assertEqual(loads(ArticleDraft, dumps(article)), article)
+
+    def test_changes_after_creation_are_serialized(self):
+        data = _sentiment_output(self.rng)
+        # symbol não veio na saída: preenchido depois, vai para o final
+        record = SentimentResult.from_dict(data)
+        record.symbol = 'PETR4'
+        record.extra['source'] = 'cache'
+        record.sentiment_score = 0.5
+
+        expected = {**data, 'sentiment_score': 0.5, 'source': 'cache', 'symbol': 'PETR4'}
+        self.assertEqual(record.to_dict(), expected)
+        self.assertEqual(list(record.to_dict()), list(expected))
+        self.assertEqual(dumps(record), json.dumps(expected, ensure_ascii=False))
+
+    def test_records_built_in_code_emit_the_given_fields_in_contract_order(self):
+        article = ArticleDraft(content='Texto', title='Título', extra={'request_id': 'r1'})
+        self.assertEqual(dumps(article), '{"title": "Título", "content": "Texto", "request_id": "r1"}')
+
+        with self.assertRaises(TypeError):
+            ArticleDraft(headline='x')
+
+    def test_dumps_accepts_values_with_records_inside(self):
+        sentiment = _sentiment_output(self.rng)
+        body = {'status': 200, 'body': SentimentResult.from_dict(sentiment), 'items': [None, 'ação']}
+        self.assertEqual(dumps(body), json.dumps({**body, 'body': sentiment}, ensure_ascii=False))
+
+        with self.assertRaises(TypeError):
+            dumps({'when': object()})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes da fila de jobs durável (utils/job_queue.py) e do consumidor
+(service/queue_worker.py).
+
+Uso: python -m pytest src/llm/tests
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+_LLM_ROOT = str(Path(__file__).resolve().parent.parent)
+if _LLM_ROOT not in sys.path:
+    sys.path.insert(0, _LLM_ROOT)
+
+from service.queue_worker import QueueConsumer
+from utils.job_queue import (PRIORITY_INTERACTIVE, PRIORITY_SCHEDULED, STATUS_DEAD, STATUS_DONE,
+                             STATUS_PENDING, JobQueue)
+
+
+class JobQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.queue = self._queue()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _queue(self, **kwargs):
+        options = {'max_attempts': 3, 'retry_delay': 0, 'visibility_timeout': 600}
+        options.update(kwargs)
+        return JobQueue(os.path.join(self.directory, 'jobs.sqlite3'), **options)
+
+    def test_identical_pending_jobs_are_deduplicated(self):
+        first = self.queue.enqueue('key', {'symbol': 'PETR4', 'trace_id': 'a'})
+        second = self.queue.enqueue('key', {'symbol': 'PETR4', 'trace_id': 'b'})
+        other = self.queue.enqueue('key', {'symbol': 'VALE3'})
+
+        self.assertFalse(first['deduplicated'])
+        self.assertTrue(second['deduplicated'])
+        self.assertEqual(first['job_id'], second['job_id'])
+        self.assertNotEqual(first['job_id'], other['job_id'])
+        self.assertEqual(self.queue.depth(), {STATUS_PENDING: 2})
+
+    def test_duplicate_raises_the_priority_of_the_pending_job(self):
+        scheduled = self.queue.enqueue('key', {'symbol': 'PETR4'}, 'scheduled')
+        self.queue.enqueue('key', {'symbol': 'VALE3'}, 'scheduled')
+        self.queue.enqueue('key', {'symbol': 'PETR4'}, 'interactive')
+
+        job = self.queue.claim()
+        self.assertEqual(job['id'], scheduled['job_id'])
+        self.assertEqual(job['priority'], PRIORITY_INTERACTIVE)
+
+    def test_interactive_jobs_are_claimed_before_scheduled_ones(self):
+        self.queue.enqueue('julia', {'company_name': 'A'}, 'scheduled')
+        self.queue.enqueue('julia', {'company_name': 'B'}, 'scheduled')
+        interactive = self.queue.enqueue('key', {'symbol': 'C'}, 'interactive')
+
+        order = [self.queue.claim() for _ in range(3)]
+
+        self.assertEqual(order[0]['id'], interactive['job_id'])
+        self.assertEqual([job['payload'].get('company_name') for job in order[1:]], ['A', 'B'])
+        self.assertEqual(order[1]['priority'], PRIORITY_SCHEDULED)
+        self.assertIsNone(self.queue.claim())
+
+    def test_failures_back_off_and_end_in_the_dead_letter(self):
+        queue = self._queue(retry_delay=10)
+        job_id = queue.enqueue('key', {'symbol': 'PETR4'}, max_attempts=2)['job_id']
+
+        job = queue.claim()
+        self.assertEqual(queue.fail(job_id, job['attempts'], 'erro 1'), STATUS_PENDING)
+        # Backoff: o job só volta a ficar disponível depois do atraso
+        self.assertIsNone(queue.claim())
+        self.assertGreater(queue.get(job_id)['available_at'], time.time() + 5)
+
+        with mock.patch('utils.job_queue.time.time', return_value=time.time() + 11):
+            job = queue.claim()
+        self.assertEqual(job['attempts'], 2)
+        self.assertEqual(queue.fail(job_id, job['attempts'], 'erro 2'), STATUS_DEAD)
+        self.assertEqual(queue.get(job_id)['error'], 'erro 2')
+        self.assertEqual([dead['id'] for dead in queue.list(STATUS_DEAD)], [job_id])
+
+        self.assertTrue(queue.requeue(job_id))
+        self.assertEqual(queue.get(job_id)['attempts'], 0)
+
+    def test_running_job_without_heartbeat_is_reclaimed(self):
+        queue = self._queue(visibility_timeout=60)
+        job_id = queue.enqueue('key', {'symbol': 'PETR4'})['job_id']
+        self.assertEqual(queue.claim()['attempts'], 1)
+        self.assertIsNone(queue.claim())
+
+        with mock.patch('utils.job_queue.time.time', return_value=time.time() + 61):
+            job = queue.claim()
+        self.assertEqual(job['id'], job_id)
+        self.assertEqual(job['attempts'], 2)
+
+    def test_expired_job_on_its_last_attempt_goes_to_the_dead_letter(self):
+        queue = self._queue(visibility_timeout=60)
+        job_id = queue.enqueue('key', {'symbol': 'PETR4'}, max_attempts=1)['job_id']
+        queue.claim()
+
+        with mock.patch('utils.job_queue.time.time', return_value=time.time() + 61):
+            self.assertIsNone(queue.claim())
+        self.assertEqual(queue.get(job_id)['status'], STATUS_DEAD)
+
+    def test_stale_consumer_cannot_overwrite_the_new_lease(self):
+        queue = self._queue(visibility_timeout=60)
+        job_id = queue.enqueue('key', {'symbol': 'PETR4'})['job_id']
+        stale = queue.claim()
+        with mock.patch('utils.job_queue.time.time', return_value=time.time() + 61):
+            current = queue.claim()
+
+        self.assertFalse(queue.heartbeat(job_id, stale['attempts']))
+        self.assertTrue(queue.complete(job_id, current['attempts'], {'title': 'novo'}))
+        # O consumidor antigo termina depois: nem sobrescreve o resultado nem devolve o job à fila
+        self.assertFalse(queue.complete(job_id, stale['attempts'], {'title': 'antigo'}))
+        self.assertIsNone(queue.fail(job_id, stale['attempts'], 'erro antigo'))
+
+        job = queue.get(job_id)
+        self.assertEqual(job['status'], STATUS_DONE)
+        self.assertEqual(job['result'], {'title': 'novo'})
+
+    def test_purge_removes_only_old_finished_jobs(self):
+        done_id = self.queue.enqueue('key', {'symbol': 'PETR4'})['job_id']
+        job = self.queue.claim()
+        self.queue.complete(done_id, job['attempts'], {'title': 'ok'})
+        pending_id = self.queue.enqueue('key', {'symbol': 'VALE3'})['job_id']
+
+        self.assertEqual(self.queue.purge(retention=3600), 0)
+        with mock.patch('utils.job_queue.time.time', return_value=time.time() + 3601):
+            self.assertEqual(self.queue.purge(retention=3600), 1)
+        self.assertIsNone(self.queue.get(done_id))
+        self.assertIsNotNone(self.queue.get(pending_id))
+
+
+class QueueConsumerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.queue = JobQueue(os.path.join(self.directory, 'jobs.sqlite3'), retry_delay=0,
+                              visibility_timeout=0.3)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_consumer_records_results_and_failures(self):
+        handlers = {
+            'key': lambda payload: (200, {'title': payload['symbol']}),
+            'pedro': lambda payload: (500, {'error': 'falhou'}),
+        }
+        consumer = QueueConsumer(self.queue, workers=0, handlers=handlers)
+        ok_id = self.queue.enqueue('key', {'symbol': 'PETR4'})['job_id']
+        dead_id = self.queue.enqueue('pedro', {'symbol': 'PETR4'}, max_attempts=1)['job_id']
+
+        self.assertTrue(consumer.process_one())
+        self.assertTrue(consumer.process_one())
+        self.assertFalse(consumer.process_one())
+
+        self.assertEqual(self.queue.get(ok_id)['result'], {'title': 'PETR4'})
+        self.assertEqual(self.queue.get(dead_id)['status'], STATUS_DEAD)
+
+    def test_consumer_discards_the_result_after_losing_the_lease(self):
+        def slow(payload):
+            # Outro consumidor reserva o job enquanto este ainda roda (sem heartbeat)
+            time.sleep(0.5)
+            self.queue.claim()
+            return 200, {'title': 'antigo'}
+
+        consumer = QueueConsumer(self.queue, workers=0, handlers={'key': slow})
+        job_id = self.queue.enqueue('key', {'symbol': 'PETR4'})['job_id']
+        with mock.patch.object(self.queue, 'heartbeat', return_value=False):
+            self.assertTrue(consumer.process_one())
+
+        job = self.queue.get(job_id)
+        self.assertEqual(job['status'], 'running')
+        self.assertEqual(job['attempts'], 2)
+        self.assertIsNone(job['result'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes da extração de JSON das respostas do LLM (utils/json_utils.py).
+
+Uso: python -m pytest src/llm/tests
+"""
+
+import json
+import sys
+import unittest
+from pathlib import Path
+
+_LLM_ROOT = str(Path(__file__).resolve().parent.parent)
+if _LLM_ROOT not in sys.path:
+    sys.path.insert(0, _LLM_ROOT)
+
+from utils.json_utils import JSONExtractionError, JSONStreamExtractor, _loads_tolerant, extract_json
+
+
+class ExtractJSONTest(unittest.TestCase):
+
+    def _reason(self, text, required_keys=()):
+        with self.assertRaises(JSONExtractionError) as context:
+            extract_json(text, required_keys)
+        return context.exception
+
+    def test_plain_object(self):
+        self.assertEqual(extract_json('{"title": "A", "body": "B"}'), {'title': 'A', 'body': 'B'})
+
+    def test_fenced_object_with_surrounding_text(self):
+        text = 'Segue o artigo:\n```json\n{"title": "A {chave}", "tags": ["x", "y"]}\n```\nFim.'
+        self.assertEqual(extract_json(text), {'title': 'A {chave}', 'tags': ['x', 'y']})
+
+    def test_trailing_commas_are_tolerated(self):
+        text = '```json\n{"title": "A", "tags": ["x", "y",],}\n```'
+        self.assertEqual(extract_json(text), {'title': 'A', 'tags': ['x', 'y']})
+
+    def test_braces_and_escaped_quotes_inside_strings(self):
+        text = '{"body": "texto com } e \\" aspas {", "n": 1}'
+        self.assertEqual(extract_json(text), {'body': 'texto com } e " aspas {', 'n': 1})
+
+    def test_empty(self):
+        self.assertEqual(self._reason('').reason, 'empty')
+        self.assertEqual(self._reason('  \n ').reason, 'empty')
+        self.assertEqual(self._reason(None).reason, 'empty')
+
+    def test_no_json_object(self):
+        error = self._reason('Não consegui gerar o artigo.')
+        self.assertEqual(error.reason, 'no_json_object')
+        self.assertIsNone(error.position)
+
+    def test_truncated(self):
+        text = 'Resposta: {"title": "A", "body": "cortado no mei'
+        error = self._reason(text)
+        self.assertEqual(error.reason, 'truncated')
+        self.assertEqual(error.position, text.index('{'))
+        self.assertIn('dentro de string', error.detail)
+
+    def test_invalid_json(self):
+        text = '{"title": "A" "body": "B"}'
+        error = self._reason(text)
+        self.assertEqual(error.reason, 'invalid_json')
+        self.assertEqual(error.position, text.index('"body"'))
+
+    def test_invalid_first_object_falls_back_to_the_next_one(self):
+        text = '{title: A} e depois {"title": "B"}'
+        self.assertEqual(extract_json(text), {'title': 'B'})
+
+    def test_missing_keys(self):
+        error = self._reason('{"title": "A"}', ('title', 'body', 'summary'))
+        self.assertEqual(error.reason, 'missing_keys')
+        self.assertEqual(error.detail, 'body, summary')
+        self.assertTrue(isinstance(error, ValueError))
+
+
+class JSONStreamExtractorTest(unittest.TestCase):
+
+    def test_object_split_across_chunks(self):
+        text = '```json\n{"title": "A \\"citação\\"", "items": [{"n": 1}, {"n": 2}]}\n```'
+        extractor = JSONStreamExtractor()
+        # Um caractere por vez: cobre escape e aspas no limite entre partes
+        for index, char in enumerate(text):
+            complete = extractor.feed(char)
+            if complete:
+                break
+        self.assertTrue(extractor.complete)
+        self.assertEqual(index, text.rindex('}'))
+        self.assertEqual(extractor.extract(('title',)), json.loads(text[8:text.rindex('}') + 1]))
+
+    def test_incomplete_stream_is_truncated(self):
+        extractor = JSONStreamExtractor()
+        self.assertFalse(extractor.feed('{"title": "A", "items": [1, 2'))
+        with self.assertRaises(JSONExtractionError) as context:
+            extractor.extract()
+        self.assertEqual(context.exception.reason, 'truncated')
+        self.assertIn('profundidade 2', context.exception.detail)
+
+        self.assertTrue(extractor.feed(']}'))
+        self.assertEqual(extractor.extract(), {'title': 'A', 'items': [1, 2]})
+
+
+class LoadsTolerantTest(unittest.TestCase):
+
+    def test_valid_json_is_decoded_as_is(self):
+        self.assertEqual(_loads_tolerant('{"a": [1, 2]}'), {'a': [1, 2]})
+
+    def test_trailing_commas_are_removed(self):
+        self.assertEqual(_loads_tolerant('{"a": [1, 2, ], "b": {"c": 3,},}'), {'a': [1, 2], 'b': {'c': 3}})
+
+    def test_other_errors_report_the_original_position(self):
+        candidate = '{"a": 1,, "b": 2,}'
+        with self.assertRaises(json.JSONDecodeError) as context:
+            _loads_tolerant(candidate)
+        self.assertEqual(context.exception.pos, candidate.index(',,') + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes do executor de grafo de scripts/pipeline.py (run_dag).
+
+Uso: python -m pytest src/llm/tests
+"""
+
+import sys
+import threading
+import time
+import unittest
+from collections import Counter
+from pathlib import Path
+
+_LLM_ROOT = str(Path(__file__).resolve().parent.parent)
+if _LLM_ROOT not in sys.path:
+    sys.path.insert(0, _LLM_ROOT)
+
+from scripts.pipeline import Stage, run_dag
+
+
+class RunDagTest(unittest.TestCase):
+
+    def test_failed_item_skips_queued_sibling_and_is_yielded_once(self):
+        calls = Counter()
+        lock = threading.Lock()
+
+        def record(stage, item):
+            with lock:
+                calls[(stage, item)] += 1
+
+        def a(item, _):
+            record('a', item)
+            if item % 2 == 0:
+                raise ValueError('falhou')
+            return item
+
+        def b(item, _):
+            record('b', item)
+            # Mantém a fila de 'y' cheia enquanto 'a' falha
+            time.sleep(0.01)
+            return item
+
+        def c(item, results):
+            record('c', item)
+            return results['a'] + results['b']
+
+        stages = [
+            Stage('a', 'x', a),
+            Stage('b', 'y', b),
+            Stage('c', 'x', c, deps=('a', 'b')),
+        ]
+        flows = list(run_dag(range(10), stages, {'x': 4, 'y': 1}))
+
+        self.assertEqual(sorted(flow.item for flow in flows), list(range(10)))
+        for flow in flows:
+            if flow.item % 2 == 0:
+                self.assertEqual(flow.error, ('a', 'falhou'))
+                self.assertNotIn('c', flow.results)
+            else:
+                self.assertIsNone(flow.error)
+                self.assertEqual(flow.results['c'], 2 * flow.item)
+        # Nenhuma etapa roda duas vezes, e 'b' dos itens que falharam antes de
+        # sair da fila não roda
+        self.assertTrue(all(count == 1 for count in calls.values()))
+        self.assertLess(sum(1 for stage, item in calls if stage == 'b' and item % 2 == 0), 5)
+
+    def test_dependent_stage_runs_after_dependencies(self):
+        stages = [
+            Stage('a', 'x', lambda item, _: item),
+            Stage('b', 'x', lambda item, results: results['a'] * 10, deps=('a',)),
+        ]
+        flows = list(run_dag([1, 2, 3], stages, {'x': 2}, window=1))
+
+        self.assertEqual(sorted(flow.results['b'] for flow in flows), [10, 20, 30])
+        self.assertTrue(all(flow.error is None for flow in flows))
+
+
+if __name__ == '__main__':
+    unittest.main()
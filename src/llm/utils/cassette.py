@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Gravação e reprodução (cassetes) do tráfego com as APIs externas
+Em modo 'record', as respostas reais do Yahoo Finance (yfinance), da News API
+e do Gemini são gravadas num arquivo JSON versionado; em modo 'replay', as
+mesmas respostas são servidas de forma determinística, sem rede e sem as
+bibliotecas dos clientes instaladas. Serve para perfilar e medir os caminhos
+de parsing e agregação com payloads reais, de forma repetível.
+
+Os agentes não mudam: cada cliente é obtido por wrap(serviço, carregador),
+que devolve o cliente real ou o envoltório de gravação/reprodução.
+
+Configuração:
+    LLM_CASSETTE_MODE: 'record' ou 'replay' (padrão: desligado)
+    LLM_CASSETTE: arquivo do cassete (padrão: benchmarks/cassettes/default.json);
+        a gravação acrescenta interações ao arquivo existente
+    LLM_CASSETTE_STRICT: na reprodução, exige a mesma requisição também para o
+        Gemini (padrão: false; prompts com dados do momento caem na próxima
+        resposta gravada do mesmo modelo)
+    LLM_CASSETTE_REPLAY_LATENCY: reproduz a latência gravada (padrão: false)
+
+Uso:
+    LLM_CASSETTE_MODE=record python models/AgentPedro.py Petrobras
+    python benchmarks/loadtest.py --cassette benchmarks/cassettes/default.json   # reprodução sob carga
+    python utils/cassette.py [arquivo]    # resumo das interações gravadas
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    from .shared_state import state_dir
+except ImportError:
+    from shared_state import state_dir  # type: ignore
+
+try:
+    import fcntl  # type: ignore
+except ImportError:
+    fcntl = None  # type: ignore
+
+# Versão do formato do arquivo (incrementar ao mudar a estrutura das interações)
+CASSETTE_VERSION = 1
+
+DEFAULT_CASSETTE = Path(__file__).parent.parent / 'benchmarks' / 'cassettes' / 'default.json'
+
+# Parâmetros que nunca são gravados
+SECRET_PARAMS = ('apikey', 'api_key', 'key', 'token')
+
+# Serviços cuja reprodução aceita outra requisição da mesma rota (ver LLM_CASSETTE_STRICT)
+LOOSE_SERVICES = ('gemini',)
+
+
+class CassetteMiss(LookupError):
+    """A requisição não está no cassete (modo replay)."""
+
+
+class ReplayedError(Exception):
+    """Erro gravado de uma chamada real, reproduzido no modo replay."""
+
+
+def mode() -> Optional[str]:
+    """Modo atual ('record', 'replay') ou None."""
+    value = os.getenv('LLM_CASSETTE_MODE', '').strip().lower()
+    return value if value in ('record', 'replay') else None
+
+
+def replaying() -> bool:
+    return mode() == 'replay'
+
+
+def api_key(name: str) -> Optional[str]:
+    """Chave da API (variável 'name'); na reprodução, um marcador basta."""
+    return os.getenv(name) or ('cassette-replay' if replaying() else None)
+
+
+def _bool_env(name: str) -> bool:
+    return os.getenv(name, 'false').lower() in ('1', 'true', 'yes')
+
+
+def _jsonable(value: Any) -> Any:
+    return json.loads(json.dumps(value, default=str))
+
+
+def _request_key(service: str, operation: str, request: Dict[str, Any]) -> str:
+    raw = json.dumps(request, sort_keys=True, default=str, ensure_ascii=False)
+    return f"{service}:{operation}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]}"
+
+
+class Cassette:
+    """Arquivo de interações gravadas (uma lista por chave de requisição)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._by_key: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_route: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._loaded = False
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return {'version': CASSETTE_VERSION, 'interactions': []}
+        if data.get('version') != CASSETTE_VERSION:
+            raise ValueError(f"Cassete {self.path} na versão {data.get('version')}, "
+                             f"esperada {CASSETTE_VERSION} (grave novamente)")
+        return data
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        for interaction in self._read()['interactions']:
+            self._by_key.setdefault(interaction['key'], []).append(interaction)
+            self._by_route.setdefault(interaction['route'], []).append(interaction)
+        self._loaded = True
+
+    def _next(self, cursor: str, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # Gravações repetidas da mesma requisição são servidas em ordem, em ciclo
+        index = self._cursor.get(cursor, 0)
+        self._cursor[cursor] = index + 1
+        return candidates[index % len(candidates)]
+
+    def find(self, key: str, route: str, service: str) -> Dict[str, Any]:
+        """
+        Próxima interação gravada para a requisição.
+
+        Raises:
+            CassetteMiss: Se não houver gravação compatível
+        """
+        with self._lock:
+            self._load()
+            if key in self._by_key:
+                return self._next(key, self._by_key[key])
+            if service in LOOSE_SERVICES and not _bool_env('LLM_CASSETTE_STRICT') and route in self._by_route:
+                return self._next(f'route:{route}', self._by_route[route])
+        raise CassetteMiss(f"Requisição não gravada no cassete {self.path}: {key} ({route})")
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # O lock fica no diretório de estado para não sujar o diretório versionado dos cassetes
+        digest = hashlib.sha256(str(self.path.resolve()).encode('utf-8')).hexdigest()[:12]
+        with open(state_dir() / f'cassette-{digest}.lock', 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def append(self, interaction: Dict[str, Any]) -> None:
+        """Acrescenta uma interação ao arquivo (seguro entre threads e processos)."""
+        with self._lock, self._file_lock():
+            data = self._read()
+            data['version'] = CASSETTE_VERSION
+            data['updated_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+            data['interactions'].append(interaction)
+            tmp_path = self.path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(data, file, indent=1, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+
+_cassettes: Dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette() -> Cassette:
+    """Cassete configurado em LLM_CASSETTE (um objeto por arquivo e processo)."""
+    path = Path(os.getenv('LLM_CASSETTE') or DEFAULT_CASSETTE)
+    with _cassettes_lock:
+        if str(path) not in _cassettes:
+            _cassettes[str(path)] = Cassette(path)
+        return _cassettes[str(path)]
+
+
+def interact(service: str, operation: str, request: Dict[str, Any], perform: Callable[[], Any],
+             serialize: Callable[[Any], Any] = _jsonable,
+             deserialize: Callable[[Any], Any] = lambda value: value,
+             route: Optional[str] = None) -> Any:
+    """
+    Executa (e grava) ou reproduz uma chamada externa.
+
+    Args:
+        service: Serviço ('yahoo', 'news', 'gemini')
+        operation: Operação (ex: 'info', 'history', 'get', 'generate_content')
+        request: Parâmetros que identificam a requisição (sem segredos)
+        perform: Executa a chamada real
+        serialize: Converte o resultado real para JSON
+        deserialize: Reconstrói o resultado a partir do JSON gravado
+        route: Agrupamento para a reprodução tolerante (padrão: serviço:operação)
+
+    Returns:
+        Resultado real (record/desligado) ou reconstruído (replay)
+
+    Raises:
+        CassetteMiss: Em replay, se a requisição não foi gravada
+        ReplayedError: Em replay, se a chamada gravada terminou em erro
+    """
+    key = _request_key(service, operation, request)
+    route = route or f"{service}:{operation}"
+    current = mode()
+
+    if current == 'replay':
+        interaction = get_cassette().find(key, route, service)
+        if _bool_env('LLM_CASSETTE_REPLAY_LATENCY'):
+            time.sleep(interaction.get('elapsed', 0))
+        if 'error' in interaction:
+            raise ReplayedError(interaction['error'])
+        return deserialize(interaction['response'])
+
+    if current is None:
+        return perform()
+
+    started_at = time.monotonic()
+    interaction: Dict[str, Any] = {
+        'service': service, 'operation': operation, 'key': key, 'route': route,
+        'request': _jsonable(request), 'recorded_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    try:
+        result = perform()
+    except Exception as e:
+        interaction['elapsed'] = round(time.monotonic() - started_at, 4)
+        interaction['error'] = f"{type(e).__name__}: {e}"
+        get_cassette().append(interaction)
+        raise
+    interaction['elapsed'] = round(time.monotonic() - started_at, 4)
+    interaction['response'] = serialize(result)
+    get_cassette().append(interaction)
+    return result
+
+
+# Yahoo Finance (yfinance ou utils/yahoo_http.py) ------------------------------
+
+def _serialize_history(history: Any) -> Dict[str, Any]:
+    if hasattr(history, 'to_dict') and hasattr(history, 'columns'):
+        # DataFrame do pandas (yfinance)
+        return {'columns': {str(column): history[column].tolist() for column in history.columns},
+                'index': [str(value) for value in history.index]}
+    return {'columns': history.to_columns(), 'index': []}
+
+
+def _deserialize_history(data: Dict[str, Any]) -> Any:
+    try:
+        from .yahoo_http import History
+    except ImportError:
+        from yahoo_http import History  # type: ignore
+    return History(data.get('columns') or {})
+
+
+class _YahooTicker:
+    def __init__(self, client: Any, symbol: str):
+        self.symbol = symbol
+        self._ticker = client.Ticker(symbol) if client is not None else None
+        self._info: Optional[Dict[str, Any]] = None
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        if self._info is None:
+            self._info = interact('yahoo', 'info', {'symbol': self.symbol}, lambda: self._ticker.info)
+        return self._info
+
+    def history(self, period: str = '1mo', interval: str = '1d', **kwargs: Any) -> Any:
+        return interact('yahoo', 'history', {'symbol': self.symbol, 'period': period, 'interval': interval, **kwargs},
+                        lambda: self._ticker.history(period=period, interval=interval, **kwargs),
+                        _serialize_history, _deserialize_history)
+
+
+class _YahooClient:
+    def __init__(self, client: Any):
+        self._client = client
+
+    def Ticker(self, symbol: str) -> _YahooTicker:
+        return _YahooTicker(self._client, symbol)
+
+
+# News API (requests) ---------------------------------------------------------
+
+class _RecordedResponse:
+    def __init__(self, data: Dict[str, Any]):
+        self.status_code = data['status_code']
+        self._body = data.get('body')
+        self.text = data.get('text') or (json.dumps(self._body, ensure_ascii=False) if self._body is not None else '')
+
+    def json(self) -> Any:
+        if self._body is None:
+            return json.loads(self.text)
+        return self._body
+
+
+def _serialize_response(response: Any) -> Dict[str, Any]:
+    try:
+        return {'status_code': response.status_code, 'body': response.json()}
+    except ValueError:
+        return {'status_code': response.status_code, 'body': None, 'text': response.text}
+
+
+class _HTTPClient:
+    def __init__(self, client: Any, service: str):
+        self._client = client
+        self._service = service
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        public = {name: value for name, value in (params or {}).items() if name.lower() not in SECRET_PARAMS}
+        return interact(self._service, 'get', {'url': url, 'params': public},
+                        lambda: self._client.get(url, params=params, **kwargs),
+                        _serialize_response, _RecordedResponse)
+
+
+# Gemini (google.generativeai) ------------------------------------------------
+
+def _serialize_generation(response: Any) -> Dict[str, Any]:
+    try:
+        text = response.text
+    except (ValueError, AttributeError):
+        try:
+            text = ''.join(getattr(part, 'text', '') for part in response.candidates[0].content.parts)
+        except (AttributeError, IndexError, TypeError):
+            text = ''
+    try:
+        reason = response.candidates[0].finish_reason
+        finish_reason = getattr(reason, 'name', None) or str(reason)
+    except (AttributeError, IndexError, TypeError):
+        finish_reason = ''
+    metadata = getattr(response, 'usage_metadata', None)
+    return {
+        'text': text,
+        'finish_reason': finish_reason,
+        'prompt_token_count': getattr(metadata, 'prompt_token_count', 0) or 0,
+        'candidates_token_count': getattr(metadata, 'candidates_token_count', 0) or 0,
+    }
+
+
+def _deserialize_generation(data: Dict[str, Any]) -> Any:
+    part = SimpleNamespace(text=data['text'])
+    candidate = SimpleNamespace(finish_reason=SimpleNamespace(name=data.get('finish_reason') or 'STOP'),
+                                content=SimpleNamespace(parts=[part]))
+    usage = SimpleNamespace(prompt_token_count=data.get('prompt_token_count', 0),
+                            candidates_token_count=data.get('candidates_token_count', 0))
+    return SimpleNamespace(text=data['text'], candidates=[candidate], usage_metadata=usage)
+
+
+class _GenerativeModel:
+    def __init__(self, client: Any, model_name: str, **kwargs: Any):
+        self.model_name = model_name
+        self._model = client.GenerativeModel(model_name, **kwargs) if client is not None else None
+
+    def generate_content(self, contents: Any, generation_config: Any = None, **kwargs: Any) -> Any:
+        return interact('gemini', 'generate_content',
+                        {'model': self.model_name, 'contents': contents, 'generation_config': generation_config},
+                        lambda: self._model.generate_content(contents, generation_config=generation_config, **kwargs),
+                        _serialize_generation, _deserialize_generation,
+                        route=f"gemini:{self.model_name}")
+
+
+class _GenaiClient:
+    def __init__(self, client: Any):
+        self._client = client
+
+    def configure(self, **kwargs: Any) -> None:
+        if self._client is not None:
+            self._client.configure(**kwargs)
+
+    def GenerativeModel(self, model_name: str, **kwargs: Any) -> _GenerativeModel:
+        return _GenerativeModel(self._client, model_name, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        if self._client is None:
+            raise AttributeError(f"{name} indisponível na reprodução do cassete")
+        return getattr(self._client, name)
+
+
+WRAPPERS: Dict[str, Callable[[Any], Any]] = {
+    'yahoo': _YahooClient,
+    'news': lambda client: _HTTPClient(client, 'news'),
+    'gemini': _GenaiClient,
+}
+
+
+def wrap(service: str, load: Callable[[], Any]) -> Any:
+    """
+    Cliente de um serviço externo, conforme o modo do cassete.
+
+    Args:
+        service: 'yahoo' (módulo com Ticker), 'news' (módulo com get) ou 'gemini' (google.generativeai)
+        load: Importa o cliente real (não é chamado no modo replay)
+
+    Returns:
+        O cliente real (modo desligado) ou o envoltório de gravação/reprodução
+    """
+    current = mode()
+    if current is None:
+        return load()
+    return WRAPPERS[service](None if current == 'replay' else load())
+
+
+def main() -> int:
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(os.getenv('LLM_CASSETTE') or DEFAULT_CASSETTE)
+    try:
+        data = Cassette(path)._read()
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    interactions = data['interactions']
+    print(f"{path}: versão {data.get('version')}, {len(interactions)} interação(ões)")
+    routes: Dict[str, List[Dict[str, Any]]] = {}
+    for interaction in interactions:
+        routes.setdefault(interaction['route'], []).append(interaction)
+    for route, items in sorted(routes.items()):
+        errors = sum(1 for item in items if 'error' in item)
+        elapsed = sum(item.get('elapsed', 0) for item in items) / len(items)
+        print(f"  {route:<40} {len(items):>5} gravação(ões)  {errors:>3} erro(s)  {elapsed * 1000:>8.1f} ms em média")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
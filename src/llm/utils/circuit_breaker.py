@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Circuit breaker para APIs externas (Gemini, News API)
+O estado (fechado/aberto/meio-aberto), as falhas recentes e os tempos de
+resposta ficam em estado compartilhado entre processos, para que uma
+indisponibilidade detectada por uma execução valha para todas as outras.
+
+Configuração (variáveis de ambiente, com sufixo opcional por serviço,
+ex: CIRCUIT_GEMINI_RECOVERY_TIMEOUT):
+    CIRCUIT_FAILURE_THRESHOLD: falhas mínimas na janela para abrir (padrão: 5)
+    CIRCUIT_FAILURE_RATE: taxa de falhas mínima para abrir (padrão: 0.5)
+    CIRCUIT_WINDOW: janela de observação em segundos (padrão: 120)
+    CIRCUIT_RECOVERY_TIMEOUT: segundos aberto antes de testar de novo (padrão: 60)
+    CIRCUIT_HALF_OPEN_MAX_CALLS: requisições de teste no meio-aberto (padrão: 1)
+    CIRCUIT_SLOW_CALL_THRESHOLD: segundos a partir dos quais uma chamada conta como falha
+        (padrão: LLM_LATENCY_BUDGET para o gemini; 0 = desativado nos demais)
+
+Chamadas em segundo plano que o chamador abandona no prazo (run_llm com
+LLM_LATENCY_BUDGET) contam como falha no momento do abandono, via
+CallTracker: nos scripts o processo termina antes de a chamada voltar, e no
+serviço a conclusão tardia não é registrada de novo.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from .shared_state import SharedState
+except ImportError:
+    from shared_state import SharedState  # type: ignore
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Lançada quando o circuito está aberto e a chamada deve ir direto para o fallback."""
+
+    def __init__(self, name: str, retry_in: float = 0.0):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"Circuito '{name}' aberto (nova tentativa em {retry_in:.0f}s)")
+
+
+# Limite padrão de chamada lenta por serviço: o Gemini que passa do orçamento
+# de latência já foi trocado pelo fallback, então conta como falha
+DEFAULT_SLOW_CALL_THRESHOLDS = {
+    'gemini': lambda: float(os.getenv('LLM_LATENCY_BUDGET', '50') or 0),
+}
+
+_current_tracker: 'contextvars.ContextVar[Optional[CallTracker]]' = contextvars.ContextVar(
+    'circuit_call_tracker', default=None)
+
+
+class CallTracker:
+    """
+    Acompanha uma chamada em segundo plano que o chamador pode abandonar.
+
+    Só contam as chamadas protegidas em andamento no momento do abandono: uma
+    espera em outra etapa (ex: busca de notícias antes do Gemini) não é falha
+    do serviço protegido.
+
+    Uso:
+        tracker = CallTracker()
+        tracker.bind()      # na thread da chamada, antes de chamar o serviço
+        ...
+        tracker.abandon()   # no chamador, ao desistir
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active: Dict[int, Any] = {}
+        self.abandoned = False
+
+    def bind(self) -> None:
+        """Associa o acompanhamento ao contexto atual (as chamadas do breaker o consultam)."""
+        _current_tracker.set(self)
+
+    def abandon(self) -> None:
+        """Registra como falha as chamadas em andamento (uma única vez); conclusões tardias não são registradas."""
+        with self._lock:
+            if self.abandoned:
+                return
+            self.abandoned = True
+            now = time.monotonic()
+            for breaker, started_at in self._active.values():
+                breaker.record_failure(now - started_at)
+
+
+def _config(name: str, key: str, default: float) -> float:
+    value = os.getenv(f"CIRCUIT_{name.upper()}_{key}") or os.getenv(f"CIRCUIT_{key}")
+    try:
+        return float(value) if value else default
+    except ValueError:
+        return default
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker com estados fechado, aberto e meio-aberto.
+
+    - Fechado: chamadas passam; falhas e tempos são registrados na janela.
+    - Aberto: chamadas são rejeitadas imediatamente até o recovery_timeout.
+    - Meio-aberto: até half_open_max_calls chamadas de teste passam; um sucesso
+      fecha o circuito, uma falha o reabre.
+    """
+
+    def __init__(self, name: str, failure_threshold: Optional[int] = None, failure_rate: Optional[float] = None,
+                 window: Optional[float] = None, recovery_timeout: Optional[float] = None,
+                 half_open_max_calls: Optional[int] = None, slow_call_threshold: Optional[float] = None):
+        self.name = name
+        # 'is None': um 0 explícito é um valor válido (ex: slow_call_threshold=0 desativa)
+        if failure_threshold is None:
+            failure_threshold = int(_config(name, 'FAILURE_THRESHOLD', 5))
+        if failure_rate is None:
+            failure_rate = _config(name, 'FAILURE_RATE', 0.5)
+        if window is None:
+            window = _config(name, 'WINDOW', 120)
+        if recovery_timeout is None:
+            recovery_timeout = _config(name, 'RECOVERY_TIMEOUT', 60)
+        if half_open_max_calls is None:
+            half_open_max_calls = int(_config(name, 'HALF_OPEN_MAX_CALLS', 1))
+        if slow_call_threshold is None:
+            default_slow = DEFAULT_SLOW_CALL_THRESHOLDS.get(name)
+            slow_call_threshold = _config(name, 'SLOW_CALL_THRESHOLD', default_slow() if default_slow else 0)
+        self.failure_threshold = failure_threshold
+        self.failure_rate = failure_rate
+        self.window = window
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.slow_call_threshold = slow_call_threshold
+        self._state = SharedState(f"circuit_{name}")
+
+    @property
+    def state(self) -> str:
+        """Estado atual do circuito (sem efeitos colaterais)."""
+        data = self._state.read()
+        state = data.get('state', CLOSED)
+        if state == OPEN and time.time() - data.get('opened_at', 0) >= self.recovery_timeout:
+            return HALF_OPEN
+        return state
+
+    def is_open(self) -> bool:
+        """
+        Indica se as chamadas devem ir direto para o fallback.
+
+        Não consome vagas de teste do meio-aberto (use allow_request para isso).
+        """
+        return self.state == OPEN
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Resumo do estado para diagnóstico/métricas."""
+        data = self._state.read()
+        calls = data.get('calls', [])
+        failures = sum(1 for call in calls if not call[1])
+        return {
+            'name': self.name,
+            'state': self.state,
+            'calls_in_window': len(calls),
+            'failures_in_window': failures,
+            'opened_at': data.get('opened_at'),
+            'opens': data.get('opens', 0),
+        }
+
+    def allow_request(self) -> bool:
+        """
+        Verifica (e reserva) a permissão para uma chamada.
+
+        Returns:
+            bool: True se a chamada pode prosseguir
+        """
+        # Caminho rápido sem lock: circuito fechado
+        if self._state.read().get('state', CLOSED) == CLOSED:
+            return True
+
+        now = time.time()
+        with self._state.update() as data:
+            state = data.get('state', CLOSED)
+            if state == CLOSED:
+                return True
+
+            if state == OPEN:
+                if now - data.get('opened_at', 0) < self.recovery_timeout:
+                    return False
+                data['state'] = HALF_OPEN
+                data['half_open_since'] = now
+                data['half_open_in_flight'] = 0
+
+            # Meio-aberto: libera testes órfãos (processo que morreu durante o teste)
+            if now - data.get('half_open_since', now) >= self.recovery_timeout:
+                data['half_open_since'] = now
+                data['half_open_in_flight'] = 0
+
+            if data.get('half_open_in_flight', 0) >= self.half_open_max_calls:
+                return False
+            data['half_open_in_flight'] = data.get('half_open_in_flight', 0) + 1
+            return True
+
+    def retry_in(self) -> float:
+        """Segundos até o circuito aceitar uma chamada de teste."""
+        data = self._state.read()
+        if data.get('state') != OPEN:
+            return 0.0
+        return max(0.0, self.recovery_timeout - (time.time() - data.get('opened_at', 0)))
+
+    def record_success(self, duration: float = 0.0) -> None:
+        """Registra uma chamada bem-sucedida."""
+        if self.slow_call_threshold and duration >= self.slow_call_threshold:
+            self.record_failure(duration)
+            return
+        now = time.time()
+        with self._state.update() as data:
+            if data.get('state') in (HALF_OPEN, OPEN):
+                opens = data.get('opens', 0)
+                data.clear()
+                data.update({'state': CLOSED, 'opens': opens})
+            self._append_call(data, now, True, duration)
+
+    def record_failure(self, duration: float = 0.0) -> None:
+        """Registra uma chamada com falha (pode abrir o circuito)."""
+        now = time.time()
+        with self._state.update() as data:
+            state = data.get('state', CLOSED)
+            if state in (HALF_OPEN, OPEN):
+                self._open(data, now)
+                return
+
+            calls = self._append_call(data, now, False, duration)
+            failures = sum(1 for call in calls if not call[1])
+            if failures >= self.failure_threshold and failures / len(calls) >= self.failure_rate:
+                self._open(data, now)
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Executa a função protegida pelo circuito.
+
+        Raises:
+            CircuitOpenError: Se o circuito estiver aberto
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(self.name, self.retry_in())
+        tracker = _current_tracker.get()
+        started_at = time.monotonic()
+        token = object()
+        if tracker is not None:
+            with tracker._lock:
+                tracker._active[id(token)] = (self, started_at)
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self._record(tracker, token, False, time.monotonic() - started_at)
+            raise
+        self._record(tracker, token, True, time.monotonic() - started_at)
+        return result
+
+    def _record(self, tracker: Optional[CallTracker], token: object, ok: bool, duration: float) -> None:
+        if tracker is None:
+            (self.record_success if ok else self.record_failure)(duration)
+            return
+        with tracker._lock:
+            tracker._active.pop(id(token), None)
+            # Chamada abandonada pelo chamador: já contou como falha no abandono
+            if not tracker.abandoned:
+                (self.record_success if ok else self.record_failure)(duration)
+
+    def _append_call(self, data: Dict[str, Any], now: float, ok: bool, duration: float) -> list:
+        calls = [call for call in data.get('calls', []) if now - call[0] < self.window]
+        calls.append([now, ok, round(duration, 3)])
+        data['calls'] = calls
+        return calls
+
+    def _open(self, data: Dict[str, Any], now: float) -> None:
+        data['state'] = OPEN
+        data['opened_at'] = now
+        data['half_open_in_flight'] = 0
+        data['opens'] = data.get('opens', 0) + 1
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """
+    Retorna o circuit breaker do serviço (uma instância por processo).
+
+    Args:
+        name: Nome do serviço (ex: 'gemini', 'news_api')
+
+    Returns:
+        CircuitBreaker do serviço
+    """
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name)
+    return _breakers[name]
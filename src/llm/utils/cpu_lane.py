@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Faixa de CPU dos workers do serviço LLM
+Trabalho CPU-bound (renderização do artigo de template, pontuação de
+sentimento por palavras-chave) roda num pequeno pool de processos, para não
+disputar o GIL com as threads que aguardam chamadas de I/O ao Gemini e às
+APIs de notícias.
+
+Fora dos workers do serviço (scripts de linha de comando) a faixa não é
+iniciada e as funções rodam na própria thread.
+"""
+
+import os
+import sys
+from typing import Any, Callable, Optional
+
+_executor: Optional[Any] = None
+
+# Barreira dos processos em aquecimento (herdada pelos filhos no fork)
+_warm_barrier: Optional[Any] = None
+
+# Espera máxima (segundos) pelo aquecimento de todos os processos
+WARM_TIMEOUT = 30.0
+
+
+def _warm_up() -> None:
+    # Cada tarefa segura o seu processo até todos estarem de pé: nenhum fica ocioso
+    # para pegar a tarefa seguinte, e o pool precisa criar um processo por tarefa
+    from threading import BrokenBarrierError
+
+    try:
+        _warm_barrier.wait(WARM_TIMEOUT)  # type: ignore
+    except BrokenBarrierError:
+        pass
+
+
+def start(workers: int) -> bool:
+    """
+    Inicia o pool da faixa de CPU com processos filhos (fork) já aquecidos.
+
+    Deve ser chamada antes de iniciar outras threads no processo: o fork de
+    todos os filhos acontece aqui, com o processo ainda sem as threads do
+    worker. O ProcessPoolExecutor do Python 3.9 cria os processos sob demanda
+    (um por submissão sem processo ocioso); por isso são submetidas 'workers'
+    tarefas de aquecimento que só terminam quando todas estão rodando.
+
+    Args:
+        workers: Número de processos (0 desativa a faixa)
+
+    Returns:
+        bool: True se a faixa foi iniciada
+    """
+    global _executor, _warm_barrier
+    if workers <= 0 or not hasattr(os, 'fork') or _executor is not None:
+        return False
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, wait
+
+    context = multiprocessing.get_context('fork')
+    _warm_barrier = context.Barrier(workers)
+    _executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    # Todas as submissões criam os processos agora, antes das threads do worker
+    wait([_executor.submit(_warm_up) for _ in range(workers)])
+    _warm_barrier = None
+    return True
+
+
+def shutdown() -> None:
+    """Encerra o pool da faixa de CPU."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def run_cpu_bound(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Executa uma função CPU-bound na faixa de CPU (ou na thread atual, se a faixa não estiver ativa).
+
+    A função e os argumentos precisam ser serializáveis (funções de módulo, dicionários).
+    """
+    if _executor is None:
+        return func(*args, **kwargs)
+
+    from concurrent.futures.process import BrokenProcessPool
+
+    try:
+        return _executor.submit(func, *args, **kwargs).result()
+    except BrokenProcessPool as e:
+        print(f"Aviso: faixa de CPU indisponível ({e}), executando na thread atual", file=sys.stderr)
+        return func(*args, **kwargs)
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Modelos tipados dos dados trocados entre os módulos LLM
+FinancialSnapshot (saída do Agente Júlia), SentimentResult (saída do Agente
+Pedro) e ArticleDraft (saída do Agente Key / run_llm), como classes com
+__slots__: sem o __dict__ por instância, ocupam uma fração da memória do
+dicionário equivalente quando o serviço mantém milhares deles.
+
+Os contratos JSON lidos pelo PHP não mudam: from_dict guarda a ordem e o
+conjunto exatos das chaves recebidas (chaves desconhecidas vão para 'extra'),
+e to_dict/dumps reproduzem o mesmo JSON, byte a byte. Os valores aninhados
+(company_info, raw_data, ...) não são copiados.
+
+dumps usa um codificador C do módulo json criado uma única vez: o modelo vira o
+dicionário do layout pelo plano pré-calculado do layout (attrgetter/itemgetter)
+e os modelos aninhados são codificados pelo mesmo codificador, sem to_dict. O
+custo fica no nível de json.dumps sobre o dicionário original com os campos do
+contrato (montar o dicionário custa o mesmo que o JSONEncoder que json.dumps
+cria a cada chamada com ensure_ascii=False) e um pouco acima com chaves em
+'extra'; o ganho dos modelos é de memória e de acesso tipado, não de velocidade.
+
+Usado pelos handlers do serviço (service/handlers.py), que devolvem os
+resultados dos agentes como modelos, e entre as etapas do scripts/pipeline.py
+(julia → pedro → key).
+
+Uso:
+    snapshot = FinancialSnapshot.from_dict(data)
+    snapshot.price, snapshot.change_percent
+    dumps(snapshot) == json.dumps(data, ensure_ascii=False)
+"""
+
+import json
+from json.encoder import c_make_encoder, encode_basestring
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, TypeVar
+
+R = TypeVar('R', bound='_Record')
+
+# Layouts de chaves distintos guardados por classe (as instâncias compartilham a mesma tupla)
+MAX_SHARED_LAYOUTS = 512
+
+
+def _tuple_getter(factory: Callable[..., Any], names: Tuple[str, ...]) -> Callable[[Any], tuple]:
+    # attrgetter/itemgetter com um único nome devolvem o valor, não uma tupla
+    if len(names) > 1:
+        return factory(*names)
+    if names:
+        getter = factory(names[0])
+        return lambda obj: (getter(obj),)
+    return lambda obj: ()
+
+
+class _Record:
+    """
+    Base dos modelos: campos conhecidos em __slots__ e o layout das chaves.
+
+    Subclasses declaram FIELDS na ordem do contrato JSON (com as anotações
+    correspondentes) e `__slots__ = FIELDS`.
+    """
+
+    __slots__ = ('extra', '_layout')
+    FIELDS: Tuple[str, ...] = ()
+    # Campos convertidos para outro modelo em from_dict (ex: ArticleDraft.sentiment)
+    NESTED: Dict[str, Type['_Record']] = {}
+
+    extra: Dict[str, Any]
+    _layout: Tuple[str, ...]
+
+    def __init__(self, extra: Optional[Dict[str, Any]] = None, **values: Any):
+        unknown = set(values) - set(self.FIELDS)
+        if unknown:
+            raise TypeError(f"{type(self).__name__}: campos desconhecidos {sorted(unknown)}")
+        for name in self.FIELDS:
+            setattr(self, name, values.get(name))
+        self.extra = dict(extra or {})
+        # Objeto criado no código: emite os campos informados, na ordem do contrato
+        self._layout = self._share_layout(tuple(name for name in self.FIELDS if name in values) + tuple(self.extra))
+
+    @classmethod
+    def _share_layout(cls, keys: Tuple[str, ...]) -> Tuple[str, ...]:
+        layouts = cls.__dict__.get('_layouts')
+        if layouts is None:
+            layouts = {}
+            setattr(cls, '_layouts', layouts)
+        shared = layouts.get(keys)
+        if shared is None:
+            if len(layouts) >= MAX_SHARED_LAYOUTS:
+                return keys
+            shared = keys
+            layouts[keys] = (shared, cls._plan(keys))
+            return shared
+        return shared[0]
+
+    @classmethod
+    def _plan(cls, layout: Tuple[str, ...]) -> Callable[['_Record'], Optional[Dict[str, Any]]]:
+        # Monta o dicionário do layout só com attrgetter/itemgetter (em C), sem laço em Python.
+        # Devolve None quando o objeto mudou depois da criação (campo ausente preenchido ou
+        # 'extra' alterado): aí vale o caminho geral de _fields
+        known = cls._known_fields()
+        known_keys = tuple(key for key in layout if key in known)
+        extra_keys = frozenset(key for key in layout if key not in known)
+        absent = tuple(name for name in cls.FIELDS if name not in known_keys)
+        get_known = _tuple_getter(attrgetter, known_keys)
+        get_absent = _tuple_getter(attrgetter, absent)
+        unset = (None,) * len(absent)
+
+        if not extra_keys:
+            def build(record: '_Record') -> Optional[Dict[str, Any]]:
+                if record.extra or (absent and get_absent(record) != unset):
+                    return None
+                return dict(zip(layout, get_known(record)))
+            return build
+
+        in_order = _tuple_getter(itemgetter, layout)
+
+        def build_with_extra(record: '_Record') -> Optional[Dict[str, Any]]:
+            extra = record.extra
+            if extra.keys() != extra_keys or (absent and get_absent(record) != unset):
+                return None
+            merged = dict(zip(known_keys, get_known(record)))
+            merged.update(extra)
+            return dict(zip(layout, in_order(merged)))
+        return build_with_extra
+
+    @classmethod
+    def from_dict(cls: Type[R], data: Dict[str, Any]) -> R:
+        """
+        Cria o modelo a partir do dicionário do contrato JSON.
+
+        Args:
+            data: Dicionário produzido pelo agente (ou lido do JSON)
+
+        Returns:
+            Instância com os campos conhecidos, 'extra' com as demais chaves e
+            o layout original das chaves
+        """
+        record = cls.__new__(cls)
+        get = data.get
+        for name in cls.FIELDS:
+            setattr(record, name, get(name))
+        for name, model in cls.NESTED.items():
+            value = get(name)
+            if isinstance(value, dict):
+                setattr(record, name, model.from_dict(value))
+        known = cls._known_fields()
+        record.extra = {key: value for key, value in data.items() if key not in known}
+        record._layout = cls._share_layout(tuple(data))
+        return record
+
+    @classmethod
+    def _known_fields(cls) -> frozenset:
+        known = cls.__dict__.get('_known')
+        if known is None:
+            known = frozenset(cls.FIELDS)
+            setattr(cls, '_known', known)
+        return known
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Dicionário do contrato JSON, com as chaves na ordem original.
+
+        Campos preenchidos depois da criação e ausentes do layout original
+        são acrescentados ao final.
+        """
+        data = self._fields()
+        for name in self.NESTED:
+            value = data.get(name)
+            if isinstance(value, _Record):
+                data[name] = value.to_dict()
+        return data
+
+    def _fields(self) -> Dict[str, Any]:
+        # Dicionário do layout com os modelos aninhados ainda como modelos
+        layout = self._layout
+        shared = type(self).__dict__['_layouts'].get(layout)
+        if shared is not None and shared[0] is layout:
+            data = shared[1](self)
+            if data is not None:
+                return data
+        extra = self.extra
+        known = self._known_fields()
+        data = {}
+        for key in layout:
+            if key in extra:
+                data[key] = extra[key]
+            elif key in known:
+                data[key] = getattr(self, key)
+        if len(data) < len(self.FIELDS) + len(extra):
+            for key, value in extra.items():
+                if key not in data:
+                    data[key] = value
+            for name in self.FIELDS:
+                if name not in data:
+                    value = getattr(self, name)
+                    if value is not None:
+                        data[name] = value
+        return data
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        mine, theirs = self.to_dict(), other.to_dict()
+        return mine == theirs and list(mine) == list(theirs)
+
+    def __repr__(self) -> str:
+        shown = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS[:3])
+        return f"{type(self).__name__}({shown}, ...)"
+
+
+class FinancialSnapshot(_Record):
+    """Dados financeiros coletados pelo Agente Júlia (get_stock_data_by_company_name)."""
+
+    symbol: Optional[str]
+    company_name: Optional[str]
+    searched_name: Optional[str]
+    price: Optional[float]
+    previous_close: Optional[float]
+    change: Optional[float]
+    change_percent: Optional[float]
+    volume: Optional[int]
+    market_cap: Optional[int]
+    high_52w: Optional[float]
+    low_52w: Optional[float]
+    pe_ratio: Optional[float]
+    price_to_book: Optional[float]
+    peg_ratio: Optional[float]
+    enterprise_value: Optional[float]
+    enterprise_to_revenue: Optional[float]
+    enterprise_to_ebitda: Optional[float]
+    company_info: Optional[Dict[str, Any]]
+    financial_metrics: Optional[Dict[str, Any]]
+    dividend_info: Optional[Dict[str, Any]]
+    growth_metrics: Optional[Dict[str, Any]]
+    currency: Optional[str]
+    exchange: Optional[str]
+    raw_data: Optional[Dict[str, Any]]
+    collected_at: Optional[str]
+
+    FIELDS = ('symbol', 'company_name', 'searched_name', 'price', 'previous_close', 'change',
+              'change_percent', 'volume', 'market_cap', 'high_52w', 'low_52w', 'pe_ratio',
+              'price_to_book', 'peg_ratio', 'enterprise_value', 'enterprise_to_revenue',
+              'enterprise_to_ebitda', 'company_info', 'financial_metrics', 'dividend_info',
+              'growth_metrics', 'currency', 'exchange', 'raw_data', 'collected_at')
+    __slots__ = FIELDS
+
+
+class SentimentResult(_Record):
+    """Análise de sentimento do Agente Pedro (básica ou do Gemini; campos do Gemini ficam em 'extra')."""
+
+    sentiment: Optional[str]
+    sentiment_score: Optional[float]
+    news_count: Optional[int]
+    positive_count: Optional[int]
+    negative_count: Optional[int]
+    neutral_count: Optional[int]
+    trending_topics: Optional[str]
+    news_sources: Optional[List[str]]
+    raw_data: Any
+    analyzed_at: Optional[str]
+    company_name: Optional[str]
+    symbol: Optional[str]
+
+    FIELDS = ('sentiment', 'sentiment_score', 'news_count', 'positive_count', 'negative_count',
+              'neutral_count', 'trending_topics', 'news_sources', 'raw_data', 'analyzed_at',
+              'company_name', 'symbol')
+    __slots__ = FIELDS
+
+
+class ArticleDraft(_Record):
+    """Matéria do Agente Key (Gemini ou template), com o sentimento no modo fundido."""
+
+    title: Optional[str]
+    content: Optional[str]
+    is_fallback: Optional[bool]
+    fallback_reason: Optional[str]
+    sentiment: Optional[SentimentResult]
+    error: Optional[str]
+
+    FIELDS = ('title', 'content', 'is_fallback', 'fallback_reason', 'sentiment', 'error')
+    __slots__ = FIELDS
+    NESTED = {'sentiment': SentimentResult}
+
+
+def json_default(value: Any) -> Any:
+    """
+    Hook 'default' de json.dumps/msgpack.packb: converte os modelos em dicionários.
+
+    Raises:
+        TypeError: Para outros tipos não serializáveis
+    """
+    if isinstance(value, _Record):
+        return value._fields()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# Codificador C criado uma vez, com as opções de json.dumps(ensure_ascii=False). Sem
+# verificação de referência circular (markers=None): não guarda estado entre chamadas e
+# pode ser usado por várias threads; os dados vêm de JSON e não têm ciclos
+_encode = c_make_encoder(None, json_default, encode_basestring, None, ': ', ', ',
+                         False, False, True) if c_make_encoder is not None else None
+
+
+def dumps(value: Any, **kwargs: Any) -> str:
+    """
+    JSON do modelo, igual ao do dicionário original (ensure_ascii=False, como nos agentes).
+
+    Aceita também qualquer valor JSON com modelos dentro (ex: o corpo de uma
+    resposta do serviço).
+
+    Args:
+        value: Modelo (ou valor com modelos) a serializar
+        **kwargs: Opções extras do json.dumps (ex: indent=2); com elas a
+            codificação passa pelo json.dumps
+    """
+    if kwargs or _encode is None:
+        return json.dumps(value, ensure_ascii=False, default=json_default, **kwargs)
+    if isinstance(value, _Record):
+        value = value._fields()
+    elif isinstance(value, str):
+        return encode_basestring(value)
+    return ''.join(_encode(value, 0))
+
+
+def loads(model: Type[R], text: str) -> R:
+    """
+    Lê um modelo a partir do JSON do contrato.
+
+    Raises:
+        ValueError: Se o JSON não for um objeto
+    """
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError(f"{model.__name__}: o JSON deve ser um objeto")
+    return model.from_dict(data)
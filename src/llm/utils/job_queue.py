@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Fila de jobs durável do serviço LLM (SQLite)
+Jobs dos agentes (julia, pedro, key) ficam numa tabela SQLite, com prioridade,
+deduplicação de jobs idênticos pendentes, novas tentativas com backoff e
+dead-letter (status 'dead') persistidos no mesmo arquivo.
+
+Prioridades (menor = primeiro):
+    PRIORITY_INTERACTIVE (0): requisições do usuário (OrchestrationController::orchestrate)
+    PRIORITY_SCHEDULED (10): lotes agendados (agent:*)
+
+Configuração:
+    LLM_QUEUE_PATH: arquivo SQLite da fila (padrão: <LLM_STATE_DIR>/jobs.sqlite3)
+    LLM_QUEUE_MAX_ATTEMPTS: tentativas antes do dead-letter (padrão: 3)
+    LLM_QUEUE_RETRY_DELAY: atraso base das novas tentativas em segundos (padrão: 5, dobra a cada falha)
+    LLM_QUEUE_VISIBILITY_TIMEOUT: segundos sem heartbeat até um job 'running' órfão voltar à
+        fila, ou ir para o dead-letter se já esgotou as tentativas (padrão: 600)
+    LLM_QUEUE_RETENTION: segundos que jobs concluídos ('done') e do dead-letter ('dead')
+        ficam no arquivo antes de serem apagados por purge() (padrão: 604800, 7 dias; 0 mantém)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    from .data_models import dumps
+    from .shared_state import state_dir
+except ImportError:
+    from data_models import dumps  # type: ignore
+    from shared_state import state_dir  # type: ignore
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_SCHEDULED = 10
+
+PRIORITIES = {
+    'interactive': PRIORITY_INTERACTIVE,
+    'scheduled': PRIORITY_SCHEDULED,
+}
+
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_DEAD = 'dead'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    agent TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 10,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority, available_at, id);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key) WHERE status IN ('pending', 'running');
+"""
+
+# Colunas adicionadas depois da primeira versão (arquivos existentes são migrados)
+_MIGRATIONS = {
+    'heartbeat_at': 'ALTER TABLE jobs ADD COLUMN heartbeat_at REAL',
+}
+
+
+def default_queue_path() -> str:
+    """Caminho padrão do arquivo SQLite da fila."""
+    return os.getenv('LLM_QUEUE_PATH') or str(state_dir() / 'jobs.sqlite3')
+
+
+# Opções de rastreamento (utils/tracing.py) não distinguem jobs
+TRACE_KEYS = ('trace_id', 'trace', 'profile')
+
+
+def dedup_key(agent: str, payload: Dict[str, Any]) -> str:
+    """Chave de deduplicação: agente + payload em JSON canônico (sem as opções de rastreamento)."""
+    payload = {key: value for key, value in payload.items() if key not in TRACE_KEYS}
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(f"{agent}\n{canonical}".encode('utf-8')).hexdigest()
+
+
+def parse_priority(value: Any) -> int:
+    """Converte 'interactive'/'scheduled' ou um inteiro na prioridade numérica."""
+    if isinstance(value, str) and value in PRIORITIES:
+        return PRIORITIES[value]
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return PRIORITY_SCHEDULED
+
+
+class JobQueue:
+    """
+    Fila de jobs em SQLite, segura entre threads e processos.
+
+    Cada operação usa uma conexão própria da thread; as transações de
+    reserva usam BEGIN IMMEDIATE para que dois consumidores nunca peguem o
+    mesmo job.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_attempts: Optional[int] = None,
+                 retry_delay: Optional[float] = None, visibility_timeout: Optional[float] = None,
+                 retention: Optional[float] = None):
+        self.path = path or default_queue_path()
+        self.max_attempts = max_attempts or int(os.getenv('LLM_QUEUE_MAX_ATTEMPTS', '3'))
+        self.retry_delay = retry_delay if retry_delay is not None else float(os.getenv('LLM_QUEUE_RETRY_DELAY', '5'))
+        self.visibility_timeout = visibility_timeout or float(os.getenv('LLM_QUEUE_VISIBILITY_TIMEOUT', '600'))
+        self.retention = retention if retention is not None else float(os.getenv('LLM_QUEUE_RETENTION', '604800'))
+        self._local = threading.local()
+        connection = self._connect()
+        connection.executescript(_SCHEMA)
+        columns = {row['name'] for row in connection.execute('PRAGMA table_info(jobs)')}
+        for column, statement in _MIGRATIONS.items():
+            if column not in columns:
+                try:
+                    connection.execute(statement)
+                except sqlite3.OperationalError:
+                    # Outro processo migrou ao mesmo tempo
+                    pass
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def enqueue(self, agent: str, payload: Dict[str, Any], priority: Any = PRIORITY_SCHEDULED,
+                max_attempts: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Enfileira um job. Se já houver um job idêntico pendente ou em execução,
+        retorna o existente (com a prioridade elevada, se a nova for maior).
+
+        Args:
+            agent: Agente ('julia', 'pedro', 'key')
+            payload: Entrada do agente
+            priority: 'interactive', 'scheduled' ou inteiro (menor = primeiro)
+            max_attempts: Tentativas antes do dead-letter
+
+        Returns:
+            Dicionário com 'job_id', 'status' e 'deduplicated'
+        """
+        key = dedup_key(agent, payload)
+        priority = parse_priority(priority)
+        now = time.time()
+        connection = self._connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                "SELECT id, status, priority FROM jobs WHERE dedup_key = ? AND status IN ('pending', 'running')",
+                (key,)
+            ).fetchone()
+            if row is not None:
+                if priority < row['priority']:
+                    connection.execute('UPDATE jobs SET priority = ? WHERE id = ?', (priority, row['id']))
+                connection.execute('COMMIT')
+                return {'job_id': row['id'], 'status': row['status'], 'deduplicated': True}
+
+            cursor = connection.execute(
+                'INSERT INTO jobs (agent, payload, dedup_key, priority, max_attempts, created_at, available_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (agent, json.dumps(payload, ensure_ascii=False), key, priority,
+                 max_attempts or self.max_attempts, now, now)
+            )
+            connection.execute('COMMIT')
+            return {'job_id': cursor.lastrowid, 'status': STATUS_PENDING, 'deduplicated': False}
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+    def claim(self, agents: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Reserva o próximo job disponível (maior prioridade, mais antigo primeiro).
+
+        Args:
+            agents: Restringe a reserva a esses agentes (opcional)
+
+        Returns:
+            Job reservado (com 'payload' já decodificado) ou None se a fila estiver vazia
+        """
+        now = time.time()
+        connection = self._connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            # Jobs 'running' sem heartbeat (consumidor morreu ou travou): quem já esgotou
+            # as tentativas vai para o dead-letter, os demais voltam para a fila
+            expired = now - self.visibility_timeout
+            connection.execute(
+                "UPDATE jobs SET status = 'dead', error = ?, finished_at = ? "
+                "WHERE status = 'running' AND COALESCE(heartbeat_at, started_at) < ? AND attempts >= max_attempts",
+                ('Tempo de visibilidade esgotado (consumidor sem heartbeat) na última tentativa', now, expired)
+            )
+            connection.execute(
+                "UPDATE jobs SET status = 'pending', available_at = ? "
+                "WHERE status = 'running' AND COALESCE(heartbeat_at, started_at) < ?",
+                (now, expired)
+            )
+            query = "SELECT * FROM jobs WHERE status = 'pending' AND available_at <= ?"
+            params: List[Any] = [now]
+            if agents:
+                query += f" AND agent IN ({','.join('?' * len(agents))})"
+                params.extend(agents)
+            query += ' ORDER BY priority, id LIMIT 1'
+            row = connection.execute(query, params).fetchone()
+            if row is None:
+                connection.execute('COMMIT')
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, heartbeat_at = ? "
+                "WHERE id = ?",
+                (now, now, row['id'])
+            )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+        job = self._row_to_job(row)
+        job['status'] = STATUS_RUNNING
+        job['attempts'] += 1
+        return job
+
+    # As operações de quem reservou o job recebem a tentativa da reserva ('attempts'
+    # devolvido por claim) como token: se o job foi devolvido à fila por falta de
+    # heartbeat e reservado de novo, o consumidor antigo não grava mais nada
+
+    def heartbeat(self, job_id: int, attempt: int) -> bool:
+        """
+        Renova a reserva de um job em execução (adia a devolução por visibility_timeout).
+
+        Args:
+            job_id: Job reservado
+            attempt: Tentativa da reserva (job['attempts'] devolvido por claim)
+
+        Returns:
+            bool: False se a reserva foi perdida (job devolvido, reservado de novo ou concluído)
+        """
+        cursor = self._connect().execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running' AND attempts = ?",
+            (time.time(), job_id, attempt)
+        )
+        return cursor.rowcount > 0
+
+    def complete(self, job_id: int, attempt: int, result: Dict[str, Any]) -> bool:
+        """
+        Marca o job como concluído e grava o resultado.
+
+        Returns:
+            bool: False se a reserva foi perdida (o resultado é descartado)
+        """
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, finished_at = ? "
+            "WHERE id = ? AND status = 'running' AND attempts = ?",
+            (dumps(result), time.time(), job_id, attempt)
+        )
+        return cursor.rowcount > 0
+
+    def fail(self, job_id: int, attempt: int, error: str) -> Optional[str]:
+        """
+        Registra a falha do job: volta para a fila com backoff ou vai para o dead-letter.
+
+        Returns:
+            Novo status do job ('pending' ou 'dead'), ou None se a reserva foi perdida
+        """
+        now = time.time()
+        connection = self._connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = 'running' AND attempts = ?",
+                (job_id, attempt)
+            ).fetchone()
+            if row is None:
+                connection.execute('COMMIT')
+                return None
+            if row['attempts'] >= row['max_attempts']:
+                status = STATUS_DEAD
+                connection.execute(
+                    "UPDATE jobs SET status = 'dead', error = ?, finished_at = ? WHERE id = ?",
+                    (error, now, job_id)
+                )
+            else:
+                status = STATUS_PENDING
+                delay = self.retry_delay * (2 ** (row['attempts'] - 1))
+                connection.execute(
+                    "UPDATE jobs SET status = 'pending', error = ?, available_at = ? WHERE id = ?",
+                    (error, now + delay, job_id)
+                )
+            connection.execute('COMMIT')
+            return status
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Retorna o job (com resultado/erro) ou None se não existir."""
+        row = self._connect().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Lista jobs (mais recentes primeiro), opcionalmente filtrando por status."""
+        query = 'SELECT * FROM jobs'
+        params: List[Any] = []
+        if status:
+            query += ' WHERE status = ?'
+            params.append(status)
+        query += ' ORDER BY id DESC LIMIT ?'
+        params.append(limit)
+        return [self._row_to_job(row) for row in self._connect().execute(query, params).fetchall()]
+
+    def requeue(self, job_id: int) -> bool:
+        """Devolve um job do dead-letter para a fila (zera as tentativas)."""
+        try:
+            cursor = self._connect().execute(
+                "UPDATE jobs SET status = 'pending', attempts = 0, error = NULL, available_at = ? "
+                "WHERE id = ? AND status = 'dead'",
+                (time.time(), job_id)
+            )
+        except sqlite3.IntegrityError:
+            # Já existe um job idêntico pendente
+            return False
+        return cursor.rowcount > 0
+
+    def delete(self, job_id: int) -> bool:
+        """Apaga um job concluído ou do dead-letter (ex: resultado já entregue ao cliente)."""
+        cursor = self._connect().execute(
+            "DELETE FROM jobs WHERE id = ? AND status IN ('done', 'dead')", (job_id,)
+        )
+        return cursor.rowcount > 0
+
+    def purge(self, retention: Optional[float] = None) -> int:
+        """
+        Apaga os jobs 'done' e 'dead' terminados há mais de retention segundos.
+
+        Args:
+            retention: Segundos de retenção (padrão: self.retention; 0 não apaga nada)
+
+        Returns:
+            Quantidade de jobs apagados
+        """
+        retention = self.retention if retention is None else retention
+        if retention <= 0:
+            return 0
+        cursor = self._connect().execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'dead') AND finished_at < ?",
+            (time.time() - retention,)
+        )
+        return cursor.rowcount
+
+    def load(self, window: float = 300) -> Dict[str, Any]:
+        """
+        Carga atual da fila, usada para dimensionar os workers.
+
+        Args:
+            window: Janela (segundos) para a latência observada dos jobs concluídos
+
+        Returns:
+            Dicionário com 'ready' (pendentes disponíveis), 'running' e
+            'avg_latency' (segundos, ou None sem amostras)
+        """
+        now = time.time()
+        connection = self._connect()
+        ready = connection.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'pending' AND available_at <= ?", (now,)
+        ).fetchone()[0]
+        running = connection.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0]
+        avg_latency = connection.execute(
+            "SELECT AVG(finished_at - started_at) FROM jobs "
+            "WHERE status IN ('done', 'dead') AND finished_at >= ? AND started_at IS NOT NULL",
+            (now - window,)
+        ).fetchone()[0]
+        return {'ready': ready, 'running': running, 'avg_latency': avg_latency}
+
+    def depth(self) -> Dict[str, int]:
+        """Quantidade de jobs por status."""
+        rows = self._connect().execute('SELECT status, COUNT(*) AS total FROM jobs GROUP BY status').fetchall()
+        return {row['status']: row['total'] for row in rows}
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        if job.get('result') is not None:
+            job['result'] = json.loads(job['result'])
+        job.pop('dedup_key', None)
+        return job
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Utilitários para extração de JSON de respostas do LLM
+Extrator incremental único usado por todos os parsers de resposta do Gemini.
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterable, Optional
+
+# Caracteres estruturais relevantes fora de strings
+_STRUCTURAL = re.compile(r'[{}\[\]"]')
+
+# Caracteres relevantes dentro de strings (fim da string ou escape)
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+# Vírgulas finais antes de fechamento (erro comum em respostas de LLM)
+_TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+
+
+class JSONExtractionError(ValueError):
+    """
+    Erro de extração de JSON com o motivo exato da falha.
+
+    Motivos possíveis:
+        - empty: resposta vazia
+        - no_json_object: nenhum objeto JSON encontrado no texto
+        - truncated: objeto JSON iniciado mas não finalizado (resposta cortada)
+        - invalid_json: objeto encontrado, mas com sintaxe inválida
+        - missing_keys: JSON válido, mas sem as chaves obrigatórias
+    """
+
+    def __init__(self, reason: str, detail: str = '', position: Optional[int] = None):
+        self.reason = reason
+        self.detail = detail
+        self.position = position
+        message = reason if not detail else f"{reason}: {detail}"
+        if position is not None:
+            message += f" (posição {position})"
+        super().__init__(message)
+
+
+class JSONStreamExtractor:
+    """
+    Extrator incremental do primeiro objeto JSON de um texto.
+
+    O texto pode ser fornecido em partes (feed), por exemplo durante streaming
+    ou ao juntar continuações. Cercas de markdown e texto antes/depois do JSON
+    são ignorados naturalmente, pois a varredura começa no primeiro '{'.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._pos = 0
+        self._start = -1
+        self._end = -1
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def complete(self) -> bool:
+        """Indica se um objeto JSON completo (balanceado) já foi encontrado."""
+        return self._end >= 0
+
+    @property
+    def text(self) -> str:
+        """Texto acumulado até o momento."""
+        return self._buffer
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Adiciona uma parte do texto e continua a varredura de onde parou.
+
+        Args:
+            chunk: Parte do texto da resposta
+
+        Returns:
+            bool: True se um objeto completo já foi encontrado
+        """
+        if chunk:
+            self._buffer += chunk
+            self._scan()
+        return self.complete
+
+    def _reset_from(self, pos: int) -> None:
+        """Reinicia a varredura a partir de uma posição do buffer."""
+        self._pos = pos
+        self._start = -1
+        self._end = -1
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._scan()
+
+    def _scan(self) -> None:
+        buf = self._buffer
+        n = len(buf)
+        pos = self._pos
+
+        while pos < n and self._end < 0:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    pos += 1
+                    continue
+                match = _STRING_SPECIAL.search(buf, pos)
+                if match is None:
+                    pos = n
+                    break
+                pos = match.end()
+                if match.group() == '\\':
+                    if pos >= n:
+                        # Escape no fim do buffer: o próximo caractere chega no próximo feed
+                        self._escape = True
+                        break
+                    pos += 1
+                else:
+                    self._in_string = False
+                continue
+
+            if self._start < 0:
+                idx = buf.find('{', pos)
+                if idx < 0:
+                    pos = n
+                    break
+                self._start = idx
+                self._depth = 1
+                pos = idx + 1
+                continue
+
+            match = _STRUCTURAL.search(buf, pos)
+            if match is None:
+                pos = n
+                break
+            char = match.group()
+            pos = match.end()
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._end = pos
+
+        self._pos = pos
+
+    def extract(self, required_keys: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Retorna o primeiro objeto JSON válido encontrado no texto acumulado.
+
+        Se o primeiro objeto balanceado for inválido, tenta os objetos seguintes
+        antes de desistir, reportando o erro do primeiro candidato.
+
+        Args:
+            required_keys: Chaves que o objeto precisa conter
+
+        Returns:
+            Dicionário com o objeto JSON
+
+        Raises:
+            JSONExtractionError: Com o motivo exato da falha
+        """
+        if not self._buffer.strip():
+            raise JSONExtractionError('empty', 'resposta vazia')
+
+        first_error: Optional[JSONExtractionError] = None
+        while True:
+            if self._start < 0:
+                if first_error is not None:
+                    raise first_error
+                raise JSONExtractionError('no_json_object', 'nenhum "{" encontrado na resposta')
+
+            if self._end < 0:
+                if first_error is not None:
+                    raise first_error
+                state = 'dentro de string' if self._in_string else f"profundidade {self._depth}"
+                raise JSONExtractionError(
+                    'truncated',
+                    f"objeto JSON não finalizado ({state}, {len(self._buffer) - self._start} caracteres)",
+                    self._start,
+                )
+
+            candidate = self._buffer[self._start:self._end]
+            try:
+                value = _loads_tolerant(candidate)
+            except json.JSONDecodeError as e:
+                if first_error is None:
+                    first_error = JSONExtractionError(
+                        'invalid_json',
+                        f"{e.msg} (linha {e.lineno}, coluna {e.colno})",
+                        self._start + e.pos,
+                    )
+                self._reset_from(self._end)
+                continue
+
+            missing = [key for key in required_keys if key not in value]
+            if missing:
+                raise JSONExtractionError('missing_keys', ', '.join(missing), self._start)
+            return value
+
+
+def _loads_tolerant(candidate: str) -> Dict[str, Any]:
+    """
+    Decodifica o candidato; em caso de erro tenta novamente sem vírgulas finais.
+    """
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        fixed = _TRAILING_COMMA.sub(r'\1', candidate)
+        if fixed == candidate:
+            raise
+        try:
+            return json.loads(fixed)
+        except json.JSONDecodeError:
+            pass
+        # Reporta o erro original (posições relativas ao texto recebido)
+        return json.loads(candidate)
+
+
+def extract_json(text: str, required_keys: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    Extrai o primeiro objeto JSON válido de um texto (resposta do LLM).
+
+    Args:
+        text: Texto da resposta (pode conter markdown ou texto extra)
+        required_keys: Chaves que o objeto precisa conter
+
+    Returns:
+        Dicionário com o objeto JSON
+
+    Raises:
+        JSONExtractionError: Com o motivo exato da falha
+    """
+    extractor = JSONStreamExtractor()
+    extractor.feed(text or '')
+    return extractor.extract(required_keys)
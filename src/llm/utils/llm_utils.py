@@ -7,7 +7,7 @@ Funções auxiliares para formatação de dados e geração de conteúdo.
 """
 
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional
 
 def format_input_data(raw_data: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -57,6 +57,34 @@ def format_input_data(raw_data: Dict[str, Any]) -> Dict[str, Any]:
     
     return formatted
 
+# Trechos fixos do artigo de template (montados uma vez, reaproveitados em cada renderização)
+_SECTION_FINANCIAL = "### Dados Financeiros\n\n"
+_SECTION_SENTIMENT = "### Análise de Sentimento\n\n"
+_SECTION_RECOMMENDATION = "### Recomendação\n\n"
+_DISCLAIMER = "*Este conteúdo foi gerado automaticamente com auxílio de IA e requer revisão humana antes da publicação.*"
+
+_SENTIMENT_PT = {
+    'positive': 'positivo',
+    'negative': 'negativo',
+    'neutral': 'neutro'
+}
+
+_RECOMMENDATION_PREFIX = "Considerando os dados financeiros e a análise de sentimento do mercado, "
+_RECOMMENDATIONS = {
+    'positive': _RECOMMENDATION_PREFIX
+    + "há sinais positivos, mas é importante avaliar cuidadosamente antes de investir. "
+    + "Recomenda-se análise técnica e fundamentalista adicional.",
+    'negative': _RECOMMENDATION_PREFIX
+    + "há sinais de cautela. Recomenda-se aguardar mais informações ou evitar posições arriscadas. "
+    + "Consulte um analista financeiro antes de tomar decisões.",
+    'mixed': _RECOMMENDATION_PREFIX
+    + "o mercado mostra sinais mistos. Recomenda-se acompanhar de perto e buscar mais informações antes de investir.",
+}
+
+# Formatadores (pt-BR) ligados uma única vez
+_CURRENCY_FORMAT = 'R$ {:.2f}'.format
+_THOUSANDS_PT = str.maketrans(',', '.')
+
 def generate_article_content(formatted_data: Dict[str, Any]) -> Dict[str, str]:
     """
     Gera conteúdo de artigo baseado em dados formatados.
@@ -70,77 +98,90 @@ def generate_article_content(formatted_data: Dict[str, Any]) -> Dict[str, str]:
     Returns:
         Dicionário com 'title' e 'content'
     """
-    company_name = formatted_data.get('company_name', formatted_data.get('companny_name', 'N/A'))
-    symbol = formatted_data.get('symbol', 'N/A')
-    financial = formatted_data.get('financial', {})
-    sentiment = formatted_data.get('sentiment', {})
-    
-    # Gera título
-    price = financial.get('price')
-    change = financial.get('change', 0)
-    change_val = float(change) if change is not None else 0
-    trend = 'alta' if change_val > 0 else ('queda' if change_val < 0 else 'estabilidade')
+    return render_articles((formatted_data,))[0]
+
+def render_articles(records: Iterable[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    Renderiza o artigo de template de vários registros numa única passada.
     
-    title = f"Análise {company_name}: Mercado em {trend}"
-    if price is not None:
-        price_str = _format_currency(price) if isinstance(price, (int, float)) else str(price)
-        title += f" - {price_str}"
+    Usado no fallback em lote (indisponibilidade do Gemini, backfills): os
+    trechos fixos e os formatadores são preparados uma vez e cada artigo é
+    montado por junção de partes, com a mesma saída Markdown de
+    generate_article_content.
     
-    # Gera conteúdo
-    content = f"## Análise de {company_name}\n\n"
+    Args:
+        records: Dados formatados (saída de format_input_data)
+        
+    Returns:
+        Lista de dicionários com 'title' e 'content', na ordem da entrada
+        
+    Raises:
+        Exception: O mesmo erro que generate_article_content levantaria para o registro inválido
+    """
+    currency = _format_currency
+    number = _format_number
+    sentiment_pt = _SENTIMENT_PT
+    articles = []
     
-    # Seção de dados financeiros
-    if financial:
-        content += "### Dados Financeiros\n\n"
+    for formatted_data in records:
+        company_name = formatted_data.get('company_name', formatted_data.get('companny_name', 'N/A'))
+        financial = formatted_data.get('financial', {})
+        sentiment = formatted_data.get('sentiment', {})
         
-        if financial.get('price'):
-            price = financial['price']
-            price_str = _format_currency(price) if isinstance(price, (int, float)) else str(price)
-            content += f"As ações da {company_name} estão sendo negociadas a {price_str}.\n\n"
+        # Título
+        price = financial.get('price')
+        change = financial.get('change', 0)
+        change_val = float(change) if change is not None else 0
+        trend = 'alta' if change_val > 0 else ('queda' if change_val < 0 else 'estabilidade')
+        title = f"Análise {company_name}: Mercado em {trend}"
+        if price is not None:
+            title += " - " + (currency(price) if isinstance(price, (int, float)) else str(price))
         
-        if financial.get('change') and financial.get('change') != 0:
-            change_val = float(financial.get('change', 0))
-            change_percent = float(financial.get('change_percent', 0) or 0)
-            direction = "valorização" if change_val > 0 else "desvalorização"
-            content += f"A variação do dia foi de {_format_currency(abs(change_val))} ({abs(change_percent):.2f}%), "
-            content += f"representando uma {direction}.\n\n"
+        parts = [f"## Análise de {company_name}\n\n"]
+        append = parts.append
         
-        if financial.get('volume'):
-            volume = financial['volume']
-            volume_str = _format_number(volume) if isinstance(volume, (int, float)) else str(volume)
-            content += f"O volume negociado foi de {volume_str} ações.\n\n"
-    
-    # Seção de análise de sentimento
-    if sentiment:
-        content += "### Análise de Sentimento\n\n"
-        sentiment_val = sentiment.get('sentiment', 'neutral')
-        news_count = sentiment.get('news_count', 0)
-        sentiment_score = sentiment.get('sentiment_score', 0)
+        # Seção de dados financeiros
+        if financial:
+            append(_SECTION_FINANCIAL)
+            
+            if price:
+                price_str = currency(price) if isinstance(price, (int, float)) else str(price)
+                append(f"As ações da {company_name} estão sendo negociadas a {price_str}.\n\n")
+            
+            if change and change != 0:
+                change_val = float(change)
+                change_percent = float(financial.get('change_percent', 0) or 0)
+                direction = "valorização" if change_val > 0 else "desvalorização"
+                append(f"A variação do dia foi de {currency(abs(change_val))} ({abs(change_percent):.2f}%), "
+                       f"representando uma {direction}.\n\n")
+            
+            volume = financial.get('volume')
+            if volume:
+                volume_str = number(volume) if isinstance(volume, (int, float)) else str(volume)
+                append(f"O volume negociado foi de {volume_str} ações.\n\n")
         
-        sentiment_pt = {
-            'positive': 'positivo',
-            'negative': 'negativo',
-            'neutral': 'neutro'
-        }.get(sentiment_val, 'neutro')
+        # Seção de análise de sentimento
+        if sentiment:
+            append(_SECTION_SENTIMENT)
+            label = sentiment_pt.get(sentiment.get('sentiment', 'neutral'), 'neutro')
+            append(f"Com base na análise de {sentiment.get('news_count', 0)} notícias, o sentimento do mercado é "
+                   f"**{label}** com score de {sentiment.get('sentiment_score', 0):.2f}.\n\n")
+            
+            if sentiment.get('trending_topics'):
+                append(f"**Tópicos em destaque:** {sentiment['trending_topics']}\n\n")
         
-        content += f"Com base na análise de {news_count} notícias, o sentimento do mercado é **{sentiment_pt}** "
-        content += f"com score de {sentiment_score:.2f}.\n\n"
+        # Seção de recomendação e aviso legal
+        append(_SECTION_RECOMMENDATION)
+        append(_generate_recommendation(financial, sentiment))
+        append("\n\n")
+        append(_DISCLAIMER)
         
-        if sentiment.get('trending_topics'):
-            content += f"**Tópicos em destaque:** {sentiment['trending_topics']}\n\n"
-    
-    # Seção de recomendação
-    content += "### Recomendação\n\n"
-    recommendation = _generate_recommendation(financial, sentiment)
-    content += recommendation + "\n\n"
-    
-    # Aviso legal
-    content += "*Este conteúdo foi gerado automaticamente com auxílio de IA e requer revisão humana antes da publicação.*"
+        articles.append({
+            'title': title,
+            'content': ''.join(parts)
+        })
     
-    return {
-        'title': title,
-        'content': content
-    }
+    return articles
 
 def _generate_recommendation(financial: Dict, sentiment: Dict) -> str:
     """
@@ -153,28 +194,32 @@ def _generate_recommendation(financial: Dict, sentiment: Dict) -> str:
     Returns:
         String com recomendação
     """
-    recommendation = "Considerando os dados financeiros e a análise de sentimento do mercado, "
-    
     change_percent = float(financial.get('change_percent', 0) or 0)
-    sentiment_val = sentiment.get('sentiment', 'neutral')
-    
-    if sentiment_val == 'positive' and change_percent > 0:
-        recommendation += "há sinais positivos, mas é importante avaliar cuidadosamente antes de investir. "
-        recommendation += "Recomenda-se análise técnica e fundamentalista adicional."
-    elif sentiment_val == 'negative' and change_percent < 0:
-        recommendation += "há sinais de cautela. Recomenda-se aguardar mais informações ou evitar posições arriscadas. "
-        recommendation += "Consulte um analista financeiro antes de tomar decisões."
-    else:
-        recommendation += "o mercado mostra sinais mistos. Recomenda-se acompanhar de perto e buscar mais informações antes de investir."
+    return _RECOMMENDATIONS[recommendation_bucket(change_percent, sentiment.get('sentiment', 'neutral'))]
+
+def recommendation_bucket(change_percent: float, sentiment_label: str) -> str:
+    """
+    Faixa de recomendação de um símbolo (mesma regra do artigo de template).
     
-    return recommendation
+    Args:
+        change_percent: Variação do dia em %
+        sentiment_label: 'positive', 'negative' ou 'neutral'
+        
+    Returns:
+        'positive' (sentimento e preço em alta), 'negative' (ambos em queda) ou 'mixed'
+    """
+    if sentiment_label == 'positive' and change_percent > 0:
+        return 'positive'
+    if sentiment_label == 'negative' and change_percent < 0:
+        return 'negative'
+    return 'mixed'
 
 def _format_currency(value: Optional[Any]) -> str:
     """Formata valor como moeda."""
     if value is None:
         return "N/A"
     try:
-        return f"R$ {float(value):.2f}"
+        return _CURRENCY_FORMAT(float(value))
     except (ValueError, TypeError):
         return str(value)
 
@@ -192,8 +237,7 @@ def _format_number(value: Optional[Any]) -> str:
     if value is None:
         return "N/A"
     try:
-        num = float(value)
-        return f"{num:,.0f}".replace(',', '.')
+        return format(float(value), ',.0f').translate(_THOUSANDS_PT)
     except (ValueError, TypeError):
         return str(value)
 
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Contabilidade de memória dos workers do serviço LLM
+Acompanha a memória residente (RSS) e os jobs processados por worker, indica
+quando o worker deve ser reciclado e grava um dump do tracemalloc quando o
+RSS dá um salto.
+
+Configuração:
+    LLM_WORKER_MAX_JOBS: jobs por worker antes da reciclagem (padrão: 500; 0 desativa)
+    LLM_WORKER_MAX_RSS_MB: RSS máximo em MB antes da reciclagem (padrão: 512; 0 desativa)
+    LLM_RSS_SPIKE_MB: crescimento de RSS entre dois jobs que conta como salto (padrão: 64)
+    LLM_TRACEMALLOC: inicia o tracemalloc junto com o worker (padrão: false; sem ele,
+        o primeiro salto apenas liga o tracemalloc e os seguintes geram dump)
+    LLM_TRACEMALLOC_FRAMES: quadros de pilha guardados por alocação (padrão: 10)
+    LLM_MEMORY_DUMP_DIR: diretório dos dumps (padrão: <LLM_STATE_DIR>/memory_dumps)
+"""
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+try:
+    from .shared_state import state_dir
+except ImportError:
+    from shared_state import state_dir  # type: ignore
+
+try:
+    import psutil  # type: ignore
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# Linhas de estatística gravadas em cada dump
+DUMP_TOP_STATS = 30
+
+
+def rss_bytes() -> Optional[int]:
+    """
+    Memória residente atual do processo em bytes.
+
+    Usa psutil quando instalado, senão /proc/self/statm (Linux) e, por último,
+    o pico de RSS do resource (macOS/BSD).
+    """
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm', 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss é em bytes no macOS e em KB nos demais
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+class MemoryGuard:
+    """
+    Contabiliza RSS e jobs de um worker e decide sobre a reciclagem.
+    """
+
+    def __init__(self, max_jobs: Optional[int] = None, max_rss_mb: Optional[float] = None,
+                 spike_mb: Optional[float] = None, dump_dir: Optional[str] = None):
+        self.max_jobs = int(max_jobs if max_jobs is not None else _env_number('LLM_WORKER_MAX_JOBS', 500))
+        self.max_rss = (max_rss_mb if max_rss_mb is not None else _env_number('LLM_WORKER_MAX_RSS_MB', 512)) * 1024 * 1024
+        self.spike = (spike_mb if spike_mb is not None else _env_number('LLM_RSS_SPIKE_MB', 64)) * 1024 * 1024
+        self.dump_dir = Path(dump_dir or os.getenv('LLM_MEMORY_DUMP_DIR') or state_dir() / 'memory_dumps')
+        self.jobs = 0
+        self.started_at = time.time()
+        self.start_rss = rss_bytes()
+        self.last_rss = self.start_rss
+        self.peak_rss = self.start_rss
+        self.dumps = 0
+        self._baseline = None
+        # Compartilhado entre as threads do servidor e do consumidor da fila
+        self._lock = threading.Lock()
+
+        if os.getenv('LLM_TRACEMALLOC', 'false').lower() in ('1', 'true', 'yes'):
+            self._start_tracing()
+
+    def job_done(self) -> Optional[str]:
+        """
+        Registra um job concluído e mede a memória.
+
+        Returns:
+            Motivo da reciclagem ('max_jobs', 'max_rss') ou None se o worker pode continuar
+        """
+        with self._lock:
+            return self._job_done()
+
+    def _job_done(self) -> Optional[str]:
+        self.jobs += 1
+        rss = rss_bytes()
+        if rss is not None:
+            previous = self.last_rss
+            self.last_rss = rss
+            self.peak_rss = max(self.peak_rss or 0, rss)
+            if previous is not None and self.spike > 0 and rss - previous >= self.spike:
+                self._on_spike(previous, rss)
+
+        if self.max_jobs > 0 and self.jobs >= self.max_jobs:
+            return 'max_jobs'
+        if self.max_rss > 0 and rss is not None and rss >= self.max_rss:
+            return 'max_rss'
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Contabilidade atual do worker."""
+        to_mb = lambda value: round(value / 1024 / 1024, 1) if value is not None else None
+        return {
+            'pid': os.getpid(),
+            'jobs': self.jobs,
+            'rss_mb': to_mb(self.last_rss),
+            'start_rss_mb': to_mb(self.start_rss),
+            'peak_rss_mb': to_mb(self.peak_rss),
+            'dumps': self.dumps,
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+        }
+
+    def _start_tracing(self) -> None:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(int(_env_number('LLM_TRACEMALLOC_FRAMES', 10)))
+        self._baseline = tracemalloc.take_snapshot()
+
+    def _on_spike(self, before: int, after: int) -> None:
+        import tracemalloc
+        growth_mb = (after - before) / 1024 / 1024
+        if not tracemalloc.is_tracing():
+            # Sem rastreamento ainda: liga agora para que o próximo salto tenha dados
+            print(f"⚠️  Worker {os.getpid()}: RSS subiu {growth_mb:.0f} MB em um job, "
+                  f"ativando tracemalloc", file=sys.stderr)
+            self._start_tracing()
+            return
+        path = self.dump(f"salto de RSS de {growth_mb:.0f} MB ({before // 1024 // 1024} → {after // 1024 // 1024} MB)")
+        if path:
+            print(f"⚠️  Worker {os.getpid()}: RSS subiu {growth_mb:.0f} MB em um job, dump em {path}", file=sys.stderr)
+
+    def dump(self, reason: str) -> Optional[str]:
+        """
+        Grava as maiores alocações (e o crescimento desde a referência) num arquivo texto.
+
+        Args:
+            reason: Motivo registrado no cabeçalho do dump
+
+        Returns:
+            Caminho do dump ou None se o tracemalloc não estiver ativo
+        """
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            return None
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        self.dump_dir.mkdir(parents=True, exist_ok=True)
+        path = self.dump_dir / f"worker-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}-{self.dumps}.txt"
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(f"# {reason}\n# {self.stats()}\n\n")
+            if self._baseline is not None:
+                file.write("## Crescimento desde a referência\n")
+                for stat in snapshot.compare_to(self._baseline, 'lineno')[:DUMP_TOP_STATS]:
+                    file.write(f"{stat}\n")
+                file.write("\n")
+            file.write("## Maiores alocações\n")
+            for stat in snapshot.statistics('lineno')[:DUMP_TOP_STATS]:
+                file.write(f"{stat}\n")
+        self.dumps += 1
+        self._baseline = snapshot
+        return str(path)
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Métricas do serviço LLM no formato texto do Prometheus
+Contadores e histogramas em memória, por processo. Os workers do pool gravam
+periodicamente um snapshot em <LLM_STATE_DIR>/metrics/<pid>.json; o servidor
+soma os snapshots de todos os processos com os seus próprios números ao
+responder GET /metrics.
+
+Métricas principais:
+    llm_stage_duration_seconds{stage}: latência por etapa do pipeline
+        (ticker_resolution, quote_fetch, news_fetch, gemini_call, parse)
+    llm_cache_requests_total{cache,result}: consultas a caches (hit/miss)
+    llm_fallback_total{component}: vezes em que um fallback foi usado
+    llm_gemini_tokens_total{task,type}: tokens de entrada/saída do Gemini
+    llm_jobs_total{agent,result}: jobs processados pela fila
+    llm_circuit_breaker_*, llm_queue_jobs: medidas instantâneas lidas pelo servidor
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from . import tracing
+    from .shared_state import state_dir
+except ImportError:
+    import tracing  # type: ignore
+    from shared_state import state_dir  # type: ignore
+
+try:
+    import fcntl  # type: ignore
+except ImportError:
+    fcntl = None  # type: ignore
+
+# Limites (segundos) dos buckets dos histogramas de latência
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Tipo e descrição de cada métrica conhecida (as demais saem como 'untyped')
+METRICS_HELP = {
+    'llm_stage_duration_seconds': ('histogram', 'Latência de cada etapa do pipeline dos agentes'),
+    'llm_request_duration_seconds': ('histogram', 'Latência das requisições HTTP ao serviço'),
+    'llm_requests_total': ('counter', 'Requisições HTTP atendidas pelo serviço'),
+    'llm_jobs_total': ('counter', 'Jobs da fila processados'),
+    'llm_job_duration_seconds': ('histogram', 'Duração da execução dos jobs da fila'),
+    'llm_cache_requests_total': ('counter', 'Consultas a caches do serviço'),
+    'llm_cache_hit_ratio': ('gauge', 'Fração de consultas atendidas pelo cache'),
+    'llm_fallback_total': ('counter', 'Vezes em que um fallback sem LLM/API foi usado'),
+    'llm_gemini_tokens_total': ('counter', 'Tokens consumidos nas chamadas ao Gemini'),
+    'llm_circuit_breaker_state': ('gauge', 'Estado do circuit breaker (1 no estado atual)'),
+    'llm_circuit_breaker_opens_total': ('counter', 'Aberturas do circuit breaker'),
+    'llm_queue_jobs': ('gauge', 'Jobs na fila por estado'),
+    'llm_pool_workers': ('gauge', 'Processos worker ativos no pool'),
+    'llm_up': ('gauge', 'Serviço no ar'),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Labels], float] = {}
+_histograms: Dict[Tuple[str, Labels], List[float]] = {}
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def inc(name: str, value: float = 1.0, **labels: Any) -> None:
+    """
+    Incrementa um contador.
+
+    Args:
+        name: Nome da métrica (ex: 'llm_fallback_total')
+        value: Incremento
+        **labels: Rótulos da série (ex: component='article')
+    """
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + value
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    """
+    Registra uma observação num histograma (buckets DEFAULT_BUCKETS).
+
+    O histograma é guardado como [contagem por bucket..., soma, total].
+    """
+    key = (name, _labels(labels))
+    with _lock:
+        data = _histograms.get(key)
+        if data is None:
+            data = _histograms[key] = [0.0] * (len(DEFAULT_BUCKETS) + 2)
+        for index, bound in enumerate(DEFAULT_BUCKETS):
+            if value <= bound:
+                data[index] += 1
+                break
+        data[-2] += value
+        data[-1] += 1
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Mede a duração de uma etapa do pipeline em llm_stage_duration_seconds
+    (e a registra como span no trace ativo, ver utils/tracing.py).
+
+    Uso:
+        with metrics.stage('quote_fetch'):
+            info = stock.info
+    """
+    started_at = time.monotonic()
+    try:
+        with tracing.span(name):
+            yield
+    finally:
+        observe('llm_stage_duration_seconds', time.monotonic() - started_at, stage=name)
+
+
+def cache_result(cache: str, hit: bool) -> None:
+    """Registra uma consulta a um cache (hit ou miss)."""
+    inc('llm_cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+
+def snapshot() -> Dict[str, Any]:
+    """
+    Cópia serializável (JSON) das métricas deste processo.
+
+    Returns:
+        {'counters': [[nome, rótulos, valor], ...], 'histograms': [[nome, rótulos, dados], ...]}
+    """
+    with _lock:
+        return {
+            'counters': [[name, dict(labels), value] for (name, labels), value in _counters.items()],
+            'histograms': [[name, dict(labels), list(data)] for (name, labels), data in _histograms.items()],
+        }
+
+
+def merge(snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Soma vários snapshots (de processos diferentes) num só."""
+    counters: Dict[Tuple[str, Labels], float] = {}
+    histograms: Dict[Tuple[str, Labels], List[float]] = {}
+    for snap in snapshots:
+        for name, labels, value in snap.get('counters', []):
+            key = (name, _labels(labels))
+            counters[key] = counters.get(key, 0.0) + value
+        for name, labels, data in snap.get('histograms', []):
+            key = (name, _labels(labels))
+            current = histograms.get(key)
+            if current is None or len(current) != len(data):
+                histograms[key] = list(data)
+            else:
+                histograms[key] = [a + b for a, b in zip(current, data)]
+    return {
+        'counters': [[name, dict(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, dict(labels), data] for (name, labels), data in histograms.items()],
+    }
+
+
+# Snapshots entre processos ---------------------------------------------------
+
+def metrics_dir() -> Path:
+    """Diretório dos snapshots por processo (<LLM_STATE_DIR>/metrics)."""
+    path = state_dir() / 'metrics'
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@contextmanager
+def _dir_lock() -> Iterator[None]:
+    with open(metrics_dir() / '.lock', 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: Path) -> Dict[str, Any]:
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def flush() -> None:
+    """Grava o snapshot deste processo para o servidor agregar."""
+    try:
+        _write_json(metrics_dir() / f'{os.getpid()}.json', snapshot())
+    except OSError:
+        pass
+
+
+def archive(pid: int) -> None:
+    """
+    Incorpora o snapshot de um processo encerrado ao acumulado, para que os
+    contadores não diminuam quando um worker é reciclado.
+    """
+    path = metrics_dir() / f'{pid}.json'
+    if not path.exists():
+        return
+    with _dir_lock():
+        archived_path = metrics_dir() / 'archived.json'
+        _write_json(archived_path, merge([_read_json(archived_path), _read_json(path)]))
+        path.unlink()
+
+
+def reset() -> None:
+    """Apaga os snapshots de execuções anteriores (chamada na subida do serviço)."""
+    with _dir_lock():
+        for path in metrics_dir().glob('*.json'):
+            path.unlink()
+
+
+def collect() -> Dict[str, Any]:
+    """Métricas somadas deste processo, dos workers e dos workers já encerrados."""
+    own = f'{os.getpid()}.json'
+    with _dir_lock():
+        others = [_read_json(path) for path in metrics_dir().glob('*.json') if path.name != own]
+    return merge(others + [snapshot()])
+
+
+# Formato texto do Prometheus -------------------------------------------------
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(round(value, 6))
+
+
+def render(data: Dict[str, Any], gauges: Optional[List[Tuple[str, Dict[str, Any], float]]] = None) -> str:
+    """
+    Gera o texto de exposição do Prometheus.
+
+    Args:
+        data: Métricas (snapshot/merge/collect)
+        gauges: Medidas instantâneas [(nome, rótulos, valor), ...] (fila, circuitos)
+
+    Returns:
+        Texto no formato 0.0.4 do Prometheus
+    """
+    series: Dict[str, List[str]] = {}
+
+    for name, labels, value in data.get('counters', []):
+        series.setdefault(name, []).append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+    # Taxa de acerto derivada dos contadores de cache
+    caches: Dict[str, Dict[str, float]] = {}
+    for name, labels, value in data.get('counters', []):
+        if name == 'llm_cache_requests_total':
+            caches.setdefault(labels.get('cache', ''), {})[labels.get('result', '')] = value
+    for cache, results in sorted(caches.items()):
+        total = results.get('hit', 0) + results.get('miss', 0)
+        if total:
+            series.setdefault('llm_cache_hit_ratio', []).append(
+                f'llm_cache_hit_ratio{_format_labels({"cache": cache})} {_format_value(results.get("hit", 0) / total)}')
+
+    for name, labels, hist in data.get('histograms', []):
+        lines = series.setdefault(name, [])
+        cumulative = 0.0
+        for bound, count in zip(DEFAULT_BUCKETS, hist):
+            cumulative += count
+            lines.append(f'{name}_bucket{_format_labels({**labels, "le": repr(bound)})} {_format_value(cumulative)}')
+        lines.append(f'{name}_bucket{_format_labels({**labels, "le": "+Inf"})} {_format_value(hist[-1])}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(hist[-2])}')
+        lines.append(f'{name}_count{_format_labels(labels)} {_format_value(hist[-1])}')
+
+    for name, labels, value in gauges or []:
+        series.setdefault(name, []).append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+    output = []
+    for name in sorted(series):
+        kind, help_text = METRICS_HELP.get(name, ('untyped', name))
+        output.append(f'# HELP {name} {help_text}')
+        output.append(f'# TYPE {name} {kind}')
+        output.extend(sorted(series[name]) if kind != 'histogram' else series[name])
+    return '\n'.join(output) + '\n'
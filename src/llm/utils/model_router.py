@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Roteamento de modelos Gemini por tarefa
+Cada tarefa (classificação de sentimento, análise estratégica, redação de
+artigo) tem seu próprio modelo, configuração de geração e metas de latência
+e custo. A latência observada de cada rota é registrada em estado
+compartilhado entre processos; quando a meta é estourada, a tarefa passa
+para o próximo modelo (mais rápido) da lista e volta a testar o modelo
+principal depois de um tempo.
+
+Configuração:
+    GEMINI_MODEL: modelo principal de artigo e análise estratégica (padrão: gemini-1.5-flash;
+        gemini-pro/gemini-1.0 não têm saída JSON estruturada, ver GeminiService.supports_json_mode)
+    GEMINI_SENTIMENT_MODEL: modelo principal de sentimento (padrão: gemini-1.5-flash)
+    GEMINI_ROUTES: JSON com sobrescritas por tarefa, ex:
+        {"article": {"models": ["gemini-1.5-pro", "gemini-1.5-flash"], "latency_target": 20}}
+    GEMINI_ROUTES_FILE: caminho de um arquivo JSON no mesmo formato
+"""
+
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+
+try:
+    from .shared_state import SharedState
+except ImportError:
+    from shared_state import SharedState  # type: ignore
+
+# Tarefas conhecidas
+TASK_SENTIMENT = 'sentiment'
+TASK_STRATEGIC_ANALYSIS = 'strategic_analysis'
+TASK_ARTICLE = 'article'
+
+# Amostras mínimas antes de decidir por um rebaixamento
+MIN_SAMPLES = 3
+
+# Peso da última amostra na média móvel exponencial
+EWMA_ALPHA = 0.3
+
+
+def _default_routes() -> Dict[str, Dict[str, Any]]:
+    fast_model = 'gemini-1.5-flash'
+    main_model = os.getenv('GEMINI_MODEL', fast_model)
+    # Sem modelo de reserva quando o principal já é o rápido
+    models = [main_model] if main_model == fast_model else [main_model, fast_model]
+    return {
+        TASK_SENTIMENT: {
+            'models': [os.getenv('GEMINI_SENTIMENT_MODEL', fast_model)],
+            'temperature': 0.4,  # Balanceado para análise estratégica
+            'max_output_tokens': 3072,  # Mais tokens para análise detalhada
+            'latency_target': 15.0,
+            'max_cost_per_call': None,
+            'recovery_after': 600,
+        },
+        TASK_STRATEGIC_ANALYSIS: {
+            'models': list(models),
+            'temperature': 0.4,
+            'max_output_tokens': 4096,
+            'latency_target': 30.0,
+            'max_cost_per_call': None,
+            'recovery_after': 600,
+        },
+        TASK_ARTICLE: {
+            'models': list(models),
+            'temperature': 0.6,  # Reduzido para mais objetividade jornalística, mantendo criatividade
+            'max_output_tokens': 3072,  # Aumentado para permitir análises mais aprofundadas
+            'latency_target': 30.0,
+            'max_cost_per_call': None,
+            'recovery_after': 600,
+        },
+    }
+
+
+def load_routes() -> Dict[str, Dict[str, Any]]:
+    """
+    Carrega as rotas padrão com as sobrescritas de GEMINI_ROUTES/GEMINI_ROUTES_FILE.
+
+    Returns:
+        Dicionário tarefa -> configuração da rota
+    """
+    routes = _default_routes()
+    overrides: Dict[str, Any] = {}
+
+    routes_file = os.getenv('GEMINI_ROUTES_FILE')
+    if routes_file:
+        try:
+            with open(routes_file, 'r', encoding='utf-8') as file:
+                overrides.update(json.load(file))
+        except (OSError, ValueError) as e:
+            print(f"Aviso: GEMINI_ROUTES_FILE inválido ({e}), usando rotas padrão", file=sys.stderr)
+
+    routes_json = os.getenv('GEMINI_ROUTES')
+    if routes_json:
+        try:
+            overrides.update(json.loads(routes_json))
+        except ValueError as e:
+            print(f"Aviso: GEMINI_ROUTES inválido ({e}), usando rotas padrão", file=sys.stderr)
+
+    for task, override in overrides.items():
+        if isinstance(override, dict):
+            routes.setdefault(task, {}).update(override)
+    return routes
+
+
+class ModelRouter:
+    """
+    Seleciona o modelo de cada tarefa e rebaixa para modelos mais rápidos
+    quando a latência (ou o custo) observada estoura a meta da rota.
+    """
+
+    def __init__(self, routes: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.routes = routes if routes is not None else load_routes()
+        self._state = SharedState('model_routes')
+
+    def select(self, task: str) -> Dict[str, Any]:
+        """
+        Seleciona o modelo e a configuração de geração da tarefa.
+
+        Args:
+            task: Nome da tarefa ('sentiment', 'strategic_analysis', 'article')
+
+        Returns:
+            Dicionário com 'task', 'model', 'level', 'temperature',
+            'max_output_tokens' e 'latency_target'
+        """
+        route = self.routes.get(task) or self.routes[TASK_ARTICLE]
+        models = route.get('models') or [os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')]
+
+        task_state = self._state.read().get(task, {})
+        level = min(int(task_state.get('level', 0)), len(models) - 1)
+
+        # Depois de um tempo rebaixada, a tarefa volta a testar o modelo principal
+        if level > 0 and time.time() - task_state.get('downgraded_at', 0) >= route.get('recovery_after', 600):
+            level = 0
+
+        return {
+            'task': task,
+            'model': models[level],
+            'level': level,
+            'temperature': route.get('temperature', 0.6),
+            'max_output_tokens': route.get('max_output_tokens', 3072),
+            'latency_target': route.get('latency_target'),
+        }
+
+    def record(self, task: str, model: str, latency: float, output_tokens: Optional[int] = None) -> None:
+        """
+        Registra a latência (e o custo estimado) de uma chamada e decide sobre rebaixamento.
+
+        Args:
+            task: Nome da tarefa
+            model: Modelo efetivamente usado
+            latency: Latência da chamada em segundos
+            output_tokens: Tokens de saída (para estimar custo, se configurado)
+        """
+        route = self.routes.get(task) or self.routes[TASK_ARTICLE]
+        models = route.get('models') or []
+        target = route.get('latency_target')
+        max_cost = route.get('max_cost_per_call')
+        cost_per_1k = (route.get('cost_per_1k_output_tokens') or {}).get(model)
+        cost = (output_tokens or 0) / 1000 * cost_per_1k if cost_per_1k is not None else None
+
+        now = time.time()
+        with self._state.update() as data:
+            stats = data.setdefault('routes', {}).setdefault(f"{task}:{model}", {})
+            stats['samples'] = stats.get('samples', 0) + 1
+            stats['last_latency'] = round(latency, 3)
+            previous = stats.get('ewma_latency')
+            stats['ewma_latency'] = round(latency if previous is None else
+                                          EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * previous, 3)
+            if cost is not None:
+                stats['last_cost'] = round(cost, 6)
+
+            task_state = data.setdefault(task, {'level': 0})
+            level = int(task_state.get('level', 0))
+            index = models.index(model) if model in models else -1
+            if index != level:
+                recovering = 0 <= index < level and \
+                    now - task_state.get('downgraded_at', 0) >= route.get('recovery_after', 600)
+                if recovering:
+                    # Teste do modelo principal depois do período rebaixado
+                    if target is None or latency <= target:
+                        task_state['level'] = index
+                        stats['samples'] = 1
+                        stats['ewma_latency'] = round(latency, 3)
+                    else:
+                        task_state['downgraded_at'] = now
+                # Outras chamadas fora da rota atual (ex: hedge com outro modelo) só são registradas
+                return
+
+            over_latency = (target is not None and stats['samples'] >= MIN_SAMPLES
+                            and stats['ewma_latency'] > target)
+            over_cost = max_cost is not None and cost is not None and cost > max_cost
+            if (over_latency or over_cost) and level < len(models) - 1:
+                task_state['level'] = level + 1
+                task_state['downgraded_at'] = now
+                # Recomeça a média do novo modelo do zero
+                data['routes'].pop(f"{task}:{models[level + 1]}", None)
+                reason = 'latência' if over_latency else 'custo'
+                print(f"Aviso: rota '{task}' acima da meta de {reason}, "
+                      f"rebaixando de {models[level]} para {models[level + 1]}", file=sys.stderr)
+
+    def stats(self) -> Dict[str, Any]:
+        """Latências observadas por rota e nível atual de cada tarefa."""
+        return self._state.read()
+
+
+_router: Optional[ModelRouter] = None
+
+
+def get_router() -> ModelRouter:
+    """Retorna o roteador de modelos do processo."""
+    global _router
+    if _router is None:
+        _router = ModelRouter()
+    return _router
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Triagem dos símbolos acompanhados
+Carrega o snapshot mais recente (dados financeiros da Júlia + sentimento do
+Pedro) de todos os símbolos e calcula, numa única passada sobre colunas,
+pontuação, ranking e faixa de recomendação do universo inteiro. O ranking
+indica quais símbolos merecem um artigo novo do Gemini, em vez de gerar um
+artigo por símbolo.
+
+A pontuação combina, normalizados pelo universo do momento:
+    movimento: |variação %| / maior |variação %| do universo
+    sentimento: |sentiment_score| (limitado a 1)
+    cobertura: news_count / maior news_count do universo
+com os pesos de SCORE_WEIGHTS. A faixa ('positive', 'negative', 'mixed') segue
+a mesma regra da recomendação do artigo de template (llm_utils).
+
+Com numpy instalado o cálculo é vetorizado; sem ele, o mesmo cálculo roda em
+Python puro, com resultado idêntico.
+
+Uso:
+    python utils/screening.py snapshots.ndjson                 # ranking
+    python utils/screening.py snapshots.json --json            # ranking em JSON
+    python utils/screening.py snapshots.ndjson --top 10 --inputs | python scripts/run_llm.py --batch -
+
+A entrada é uma lista JSON ou NDJSON de registros no formato do run_llm
+({'company_name', 'financial', 'sentiment'}); '-' lê da entrada padrão.
+"""
+
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from .llm_utils import recommendation_bucket
+except ImportError:
+    from llm_utils import recommendation_bucket  # type: ignore
+
+try:
+    import numpy as np  # type: ignore
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Pesos de cada componente da pontuação (somam 1)
+SCORE_WEIGHTS = {'move': 0.5, 'sentiment': 0.3, 'coverage': 0.2}
+
+# Código numérico do rótulo de sentimento nas colunas
+_LABEL_CODES = {'positive': 1, 'negative': -1}
+
+
+def _number(value: Any) -> float:
+    """Valor numérico da coluna (0.0 para ausente, inválido ou não finito)."""
+    try:
+        number = float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+    return number if math.isfinite(number) else 0.0
+
+
+def _symbol(record: Dict[str, Any]) -> str:
+    financial = record.get('financial') or {}
+    return str(financial.get('action_symbol') or financial.get('symbol') or record.get('company_name') or '')
+
+
+def _snapshot_time(record: Dict[str, Any]) -> str:
+    # Datas ISO ('T') e do MySQL (' ') comparadas como texto
+    times = (record.get('updated_at'), (record.get('financial') or {}).get('collected_at'),
+             (record.get('sentiment') or {}).get('analyzed_at'))
+    return max(str(value).replace('T', ' ') for value in times if value) if any(times) else ''
+
+
+def latest_snapshots(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Mantém apenas o snapshot mais recente de cada símbolo.
+
+    A data do snapshot é a mais recente entre 'updated_at', financial.collected_at
+    e sentiment.analyzed_at; em caso de empate, vale o registro que aparece depois.
+
+    Args:
+        records: Registros no formato do run_llm
+
+    Returns:
+        Lista de snapshots, um por símbolo, na ordem da primeira aparição
+    """
+    latest: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        symbol = _symbol(record)
+        if not symbol:
+            continue
+        current = latest.get(symbol)
+        if current is None or _snapshot_time(record) >= _snapshot_time(current):
+            latest[symbol] = record
+    return list(latest.values())
+
+
+def _columns(snapshots: List[Dict[str, Any]]) -> Dict[str, list]:
+    """Colunas da triagem, na ordem dos snapshots."""
+    columns: Dict[str, list] = {'symbol': [], 'change_percent': [], 'sentiment_score': [],
+                                'label': [], 'news_count': []}
+    for snapshot in snapshots:
+        financial = snapshot.get('financial') or {}
+        sentiment = snapshot.get('sentiment') or {}
+        columns['symbol'].append(_symbol(snapshot))
+        columns['change_percent'].append(_number(financial.get('change_percent')))
+        columns['sentiment_score'].append(_number(sentiment.get('sentiment_score')))
+        columns['label'].append(_LABEL_CODES.get(sentiment.get('sentiment', 'neutral'), 0))
+        columns['news_count'].append(_number(sentiment.get('news_count')))
+    return columns
+
+
+def _score_numpy(columns: Dict[str, list]) -> Dict[str, list]:
+    change = np.asarray(columns['change_percent'], dtype=float)
+    label = np.asarray(columns['label'], dtype=np.int8)
+    news = np.asarray(columns['news_count'], dtype=float)
+
+    move = np.abs(change)
+    peak_move = move.max()
+    move = move / peak_move if peak_move > 0 else np.zeros_like(move)
+    sentiment = np.minimum(np.abs(np.asarray(columns['sentiment_score'], dtype=float)), 1.0)
+    peak_news = news.max()
+    coverage = news / peak_news if peak_news > 0 else np.zeros_like(news)
+    scores = (SCORE_WEIGHTS['move'] * move + SCORE_WEIGHTS['sentiment'] * sentiment
+              + SCORE_WEIGHTS['coverage'] * coverage)
+
+    buckets = np.where((label == 1) & (change > 0), 'positive',
+                       np.where((label == -1) & (change < 0), 'negative', 'mixed'))
+    # Maior pontuação primeiro; empates pelo símbolo
+    order = np.lexsort((np.asarray(columns['symbol']), -scores))
+    return {'score': scores.tolist(), 'bucket': buckets.tolist(), 'order': order.tolist()}
+
+
+def _score_python(columns: Dict[str, list]) -> Dict[str, list]:
+    change = columns['change_percent']
+    news = columns['news_count']
+
+    moves = [abs(value) for value in change]
+    peak_move = max(moves)
+    peak_news = max(news)
+    scores = [
+        SCORE_WEIGHTS['move'] * (move / peak_move if peak_move > 0 else 0.0)
+        + SCORE_WEIGHTS['sentiment'] * min(abs(sentiment), 1.0)
+        + SCORE_WEIGHTS['coverage'] * (count / peak_news if peak_news > 0 else 0.0)
+        for move, sentiment, count in zip(moves, columns['sentiment_score'], news)
+    ]
+    labels = {code: label for label, code in _LABEL_CODES.items()}
+    buckets = [recommendation_bucket(value, labels.get(code, 'neutral'))
+               for value, code in zip(change, columns['label'])]
+    symbols = columns['symbol']
+    order = sorted(range(len(scores)), key=lambda index: (-scores[index], symbols[index]))
+    return {'score': scores, 'bucket': buckets, 'order': order}
+
+
+def screen(records: Iterable[Dict[str, Any]], use_numpy: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """
+    Ranking do universo de símbolos a partir dos snapshots.
+
+    Args:
+        records: Registros no formato do run_llm (pode haver vários por símbolo)
+        use_numpy: Força (True) ou desliga (False) o cálculo com numpy (padrão: se instalado)
+
+    Returns:
+        Lista ordenada pela pontuação (maior primeiro), cada item com 'rank',
+        'symbol', 'company_name', 'score', 'bucket', 'change_percent',
+        'sentiment', 'sentiment_score', 'news_count' e o 'snapshot' original
+    """
+    snapshots = latest_snapshots(records)
+    if not snapshots:
+        return []
+    columns = _columns(snapshots)
+    if use_numpy is None:
+        use_numpy = NUMPY_AVAILABLE
+    if use_numpy and not NUMPY_AVAILABLE:
+        raise RuntimeError("numpy não está instalado")
+    scored = _score_numpy(columns) if use_numpy else _score_python(columns)
+
+    ranking = []
+    for rank, index in enumerate(scored['order'], 1):
+        snapshot = snapshots[index]
+        sentiment = snapshot.get('sentiment') or {}
+        ranking.append({
+            'rank': rank,
+            'symbol': columns['symbol'][index],
+            'company_name': snapshot.get('company_name') or (snapshot.get('financial') or {}).get('company_name', ''),
+            'score': round(scored['score'][index], 4),
+            'bucket': scored['bucket'][index],
+            'change_percent': columns['change_percent'][index],
+            'sentiment': sentiment.get('sentiment', 'neutral'),
+            'sentiment_score': columns['sentiment_score'][index],
+            'news_count': int(columns['news_count'][index]),
+            'snapshot': snapshot,
+        })
+    return ranking
+
+
+def select(ranking: List[Dict[str, Any]], top: Optional[int] = None, min_score: float = 0.0,
+           buckets: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Símbolos que merecem um artigo novo.
+
+    Args:
+        ranking: Resultado de screen()
+        top: Máximo de símbolos (padrão: sem limite)
+        min_score: Pontuação mínima
+        buckets: Faixas aceitas (padrão: todas)
+
+    Returns:
+        Itens do ranking selecionados, na ordem do ranking
+    """
+    allowed = set(buckets) if buckets else None
+    chosen = [item for item in ranking
+              if item['score'] >= min_score and (allowed is None or item['bucket'] in allowed)]
+    return chosen[:top] if top is not None else chosen
+
+
+def load_records(source: str) -> List[Dict[str, Any]]:
+    """
+    Lê os snapshots de um arquivo (ou '-' para a entrada padrão), em lista JSON ou NDJSON.
+
+    Raises:
+        ValueError: Se o conteúdo não for JSON válido
+    """
+    text = sys.stdin.read() if source == '-' else Path(source).read_text(encoding='utf-8')
+    stripped = text.lstrip()
+    try:
+        if stripped.startswith('['):
+            return json.loads(stripped)
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Snapshots inválidos em {source}: {e}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Triagem e ranking dos símbolos acompanhados')
+    parser.add_argument('source', help="Snapshots (lista JSON ou NDJSON; '-' para a entrada padrão)")
+    parser.add_argument('--top', type=int, help='Seleciona no máximo N símbolos')
+    parser.add_argument('--min-score', type=float, default=0.0, help='Pontuação mínima para a seleção')
+    parser.add_argument('--bucket', action='append', choices=['positive', 'negative', 'mixed'],
+                        help='Seleciona apenas estas faixas (pode repetir)')
+    parser.add_argument('--json', action='store_true', help='Imprime a seleção em JSON')
+    parser.add_argument('--inputs', action='store_true',
+                        help='Imprime a seleção como entrada NDJSON do run_llm --batch')
+    args = parser.parse_args()
+
+    try:
+        records = load_records(args.source)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    chosen = select(screen(records), args.top, args.min_score, args.bucket)
+
+    if args.inputs:
+        for item in chosen:
+            print(json.dumps({**item['snapshot'], 'request_id': item['symbol']}, ensure_ascii=False))
+    elif args.json:
+        print(json.dumps([{key: value for key, value in item.items() if key != 'snapshot'} for item in chosen],
+                         indent=2, ensure_ascii=False))
+    else:
+        print(f"{len(chosen)} símbolo(s) selecionado(s) (cálculo: {'numpy' if NUMPY_AVAILABLE else 'python'})",
+              file=sys.stderr)
+        for item in chosen:
+            print(f"{item['rank']:>4}  {item['symbol']:<10} {item['score']:>7.4f}  {item['bucket']:<8} "
+                  f"{item['change_percent']:>+8.2f}%  {item['sentiment']:<8} {item['news_count']:>5} notícia(s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cliente do serviço LLM
+Permite que os scripts de linha de comando funcionem como clientes finos do
+serviço em execução contínua (main.py), quando LLM_SERVICE_URL está definido.
+
+Exemplos de LLM_SERVICE_URL:
+    http://llm:8001
+    unix:///tmp/llm_service.sock
+"""
+
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+
+class ServiceUnavailable(Exception):
+    """O serviço não está configurado ou não respondeu (o chamador deve executar localmente)."""
+
+
+def service_url() -> Optional[str]:
+    """URL do serviço LLM (LLM_SERVICE_URL), ou None se não configurado."""
+    return os.getenv('LLM_SERVICE_URL') or None
+
+
+def call_service(endpoint: str, payload: Dict[str, Any], timeout: Optional[float] = None,
+                 url: Optional[str] = None) -> Tuple[int, Dict[str, Any]]:
+    """
+    Chama um endpoint do serviço LLM.
+
+    Args:
+        endpoint: Nome do endpoint ('julia', 'pedro', 'key')
+        payload: Corpo JSON da requisição
+        timeout: Timeout em segundos (padrão: LLM_SERVICE_TIMEOUT ou 120)
+        url: URL do serviço (padrão: LLM_SERVICE_URL)
+
+    Returns:
+        Tupla (status HTTP, corpo JSON)
+
+    Raises:
+        ServiceUnavailable: Se o serviço não estiver configurado ou não aceitar a conexão
+    """
+    url = url or service_url()
+    if not url:
+        raise ServiceUnavailable('LLM_SERVICE_URL não configurado')
+    if timeout is None:
+        timeout = float(os.getenv('LLM_SERVICE_TIMEOUT', '120'))
+
+    # http.client só é importado quando o serviço está configurado (custo na inicialização)
+    import http.client
+    import socket
+    from urllib.parse import urlparse
+
+    class UnixHTTPConnection(http.client.HTTPConnection):
+        def connect(self) -> None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(parsed.path)
+            self.sock = sock
+
+    parsed = urlparse(url)
+    connection: http.client.HTTPConnection
+    if parsed.scheme == 'unix':
+        connection = UnixHTTPConnection('localhost', timeout=timeout)
+        base_path = ''
+    elif parsed.scheme in ('http', ''):
+        connection = http.client.HTTPConnection(parsed.hostname or 'localhost', parsed.port or 8001, timeout=timeout)
+        base_path = parsed.path.rstrip('/')
+    else:
+        raise ServiceUnavailable(f'Esquema não suportado em LLM_SERVICE_URL: {parsed.scheme}')
+
+    try:
+        connection.connect()
+    except OSError as e:
+        connection.close()
+        raise ServiceUnavailable(f'Serviço LLM indisponível em {url}: {e}')
+
+    # Conectado: falhas daqui em diante viram erro (502) em vez de reexecutar localmente,
+    # para não duplicar uma chamada que o serviço pode ainda estar processando
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    try:
+        headers = {'Content-Type': 'application/json; charset=utf-8'}
+        # Propaga o trace do chamador (PHP -> script -> serviço)
+        trace_id = os.getenv('LLM_TRACE_ID')
+        if trace_id:
+            headers['X-Trace-Id'] = trace_id
+        connection.request('POST', f"{base_path}/{endpoint}", body=body, headers=headers)
+        response = connection.getresponse()
+        raw = response.read()
+        return response.status, json.loads(raw.decode('utf-8'))
+    except (OSError, http.client.HTTPException) as e:
+        return 502, {'error': f'Falha na comunicação com o serviço LLM: {e}'}
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        return 502, {'error': f'Resposta inválida do serviço LLM: {e}'}
+    finally:
+        connection.close()
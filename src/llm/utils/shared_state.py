@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Estado compartilhado entre processos
+Pequenos arquivos JSON protegidos por lock de arquivo, usados para que cada
+execução dos scripts (processos independentes) enxergue o mesmo estado.
+"""
+
+import json
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+try:
+    import fcntl  # type: ignore
+except ImportError:
+    # Windows: sem lock entre processos (melhor esforço)
+    fcntl = None  # type: ignore
+
+
+def state_dir() -> Path:
+    """
+    Diretório onde o estado compartilhado é armazenado.
+
+    Configurável via LLM_STATE_DIR (padrão: <tmp>/llm_state).
+
+    Returns:
+        Path do diretório (criado se não existir)
+    """
+    import tempfile  # importado sob demanda (custo na inicialização dos scripts)
+    path = Path(os.getenv('LLM_STATE_DIR') or Path(tempfile.gettempdir()) / 'llm_state')
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+class SharedState:
+    """
+    Documento JSON compartilhado entre processos.
+
+    Leituras simples não usam lock; atualizações usam lock exclusivo e
+    escrita atômica (arquivo temporário + rename).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.path = state_dir() / f"{name}.json"
+        self._lock_path = state_dir() / f"{name}.lock"
+
+    def read(self) -> Dict[str, Any]:
+        """
+        Lê o estado atual.
+
+        Returns:
+            Dicionário com o estado (vazio se não existir ou estiver corrompido)
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    @contextmanager
+    def update(self) -> Iterator[Dict[str, Any]]:
+        """
+        Abre o estado para atualização sob lock exclusivo.
+
+        Uso:
+            with state.update() as data:
+                data['count'] = data.get('count', 0) + 1
+        """
+        with open(self._lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                data = self.read()
+                yield data
+                self._write(data)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _write(self, data: Dict[str, Any]) -> None:
+        try:
+            import tempfile
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.path.parent), prefix=f".{self.name}.", suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(data, file, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Aviso: não foi possível salvar estado compartilhado {self.name}: {e}", file=sys.stderr)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Single-flight: chamadas idênticas simultâneas compartilham uma execução
+Quando o agendador e um usuário (ou dois revisores) disparam o mesmo fluxo ao
+mesmo tempo, as mesmas chamadas ao Yahoo Finance, à News API e ao Gemini
+rodariam em dobro. Com @shared('nome'), chamadas com os mesmos argumentos
+(a impressão digital da requisição) que chegam enquanto uma delas está em
+andamento esperam por ela e recebem o mesmo resultado:
+
+- No mesmo processo (threads do serviço): um Future por impressão digital.
+- Entre processos (scripts disparados pelo PHP, workers do pool): um lock de
+  arquivo em <LLM_STATE_DIR>/single_flight/<nome>-<hash>.lock. Quem obtém o
+  lock executa e grava o resultado ao lado; quem esperou pelo lock lê esse
+  resultado, se ele terminou depois da sua chegada (não é um cache: quem chega
+  depois do fim executa de novo).
+
+Exceções são repassadas às threads que esperavam no mesmo processo; entre
+processos, uma falha não grava resultado e o próximo da fila executa. Quem
+espera pelo lock além de LLM_SINGLE_FLIGHT_WAIT recebe SingleFlightTimeout em
+vez de repetir a chamada: o chamador (ex: o PHP, que encerra o script em
+LLM_TIMEOUT) já desistiu dela.
+
+Configuração:
+    LLM_SINGLE_FLIGHT: ativa o compartilhamento (padrão: true)
+    LLM_SINGLE_FLIGHT_WAIT: segundos máximos esperando outro processo (padrão:
+        LLM_TIMEOUT do PHP, 60, menos 5s para a resposta chegar antes do encerramento)
+    LLM_SINGLE_FLIGHT_RETENTION: segundos que os arquivos de resultado ficam
+        no diretório (padrão: 300)
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+try:
+    from . import metrics
+    from .shared_state import state_dir
+except ImportError:
+    import metrics  # type: ignore
+    from shared_state import state_dir  # type: ignore
+
+try:
+    import fcntl  # type: ignore
+except ImportError:
+    # Windows: só o compartilhamento dentro do processo
+    fcntl = None  # type: ignore
+
+ENABLED = os.getenv('LLM_SINGLE_FLIGHT', 'true').lower() in ('1', 'true', 'yes')
+# Folga (segundos) entre o fim da espera e o LLM_TIMEOUT de quem disparou o script
+_WAIT_MARGIN = 5.0
+WAIT_SECONDS = float(os.getenv('LLM_SINGLE_FLIGHT_WAIT')
+                     or max(1.0, float(os.getenv('LLM_TIMEOUT', '60')) - _WAIT_MARGIN))
+RETENTION_SECONDS = float(os.getenv('LLM_SINGLE_FLIGHT_RETENTION', '300'))
+
+# Campos por requisição que não mudam o resultado (não entram na impressão digital)
+IGNORED_KEYS = frozenset(('request_id', 'trace_id', 'trace', 'profile'))
+
+_POLL_SECONDS = 0.05
+_SWEEP_INTERVAL = 60.0
+
+_lock = threading.Lock()
+_in_flight: Dict[str, 'Future'] = {}
+_last_sweep = 0.0
+
+
+class SingleFlightTimeout(TimeoutError):
+    """Outro processo não terminou a mesma chamada dentro de WAIT_SECONDS."""
+
+    def __init__(self, key: str, waited: float):
+        self.key = key
+        self.waited = waited
+        super().__init__(f"Chamada idêntica em outro processo não terminou em {waited:g}s ({key})")
+
+
+def _strip(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: item for key, item in value.items() if key not in IGNORED_KEYS}
+    return value
+
+
+def fingerprint(name: str, *args: Any, **kwargs: Any) -> str:
+    """
+    Impressão digital de uma chamada: nome + argumentos em JSON canônico.
+
+    Args:
+        name: Nome da operação (ex: 'julia')
+        *args, **kwargs: Argumentos da chamada (dicionários de entrada sem os
+            campos de IGNORED_KEYS)
+
+    Returns:
+        '<nome>-<sha256 abreviado>'
+    """
+    import hashlib  # importado sob demanda (custo na inicialização dos scripts)
+
+    canonical = json.dumps([[_strip(arg) for arg in args], {key: _strip(value) for key, value in kwargs.items()}],
+                           sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return f"{name}-{hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]}"
+
+
+def run(key: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Executa func(*args, **kwargs) uma única vez por impressão digital em andamento.
+
+    Args:
+        key: Impressão digital da chamada (ver fingerprint)
+        func: Função a executar (o resultado deve ser serializável em JSON
+            para ser compartilhado entre processos)
+
+    Returns:
+        O resultado da execução (cópia para quem apenas esperou)
+
+    Raises:
+        SingleFlightTimeout: Se outro processo segurou a chamada além de WAIT_SECONDS
+    """
+    import copy
+    from concurrent.futures import Future
+
+    name = key.rsplit('-', 1)[0]
+    with _lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = _in_flight[key] = Future()
+
+    if not leader:
+        metrics.inc('llm_single_flight_total', operation=name, role='follower')
+        return copy.deepcopy(future.result())
+
+    try:
+        result = _run_across_processes(key, name, func, args, kwargs)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        # Quem esperou recebe cópias de um retrato do resultado (o chamador pode alterar o seu)
+        future.set_result(copy.deepcopy(result))
+        return result
+    finally:
+        with _lock:
+            _in_flight.pop(key, None)
+
+
+def shared(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorador: chamadas simultâneas com os mesmos argumentos compartilham o resultado.
+
+    Uso:
+        @single_flight.shared('news')
+        def search_news(company_name, limit=20): ...
+    """
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not ENABLED:
+                return func(*args, **kwargs)
+            return run(fingerprint(name, *args, **kwargs), func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _run_across_processes(key: str, name: str, func: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+    if fcntl is None:
+        metrics.inc('llm_single_flight_total', operation=name, role='leader')
+        return func(*args, **kwargs)
+
+    try:
+        directory = state_dir() / 'single_flight'
+        directory.mkdir(exist_ok=True)
+        lock_file = open(directory / f"{key}.lock", 'a')
+    except OSError as e:
+        print(f"Aviso: single-flight entre processos indisponível ({e})", file=sys.stderr)
+        return func(*args, **kwargs)
+
+    result_path = directory / f"{key}.json"
+    arrived_at = time.time()
+    with lock_file:
+        locked = _acquire(lock_file, key, WAIT_SECONDS)
+        try:
+            if locked:
+                _touch(lock_file)
+                # Outro processo terminou enquanto esperávamos: usa o resultado dele
+                shared_result = _read_result(result_path, arrived_at)
+                if shared_result is not None:
+                    metrics.inc('llm_single_flight_total', operation=name, role='process_follower')
+                    return shared_result['result']
+
+            metrics.inc('llm_single_flight_total', operation=name, role='leader')
+            result = func(*args, **kwargs)
+            if locked:
+                _write_result(result_path, result)
+            return result
+        finally:
+            if locked:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                _sweep(directory)
+
+
+def _acquire(lock_file: Any, key: str, wait: float) -> bool:
+    """
+    Lock exclusivo com espera limitada.
+
+    Returns:
+        bool: False se o sistema de arquivos não suporta o lock (executa sem compartilhar)
+
+    Raises:
+        SingleFlightTimeout: Se outro processo não terminar dentro de wait segundos
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                metrics.inc('llm_single_flight_total', operation=key.rsplit('-', 1)[0], role='timeout')
+                raise SingleFlightTimeout(key, wait)
+            time.sleep(_POLL_SECONDS)
+        except OSError:
+            return False
+
+
+def _touch(lock_file: Any) -> None:
+    # Lock em uso não é removido pela limpeza (que olha a data de modificação)
+    try:
+        os.utime(lock_file.fileno())
+    except (OSError, NotImplementedError):
+        pass
+
+
+def _read_result(path: Path, arrived_at: float) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or float(data.get('finished_at', 0)) < arrived_at:
+        return None
+    return data
+
+
+def _write_result(path: Path, result: Any) -> None:
+    try:
+        payload = json.dumps({'finished_at': time.time(), 'result': result}, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(payload)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Aviso: não foi possível gravar resultado compartilhado: {e}", file=sys.stderr)
+
+
+def _sweep(directory: Path) -> None:
+    """Remove resultados e locks parados há mais de RETENTION_SECONDS (no máximo a cada minuto)."""
+    global _last_sweep
+    now = time.time()
+    if now - _last_sweep < _SWEEP_INTERVAL:
+        return
+    _last_sweep = now
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if now - entry.stat().st_mtime > RETENTION_SECONDS:
+                os.unlink(entry.path)
+        except OSError:
+            pass
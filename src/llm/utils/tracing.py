@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Rastreamento por requisição (spans) e profiling opcional
+Cada requisição (HTTP, job da fila ou execução de linha de comando) abre um
+trace; as etapas dos agentes abrem spans dentro dele. Ao final o trace vira
+uma cascata JSON (início e duração de cada span relativos ao início) gravada
+em <LLM_STATE_DIR>/traces/<trace_id>.json.
+
+O trace_id vem do PHP (cabeçalho X-Trace-Id, campo "trace_id" da entrada ou
+variável LLM_TRACE_ID nos scripts) para casar os logs dos dois lados.
+
+Sem trace ativo, span() não registra nada (custo de uma consulta a contextvar).
+
+Configuração:
+    LLM_TRACE: grava todos os traces (padrão: false; só os lentos são gravados)
+    LLM_TRACE_SLOW_SECONDS: duração a partir da qual o trace é gravado (padrão: 10)
+    LLM_TRACE_DIR: diretório dos traces (padrão: <LLM_STATE_DIR>/traces)
+    LLM_TRACE_MAX_FILES: traces mantidos no diretório (padrão: 500)
+    LLM_PROFILE: faz profiling de toda requisição/execução (padrão: false; por
+        requisição, use "profile": true na entrada)
+    LLM_PROFILER: 'cprofile' (padrão) ou 'pyinstrument' (amostragem, se instalado)
+
+Uso:
+    python utils/tracing.py <trace_id>   # imprime a cascata de um trace gravado
+"""
+
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    from .shared_state import state_dir
+except ImportError:
+    from shared_state import state_dir  # type: ignore
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('llm_trace', default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar('llm_span', default=None)
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, 'false').lower() in ('1', 'true', 'yes')
+
+
+def traces_dir() -> Path:
+    """Diretório onde os traces e perfis são gravados."""
+    path = Path(os.getenv('LLM_TRACE_DIR') or state_dir() / 'traces')
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+class Span:
+    """Trecho cronometrado de um trace."""
+
+    def __init__(self, trace: 'Trace', name: str, parent_id: Optional[int], attrs: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.id = trace._next_id()
+        self.parent_id = parent_id
+        self.attrs = attrs
+        self.thread = threading.current_thread().name
+        self.start = time.monotonic()
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attrs: Any) -> None:
+        """Adiciona atributos ao span (ex: modelo usado, tokens)."""
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.end if self.end is not None else time.monotonic()
+        data = {
+            'id': self.id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ms': round((self.start - self.trace.start) * 1000, 2),
+            'duration_ms': round((end - self.start) * 1000, 2),
+            'thread': self.thread,
+        }
+        if self.attrs:
+            data['attrs'] = self.attrs
+        if self.error:
+            data['error'] = self.error
+        if self.end is None:
+            data['unfinished'] = True
+        return data
+
+
+class Trace:
+    """Conjunto de spans de uma requisição."""
+
+    def __init__(self, name: str, trace_id: Optional[str] = None, force_export: bool = False):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.name = name
+        self.force_export = force_export
+        self.started_at = time.time()
+        self.start = time.monotonic()
+        self.duration: Optional[float] = None
+        self.spans: List[Span] = []
+        self.profile_path: Optional[str] = None
+        self._lock = threading.Lock()
+        self._ids = 0
+
+    def _next_id(self) -> int:
+        with self._lock:
+            self._ids += 1
+            return self._ids
+
+    def _add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Cascata JSON do trace (spans ordenados pelo início)."""
+        with self._lock:
+            spans = [span.to_dict() for span in self.spans]
+        data = {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'started_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at)),
+            'duration_ms': round((self.duration if self.duration is not None else time.monotonic() - self.start) * 1000, 2),
+            'spans': sorted(spans, key=lambda span: (span['start_ms'], span['id'])),
+        }
+        if self.profile_path:
+            data['profile'] = self.profile_path
+        return data
+
+    def export(self) -> Optional[str]:
+        """Grava a cascata em traces_dir(); retorna o caminho do arquivo."""
+        try:
+            directory = traces_dir()
+            path = directory / f"{_safe_id(self.trace_id)}.json"
+            tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(self.to_dict(), file, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+            _prune(directory)
+            return str(path)
+        except OSError as e:
+            print(f"Aviso: não foi possível gravar o trace {self.trace_id}: {e}", file=sys.stderr)
+            return None
+
+
+def _safe_id(trace_id: str) -> str:
+    """trace_id seguro para nome de arquivo (vem de fora: PHP/entrada)."""
+    cleaned = ''.join(c for c in str(trace_id) if c.isalnum() or c in '-_.')[:128].lstrip('.')
+    return cleaned or uuid.uuid4().hex
+
+
+def _prune(directory: Path) -> None:
+    try:
+        limit = int(os.getenv('LLM_TRACE_MAX_FILES', '500'))
+    except ValueError:
+        limit = 500
+    files = sorted(directory.glob('*.json'), key=lambda path: path.stat().st_mtime)
+    for path in files[:max(0, len(files) - limit)]:
+        for related in (path, path.with_suffix('.prof'), path.with_suffix('.prof.txt')):
+            try:
+                related.unlink()
+            except OSError:
+                pass
+
+
+def current_trace() -> Optional[Trace]:
+    """Trace ativo no contexto atual (ou None)."""
+    return _current_trace.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """trace_id ativo no contexto atual (ou None)."""
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+    """
+    Abre um span dentro do trace ativo (sem trace ativo, não faz nada).
+
+    Uso:
+        with tracing.span('quote_fetch', ticker=ticker) as current:
+            ...
+            if current: current.set(rows=len(hist))
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    current = Span(trace, name, parent.id if parent is not None else None, attrs)
+    trace._add(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end = time.monotonic()
+        _current_span.reset(token)
+
+
+@contextmanager
+def trace(name: str, trace_id: Optional[str] = None, force_export: bool = False,
+          profile: bool = False) -> Iterator[Optional[Span]]:
+    """
+    Abre o trace da requisição ou, se já houver um ativo, apenas um span.
+
+    O trace raiz é gravado ao final quando forçado (force_export, LLM_TRACE),
+    com profiling, ou quando passa de LLM_TRACE_SLOW_SECONDS.
+
+    Args:
+        name: Nome da operação (ex: 'POST /key', 'run_llm')
+        trace_id: Identificador vindo do chamador (padrão: LLM_TRACE_ID ou um novo)
+        force_export: Grava o trace mesmo se rápido
+        profile: Faz profiling da requisição (LLM_PROFILER) e grava o resultado junto ao trace
+    """
+    if _current_trace.get() is not None:
+        with span(name) as current:
+            yield current
+        return
+
+    root = Trace(name, trace_id or os.getenv('LLM_TRACE_ID'), force_export or _env_flag('LLM_TRACE'))
+    trace_token = _current_trace.set(root)
+    profiler = _start_profiler() if profile or _env_flag('LLM_PROFILE') else None
+    try:
+        with span(name) as current:
+            yield current
+    finally:
+        root.duration = time.monotonic() - root.start
+        if profiler is not None:
+            root.profile_path = _save_profile(profiler, root.trace_id)
+        _current_trace.reset(trace_token)
+        try:
+            slow = float(os.getenv('LLM_TRACE_SLOW_SECONDS', '10'))
+        except ValueError:
+            slow = 10.0
+        if root.force_export or profiler is not None or (slow > 0 and root.duration >= slow):
+            path = root.export()
+            if path and not root.force_export:
+                print(f"⏱️  {name} levou {root.duration:.1f}s, trace {root.trace_id} em {path}", file=sys.stderr)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorador: executa a função dentro de trace() (span, se já houver trace ativo).
+
+    Args:
+        name: Nome do span (padrão: nome da função)
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with trace(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def request_options(payload: Any) -> Dict[str, Any]:
+    """
+    Opções de rastreamento de uma entrada: 'trace_id', 'trace' (gravar
+    sempre) e 'profile' (profiling desta requisição).
+
+    Returns:
+        Argumentos para trace() (trace_id, force_export, profile)
+    """
+    if not isinstance(payload, dict):
+        return {}
+    truthy = (True, 1, '1', 'true')
+    trace_id = payload.get('trace_id')
+    return {
+        'trace_id': str(trace_id) if trace_id else None,
+        'force_export': payload.get('trace') in truthy,
+        'profile': payload.get('profile') in truthy,
+    }
+
+
+def _start_profiler() -> Any:
+    if os.getenv('LLM_PROFILER', 'cprofile').lower() == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler  # type: ignore
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+        except ImportError:
+            print("Aviso: pyinstrument não instalado, usando cProfile", file=sys.stderr)
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _save_profile(profiler: Any, trace_id: str) -> Optional[str]:
+    """
+    Grava o perfil ao lado do trace: <id>.prof (pstats, para snakeviz etc.)
+    e <id>.prof.txt (funções com maior tempo acumulado).
+
+    O cProfile mede apenas a thread da requisição; chamadas ao Gemini em
+    threads de segundo plano aparecem como espera nos spans do trace.
+    """
+    if hasattr(profiler, 'output_text'):
+        profiler.stop()
+    else:
+        profiler.disable()
+
+    base = traces_dir() / _safe_id(trace_id)
+    try:
+        if hasattr(profiler, 'output_text'):
+            path = base.with_suffix('.prof.txt')
+            path.write_text(profiler.output_text(unicode=True), encoding='utf-8')
+            return str(path)
+
+        import io
+        import pstats
+        profiler.dump_stats(str(base.with_suffix('.prof')))
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(40)
+        base.with_suffix('.prof.txt').write_text(output.getvalue(), encoding='utf-8')
+        return str(base.with_suffix('.prof'))
+    except OSError as e:
+        print(f"Aviso: não foi possível gravar o perfil do trace {trace_id}: {e}", file=sys.stderr)
+        return None
+
+
+def load_trace(trace_id: str) -> Optional[Dict[str, Any]]:
+    """Lê um trace gravado (ou None se não existir)."""
+    path = traces_dir() / f"{_safe_id(trace_id)}.json"
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def format_waterfall(data: Dict[str, Any], width: int = 50) -> str:
+    """Cascata do trace em texto (uma linha por span, barra proporcional ao tempo)."""
+    total = data.get('duration_ms') or 1
+    depth: Dict[int, int] = {}
+    lines = [f"trace {data['trace_id']} ({data['name']}): {total / 1000:.2f}s"]
+    for item in data.get('spans', []):
+        level = depth[item['id']] = depth.get(item['parent_id'], -1) + 1 if item['parent_id'] else 0
+        offset = int(item['start_ms'] / total * width)
+        length = max(1, int(item['duration_ms'] / total * width))
+        bar = ' ' * offset + '█' * min(length, width - offset)
+        label = ('  ' * level + item['name'])[:32]
+        suffix = ' ✗' if item.get('error') else ''
+        lines.append(f"{label:<32} {bar:<{width}} {item['duration_ms'] / 1000:8.3f}s{suffix}")
+    return '\n'.join(lines)
+
+
+def main() -> int:
+    if len(sys.argv) < 2:
+        print("Uso: python utils/tracing.py <trace_id | arquivo.json>", file=sys.stderr)
+        return 1
+    target = sys.argv[1]
+    if os.path.isfile(target):
+        with open(target, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+    else:
+        data = load_trace(target)
+    if data is None:
+        print(f"Trace não encontrado: {target}", file=sys.stderr)
+        return 1
+    print(format_waterfall(data))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Formato de saída dos agentes para o PHP
+Os scripts (AgentJulia.py, AgentPedro.py, run_llm.py) imprimem o resultado em
+JSON indentado por padrão. O chamador pode negociar um formato mais barato de
+codificar, copiar pelo pipe e decodificar:
+
+    --format json       JSON indentado (padrão, saída de sempre)
+    --format compact    JSON sem espaços (json_decode lê igual)
+    --format msgpack    MessagePack (binário; requer o pacote msgpack, senão
+                        cai para compact com aviso no stderr)
+    --spill-over BYTES  resultados maiores que BYTES vão para um arquivo
+                        temporário e o stdout recebe só o ponteiro:
+                        {"_spill":{"path":"...","format":"msgpack","bytes":N}}
+
+O leitor distingue os formatos pelo primeiro byte ('{' ou '[' é JSON; os
+resultados são objetos, que em MessagePack começam com 0x80-0x8f, 0xde ou
+0xdf). O arquivo do ponteiro pertence ao leitor, que deve apagá-lo; arquivos
+que nenhum leitor apagou (ex: PHP que desistiu no timeout) são varridos pelo
+próximo emit que gravar em arquivo, depois de LLM_OUTPUT_SPILL_TTL segundos.
+
+Configuração (valores padrão das opções):
+    LLM_OUTPUT_FORMAT: json, compact ou msgpack (padrão: json)
+    LLM_OUTPUT_SPILL_BYTES: limite para gravar em arquivo (padrão: 0, desligado)
+    LLM_OUTPUT_SPILL_DIR: diretório dos arquivos (padrão: /dev/shm, em memória,
+        quando existir; senão o diretório temporário do sistema)
+    LLM_OUTPUT_SPILL_TTL: idade em segundos a partir da qual um arquivo não lido
+        é apagado (padrão: 3600)
+
+O serviço HTTP aplica a mesma negociação pelo cabeçalho Accept
+(application/msgpack).
+"""
+
+import json
+import os
+import sys
+import time
+from typing import Any, List, Optional, Tuple
+
+try:
+    from .data_models import json_default
+except ImportError:
+    from data_models import json_default  # type: ignore
+
+try:
+    import msgpack  # type: ignore
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+FORMATS = ('json', 'compact', 'msgpack')
+MSGPACK_CONTENT_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+SPILL_KEY = '_spill'
+SPILL_PREFIX = 'llm-out-'
+_SPILL_SUFFIXES = {'json': '.json', 'compact': '.json', 'msgpack': '.msgpack'}
+
+
+class WireOptions:
+    """Formato negociado e limite para gravar a saída em arquivo."""
+
+    __slots__ = ('format', 'spill_over')
+
+    def __init__(self, format: Optional[str] = None, spill_over: Optional[int] = None):
+        self.format = resolve_format(format or os.getenv('LLM_OUTPUT_FORMAT') or 'json')
+        if spill_over is None:
+            spill_over = int(os.getenv('LLM_OUTPUT_SPILL_BYTES', '0') or 0)
+        self.spill_over = max(0, spill_over)
+
+
+def resolve_format(name: str) -> str:
+    """
+    Formato efetivo: msgpack sem o pacote instalado cai para compact.
+
+    Raises:
+        ValueError: Para formatos desconhecidos
+    """
+    name = name.strip().lower()
+    if name not in FORMATS:
+        raise ValueError(f"Formato de saída inválido: {name} (use {', '.join(FORMATS)})")
+    if name == 'msgpack' and not MSGPACK_AVAILABLE:
+        print("Aviso: msgpack não instalado, usando JSON compacto", file=sys.stderr)
+        return 'compact'
+    return name
+
+
+def parse_args(argv: List[str]) -> Tuple[List[str], WireOptions]:
+    """
+    Separa --format/--spill-over dos argumentos posicionais do script.
+
+    Args:
+        argv: Argumentos do script (sem o nome do programa)
+
+    Returns:
+        Tupla (argumentos restantes, opções de saída)
+
+    Raises:
+        ValueError: Para valores inválidos das opções
+    """
+    rest: List[str] = []
+    values = {'--format': None, '--spill-over': None}
+    index = 0
+    while index < len(argv):
+        arg = argv[index]
+        name, sep, value = arg.partition('=')
+        if name in values:
+            if not sep:
+                index += 1
+                if index >= len(argv):
+                    raise ValueError(f"{name} requer um valor")
+                value = argv[index]
+            values[name] = value
+        else:
+            rest.append(arg)
+        index += 1
+    spill_over = values['--spill-over']
+    try:
+        spill_bytes = int(spill_over) if spill_over is not None else None
+    except ValueError:
+        raise ValueError(f"--spill-over deve ser um número de bytes: {spill_over}")
+    return rest, WireOptions(values['--format'], spill_bytes)
+
+
+def encode(data: Any, fmt: str) -> bytes:
+    """Codifica o resultado no formato pedido (os modelos de utils/data_models.py viram dicionários)."""
+    if fmt == 'msgpack':
+        return msgpack.packb(data, use_bin_type=True, default=json_default)
+    if fmt == 'compact':
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=json_default).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, indent=2, default=json_default).encode('utf-8')
+
+
+def decode(raw: bytes) -> Any:
+    """
+    Decodifica uma saída de encode (o formato é detectado pelo primeiro byte).
+
+    Raises:
+        ValueError: Se a saída não for JSON nem MessagePack válido
+    """
+    text = raw.lstrip()
+    if text[:1] in (b'{', b'['):
+        return json.loads(text.decode('utf-8'))
+    if not MSGPACK_AVAILABLE:
+        raise ValueError("Saída em MessagePack, mas o pacote msgpack não está instalado")
+    return msgpack.unpackb(raw, raw=False)
+
+
+def spill_dir() -> str:
+    """Diretório dos arquivos de saída grandes."""
+    configured = os.getenv('LLM_OUTPUT_SPILL_DIR')
+    if configured:
+        return configured
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    import tempfile
+    return tempfile.gettempdir()
+
+
+def sweep_spills(max_age: Optional[float] = None, directory: Optional[str] = None) -> int:
+    """
+    Apaga os arquivos de saída que nenhum leitor apagou.
+
+    Args:
+        max_age: Idade mínima em segundos (padrão: LLM_OUTPUT_SPILL_TTL)
+        directory: Diretório a varrer (padrão: spill_dir())
+
+    Returns:
+        Quantidade de arquivos apagados
+    """
+    if max_age is None:
+        max_age = float(os.getenv('LLM_OUTPUT_SPILL_TTL', '3600') or 3600)
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = os.scandir(directory or spill_dir())
+    except OSError:
+        return 0
+    with entries:
+        for entry in entries:
+            if not entry.name.startswith(SPILL_PREFIX):
+                continue
+            try:
+                if entry.is_file(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    os.unlink(entry.path)
+                    removed += 1
+            except OSError:
+                # Lido e apagado por outro processo no meio da varredura
+                continue
+    return removed
+
+
+def emit(data: Any, options: Optional[WireOptions] = None, stream: Optional[Any] = None) -> None:
+    """
+    Escreve o resultado no stdout no formato negociado (ou o ponteiro do arquivo).
+
+    Args:
+        data: Resultado do agente
+        options: Formato e limite (padrão: variáveis de ambiente)
+        stream: Saída binária (padrão: sys.stdout.buffer)
+    """
+    options = options or WireOptions()
+    payload = encode(data, options.format)
+    if options.spill_over and len(payload) > options.spill_over:
+        import tempfile
+        directory = spill_dir()
+        sweep_spills(directory=directory)
+        fd, path = tempfile.mkstemp(prefix=SPILL_PREFIX, suffix=_SPILL_SUFFIXES[options.format], dir=directory)
+        with os.fdopen(fd, 'wb') as file:
+            file.write(payload)
+        pointer = {SPILL_KEY: {'path': path, 'format': options.format, 'bytes': len(payload)}}
+        payload = json.dumps(pointer, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    if stream is None:
+        sys.stdout.flush()
+        stream = sys.stdout.buffer
+    stream.write(payload)
+    if options.format != 'msgpack' or payload[:1] == b'{':
+        stream.write(b'\n')
+    stream.flush()
+
+
+def read(raw: bytes, remove: bool = True) -> Any:
+    """
+    Lê a saída de um agente (segue o ponteiro de arquivo, se houver).
+
+    Args:
+        raw: stdout do script
+        remove: Apaga o arquivo do ponteiro depois de ler
+
+    Returns:
+        O resultado decodificado
+    """
+    data = decode(raw)
+    spill = data.get(SPILL_KEY) if isinstance(data, dict) and len(data) == 1 else None
+    if not isinstance(spill, dict):
+        return data
+    path = spill['path']
+    try:
+        with open(path, 'rb') as file:
+            return decode(file.read())
+    finally:
+        if remove:
+            os.unlink(path)
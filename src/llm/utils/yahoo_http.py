@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cliente HTTP mínimo da API do Yahoo Finance
+Usado pelo Agente Júlia no lugar do yfinance quando YAHOO_API_BASE_URL está
+definido (ex: dublês locais do benchmarks/loadtest.py ou um proxy interno).
+Expõe apenas o que o agente usa do yfinance: Ticker(symbol).info e
+Ticker(symbol).history(period).
+
+Endpoints consultados (mesmo formato da API pública):
+    GET {base}/v10/finance/quoteSummary/{symbol}?modules=...
+    GET {base}/v8/finance/chart/{symbol}?range=2d&interval=1d
+
+Configuração:
+    YAHOO_API_BASE_URL: URL base (ex: http://127.0.0.1:8765)
+    YAHOO_API_TIMEOUT: timeout de cada requisição em segundos (padrão: 10)
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+from urllib.error import HTTPError
+from urllib.parse import quote, urlencode
+from urllib.request import Request, urlopen
+
+# Módulos do quoteSummary achatados em 'info' (como no yfinance)
+QUOTE_SUMMARY_MODULES = ('price', 'summaryDetail', 'defaultKeyStatistics', 'financialData',
+                         'assetProfile', 'quoteType')
+
+
+class YahooHTTPError(Exception):
+    """Resposta de erro da API (limite de requisições, erro do servidor etc.)."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Yahoo Finance respondeu {status}: {message}")
+        self.status = status
+
+
+def base_url() -> Optional[str]:
+    """URL base configurada (YAHOO_API_BASE_URL), ou None para usar o yfinance."""
+    url = os.getenv('YAHOO_API_BASE_URL')
+    return url.rstrip('/') if url else None
+
+
+def _get(path: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    GET na API; devolve None para 404 (símbolo inexistente).
+
+    Raises:
+        YahooHTTPError: Para os demais erros HTTP
+    """
+    url = f"{base_url()}{path}?{urlencode(params)}"
+    request = Request(url, headers={'Accept': 'application/json', 'User-Agent': 'llm-agent-julia'})
+    try:
+        with urlopen(request, timeout=float(os.getenv('YAHOO_API_TIMEOUT', '10'))) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except HTTPError as e:
+        if e.code == 404:
+            return None
+        raise YahooHTTPError(e.code, e.reason)
+
+
+def _raw(value: Any) -> Any:
+    # A API devolve números como {"raw": 1.23, "fmt": "1,23"}
+    if isinstance(value, dict):
+        return value.get('raw') if 'raw' in value else (None if not value else value)
+    return value
+
+
+class _Column(list):
+    """Coluna do histórico (apenas .iloc, como no pandas)."""
+
+    @property
+    def iloc(self) -> List[Any]:
+        return self
+
+
+class History:
+    """Subconjunto do DataFrame de histórico usado pelo agente: hist['Close'].iloc[-1], len(hist), hist.empty."""
+
+    def __init__(self, columns: Dict[str, List[Any]]):
+        self._columns = {name: _Column(values) for name, values in columns.items()}
+
+    def __getitem__(self, name: str) -> _Column:
+        return self._columns[name]
+
+    def __len__(self) -> int:
+        return len(self._columns.get('Close', []))
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    def to_columns(self) -> Dict[str, List[Any]]:
+        """Colunas como listas (para serialização)."""
+        return {name: list(values) for name, values in self._columns.items()}
+
+
+class Ticker:
+    """Equivalente HTTP do yfinance.Ticker para um símbolo."""
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self._info: Optional[Dict[str, Any]] = None
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        """Campos do quoteSummary achatados num único dicionário ({} se o símbolo não existir)."""
+        if self._info is None:
+            data = _get(f"/v10/finance/quoteSummary/{quote(self.symbol)}",
+                        {'modules': ','.join(QUOTE_SUMMARY_MODULES)})
+            info: Dict[str, Any] = {}
+            results = ((data or {}).get('quoteSummary') or {}).get('result') or []
+            for module in (results[0] if results else {}).values():
+                if isinstance(module, dict):
+                    for key, value in module.items():
+                        value = _raw(value)
+                        if value is not None and key not in info:
+                            info[key] = value
+            if info:
+                info.setdefault('symbol', self.symbol)
+            self._info = info
+        return self._info
+
+    def history(self, period: str = '1mo', interval: str = '1d') -> History:
+        """Cotações do período (colunas Open, High, Low, Close, Volume)."""
+        data = _get(f"/v8/finance/chart/{quote(self.symbol)}", {'range': period, 'interval': interval})
+        results = ((data or {}).get('chart') or {}).get('result') or []
+        if not results:
+            return History({})
+        quotes = ((results[0].get('indicators') or {}).get('quote') or [{}])[0]
+        series = {name: quotes.get(name) or [] for name in ('open', 'high', 'low', 'close', 'volume')}
+        # Pregões sem algum valor (None) saem inteiros, para as colunas continuarem
+        # alinhadas entre si (e com as datas); colunas ausentes da resposta ficam vazias
+        length = max(len(values) for values in series.values())
+        rows = [index for index in range(length)
+                if all(index < len(values) and values[index] is not None for values in series.values() if values)]
+        return History({name.capitalize(): [values[index] for index in rows] if values else []
+                        for name, values in series.items()})
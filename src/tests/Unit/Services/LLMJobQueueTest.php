@@ -0,0 +1,110 @@
+<?php
+
+namespace Tests\Unit\Services;
+
+use App\Services\LLMJobQueue;
+use Illuminate\Http\Client\Request;
+use Illuminate\Support\Facades\Http;
+use Tests\TestCase;
+
+class LLMJobQueueTest extends TestCase
+{
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        config(['services.llm.service_url' => 'http://llm:8001']);
+    }
+
+    /** @test */
+    public function it_enqueues_interactive_jobs_with_priority()
+    {
+        Http::fake([
+            'llm:8001/jobs' => Http::response([
+                'job_id' => 7,
+                'status' => 'pending',
+                'deduplicated' => false,
+            ], 201),
+        ]);
+
+        $queue = new LLMJobQueue();
+        $result = $queue->enqueue('key', ['symbol' => 'PETR4'], LLMJobQueue::PRIORITY_INTERACTIVE);
+
+        $this->assertEquals(7, $result['job_id']);
+        Http::assertSent(function (Request $request) {
+            return $request->url() === 'http://llm:8001/jobs'
+                && $request['agent'] === 'key'
+                && $request['priority'] === 'interactive'
+                && $request['payload'] === ['symbol' => 'PETR4'];
+        });
+    }
+
+    /** @test */
+    public function it_returns_job_status()
+    {
+        Http::fake([
+            'llm:8001/jobs/7' => Http::response([
+                'id' => 7,
+                'status' => 'done',
+                'result' => ['title' => 'Análise PETR4', 'content' => '...'],
+            ], 200),
+        ]);
+
+        $job = (new LLMJobQueue())->status(7);
+
+        $this->assertEquals('done', $job['status']);
+        $this->assertEquals('Análise PETR4', $job['result']['title']);
+    }
+
+    /** @test */
+    public function it_returns_null_when_service_is_not_configured()
+    {
+        config(['services.llm.service_url' => null]);
+        Http::fake();
+
+        $queue = new LLMJobQueue();
+
+        $this->assertFalse($queue->isConfigured());
+        $this->assertNull($queue->enqueue('julia', ['company_name' => 'Petrobras']));
+        Http::assertNothingSent();
+    }
+
+    /** @test */
+    public function it_returns_null_when_service_rejects_job()
+    {
+        Http::fake([
+            'llm:8001/jobs' => Http::response(['error' => 'Agente inválido: foo'], 400),
+        ]);
+
+        $this->assertNull((new LLMJobQueue())->enqueue('foo', []));
+    }
+
+    /** @test */
+    public function it_awaits_the_job_until_it_is_done()
+    {
+        Http::fake([
+            'llm:8001/jobs/7' => Http::sequence()
+                ->push(['id' => 7, 'status' => 'pending'], 200)
+                ->push(['id' => 7, 'status' => 'running'], 200)
+                ->push(['id' => 7, 'status' => 'done', 'result' => ['symbol' => 'PETR4.SA']], 200),
+        ]);
+
+        $job = (new LLMJobQueue())->await(7, 5, 1);
+
+        $this->assertEquals('PETR4.SA', $job['result']['symbol']);
+        Http::assertSentCount(3);
+    }
+
+    /** @test */
+    public function it_throws_when_the_awaited_job_is_dead_lettered()
+    {
+        Http::fake([
+            'llm:8001/jobs/7' => Http::response(['id' => 7, 'status' => 'dead', 'error' => 'Tempo esgotado'], 200),
+        ]);
+
+        $this->expectException(\Exception::class);
+        $this->expectExceptionMessage('Tempo esgotado');
+
+        (new LLMJobQueue())->await(7, 5, 1);
+    }
+}
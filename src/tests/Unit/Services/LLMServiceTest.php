@@ -2,8 +2,13 @@
 
 namespace Tests\Unit\Services;
 
+use App\Services\LLMJobQueue;
 use App\Services\LLMService;
+use GuzzleHttp\Exception\ConnectException;
+use GuzzleHttp\Psr7\Request;
+use Illuminate\Http\Client\Request as ClientRequest;
 use Illuminate\Foundation\Testing\RefreshDatabase;
+use Illuminate\Http\Client\ConnectionException;
 use Illuminate\Support\Facades\Http;
 use Illuminate\Support\Facades\Process;
 use Tests\TestCase;
@@ -105,4 +110,88 @@ class LLMServiceTest extends TestCase
         $this->assertArrayHasKey('content', $result);
         $this->assertStringContainsString('disclaimer', strtolower($result['content']));
     }
+
+    /** @test */
+    public function it_keeps_the_same_trace_id_for_the_request()
+    {
+        $traceId = $this->service->getTraceId();
+
+        $this->assertNotEmpty($traceId);
+        $this->assertSame($traceId, $this->service->getTraceId());
+        $this->assertSame('php-abc123', $this->service->setTraceId('php-abc123')->getTraceId());
+    }
+
+    /** @test */
+    public function it_falls_back_to_the_local_script_only_when_the_service_is_unreachable()
+    {
+        $request = new Request('POST', 'http://llm:8001/key');
+        $refused = new ConnectionException('cURL error 7: Failed to connect', 0,
+            new ConnectException('Failed to connect', $request, null, ['errno' => 7]));
+        $dns = new ConnectionException('cURL error 6: Could not resolve host: llm');
+
+        $this->assertTrue(LLMService::isConnectFailure($refused));
+        $this->assertTrue(LLMService::isConnectFailure($dns));
+    }
+
+    /** @test */
+    public function it_treats_a_service_timeout_as_an_error_instead_of_running_locally()
+    {
+        $request = new Request('POST', 'http://llm:8001/key');
+        $timeout = new ConnectionException('cURL error 28: Operation timed out after 300000 milliseconds', 0,
+            new ConnectException('Operation timed out', $request, null, ['errno' => 28]));
+
+        $this->assertFalse(LLMService::isConnectFailure($timeout));
+        $this->assertFalse(LLMService::isConnectFailure(new ConnectionException('cURL error 28: timed out')));
+    }
+
+    /** @test */
+    public function it_generates_through_the_job_queue_with_the_given_priority()
+    {
+        config(['services.llm.service_url' => 'http://llm:8001']);
+
+        Http::fake([
+            'llm:8001/jobs' => Http::response(['job_id' => 9, 'status' => 'pending', 'deduplicated' => false], 201),
+            'llm:8001/jobs/9' => Http::response([
+                'id' => 9,
+                'status' => 'done',
+                'result' => ['title' => 'Análise PETR4', 'content' => 'A Petrobras apresentou...'],
+            ], 200),
+        ]);
+
+        $result = (new LLMService())
+            ->setQueuePriority(LLMJobQueue::PRIORITY_INTERACTIVE)
+            ->generateArticle(['price' => 30.50], ['sentiment' => 'positive', 'sentiment_score' => 0.75], 'PETR4');
+
+        $this->assertEquals('Análise PETR4', $result['title']);
+        Http::assertSent(function (ClientRequest $request) {
+            return $request->url() === 'http://llm:8001/jobs'
+                && $request['agent'] === 'key'
+                && $request['priority'] === 'interactive'
+                && $request['payload']['symbol'] === 'PETR4';
+        });
+        Http::assertNotSent(function (ClientRequest $request) {
+            return str_contains($request->url(), 'generativelanguage.googleapis.com');
+        });
+    }
+
+    /** @test */
+    public function it_uses_the_template_when_the_queued_job_fails()
+    {
+        config(['services.llm.service_url' => 'http://llm:8001']);
+
+        Http::fake([
+            'llm:8001/jobs' => Http::response(['job_id' => 9, 'status' => 'pending', 'deduplicated' => false], 201),
+            'llm:8001/jobs/9' => Http::response(['id' => 9, 'status' => 'dead', 'error' => 'falhou'], 200),
+        ]);
+
+        $result = (new LLMService())
+            ->setQueuePriority(LLMJobQueue::PRIORITY_SCHEDULED)
+            ->generateArticle(['price' => 30.50], ['sentiment' => 'neutral', 'sentiment_score' => 0], 'PETR4');
+
+        $this->assertNotEmpty($result['title']);
+        $this->assertNotEmpty($result['content']);
+        Http::assertNotSent(function (ClientRequest $request) {
+            return str_contains($request->url(), 'generativelanguage.googleapis.com');
+        });
+    }
 }
@@ -0,0 +1,59 @@
+<?php
+
+namespace Tests\Unit\Services;
+
+use App\Services\LLMWireFormat;
+use Tests\TestCase;
+
+class LLMWireFormatTest extends TestCase
+{
+    /** @test */
+    public function it_decodes_compact_and_indented_json()
+    {
+        $this->assertEquals(['title' => 'Análise'], LLMWireFormat::decode('{"title":"Análise"}'));
+        $this->assertEquals(['title' => 'Análise'], LLMWireFormat::decode("{\n  \"title\": \"Análise\"\n}\n"));
+        $this->assertNull(LLMWireFormat::decode(''));
+    }
+
+    /** @test */
+    public function it_reads_and_removes_spilled_output()
+    {
+        $path = tempnam(sys_get_temp_dir(), LLMWireFormat::SPILL_PREFIX);
+        file_put_contents($path, json_encode(['sentiment' => 'positive', 'news_count' => 3]));
+
+        $pointer = json_encode([LLMWireFormat::SPILL_KEY => ['path' => $path, 'format' => 'compact', 'bytes' => 10]]);
+        $result = LLMWireFormat::decode($pointer . "\n");
+
+        $this->assertEquals(['sentiment' => 'positive', 'news_count' => 3], $result);
+        $this->assertFileDoesNotExist($path);
+    }
+
+    /** @test */
+    public function it_rejects_spill_pointers_outside_agent_files()
+    {
+        $this->expectException(\RuntimeException::class);
+
+        LLMWireFormat::decode(json_encode([LLMWireFormat::SPILL_KEY => ['path' => '/etc/passwd']]));
+    }
+
+    /** @test */
+    public function it_builds_script_arguments_from_config()
+    {
+        config([
+            'services.llm.output_format' => 'compact',
+            'services.llm.output_spill_bytes' => 4096,
+        ]);
+
+        $this->assertEquals(['--format', 'compact', '--spill-over', '4096'], LLMWireFormat::arguments());
+        $this->assertEquals([], LLMWireFormat::headers());
+    }
+
+    /** @test */
+    public function it_falls_back_to_compact_json_without_msgpack_extension()
+    {
+        config(['services.llm.output_format' => 'msgpack']);
+
+        $expected = LLMWireFormat::msgpackAvailable() ? 'msgpack' : 'compact';
+        $this->assertEquals($expected, LLMWireFormat::format());
+    }
+}